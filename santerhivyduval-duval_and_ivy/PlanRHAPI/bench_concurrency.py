@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Benchmark de charge : débit de l'API en fonction du nombre de requêtes concurrentes
+Avec une couche d'accès asynchrone (Motor), le débit doit augmenter avec la concurrence
+au lieu de plafonner au niveau d'une seule requête à la fois.
+
+Usage : lancer l'API (uvicorn main:app --workers 1) puis
+    python bench_concurrency.py [endpoint]
+"""
+
+import os
+import sys
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+# Configuration
+API_BASE_URL = os.getenv('API_BASE_URL', "http://localhost:8000")
+REQUESTS_PER_LEVEL = int(os.getenv('BENCH_REQUESTS', "400"))
+CONCURRENCY_LEVELS = [1, 5, 10, 25, 50]
+
+_local = threading.local()
+
+
+def timed_get(url):
+    """Effectue un GET avec une session par thread et retourne la latence en ms"""
+    if not hasattr(_local, "session"):
+        _local.session = requests.Session()
+    start = time.perf_counter()
+    response = _local.session.get(url, timeout=30)
+    response.raise_for_status()
+    return (time.perf_counter() - start) * 1000
+
+
+def run_level(url, concurrency):
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        start = time.perf_counter()
+        latencies = list(executor.map(timed_get, [url] * REQUESTS_PER_LEVEL))
+        elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "throughput": REQUESTS_PER_LEVEL / elapsed,
+        "p50": statistics.median(latencies),
+        "p95": latencies[int(len(latencies) * 0.95) - 1]
+    }
+
+
+def main():
+    endpoint = sys.argv[1] if len(sys.argv) > 1 else "/plannings"
+    url = f"{API_BASE_URL}{endpoint}"
+
+    print(f"🏁 Benchmark de concurrence sur {url}")
+    print(f"   {REQUESTS_PER_LEVEL} requêtes par niveau")
+    print("=" * 70)
+    print(f"   {'concurrence':>11}  {'req/s':>9}  {'p50 (ms)':>9}  {'p95 (ms)':>9}  {'gain':>6}")
+
+    baseline = None
+    for concurrency in CONCURRENCY_LEVELS:
+        try:
+            result = run_level(url, concurrency)
+        except requests.exceptions.RequestException as e:
+            print(f"❌ Erreur de connexion - {e}")
+            return
+
+        baseline = baseline or result["throughput"]
+        print(
+            f"   {concurrency:>11}  {result['throughput']:>9.1f}  {result['p50']:>9.1f}"
+            f"  {result['p95']:>9.1f}  {result['throughput'] / baseline:>5.1f}x"
+        )
+
+    print("=" * 70)
+
+
+if __name__ == "__main__":
+    main()
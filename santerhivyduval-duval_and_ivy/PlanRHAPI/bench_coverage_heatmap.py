@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Benchmark : carte de couverture d'un service (GET /agenda/coverage, scheduling/coverage.py)
+Objectif : un mois d'un service de 200 agents en bien moins de 100 ms.
+Mesure la préparation des créneaux et le calcul des matrices sur des plannings synthétiques
+(tels que lus en base, avec les champs horaires natifs), sans MongoDB.
+"""
+
+import os
+import random
+import statistics
+import time
+from datetime import date
+
+from scheduling.compliance import is_worked
+from scheduling.contracts import period_days
+from scheduling.coverage import coverage_matrix, coverage_report, slot_offsets
+from utils.time_fields import planning_time_fields
+
+REPEAT = int(os.getenv('BENCH_REPEAT', "20"))
+TARGET_MS = 100
+PLAGES = ["07:00-19:00", "08:00-16:00", "06:30-14:30", "13:30-21:30", "20:00-08:00", "21:00-07:00"]
+
+
+def synthetic_plannings(nb_agents, days, seed=42):
+    rng = random.Random(seed)
+    docs = []
+    for i in range(nb_agents):
+        plage = rng.choice(PLAGES)
+        for day in days:
+            if rng.random() < 0.65:
+                docs.append({
+                    "user_id": f"U{i}", "date": day, "plage_horaire": plage, "activity_code": "SOIN",
+                    **planning_time_fields(day, plage)
+                })
+            elif rng.random() < 0.3:
+                docs.append({"user_id": f"U{i}", "date": day, "plage_horaire": None, "activity_code": "REPOS", **planning_time_fields(day, None)})
+    return docs
+
+
+def measure(nb_agents, first_day, last_day):
+    days = period_days(first_day, last_day)
+    docs = synthetic_plannings(nb_agents, days)
+    user_keys = {f"U{i}": i for i in range(nb_agents)}
+    timings = []
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        worked = [doc for doc in docs if is_worked(doc)]
+        agents, starts, ends = slot_offsets(first_day, worked, user_keys)
+        report = coverage_report(days, coverage_matrix(len(days), agents, starts, ends, {"jour": int(nb_agents * 0.4), "nuit": int(nb_agents * 0.1)}))
+        timings.append(time.perf_counter() - start)
+    median = statistics.median(timings) * 1000
+    print(f"   {nb_agents:>5} agents × {len(days):>3} jours  {len(docs):>7} plannings  "
+          f"{median:>7.1f} ms  {len(report['below']):>4} cellule(s) sous l'effectif minimal")
+    return median
+
+
+def main():
+    print(f"🏁 Benchmark de la carte de couverture (médiane sur {REPEAT} essais)")
+    print("=" * 80)
+    target = measure(200, date(2025, 3, 1), date(2025, 3, 31))
+    measure(1000, date(2025, 3, 1), date(2025, 3, 31))
+    measure(200, date(2025, 1, 1), date(2025, 12, 31))
+    print("=" * 80)
+    if target < TARGET_MS:
+        print(f"✅ 200 agents × 31 jours en {target:.1f} ms (objectif < {TARGET_MS} ms)")
+    else:
+        print(f"❌ 200 agents × 31 jours en {target:.1f} ms (objectif < {TARGET_MS} ms)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Benchmark : moteur de génération automatique des plannings (scheduling/)
+Objectif : un service de 100 agents sur 31 jours en moins de 2 secondes sur un cœur.
+Mesure le moteur seul, sur des contrats, disponibilités et absences synthétiques (sans MongoDB).
+"""
+
+import os
+import random
+import statistics
+import time
+from datetime import date
+
+from scheduling import build_agent_profile, generate_planning, period_days
+
+REPEAT = int(os.getenv('BENCH_REPEAT', "5"))
+TARGET_SECONDS = 2.0
+DAY_NAMES = ["Lundi", "Mardi", "Mercredi", "Jeudi", "Vendredi", "Samedi", "Dimanche"]
+
+
+def synthetic_profiles(nb_agents, days, seed=42):
+    rng = random.Random(seed)
+    profiles = []
+    for i in range(nb_agents):
+        night = rng.random() < 0.2
+        start, end = ("20:00", "08:00") if night else ("08:00", "16:00")
+        work_days = rng.sample(DAY_NAMES, k=rng.choice([3, 4, 5]))
+        contrat = {
+            "user_id": f"U{i}",
+            "contrat_hour_week": rng.choice(["35", "35h", "37h30", "24", "32,5"]),
+            "working_period": "Travail de nuit" if night else "Travail de jour",
+            "work_days": [{"day": day, "start_time": start, "end_time": end} for day in work_days]
+        }
+        availabilities = [
+            {"date": day, "start_time": "09:00", "end_time": "13:00"}
+            for day in rng.sample(days, k=3)
+        ]
+        absences = []
+        if rng.random() < 0.3:
+            first = rng.randrange(len(days) - 5)
+            absences.append({"start_date": days[first], "end_date": days[first + 4], "status": "Validé par le cadre"})
+        user = {"_id": f"U{i}", "first_name": f"Agent{i}", "last_name": "Bench"}
+        profiles.append(build_agent_profile(user, contrat, availabilities, absences, days=days))
+    return profiles
+
+
+def measure(nb_agents, nb_days):
+    days = period_days(date(2025, 1, 1), date.fromordinal(date(2025, 1, 1).toordinal() + nb_days - 1))
+    timings = []
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        profiles = synthetic_profiles(nb_agents, days)
+        docs, summary = generate_planning(profiles, days)
+        timings.append(time.perf_counter() - start)
+    median = statistics.median(timings)
+    deltas = [abs(agent["delta_hours"]) for agent in summary]
+    print(f"   {nb_agents:>5} agents × {nb_days:>3} jours  {len(docs):>7} plannings  "
+          f"{median * 1000:>8.1f} ms  écart moyen au contrat {statistics.mean(deltas):>5.1f} h")
+    return median
+
+
+def main():
+    print(f"🏁 Benchmark du générateur de plannings (médiane sur {REPEAT} essais)")
+    print("=" * 80)
+    target = measure(100, 31)
+    for nb_agents, nb_days in [(300, 31), (1000, 31), (100, 365)]:
+        measure(nb_agents, nb_days)
+    print("=" * 80)
+    if target < TARGET_SECONDS:
+        print(f"✅ 100 agents × 31 jours en {target:.3f} s (objectif < {TARGET_SECONDS} s)")
+    else:
+        print(f"❌ 100 agents × 31 jours en {target:.3f} s (objectif < {TARGET_SECONDS} s)")
+
+
+if __name__ == "__main__":
+    main()
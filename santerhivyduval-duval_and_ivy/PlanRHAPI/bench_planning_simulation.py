@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Benchmark : simulation multi-services (POST /plannings/simulate)
+Compare la génération en série sur la boucle d'événements à la répartition des services
+dans le pool de processus (utils/workers.py), sur des services synthétiques (sans MongoDB).
+Mesure la durée totale et le plus long blocage de la boucle d'événements (latence subie par les autres requêtes).
+"""
+
+import asyncio
+import os
+import time
+
+from bench_planning_generator import synthetic_profiles
+from scheduling import simulate_service
+from scheduling.contracts import month_days
+from utils.workers import PROCESS_WORKERS, run_in_process, shutdown_process_pool
+
+NB_SERVICES = int(os.getenv('BENCH_SERVICES', "12"))
+AGENTS_PER_SERVICE = int(os.getenv('BENCH_AGENTS', "300"))
+# Optimisation par service (vide : générateur glouton seul)
+BACKEND = os.getenv('BENCH_BACKEND') or None
+TIME_BUDGET = float(os.getenv('BENCH_TIME_BUDGET', "1"))
+TICK = 0.005
+
+
+async def max_loop_lag(stop: asyncio.Event):
+    """Plus grand retard observé d'un réveil périodique de la boucle d'événements"""
+    worst = 0.0
+    while not stop.is_set():
+        expected = time.perf_counter() + TICK
+        await asyncio.sleep(TICK)
+        worst = max(worst, time.perf_counter() - expected)
+    return worst
+
+
+async def serial(services, days):
+    for service_id, profiles in services:
+        simulate_service(service_id, profiles, days, backend=BACKEND, time_budget=TIME_BUDGET)
+        await asyncio.sleep(0)
+
+
+async def pooled(services, days):
+    tasks = [
+        run_in_process(simulate_service, service_id, profiles, days, backend=BACKEND, time_budget=TIME_BUDGET)
+        for service_id, profiles in services
+    ]
+    for next_result in asyncio.as_completed(tasks):
+        await next_result
+
+
+async def measure(label, run, services, days):
+    stop = asyncio.Event()
+    lag = asyncio.ensure_future(max_loop_lag(stop))
+    await asyncio.sleep(TICK)
+    start = time.perf_counter()
+    await run(services, days)
+    elapsed = time.perf_counter() - start
+    stop.set()
+    worst = await lag
+    print(f"   {label:<22} durée {elapsed:>7.2f} s   blocage max de la boucle {worst * 1000:>8.1f} ms")
+    return elapsed, worst
+
+
+async def main():
+    days = month_days(2025, 1)
+    services = [
+        (f"S{i}", synthetic_profiles(AGENTS_PER_SERVICE, days, seed=i)) for i in range(NB_SERVICES)
+    ]
+    print(f"🏁 Simulation de {NB_SERVICES} services × {AGENTS_PER_SERVICE} agents × {len(days)} jours "
+          f"(backend {BACKEND or 'glouton'}, {PROCESS_WORKERS} processus)")
+    print("=" * 80)
+
+    # Démarrage des processus hors mesure
+    await run_in_process(simulate_service, "warmup", [], days)
+
+    serial_time, serial_lag = await measure("série (boucle)", serial, services, days)
+    pool_time, pool_lag = await measure("pool de processus", pooled, services, days)
+    shutdown_process_pool()
+
+    print("=" * 80)
+    print(f"{'✅' if pool_lag < serial_lag else '❌'} Boucle d'événements libre pendant la simulation "
+          f"({pool_lag * 1000:.1f} ms contre {serial_lag * 1000:.1f} ms)")
+    print(f"   Accélération {serial_time / pool_time:.1f}x")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
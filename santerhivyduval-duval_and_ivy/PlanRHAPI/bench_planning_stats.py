@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Benchmark : GET /plannings/stats/summary
+Compare l'ancienne implémentation (13 count_documents séquentiels) à l'agrégation $facet unique,
+avec et sans répartition par service, sur des volumes croissants.
+"""
+
+import asyncio
+import os
+import random
+import statistics
+import time
+from datetime import date, datetime, timedelta
+
+from bson import ObjectId
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import MongoClient
+
+from crud.planning import (
+    DEFAULT_ACTIVITY_CODES, date_range_filter, date_window, format_planning_stats, planning_stats_pipeline
+)
+from database.indexes import ensure_indexes
+
+MONGO_URI = os.getenv('MONGO_URI', 'mongodb://localhost:27017/')
+BENCH_DATABASE_NAME = os.getenv('BENCH_DATABASE_NAME', 'planRhIA_bench')
+REPEAT = int(os.getenv('BENCH_REPEAT', "10"))
+
+
+def seed(db, nb_agents, nb_days, nb_services=8):
+    """nb_agents répartis sur nb_services, un planning par agent et par jour à partir d'aujourd'hui"""
+    for name in ("users", "plannings", "code"):
+        db[name].drop()
+
+    db.code.insert_many([{"name": code.title(), "name_abrege": code} for code in DEFAULT_ACTIVITY_CODES])
+
+    user_docs = [
+        {"_id": ObjectId(), "first_name": f"Agent{i}", "last_name": "Bench", "service_id": f"S{i % nb_services}"}
+        for i in range(nb_agents)
+    ]
+    db.users.insert_many(user_docs)
+
+    today = date.today()
+    now = datetime.now()
+    db.plannings.insert_many([
+        {
+            "user_id": str(user["_id"]),
+            "date": (today + timedelta(days=day)).strftime("%Y-%m-%d"),
+            "activity_code": random.choice(DEFAULT_ACTIVITY_CODES),
+            "plage_horaire": "08:00-16:00",
+            "created_at": now,
+            "updated_at": now
+        }
+        for day in range(nb_days) for user in user_docs
+    ])
+
+
+async def legacy_stats(db):
+    """Ancienne implémentation : un count_documents par valeur"""
+    total = await db.plannings.count_documents({})
+    by_activity = {}
+    for activity in DEFAULT_ACTIVITY_CODES:
+        by_activity[activity] = await db.plannings.count_documents({"activity_code": activity})
+    by_date = {}
+    today = date.today()
+    for i in range(7):
+        date_str = (today + timedelta(days=i)).strftime("%Y-%m-%d")
+        by_date[date_str] = await db.plannings.count_documents({"date": date_str})
+    return {"total_plannings": total, "by_activity": by_activity, "by_date": by_date}
+
+
+def facet_stats(by_service=False):
+    async def run(db):
+        window = date_window()
+        pipeline = planning_stats_pipeline({}, date_range_filter(*window), by_service)
+        results, codes = await asyncio.gather(
+            db.plannings.aggregate(pipeline).to_list(length=1),
+            db.code.find({}, {"name_abrege": 1}).to_list(length=None)
+        )
+        return format_planning_stats(results[0], [code["name_abrege"] for code in codes], window)
+    return run
+
+
+async def measure(db, label, compute):
+    timings = []
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        stats = await compute(db)
+        timings.append((time.perf_counter() - start) * 1000)
+    print(f"   {label:<22} médiane {statistics.median(timings):>8.1f} ms   max {max(timings):>8.1f} ms")
+    return stats
+
+
+async def main():
+    seed_client = MongoClient(MONGO_URI)
+    client = AsyncIOMotorClient(MONGO_URI)
+    db = client[BENCH_DATABASE_NAME]
+
+    print(f"🏁 Benchmark statistiques des plannings ({REPEAT} essais par mesure)")
+    print("=" * 70)
+
+    consistent = True
+    for nb_agents, nb_days in [(100, 31), (300, 93), (600, 365)]:
+        seed(seed_client[BENCH_DATABASE_NAME], nb_agents, nb_days)
+        await ensure_indexes(db)
+        print(f"📊 {nb_agents} agents × {nb_days} jours ({nb_agents * nb_days} plannings)")
+        legacy = await measure(db, "13 count_documents", legacy_stats)
+        facet = await measure(db, "$facet", facet_stats())
+        await measure(db, "$facet + par service", facet_stats(by_service=True))
+        # Les minutes travaillées n'existent que dans la version agrégée
+        consistent &= legacy == {key: facet[key] for key in legacy}
+
+    print("=" * 70)
+    print(f"{'✅' if consistent else '❌'} Résultats identiques entre les deux implémentations")
+
+    seed_client.drop_database(BENCH_DATABASE_NAME)
+    seed_client.close()
+    client.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
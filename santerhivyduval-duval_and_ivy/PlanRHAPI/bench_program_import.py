@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Benchmark : extraction des programmes annuels d'un classeur Excel (POST /programs/upload)
+Compare l'ancienne implémentation (pd.ExcelFile, relecture du classeur pour chaque titre, df.iloc cellule par cellule)
+à la lecture unique en openpyxl read_only avec découpage NumPy de la grille, sur un classeur synthétique,
+et vérifie que les deux produisent les mêmes documents.
+"""
+
+import math
+import os
+import random
+import tempfile
+import time
+
+import openpyxl
+import pandas as pd
+
+from extract import extract_name
+from utils.program import extract_annual_programs
+
+NB_AGENTS = int(os.getenv('BENCH_AGENTS', "200"))
+MONTHS = ["Janvier", "Février", "Mars", "Avril", "Mai", "Juin",
+          "Juillet", "Août", "Septembre", "Octobre", "Novembre", "Décembre"]
+CODES = ["J", "N", "RH", "CA", "M"]
+
+
+def build_workbook(path, nb_agents, seed=1):
+    """Une feuille 'Planning agent' par agent : titre, mois fusionnés sur (jour, code), 31 jours puis le total"""
+    rng = random.Random(seed)
+    workbook = openpyxl.Workbook()
+    workbook.remove(workbook.active)
+    for agent in range(nb_agents):
+        sheet = workbook.create_sheet(f"Planning agent {agent}")
+        sheet.cell(1, 1, f"Planning annuel de NOM{agent} Prénom Edité le 06/12/2024")
+        for index, month in enumerate(MONTHS):
+            column = 1 + 2 * index
+            sheet.cell(2, column, month)
+            sheet.merge_cells(start_row=2, start_column=column, end_row=2, end_column=column + 1)
+            for day in range(31):
+                sheet.cell(3 + day, column, f"J{day + 1}")
+                if rng.random() < 0.8:
+                    sheet.cell(3 + day, column + 1, rng.choice(CODES))
+            sheet.cell(36, column, "Total")
+    workbook.create_sheet("Planning agent mois").cell(1, 1, "Planning mensuel")
+    workbook.create_sheet("Codes horaires").cell(1, 1, "Code")
+    workbook.save(path)
+
+
+def legacy_get_first_line(file_path, sheet_name):
+    df = pd.read_excel(file_path, sheet_name=sheet_name, header=None, nrows=1)
+    text = ''
+    for element in df.to_dict(orient='records'):
+        for value in element.values():
+            if isinstance(value, str):
+                text = value
+                break
+    return text
+
+
+def legacy_extract_annual_programs(file_path):
+    """Ancienne version de utils.program.extract_annual_programs"""
+    xls = pd.ExcelFile(file_path)
+    all_programs = []
+    for sheet_name in xls.sheet_names:
+        if 'planning' in sheet_name.lower() and 'agent' in sheet_name.lower() and 'mois' not in sheet_name.lower():
+            name = extract_name(legacy_get_first_line(file_path, sheet_name))
+            df = pd.read_excel(xls, sheet_name=sheet_name, nrows=34, header=[1, 1])
+            annual_program = {'name': name, 'data': {}}
+            for month in df.columns.levels[0]:
+                annual_program['data'].setdefault(month, {})
+                for index in range(len(df) - 1):
+                    annual_program['data'][month][f"{index + 1}"] = {
+                        'day': df.iloc[index][month][0],
+                        'plan': df.iloc[index][month][1]
+                    }
+            all_programs.append(annual_program)
+    return all_programs
+
+
+def normalized(value):
+    """NaN -> None et scalaires NumPy -> Python, pour comparer les deux extractions"""
+    if isinstance(value, dict):
+        return {key: normalized(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [normalized(item) for item in value]
+    if hasattr(value, 'item'):
+        value = value.item()
+    if isinstance(value, float) and math.isnan(value):
+        return None
+    return value
+
+
+def timed(label, extract, path):
+    start = time.perf_counter()
+    programs = extract(path)
+    elapsed = time.perf_counter() - start
+    print(f"   {label:<32} {elapsed:>8.2f} s   ({len(programs)} programmes)")
+    return programs, elapsed
+
+
+def main():
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "programmes.xlsx")
+        build_workbook(path, NB_AGENTS)
+        print(f"🏁 Extraction de {NB_AGENTS} programmes annuels ({os.path.getsize(path) / 1024:.0f} Ko)")
+        print("=" * 70)
+        new_programs, new_time = timed("openpyxl read_only + NumPy", extract_annual_programs, path)
+        old_programs, old_time = timed("pandas + df.iloc (ancienne)", legacy_extract_annual_programs, path)
+
+    print("=" * 70)
+    identical = normalized(new_programs) == normalized(old_programs)
+    same_order = [list(p['data']) for p in new_programs] == [list(p['data']) for p in old_programs]
+    print(f"{'✅' if identical and same_order else '❌'} Documents identiques (noms, mois, lignes, valeurs)")
+    print(f"   Accélération {old_time / new_time:.0f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Benchmark : import d'un fichier de référence (POST /codes/upload, /polls/upload, /speciality/upload)
+Compare l'ancienne boucle (find_one de contrôle du matricule puis insert_one, ligne par ligne)
+à l'import groupé de utils.bulk_import (lots insert_many non ordonnés, matricules tirés par lot),
+puis rejoue le même fichier en mode upsert pour vérifier qu'il ne crée aucun doublon.
+"""
+
+import asyncio
+import os
+import time
+from datetime import datetime
+
+from motor.motor_asyncio import AsyncIOMotorClient
+
+from crud.code import code_import_fields, generate_code_matricule
+from database.indexes import ensure_indexes
+from utils.bulk_import import bulk_import
+
+MONGO_URI = os.getenv('MONGO_URI', 'mongodb://localhost:27017/')
+BENCH_DATABASE_NAME = os.getenv('BENCH_DATABASE_NAME', 'planRhIA_bench')
+NB_ROWS = int(os.getenv('BENCH_ROWS', "10000"))
+
+
+def file_rows(nb_rows):
+    """Lignes telles que lues par read_excel_rows"""
+    return [
+        {"name": f"Code {index}", "localisation": f"Bâtiment {index % 12}", "description": float("nan")}
+        for index in range(nb_rows)
+    ]
+
+
+async def legacy_import(collection, rows):
+    """Ancienne implémentation : un aller-retour de contrôle et un insert_one par ligne"""
+    inserted_ids = []
+    for item in rows:
+        matricule = generate_code_matricule()
+        while await collection.find_one({"matricule": matricule}, {"_id": 1}):
+            matricule = generate_code_matricule()
+        result = await collection.insert_one({
+            "name": item.get("name"),
+            "localisation": item.get("localisation", ""),
+            "description": item.get("description", ""),
+            "matricule": matricule,
+            "created_at": datetime.now(),
+            "updated_at": datetime.now()
+        })
+        inserted_ids.append(str(result.inserted_id))
+    return inserted_ids
+
+
+async def timed(label, run):
+    start = time.perf_counter()
+    result = await run()
+    elapsed = time.perf_counter() - start
+    print(f"   {label:<34} {elapsed:>8.2f} s")
+    return result, elapsed
+
+
+async def main():
+    client = AsyncIOMotorClient(MONGO_URI)
+    db = client[BENCH_DATABASE_NAME]
+    collection = db.code
+    rows = file_rows(NB_ROWS)
+
+    print(f"🏁 Import de {NB_ROWS} lignes de référence")
+    print("=" * 70)
+    await collection.drop()
+    await ensure_indexes(db)
+    _, legacy_time = await timed("ligne par ligne (ancienne)", lambda: legacy_import(collection, rows))
+
+    await collection.drop()
+    await ensure_indexes(db)
+    report, bulk_time = await timed("groupé (insert)", lambda: bulk_import(collection, rows, code_import_fields, generate_code_matricule))
+    replay, _ = await timed("rejeu du fichier (upsert)", lambda: bulk_import(
+        collection, rows, code_import_fields, generate_code_matricule, mode="upsert"
+    ))
+
+    count = await collection.count_documents({})
+    matricules = await collection.distinct("matricule")
+    print("=" * 70)
+    print(f"{'✅' if report['inserted'] == NB_ROWS and not report['failed'] else '❌'} {report['inserted']} lignes créées, {report['failed']} en erreur")
+    print(f"{'✅' if replay['inserted'] == 0 and replay['updated'] == NB_ROWS and count == NB_ROWS else '❌'} Rejeu en upsert sans doublon ({count} documents)")
+    print(f"{'✅' if len(matricules) == NB_ROWS else '❌'} Matricules uniques ({len(matricules)})")
+    print(f"   Accélération {legacy_time / bulk_time:.0f}x")
+
+    await client.drop_database(BENCH_DATABASE_NAME)
+    client.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
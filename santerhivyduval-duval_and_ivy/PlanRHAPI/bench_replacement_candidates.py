@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Benchmark : recherche de remplaçants (GET /absences/{absence_id}/candidates, scheduling/free_busy.py)
+Objectif : classement des agents d'un pôle entier en temps interactif (< 50 ms pour 2000 agents).
+Mesure la lecture des bitmaps (octets tels que stockés dans free_busy) et le classement, sans MongoDB ;
+le calcul des bitmaps (fait à l'écriture ou par le job free_busy) est mesuré à part.
+"""
+
+import os
+import random
+import statistics
+import time
+from datetime import date, datetime, timedelta
+
+import numpy as np
+
+from scheduling.contracts import period_days
+from scheduling.free_busy import DAY_BYTES, intervals_mask, rank_candidates, rest_mask, weekly_headroom
+
+REPEAT = int(os.getenv('BENCH_REPEAT', "20"))
+TARGET_MS = 50
+PLAGES = [(7, 12), (8, 8), (13, 8), (20, 12), (21, 10)]
+
+
+def synthetic_slots(nb_agents, days, seed=42):
+    """Créneaux par agent : un planning par jour travaillé, parfois une absence d'une journée"""
+    rng = random.Random(seed)
+    slots = []
+    for _ in range(nb_agents):
+        agent_slots = []
+        for day in days:
+            start = datetime.fromisoformat(day)
+            if rng.random() < 0.6:
+                hour, length = rng.choice(PLAGES)
+                agent_slots.append((start + timedelta(hours=hour), start + timedelta(hours=hour + length)))
+            elif rng.random() < 0.1:
+                agent_slots.append((start, start + timedelta(days=1)))
+        slots.append(agent_slots)
+    return slots
+
+
+def measure(nb_agents, first_day, nb_days):
+    days = period_days(first_day, first_day + timedelta(days=nb_days - 1))
+    slots = synthetic_slots(nb_agents, days)
+
+    start = time.perf_counter()
+    stored = [intervals_mask(first_day, nb_days, agent_slots) for agent_slots in slots]
+    precompute = (time.perf_counter() - start) * 1000
+    documents = [row.tobytes() for mask in stored for row in mask]
+
+    # Créneaux de l'agent absent : deux journées de 12h au milieu de la période
+    middle = datetime.combine(first_day, datetime.min.time()) + timedelta(days=nb_days // 2)
+    intervals = [(middle + timedelta(hours=7), middle + timedelta(hours=19)), (middle + timedelta(days=1, hours=7), middle + timedelta(days=1, hours=19))]
+    rng = np.random.default_rng(42)
+    contract = np.full(nb_agents, 35 * 60)
+    worked = rng.integers(0, 40 * 60, size=(nb_agents, 1))
+    affinity = rng.choice([0, 0.5, 1], size=nb_agents)
+
+    timings = []
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        bitmaps = np.frombuffer(b"".join(documents), dtype=np.uint8).reshape(nb_agents, nb_days, DAY_BYTES)
+        remaining = weekly_headroom(contract, worked, [24 * 60])
+        _, _, score, order = rank_candidates(
+            bitmaps, intervals_mask(first_day, nb_days, intervals), rest_mask(first_day, nb_days, intervals),
+            contract, remaining, affinity
+        )
+        timings.append(time.perf_counter() - start)
+    median = statistics.median(timings) * 1000
+    print(f"   {nb_agents:>5} agents × {nb_days:>2} jours  bitmaps calculés en {precompute:>7.1f} ms  "
+          f"classement {median:>6.1f} ms  {len(order):>5} candidat(s) retenu(s)")
+    return median
+
+
+def main():
+    print(f"🏁 Benchmark de la recherche de remplaçants (médiane sur {REPEAT} essais)")
+    print("=" * 90)
+    measure(200, date(2025, 3, 1), 4)
+    target = measure(2000, date(2025, 3, 1), 4)
+    measure(2000, date(2025, 3, 1), 16)
+    measure(10000, date(2025, 3, 1), 4)
+    print("=" * 90)
+    if target < TARGET_MS:
+        print(f"✅ Pôle de 2000 agents classé en {target:.1f} ms (objectif < {TARGET_MS} ms)")
+    else:
+        print(f"❌ Pôle de 2000 agents classé en {target:.1f} ms (objectif < {TARGET_MS} ms)")
+
+
+if __name__ == "__main__":
+    main()
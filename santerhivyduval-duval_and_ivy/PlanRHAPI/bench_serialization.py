@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark : sérialisation JSON d'une liste de plannings
+Compare l'ancienne chaîne (conversion champ par champ, jsonable_encoder, json.dumps)
+à MongoJSONResponse (orjson sur les documents bruts), pour 10 000 lignes.
+Ne nécessite pas de serveur MongoDB.
+"""
+
+import json
+import os
+import statistics
+import time
+from datetime import datetime, timedelta
+
+from bson import ObjectId
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from utils.json_response import MongoJSONResponse
+
+NB_ROWS = int(os.getenv('BENCH_ROWS', "10000"))
+REPEAT = int(os.getenv('BENCH_REPEAT', "20"))
+
+
+def make_rows():
+    now = datetime.now()
+    return [
+        {
+            "_id": ObjectId(),
+            "user_id": str(ObjectId()),
+            "date": (now + timedelta(days=i % 31)).strftime("%Y-%m-%d"),
+            "activity_code": "SOIN",
+            "plage_horaire": "08:00-16:00",
+            "commentaire": "Garde de jour",
+            "created_at": now,
+            "updated_at": now,
+            "user_name": f"Agent{i} Bench",
+            "user_matricule": f"INF{i:06d}BNCH"
+        }
+        for i in range(NB_ROWS)
+    ]
+
+
+def legacy(rows):
+    """Ancienne chaîne : boucle de conversion puis encodeur par défaut de FastAPI"""
+    planning_list = []
+    for planning in rows:
+        planning = dict(planning)
+        planning["_id"] = str(planning["_id"])
+        planning["created_at"] = planning.get("created_at", "").isoformat() if planning.get("created_at") else ""
+        planning["updated_at"] = planning.get("updated_at", "").isoformat() if planning.get("updated_at") else ""
+        planning_list.append(planning)
+    content = jsonable_encoder({"message": "Plannings récupérés avec succès", "data": planning_list})
+    return JSONResponse(content).body
+
+
+def mongo_json(rows):
+    return MongoJSONResponse({"message": "Plannings récupérés avec succès", "data": rows}).body
+
+
+def measure(label, serialize, rows):
+    timings = []
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        body = serialize(rows)
+        timings.append((time.perf_counter() - start) * 1000)
+    median = statistics.median(timings)
+    print(f"   {label:<20} {median:>8.1f} ms / {NB_ROWS} lignes  ({len(body) / 1e6:.2f} Mo)")
+    return median, body
+
+
+def main():
+    rows = make_rows()
+    print(f"🏁 Sérialisation de {NB_ROWS} plannings (médiane sur {REPEAT} essais)")
+    print("=" * 70)
+    legacy_ms, legacy_body = measure("conversion + json", legacy, rows)
+    fast_ms, fast_body = measure("MongoJSONResponse", mongo_json, rows)
+    print("=" * 70)
+
+    # Les deux chaînes doivent produire le même contenu
+    same = json.loads(legacy_body) == json.loads(fast_body)
+    print(f"{'✅' if same else '❌'} Contenus identiques")
+    print(f"📈 Gain : ×{legacy_ms / fast_ms:.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Benchmark : export complet des plannings, réponse matérialisée vs réponse en flux (NDJSON)
+Mesure le temps avant le premier octet (TTFB), le temps total et le pic mémoire Python
+pour des volumes croissants. En flux, le pic mémoire doit rester stable quel que soit le volume.
+"""
+
+import asyncio
+import json
+import os
+import time
+import tracemalloc
+
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import MongoClient
+
+from bench_user_lookup import seed
+from utils.pagination import sort_spec
+from utils.streaming import NDJSON_MEDIA_TYPE, stream_cursor
+from utils.user_lookup import attach_user_info
+
+MONGO_URI = os.getenv('MONGO_URI', 'mongodb://localhost:27017/')
+BENCH_DATABASE_NAME = os.getenv('BENCH_DATABASE_NAME', 'planRhIA_bench')
+
+
+def serialize(db):
+    async def transform(batch):
+        return await attach_user_info(batch, db.users)
+    return transform
+
+
+async def materialized(db):
+    """Ancienne approche : liste complète puis corps JSON complet avant d'envoyer un octet"""
+    rows = await db.plannings.find({}).sort(sort_spec("date")).to_list(length=None)
+    rows = await serialize(db)(rows)
+    body = json.dumps({"message": "Plannings récupérés avec succès", "data": rows}, default=str).encode()
+    # Le premier octet n'est disponible qu'une fois le corps entier construit
+    return len(body), 0.0
+
+
+async def streamed(db):
+    cursor = db.plannings.find({}).sort(sort_spec("date"))
+    response = stream_cursor(cursor, NDJSON_MEDIA_TYPE, transform=serialize(db))
+    size, ttfb, start = 0, None, time.perf_counter()
+    async for chunk in response.body_iterator:
+        if ttfb is None:
+            ttfb = (time.perf_counter() - start) * 1000
+        size += len(chunk.encode() if isinstance(chunk, str) else chunk)
+    return size, ttfb
+
+
+async def measure(db, label, export):
+    tracemalloc.start()
+    start = time.perf_counter()
+    size, ttfb = await export(db)
+    elapsed = (time.perf_counter() - start) * 1000
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    ttfb = ttfb or elapsed
+    print(f"   {label:<12} {size / 1e6:>7.1f} Mo  TTFB {ttfb:>8.1f} ms  total {elapsed:>8.1f} ms  pic {peak / 1e6:>7.1f} Mo")
+    return peak
+
+
+async def main():
+    seed_client = MongoClient(MONGO_URI)
+    client = AsyncIOMotorClient(MONGO_URI)
+    db = client[BENCH_DATABASE_NAME]
+
+    print("🏁 Benchmark export des plannings : matérialisé vs flux NDJSON")
+    print("=" * 80)
+
+    stream_peaks = []
+    for nb_agents, nb_days in [(100, 31), (300, 31), (300, 93)]:
+        seed(seed_client[BENCH_DATABASE_NAME], nb_agents, nb_days)
+        print(f"📊 {nb_agents} agents × {nb_days} jours ({nb_agents * nb_days} plannings)")
+        await measure(db, "matérialisé", materialized)
+        stream_peaks.append(await measure(db, "flux", streamed))
+
+    print("=" * 80)
+    growth = stream_peaks[-1] / stream_peaks[0] if stream_peaks[0] else 0
+    if growth < 2:
+        print(f"✅ Pic mémoire en flux borné (×{growth:.2f} pour ×9 plannings)")
+    else:
+        print(f"⚠️ Pic mémoire en flux croissant avec le volume (×{growth:.2f})")
+
+    seed_client.drop_database(BENCH_DATABASE_NAME)
+    seed_client.close()
+    client.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
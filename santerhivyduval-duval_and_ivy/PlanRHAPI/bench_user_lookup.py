@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Benchmark : enrichissement des plannings avec les informations utilisateur
+Compare l'ancienne approche (un find_one par ligne) à la résolution groupée ($in)
+et compte les allers-retours MongoDB pour chaque taille de résultat
+"""
+
+import asyncio
+import os
+import time
+from datetime import datetime, date, timedelta
+from bson import ObjectId
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import MongoClient, monitoring
+
+from utils.user_lookup import attach_user_info
+
+MONGO_URI = os.getenv('MONGO_URI', 'mongodb://localhost:27017/')
+BENCH_DATABASE_NAME = os.getenv('BENCH_DATABASE_NAME', 'planRhIA_bench')
+
+
+class CommandCounter(monitoring.CommandListener):
+    """Compte les commandes envoyées au serveur (find, getMore, ...)"""
+
+    def __init__(self):
+        self.count = 0
+
+    def started(self, event):
+        if event.command_name in ("find", "getMore", "aggregate"):
+            self.count += 1
+
+    def succeeded(self, event):
+        pass
+
+    def failed(self, event):
+        pass
+
+
+def seed(db, nb_agents, nb_days):
+    """Crée nb_agents utilisateurs et un planning par agent et par jour"""
+    db.users.drop()
+    db.plannings.drop()
+
+    user_docs = [
+        {"_id": ObjectId(), "first_name": f"Agent{i}", "last_name": "Bench", "matricule": f"INF{i:06d}BNCH"}
+        for i in range(nb_agents)
+    ]
+    db.users.insert_many(user_docs)
+
+    today = date.today()
+    planning_docs = [
+        {
+            "user_id": str(user["_id"]),
+            "date": (today + timedelta(days=day)).strftime("%Y-%m-%d"),
+            "activity_code": "SOIN",
+            "plage_horaire": "08:00-16:00",
+            "created_at": datetime.now(),
+            "updated_at": datetime.now()
+        }
+        for day in range(nb_days) for user in user_docs
+    ]
+    db.plannings.insert_many(planning_docs)
+
+
+async def per_row_lookup(rows, users_collection):
+    """Ancienne implémentation : un find_one par planning"""
+    for row in rows:
+        user_info = await users_collection.find_one({"_id": ObjectId(row["user_id"])})
+        if user_info:
+            row["user_name"] = f"{user_info.get('first_name', '')} {user_info.get('last_name', '')}"
+            row["user_matricule"] = user_info.get('matricule', '')
+    return rows
+
+
+async def run(db, counter, label, enrich):
+    rows = await db.plannings.find({}).to_list(length=None)
+    counter.count = 0
+    start = time.perf_counter()
+    await enrich(rows, db.users)
+    elapsed = (time.perf_counter() - start) * 1000
+    print(f"   {label:<12} {len(rows):>6} lignes  {counter.count:>6} allers-retours  {elapsed:>9.1f} ms")
+    return counter.count
+
+
+async def main():
+    counter = CommandCounter()
+    seed_client = MongoClient(MONGO_URI)
+    client = AsyncIOMotorClient(MONGO_URI, event_listeners=[counter])
+    db = client[BENCH_DATABASE_NAME]
+
+    print("🏁 Benchmark enrichissement utilisateurs des plannings")
+    print("=" * 70)
+
+    batched_round_trips = set()
+    for nb_agents, nb_days in [(10, 7), (60, 31), (200, 31)]:
+        seed(seed_client[BENCH_DATABASE_NAME], nb_agents, nb_days)
+        print(f"📊 {nb_agents} agents × {nb_days} jours")
+        await run(db, counter, "find_one", per_row_lookup)
+        batched_round_trips.add(await run(db, counter, "$in groupé", attach_user_info))
+
+    print("=" * 70)
+    if len(batched_round_trips) == 1:
+        print(f"✅ Nombre d'allers-retours constant ({batched_round_trips.pop()}) quel que soit le nombre de lignes")
+    else:
+        print(f"⚠️ Allers-retours variables selon la taille : {sorted(batched_round_trips)}")
+
+    seed_client.drop_database(BENCH_DATABASE_NAME)
+    seed_client.close()
+    client.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
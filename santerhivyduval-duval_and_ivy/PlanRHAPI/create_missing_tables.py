@@ -32,8 +32,8 @@ def create_collections():
                 "type": "info",
                 "priority": "low",
                 "is_read": False,
-                "created_at": datetime.now().isoformat(),
-                "updated_at": datetime.now().isoformat()
+                "created_at": datetime.now(),
+                "updated_at": datetime.now()
             }
         ]
         alerts_collection.insert_many(sample_alerts)
@@ -52,8 +52,8 @@ def create_collections():
                 "type": "system",
                 "severity": "low",
                 "status": "resolved",
-                "created_at": datetime.now().isoformat(),
-                "updated_at": datetime.now().isoformat()
+                "created_at": datetime.now(),
+                "updated_at": datetime.now()
             }
         ]
         anomalies_collection.insert_many(sample_anomalies)
@@ -72,8 +72,8 @@ def create_collections():
                 "type": "training",
                 "status": "pending",
                 "due_date": (datetime.now().replace(day=datetime.now().day + 7)).isoformat(),
-                "created_at": datetime.now().isoformat(),
-                "updated_at": datetime.now().isoformat()
+                "created_at": datetime.now(),
+                "updated_at": datetime.now()
             },
             {
                 "title": "Réunion mensuelle RH",
@@ -81,8 +81,8 @@ def create_collections():
                 "type": "meeting",
                 "status": "pending",
                 "due_date": (datetime.now().replace(day=datetime.now().day + 14)).isoformat(),
-                "created_at": datetime.now().isoformat(),
-                "updated_at": datetime.now().isoformat()
+                "created_at": datetime.now(),
+                "updated_at": datetime.now()
             }
         ]
         events_collection.insert_many(sample_events)
@@ -103,7 +103,7 @@ def create_collections():
                 "category": "alert",
                 "user_id": "684314eb3bd4c4c00ce9c019",
                 "read": False,
-                "created_at": datetime.now().isoformat(),
+                "created_at": datetime.now(),
                 "action_url": "/sec/alerts",
                 "action_label": "Voir les alertes"
             },
@@ -115,7 +115,7 @@ def create_collections():
                 "category": "anomaly",
                 "user_id": "684314eb3bd4c4c00ce9c019",
                 "read": False,
-                "created_at": datetime.now().isoformat(),
+                "created_at": datetime.now(),
                 "action_url": "/cadre/anomalies",
                 "action_label": "Gérer les anomalies"
             },
@@ -127,7 +127,7 @@ def create_collections():
                 "category": "event",
                 "user_id": "684314eb3bd4c4c00ce9c019",
                 "read": True,
-                "created_at": datetime.now().isoformat(),
+                "created_at": datetime.now(),
                 "action_url": "/sec/calendar",
                 "action_label": "Voir le calendrier"
             }
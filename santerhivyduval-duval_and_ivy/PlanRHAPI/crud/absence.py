@@ -1,11 +1,18 @@
 from bson import ObjectId
 from fastapi import HTTPException
+from crud.overlap import find_overlap
 from database.database import absences
+from utils.projection import EXISTS_PROJECTION
+from utils.time_fields import absence_time_fields
 import random
 import string
 from datetime import datetime
 
 
+# Une absence refusée par le cadre ne bloque pas une nouvelle déclaration sur la même période
+REJECTED_ABSENCE_STATUS = "Refusé par le cadre"
+
+
 def generate_absence_matricule() -> str:
     """Génère un matricule unique pour une absence"""
     prefix = "ABS"
@@ -28,7 +35,7 @@ async def create_absence(absence_info):
     try:
         # Générer le matricule
         matricule = generate_absence_matricule()
-        while absences.find_one({"matricule": matricule}):
+        while await absences.find_one({"matricule": matricule}, EXISTS_PROJECTION):
             matricule = generate_absence_matricule()
         
         # Ajouter les timestamps et le matricule
@@ -39,9 +46,20 @@ async def create_absence(absence_info):
             "matricule": matricule,
             "status": absence_info.get("status", "En cours")  # Valeur par défaut
         })
+        absence_info.update(absence_time_fields(
+            absence_info.get("start_date"), absence_info.get("start_hour"),
+            absence_info.get("end_date"), absence_info.get("end_hour")
+        ))
+        
+        # Vérifier que l'agent n'a pas déjà une absence sur la période
+        if "start" in absence_info and await find_overlap(
+            "absences", absence_info.get("staff_id"), absence_info["start"], absence_info["end"],
+            conditions={"status": {"$ne": REJECTED_ABSENCE_STATUS}}
+        ):
+            raise HTTPException(status_code=400, detail="Une absence est déjà déclarée sur cette période")
         
         # Insérer l'absence
-        db_response = absences.insert_one(absence_info)
+        db_response = await absences.insert_one(absence_info)
         absence_id = db_response.inserted_id
         
         return {
@@ -51,13 +69,15 @@ async def create_absence(absence_info):
             "created_at": now.isoformat()
         }
 
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"Erreur lors de la création de l'absence : {str(e)}")
         raise HTTPException(status_code=500, detail=f"Erreur interne du serveur: {str(e)}")
 
 async def delete_absence(absence_id):
     try:
-        db_response = absences.delete_one({"_id": ObjectId(absence_id)})
+        db_response = await absences.delete_one({"_id": ObjectId(absence_id)})
         print("Absence deleted successfully")
         return {"message": "Absence deleted successfully", "absence_id": str(absence_id)}
     except Exception as e:
@@ -66,7 +86,7 @@ async def delete_absence(absence_id):
 
 async def assign_replacer_to_absence(absence_id: str, replacement_id: str):
     try:
-        result = absences.update_one(
+        result = await absences.update_one(
             {"_id": ObjectId(absence_id)},
             {"$set": {"replacement_id": replacement_id}}
         )
@@ -127,7 +147,7 @@ async def update_absence_status(absence_id: str, status: str):
             "updated_at": datetime.now()
         }
         
-        result = absences.update_one(
+        result = await absences.update_one(
             {"_id": ObjectId(absence_id)},
             {"$set": update_data}
         )
@@ -135,7 +155,7 @@ async def update_absence_status(absence_id: str, status: str):
         if result.modified_count == 0:
             raise HTTPException(status_code=404, detail="Absence non trouvée")
         
-        updated_absence = absences.find_one({"_id": ObjectId(absence_id)})
+        updated_absence = await absences.find_one({"_id": ObjectId(absence_id)})
         return {
             "message": "Statut de l'absence mis à jour",
             "data": {
@@ -0,0 +1,75 @@
+# Agenda d'un agent ou d'un service sur une période : plannings, disponibilités, absences, événements
+# et jours du programme annuel, lus en parallèle par des requêtes servies par index
+import asyncio
+
+from bson import ObjectId
+
+from database.database import db, users, plannings, availabilities, absences, program_days
+from utils.projection import USER_NAME_PROJECTION, projection_of
+
+# Vue service en une seule réponse : au-delà, utiliser les endpoints paginés
+MAX_SERVICE_AGENDA_DAYS = 42
+
+AGENDA_PLANNING_PROJECTION = projection_of(("user_id", "date", "activity_code", "plage_horaire", "commentaire", "validated_by"))
+AGENDA_AVAILABILITY_PROJECTION = projection_of(("user_id", "date", "start_time", "end_time", "status", "commentaire"))
+AGENDA_ABSENCE_PROJECTION = projection_of((
+    "staff_id", "start_date", "start_hour", "end_date", "end_hour", "reason", "status", "replacement_id", "service_id"
+))
+AGENDA_PROGRAM_DAY_PROJECTION = projection_of(("user_id", "date", "plan", "day_label"))
+
+
+async def agenda_members(user_id: str = None, service_id: str = None):
+    """{user_id: nom} des agents concernés : l'agent demandé, ou les agents du service"""
+    if service_id:
+        cursor = users.find({"service_id": service_id}, USER_NAME_PROJECTION)
+    else:
+        cursor = users.find({"_id": ObjectId(user_id)} if ObjectId.is_valid(user_id) else {"_id": None}, USER_NAME_PROJECTION)
+    return {
+        str(user["_id"]): {"first_name": user.get("first_name"), "last_name": user.get("last_name")}
+        async for user in cursor
+    }
+
+
+def sorted_find(collection, query_filter, projection, sort_field):
+    return collection.find(query_filter, projection).sort([(sort_field, 1), ("_id", 1)]).to_list(length=None)
+
+
+async def build_agenda(period, user_id: str = None, service_id: str = None):
+    """
+    Agenda sur la période (bornes incluses), en une requête par source exécutées en parallèle :
+    - plannings, disponibilités, jours de programme : index (user_id, date)
+    - absences qui chevauchent la période : index (staff_id | service_id, start_date)
+    - événements dont l'échéance tombe dans la période : index (user_id | service_id, due_date)
+    """
+    members = await agenda_members(user_id, service_id)
+    owner = {"service_id": service_id} if service_id else {"user_id": user_id}
+    user_filter = {"user_id": {"$in": list(members)}} if service_id else {"user_id": user_id}
+    day_filter = {**user_filter, "date": period.day_filter()}
+    absence_filter = {
+        **({"service_id": service_id} if service_id else {"staff_id": user_id}),
+        **period.overlap_filter("start_date", "end_date")
+    }
+
+    planning_list, availability_list, absence_list, event_list, program_day_list = await asyncio.gather(
+        sorted_find(plannings, day_filter, AGENDA_PLANNING_PROJECTION, "date"),
+        sorted_find(availabilities, day_filter, AGENDA_AVAILABILITY_PROJECTION, "date"),
+        sorted_find(absences, absence_filter, AGENDA_ABSENCE_PROJECTION, "start_date"),
+        sorted_find(db.events, {**owner, "due_date": period.day_filter()}, None, "due_date"),
+        sorted_find(program_days, day_filter, AGENDA_PROGRAM_DAY_PROJECTION, "date")
+    )
+    return {
+        "period": period.to_dict(),
+        "users": members,
+        "plannings": planning_list,
+        "availabilities": availability_list,
+        "absences": absence_list,
+        "events": event_list,
+        "program_days": program_day_list,
+        "counts": {
+            "plannings": len(planning_list),
+            "availabilities": len(availability_list),
+            "absences": len(absence_list),
+            "events": len(event_list),
+            "program_days": len(program_day_list)
+        }
+    }
@@ -0,0 +1,134 @@
+# Anomalies créées par les règles de détection : une seule par règle, concerné (agent ou service) et période
+# (jour ou début de semaine), accompagnée d'une seule alerte
+from datetime import datetime
+
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+
+from database.database import db
+
+ANOMALY_DEFAULTS = {
+    "absence_unjustified": {"title": "Absence non justifiée", "type": "absence_unjustified", "severity": "high"},
+    "schedule_conflict": {"title": "Conflit de planning", "type": "schedule_conflict", "severity": "critical"},
+    "overtime_exceeded": {"title": "Dépassement des heures du contrat", "type": "overtime_exceeded", "severity": "medium"},
+    "min_work_days": {"title": "Jours travaillés insuffisants", "type": "min_work_days", "severity": "medium"},
+    "weekly_rest": {"title": "Repos hebdomadaire manquant", "type": "weekly_rest", "severity": "high"},
+    "understaffing": {"title": "Sous-effectif critique", "type": "understaffing", "severity": "critical"},
+}
+# Champs d'une détection qui ne sont pas recopiés dans metadata
+FINDING_FIELDS = ("rule_id", "user_id", "service_id", "date", "description")
+# Concerné d'une détection : un agent, ou un service pour les règles d'effectif
+OWNER_FIELDS = ("user_id", "service_id")
+DUPLICATE_KEY = 11000
+
+
+def finding_owner(finding) -> str:
+    return "user_id" if finding.get("user_id") else "service_id"
+
+
+def anomaly_key(rule_id: str, owner_id: str, day: str, owner: str = "user_id") -> dict:
+    return {"metadata.rule_id": rule_id, owner: owner_id, "metadata.date": day}
+
+
+def finding_key(finding) -> dict:
+    owner = finding_owner(finding)
+    return anomaly_key(finding["rule_id"], finding[owner], finding["date"], owner)
+
+
+async def upsert_findings(collection, operations):
+    """
+    Exécute les upserts d'un lot ; index des opérations qui ont inséré un document.
+    Un upsert concurrent (autre processus de détection) qui a déjà inséré la même clé est rejeté par l'index unique
+    (database/indexes.DETECTION_KEYS) : la détection est déjà enregistrée, l'erreur est ignorée.
+    """
+    try:
+        result = await collection.bulk_write(operations, ordered=False)
+        return list(result.upserted_ids)
+    except BulkWriteError as e:
+        if any(error.get("code") != DUPLICATE_KEY for error in e.details.get("writeErrors", [])):
+            raise
+        return [upserted["index"] for upserted in e.details.get("upserted", [])]
+
+
+async def save_alerts(findings):
+    """
+    Une alerte par détection nouvellement enregistrée ; une alerte existe au plus une fois par (règle, concerné, période),
+    même si l'anomalie est levée puis détectée à nouveau. Retourne le nombre d'alertes créées.
+    """
+    now = datetime.now()
+    operations = []
+    for finding in findings:
+        defaults = ANOMALY_DEFAULTS[finding["rule_id"]]
+        operations.append(UpdateOne(
+            finding_key(finding),
+            {"$setOnInsert": {
+                "title": defaults["title"],
+                "message": finding.get("description") or defaults["title"],
+                "type": defaults["type"],
+                "priority": defaults["severity"],
+                "is_read": False,
+                **{field: finding[field] for field in OWNER_FIELDS if finding.get(field)},
+                "created_at": now,
+                "updated_at": now,
+                "metadata": {"rule_id": finding["rule_id"], "date": finding["date"]}
+            }},
+            upsert=True
+        ))
+    if not operations:
+        return 0
+    return len(await upsert_findings(db.alerts, operations))
+
+
+async def save_anomalies(findings, with_alerts: bool = True):
+    """
+    Enregistre une anomalie par détection ; une détection déjà enregistrée (même règle, concerné et période),
+    y compris par un autre processus au même moment, n'est pas dupliquée. Chaque anomalie créée donne lieu à une alerte (with_alerts).
+    Retourne le nombre d'anomalies créées.
+    """
+    now = datetime.now()
+    operations = []
+    for finding in findings:
+        defaults = ANOMALY_DEFAULTS[finding["rule_id"]]
+        operations.append(UpdateOne(
+            finding_key(finding),
+            {"$setOnInsert": {
+                **defaults,
+                "description": finding.get("description") or f"Anomalie détectée automatiquement le {finding['date']}",
+                "status": "detected",
+                **{field: finding[field] for field in OWNER_FIELDS if finding.get(field)},
+                "detected_at": now,
+                "created_at": now,
+                "updated_at": now,
+                "metadata": {
+                    "rule_id": finding["rule_id"],
+                    "date": finding["date"],
+                    **{key: value for key, value in finding.items() if key not in FINDING_FIELDS}
+                }
+            }},
+            upsert=True
+        ))
+    if not operations:
+        return 0
+    upserted = await upsert_findings(db.anomalies, operations)
+    if with_alerts and upserted:
+        await save_alerts([findings[index] for index in upserted])
+    return len(upserted)
+
+
+async def clear_resolved_anomalies(rule_ids, scopes, findings, owner: str = "user_id"):
+    """
+    Après un recalcul des périodes scopes [(concerné, jour)], supprime les anomalies de ces règles
+    qui ne sont plus détectées ; seules les anomalies pas encore traitées (status detected) sont concernées.
+    Retourne le nombre d'anomalies supprimées.
+    """
+    still_found = {(finding["rule_id"], finding.get(owner), finding["date"]) for finding in findings}
+    resolved = [
+        anomaly_key(rule_id, owner_id, day, owner)
+        for owner_id, day in scopes
+        for rule_id in rule_ids
+        if (rule_id, owner_id, day) not in still_found
+    ]
+    if not resolved:
+        return 0
+    result = await db.anomalies.delete_many({"status": "detected", "$or": resolved})
+    return result.deleted_count
@@ -7,7 +7,7 @@ from database.database import asks
 async def create_ask(ask_info):
     try:
         # Utilisez 'insert_one' sans 'await'
-        db_response = asks.insert_one(ask_info)
+        db_response = await asks.insert_one(ask_info)
 
         # Récupérez l'ID du document inséré
         ask_id = db_response.inserted_id
@@ -27,7 +27,7 @@ async def assign_replacer_to_ask():
 async def delete_ask(ask_id):
     try:
         # Utilisez 'insert_one' sans 'await'
-        db_response = asks.delete_one({"_id": ObjectId(ask_id)})
+        db_response = await asks.delete_one({"_id": ObjectId(ask_id)})
 
         print("ask supprimé avec succès")
 
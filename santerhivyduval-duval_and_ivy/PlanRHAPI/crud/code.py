@@ -6,6 +6,8 @@ from datetime import datetime
 
 from crud.jwt_config import create_token
 from database.database import db, codes
+from utils.bulk_import import bulk_import, cell
+from utils.projection import EXISTS_PROJECTION
 
 def generate_code_matricule() -> str:
     prefix = "CODE"
@@ -16,12 +18,12 @@ def generate_code_matricule() -> str:
 async def create_code(code_info):
     try:
         # Vérifier si le nom du code existe déjà
-        if codes.find_one({"name": code_info["name"]}):
+        if await codes.find_one({"name": code_info["name"]}, EXISTS_PROJECTION):
             raise HTTPException(status_code=400, detail="Un code avec ce nom existe déjà")
         
         # Générer le matricule
         matricule = generate_code_matricule()
-        while codes.find_one({"matricule": matricule}):
+        while await codes.find_one({"matricule": matricule}, EXISTS_PROJECTION):
             matricule = generate_code_matricule()
         
         # Ajouter les timestamps et le matricule
@@ -33,7 +35,7 @@ async def create_code(code_info):
         })
         
         # Insérer le code
-        db_response = codes.insert_one(code_info)
+        db_response = await codes.insert_one(code_info)
         code_id = db_response.inserted_id
         
         return {
@@ -51,7 +53,7 @@ async def create_code(code_info):
 async def delete_code(code_id):
     try:
         # Utilisez 'insert_one' sans 'await'
-        db_response = codes.delete_one({"_id": ObjectId(code_id)})
+        db_response = await codes.delete_one({"_id": ObjectId(code_id)})
 
         print("code supprimé avec succès")
 
@@ -66,14 +68,14 @@ async def update_code(code_id: str, code_data: dict):
         # Ajouter la date de mise à jour
         code_data["updated_at"] = datetime.now()
         
-        result = codes.update_one(
+        result = await codes.update_one(
             {"_id": ObjectId(code_id)},
             {"$set": code_data}
         )
         if result.modified_count == 0:
             raise HTTPException(status_code=404, detail="code non trouvé")
         
-        updated_code = codes.find_one({"_id": ObjectId(code_id)})
+        updated_code = await codes.find_one({"_id": ObjectId(code_id)})
         return {
             "message": "code mis à jour avec succès",
             "data": {
@@ -84,4 +86,21 @@ async def update_code(code_id: str, code_data: dict):
         }
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Erreur lors de la mise à jour: {str(e)}")
-    
\ No newline at end of file
+    
+
+
+def code_import_fields(row):
+    return {
+        "name": cell(row.get("name")),
+        "localisation": cell(row.get("localisation")) or "",
+        "description": cell(row.get("description")) or ""
+    }
+
+
+async def import_codes(rows, mode="insert", progress=None):
+    """
+    Import groupé des lignes d'un fichier (utils.bulk_import) : insert crée les nouveaux noms,
+    upsert crée ou met à jour selon le nom. Retourne le rapport d'import (créés, mis à jour, erreurs par ligne).
+    progress : coroutine optionnelle (lignes traitées, total) appelée après chaque lot (jobs d'import).
+    """
+    return await bulk_import(codes, rows, code_import_fields, generate_code_matricule, mode=mode, progress=progress)
@@ -0,0 +1,181 @@
+# Conformité hebdomadaire des agents : recalcul limité aux semaines touchées par une écriture de planning,
+# bilans enregistrés dans weekly_compliance, anomalies créées ou levées au fil des recalculs
+import asyncio
+from datetime import date, datetime, timedelta
+
+from pymongo import UpdateOne
+
+from crud.anomaly import clear_resolved_anomalies, save_anomalies
+from database.database import plannings, user_contrat, absences, users, weekly_compliance
+from scheduling.compliance import COMPLIANCE_RULES, contract_terms, evaluate_week, week_monday
+from scheduling.contracts import expand_absence, period_days
+from utils.time_fields import time_fields_of
+
+# Balayage complet : agents traités par lot (plannings d'un lot chargés en une requête)
+COMPLIANCE_BATCH_USERS = 100
+
+COMPLIANCE_PLANNING_PROJECTION = {
+    "user_id": 1, "date": 1, "plage_horaire": 1, "activity_code": 1,
+    "start": 1, "end": 1, "duration_minutes": 1, "all_day": 1
+}
+
+
+def with_time_fields(planning):
+    return planning if "start" in planning else {**planning, **time_fields_of("plannings", planning)}
+
+
+async def load_compliance_inputs(user_ids, first_monday: date, last_sunday: date):
+    """Contrats, plannings (veille du premier lundi comprise) et absences des agents, en une requête par collection"""
+    start, end = (first_monday - timedelta(days=1)).isoformat(), last_sunday.isoformat()
+    return await asyncio.gather(
+        user_contrat.find({"user_id": {"$in": user_ids}}).to_list(length=None),
+        plannings.find(
+            {"user_id": {"$in": user_ids}, "date": {"$gte": start, "$lte": end}}, COMPLIANCE_PLANNING_PROJECTION
+        ).to_list(length=None),
+        absences.find(
+            {"staff_id": {"$in": user_ids}, "start_date": {"$lte": end}, "end_date": {"$gte": first_monday.isoformat()}},
+            {"staff_id": 1, "start_date": 1, "end_date": 1, "status": 1}
+        ).to_list(length=None)
+    )
+
+
+async def compute_compliance(user_ids, first_day, last_day, include_empty: bool = False, today: date = None):
+    """
+    Bilans des semaines ISO de first_day à last_day pour les agents demandés.
+    include_empty : bilan aussi pour les semaines sans planning (recalcul après une suppression).
+    Retourne (bilans, détections).
+    """
+    first_monday = week_monday(first_day)
+    last_sunday = week_monday(last_day) + timedelta(days=6)
+    contrats, planning_docs, absence_docs = await load_compliance_inputs(user_ids, first_monday, last_sunday)
+
+    terms = {contrat["user_id"]: contract_terms(contrat) for contrat in contrats}
+    default_terms = contract_terms(None)
+
+    # Plannings rangés par (agent, lundi) ; un dimanche est aussi la veille de la semaine suivante
+    slots = {}
+    for planning in planning_docs:
+        planning = with_time_fields(planning)
+        monday = week_monday(planning["date"])
+        slots.setdefault((planning["user_id"], monday), []).append(planning)
+        if date.fromisoformat(planning["date"][:10]).weekday() == 6:
+            slots.setdefault((planning["user_id"], monday + timedelta(days=7)), []).append(planning)
+
+    days_set = set(period_days(first_monday, last_sunday))
+    absent = {}
+    for absence in absence_docs:
+        if "refus" not in str(absence.get("status", "")).lower():
+            absent.setdefault(absence["staff_id"], set()).update(expand_absence(absence, days_set))
+
+    summaries, findings = [], []
+    monday = first_monday
+    while monday <= last_sunday:
+        for user_id in user_ids:
+            if not include_empty and (user_id, monday) not in slots:
+                continue
+            weekly_minutes, min_work_days = terms.get(user_id, default_terms)
+            summary, week_findings = evaluate_week(
+                user_id, monday, slots.get((user_id, monday), []), weekly_minutes, min_work_days,
+                absent_days=absent.get(user_id, ()), today=today
+            )
+            summaries.append(summary)
+            findings.extend(week_findings)
+        monday += timedelta(days=7)
+    return summaries, findings
+
+
+async def refresh_compliance(user_ids, first_day, last_day, include_empty: bool = False):
+    """
+    Recalcule et enregistre les bilans des semaines concernées, crée les anomalies détectées
+    et supprime celles (non traitées) qui ne le sont plus.
+    """
+    summaries, findings = await compute_compliance(user_ids, first_day, last_day, include_empty) if user_ids else ([], [])
+    if not summaries:
+        return {"weeks": 0, "violations": 0, "anomalies_created": 0, "anomalies_cleared": 0}
+
+    now = datetime.now()
+    await weekly_compliance.bulk_write([
+        UpdateOne(
+            {"user_id": summary["user_id"], "week_start": summary["week_start"]},
+            {"$set": {**summary, "updated_at": now}},
+            upsert=True
+        )
+        for summary in summaries
+    ], ordered=False)
+    created = await save_anomalies(findings)
+    cleared = await clear_resolved_anomalies(
+        COMPLIANCE_RULES, [(summary["user_id"], summary["week_start"]) for summary in summaries], findings
+    )
+    return {"weeks": len(summaries), "violations": len(findings), "anomalies_created": created, "anomalies_cleared": cleared}
+
+
+async def refresh_weeks(user_ids, first_day, last_day):
+    """
+    Recalcul après une écriture de plannings, limité aux agents et aux semaines touchés.
+    Une erreur de recalcul n'annule pas l'écriture : elle est journalisée, le balayage la rattrapera.
+    """
+    try:
+        return await refresh_compliance(user_ids, first_day, last_day, include_empty=True)
+    except Exception as e:
+        print(f"Erreur lors du recalcul de conformité : {str(e)}")
+        return None
+
+
+async def refresh_agent_weeks(user_id: str, *days):
+    """
+    Recalcul incrémental après l'écriture d'un planning : seules les semaines des jours touchés sont recalculées
+    (et la suivante pour un dimanche, dont une nuit peut priver le lundi de repos).
+    """
+    touched = [date.fromisoformat(str(day)[:10]) for day in days if day]
+    if not user_id or not touched:
+        return None
+    return await refresh_weeks([user_id], min(touched), max(touched) + timedelta(days=1))
+
+
+async def planning_date_span(start_date: str = None, end_date: str = None):
+    """Bornes effectives d'un balayage : les dates demandées, complétées par le premier / dernier planning"""
+    if not start_date:
+        first = await plannings.find({}, {"date": 1}).sort("date", 1).limit(1).to_list(length=1)
+        start_date = first[0]["date"] if first else None
+    if not end_date:
+        last = await plannings.find({}, {"date": 1}).sort("date", -1).limit(1).to_list(length=1)
+        end_date = last[0]["date"] if last else None
+    return start_date, end_date
+
+
+async def sweep_compliance(start_date: str = None, end_date: str = None, service_id: str = None, write: bool = False, progress=None):
+    """
+    Conformité de tous les agents ayant des plannings sur la période (ou des agents d'un service), par lots.
+    write : enregistre les bilans et met à jour les anomalies (reconstruction) ; sinon retourne seulement les détections.
+    """
+    start_date, end_date = await planning_date_span(start_date, end_date)
+    if not start_date or not end_date:
+        return [], {"weeks": 0, "violations": 0, "anomalies_created": 0, "anomalies_cleared": 0}
+
+    if service_id:
+        user_ids = [str(user["_id"]) async for user in users.find({"service_id": service_id}, {"_id": 1})]
+    else:
+        user_ids = sorted(await plannings.distinct("user_id", {"date": {"$gte": start_date, "$lte": end_date}}))
+
+    findings = []
+    totals = {"weeks": 0, "violations": 0, "anomalies_created": 0, "anomalies_cleared": 0}
+    for index in range(0, len(user_ids), COMPLIANCE_BATCH_USERS):
+        batch = [user_id for user_id in user_ids[index:index + COMPLIANCE_BATCH_USERS] if user_id]
+        if write:
+            report = await refresh_compliance(batch, start_date, end_date)
+            for key in totals:
+                totals[key] += report[key]
+        else:
+            _, batch_findings = await compute_compliance(batch, start_date, end_date)
+            findings.extend(batch_findings)
+        if progress:
+            await progress(min(index + COMPLIANCE_BATCH_USERS, len(user_ids)), len(user_ids))
+    return findings, totals
+
+
+def compliance_rule(rule_id: str):
+    """Règle de balayage (crud/detection) : détections d'une des règles de conformité sur la période"""
+    async def detect(start_date: str = None, end_date: str = None):
+        findings, _ = await sweep_compliance(start_date, end_date)
+        return [finding for finding in findings if finding["rule_id"] == rule_id]
+    return detect
@@ -5,7 +5,7 @@ from database.database import user_contrat
 
 async def create_contrat(contrat_info):
     try:
-        db_response = user_contrat.insert_one(contrat_info)
+        db_response = await user_contrat.insert_one(contrat_info)
         contrat_id = db_response.inserted_id
         print("Contrat créé avec succès")
         return {"message": "Contrat créé avec succès", "contrat_id": str(contrat_id)}
@@ -15,7 +15,7 @@ async def create_contrat(contrat_info):
 
 async def delete_contrat(contrat_id):
     try:
-        db_response = user_contrat.delete_one({"_id": ObjectId(contrat_id)})
+        db_response = await user_contrat.delete_one({"_id": ObjectId(contrat_id)})
         if db_response.deleted_count == 0:
             raise HTTPException(status_code=404, detail="Contrat non trouvé")
         print("Contrat supprimé avec succès")
@@ -28,7 +28,7 @@ async def delete_contrat(contrat_id):
 async def update_contrat(contrat_id: str, contrat_dict: dict):
     try:
         # Vérifier si le contrat existe
-        existing_contrat = user_contrat.find_one({"_id": ObjectId(contrat_id)})
+        existing_contrat = await user_contrat.find_one({"_id": ObjectId(contrat_id)})
         if not existing_contrat:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -36,7 +36,7 @@ async def update_contrat(contrat_id: str, contrat_dict: dict):
             )
 
         # Mettre à jour le contrat
-        result = user_contrat.update_one(
+        result = await user_contrat.update_one(
             {"_id": ObjectId(contrat_id)},
             {"$set": contrat_dict}
         )
@@ -47,7 +47,7 @@ async def update_contrat(contrat_id: str, contrat_dict: dict):
                 detail="Aucune modification effectuée"
             )
 
-        updated_contrat = user_contrat.find_one({"_id": ObjectId(contrat_id)})
+        updated_contrat = await user_contrat.find_one({"_id": ObjectId(contrat_id)})
         return {
             "id": str(updated_contrat["_id"]),
             "user_id": updated_contrat["user_id"],
@@ -0,0 +1,47 @@
+# Couverture d'un service sur une période : plannings des agents lus en une requête, matrice calculée par scheduling/coverage
+from datetime import timedelta
+
+from bson import ObjectId
+
+from database.database import plannings, services, users
+from scheduling.compliance import is_worked
+from scheduling.coverage import coverage_matrix, coverage_report, slot_offsets
+from scheduling.contracts import period_days
+from utils.time_fields import time_fields_of
+
+COVERAGE_PLANNING_PROJECTION = {
+    "_id": 0, "user_id": 1, "date": 1, "plage_horaire": 1, "activity_code": 1, "start": 1, "end": 1, "all_day": 1
+}
+
+
+async def build_coverage(service_id: str, period, min_staff: dict = None):
+    """
+    Matrice de couverture jour × créneau du service sur la période (bornes incluses).
+    L'effectif minimal est celui du service (min_staff), complété ou remplacé créneau par créneau par min_staff.
+    Les nuits commencées la veille du premier jour comptent dans la couverture minute par minute.
+    Retourne None si le service n'existe pas.
+    """
+    service = await services.find_one(
+        {"_id": ObjectId(service_id)} if ObjectId.is_valid(service_id) else {"_id": None}, {"min_staff": 1}
+    )
+    if service is None:
+        return None
+    required = {**(service.get("min_staff") or {}), **(min_staff or {})}
+
+    user_ids = [str(user["_id"]) async for user in users.find({"service_id": service_id}, {"_id": 1})]
+    days = period_days(period.start, period.end)
+    planning_docs = await plannings.find(
+        {"user_id": {"$in": user_ids}, "date": {"$gte": (period.start - timedelta(days=1)).isoformat(), "$lte": days[-1]}},
+        COVERAGE_PLANNING_PROJECTION
+    ).to_list(length=None) if user_ids else []
+
+    worked = []
+    for planning in planning_docs:
+        if "start" not in planning:
+            planning.update(time_fields_of("plannings", planning))
+        if is_worked(planning):
+            worked.append(planning)
+
+    agents, starts, ends = slot_offsets(period.start, worked, {user_id: index for index, user_id in enumerate(user_ids)})
+    report = coverage_report(days, coverage_matrix(len(days), agents, starts, ends, required))
+    return {"service_id": service_id, "agents": len(user_ids), "plannings": len(worked), **report}
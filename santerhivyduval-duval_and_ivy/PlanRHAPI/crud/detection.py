@@ -0,0 +1,441 @@
+from datetime import date, datetime, timedelta
+
+from bson import ObjectId
+
+from crud.absence import REJECTED_ABSENCE_STATUS
+from crud.anomaly import clear_resolved_anomalies, save_anomalies
+from crud.compliance import compliance_rule, planning_date_span, refresh_weeks
+from crud.free_busy import refresh_agent_days
+from crud.overlap import WORKED_PLANNING_FILTER, sweep_overlaps
+from database.database import db, plannings, availabilities, absences, users, services
+from scheduling.compliance import is_worked
+from scheduling.contracts import period_days
+from scheduling.optimizer import SHIFTS, shift_class
+from utils.time_fields import interval_stages, time_fields_of
+
+
+SWEEP_PROJECTION = {"user_id": 1, "date": 1, "plage_horaire": 1, "activity_code": 1, "start": 1, "end": 1, "all_day": 1}
+AVAILABILITY_SLOT_PROJECTION = {"user_id": 1, "date": 1, "start_time": 1, "end_time": 1, "status": 1, "start": 1, "end": 1}
+ABSENCE_PROJECTION = {
+    "staff_id": 1, "service_id": 1, "matricule": 1, "start_date": 1, "start_hour": 1, "end_date": 1, "end_hour": 1,
+    "status": 1, "absence_code_id": 1, "start": 1
+}
+# absence_unjustified : délai laissé pour renseigner le motif (code d'absence) ou faire valider l'absence
+UNJUSTIFIED_ABSENCE_DELAY = timedelta(hours=48)
+VALIDATED_ABSENCE_STATUS = "Validé par le cadre"
+
+
+def with_slot_fields(collection_name: str, doc: dict) -> dict:
+    return doc if "start" in doc else {**doc, **time_fields_of(collection_name, doc)}
+
+
+def slot_label(slot) -> str:
+    return slot.get("plage_horaire") or f"{slot.get('start_time')}-{slot.get('end_time')}"
+
+
+def conflict_finding(user_id, pairs):
+    """
+    Détection schedule_conflict d'un agent, rattachée au jour du premier créneau en conflit.
+    Les créneaux lus dans availabilities (source) sont rapportés à part des plannings.
+    """
+    slots = [slot for pair in pairs for slot in pair]
+    planning_ids = sorted({str(slot["_id"]) for slot in slots if slot.get("source") != "availabilities"})
+    availability_ids = sorted({str(slot["_id"]) for slot in slots if slot.get("source") == "availabilities"})
+    day = pairs[0][0].get("date")
+    finding = {
+        "rule_id": "schedule_conflict",
+        "user_id": user_id,
+        "date": day,
+        "description": f"Anomalie détectée automatiquement: {len(planning_ids)} plannings se chevauchent le {day}",
+        "planning_ids": planning_ids,
+        "plages": [[slot_label(first), slot_label(second)] for first, second in pairs]
+    }
+    if availability_ids:
+        finding["availability_ids"] = availability_ids
+        finding["description"] = (
+            f"Anomalie détectée automatiquement: créneaux en double le {day} "
+            f"({len(planning_ids)} plannings, {len(availability_ids)} disponibilités)"
+        )
+    return finding
+
+
+def conflicts_by_day(slots):
+    """Paires de créneaux en conflit (créneaux d'un agent et d'une même source, triés par start), par jour du premier créneau"""
+    by_day = {}
+    for pair in sweep_overlaps(slots):
+        by_day.setdefault(pair[0].get("date"), []).append(pair)
+    return by_day
+
+
+async def detect_schedule_conflicts(start_date: str = None, end_date: str = None):
+    """
+    Règle schedule_conflict : plannings travaillés d'un même agent dont les créneaux [start, end[ se chevauchent,
+    y compris une nuit qui déborde sur les plannings du lendemain (un repos ou un congé le lendemain n'est pas un conflit).
+    Les plannings sont lus triés par (agent, start) puis balayés : chaque planning n'est comparé qu'aux créneaux encore en cours.
+    Une détection par agent et par jour du premier créneau en conflit.
+    """
+    date_filter = {}
+    if start_date:
+        date_filter["$gte"] = start_date
+    if end_date:
+        date_filter["$lte"] = end_date
+
+    pipeline = [
+        {"$project": SWEEP_PROJECTION},
+        *interval_stages("plannings"),
+        {"$match": {"start": {"$ne": None}, **WORKED_PLANNING_FILTER}},
+        {"$sort": {"user_id": 1, "start": 1, "_id": 1}}
+    ]
+    if date_filter:
+        pipeline.insert(0, {"$match": {"date": date_filter}})
+
+    findings = []
+    current_user, slots = None, []
+
+    def flush():
+        findings.extend(conflict_finding(current_user, pairs) for pairs in conflicts_by_day(slots).values())
+
+    async for planning in plannings.aggregate(pipeline, allowDiskUse=True):
+        if planning.get("user_id") != current_user:
+            flush()
+            current_user, slots = planning.get("user_id"), []
+        slots.append(planning)
+    flush()
+    return findings
+
+
+async def agent_conflicts(user_id: str, days):
+    """
+    schedule_conflict pour un agent sur quelques jours (recalcul après une modification) : ses plannings travaillés,
+    et ses disponibilités non refusées entre elles, du jour précédent (nuit) au jour suivant.
+    Retourne (détections, jours recalculés) : les jours demandés et leurs veilles.
+    """
+    touched = sorted({date.fromisoformat(str(day)[:10]) for day in days if day})
+    if not user_id or not touched:
+        return [], []
+    scope_days = sorted({(day - timedelta(days=offset)).isoformat() for day in touched for offset in (0, 1)})
+    date_filter = {"$gte": scope_days[0], "$lte": (touched[-1] + timedelta(days=1)).isoformat()}
+
+    planning_docs = await plannings.find(
+        {"user_id": user_id, "date": date_filter, **WORKED_PLANNING_FILTER}, SWEEP_PROJECTION
+    ).to_list(length=None)
+    availability_docs = await availabilities.find(
+        {"user_id": user_id, "date": date_filter, "status": {"$ne": "refusé"}}, AVAILABILITY_SLOT_PROJECTION
+    ).to_list(length=None)
+
+    by_day = {}
+    for collection_name, docs in (("plannings", planning_docs), ("availabilities", availability_docs)):
+        slots = [
+            {**slot, "source": collection_name}
+            for slot in (with_slot_fields(collection_name, doc) for doc in docs)
+            if slot.get("start") is not None and not slot.get("all_day")
+        ]
+        slots.sort(key=lambda slot: (slot["start"], str(slot["_id"])))
+        for day, pairs in conflicts_by_day(slots).items():
+            by_day.setdefault(day, []).extend(pairs)
+
+    findings = [conflict_finding(user_id, pairs) for day, pairs in sorted(by_day.items()) if day in scope_days]
+    return findings, scope_days
+
+
+def unjustified_finding(absence, now: datetime):
+    """
+    Détection absence_unjustified d'une absence : ni motif (code d'absence) ni validation du cadre,
+    UNJUSTIFIED_ABSENCE_DELAY après son début. None si l'absence est justifiée, refusée ou trop récente.
+    """
+    absence = with_slot_fields("absences", absence)
+    if absence.get("absence_code_id") or absence.get("status") in (VALIDATED_ABSENCE_STATUS, REJECTED_ABSENCE_STATUS):
+        return None
+    if absence.get("start") is None or absence["start"] + UNJUSTIFIED_ABSENCE_DELAY > now:
+        return None
+    finding = {
+        "rule_id": "absence_unjustified",
+        "user_id": absence.get("staff_id"),
+        "date": str(absence.get("start_date"))[:10],
+        "description": f"Absence du {str(absence.get('start_date'))[:10]} sans motif ni validation après 48h",
+        "absence_id": str(absence["_id"]),
+        "status": absence.get("status")
+    }
+    if absence.get("service_id"):
+        finding["service_id"] = absence["service_id"]
+    return finding
+
+
+async def detect_unjustified_absences(start_date: str = None, end_date: str = None, now: datetime = None):
+    """Règle absence_unjustified : absences commencées sur la période, sans motif ni validation 48h après leur début"""
+    now = now or datetime.now()
+    query_filter = {
+        "status": {"$nin": [VALIDATED_ABSENCE_STATUS, REJECTED_ABSENCE_STATUS]},
+        "absence_code_id": {"$in": [None, ""]}
+    }
+    latest = (now - UNJUSTIFIED_ABSENCE_DELAY).date().isoformat()
+    query_filter["start_date"] = {"$lte": min(end_date, latest) if end_date else latest}
+    if start_date:
+        query_filter["start_date"]["$gte"] = start_date
+
+    findings = []
+    async for absence in absences.find(query_filter, ABSENCE_PROJECTION):
+        finding = unjustified_finding(absence, now)
+        if finding and finding["user_id"]:
+            findings.append(finding)
+    return findings
+
+
+def staffing_finding(service_id: str, day: str, staffed: dict, min_staff: dict):
+    """Détection understaffing d'un service pour un jour : créneaux (jour / nuit) sous l'effectif minimal"""
+    shortages = {
+        shift: {"required": int(min_staff[shift]), "staffed": staffed.get(shift, 0)}
+        for shift in SHIFTS
+        if int(min_staff.get(shift) or 0) > staffed.get(shift, 0)
+    }
+    if not shortages:
+        return None
+    detail = ", ".join(f"{shift} {counts['staffed']}/{counts['required']}" for shift, counts in shortages.items())
+    return {
+        "rule_id": "understaffing",
+        "user_id": None,
+        "service_id": service_id,
+        "date": day,
+        "description": f"Effectif insuffisant le {day} ({detail})",
+        "shortages": shortages
+    }
+
+
+async def service_understaffing(service, days):
+    """
+    understaffing pour un service sur des jours : agents distincts sur un créneau travaillé de jour ou de nuit
+    (selon l'heure de début), comparés à l'effectif minimal du service (min_staff, {"jour": n, "nuit": m}).
+    """
+    service_id = str(service["_id"])
+    days = sorted(set(days))
+    user_ids = [str(user["_id"]) async for user in users.find({"service_id": service_id}, {"_id": 1})]
+    staffed = {day: [set() for _ in SHIFTS] for day in days}
+    if user_ids and days:
+        cursor = plannings.find(
+            {"user_id": {"$in": user_ids}, "date": {"$gte": days[0], "$lte": days[-1]}},
+            {"user_id": 1, "date": 1, "plage_horaire": 1, "activity_code": 1, "start": 1, "start_minute": 1, "all_day": 1}
+        )
+        async for planning in cursor:
+            planning = with_slot_fields("plannings", planning)
+            if planning.get("date") in staffed and is_worked(planning):
+                staffed[planning["date"]][shift_class(planning.get("start_minute") or 0)].add(planning["user_id"])
+
+    findings = []
+    for day in days:
+        finding = staffing_finding(
+            service_id, day, {shift: len(staffed[day][index]) for index, shift in enumerate(SHIFTS)}, service["min_staff"]
+        )
+        if finding:
+            findings.append(finding)
+    return findings
+
+
+async def detect_understaffing(start_date: str = None, end_date: str = None):
+    """Règle understaffing : services dotés d'un effectif minimal (min_staff), jour par jour sur la période des plannings"""
+    start_date, end_date = await planning_date_span(start_date, end_date)
+    if not start_date or not end_date:
+        return []
+    days = period_days(date.fromisoformat(start_date[:10]), date.fromisoformat(end_date[:10]))
+    findings = []
+    async for service in services.find({"min_staff": {"$exists": True, "$ne": None}}, {"min_staff": 1}):
+        findings.extend(await service_understaffing(service, days))
+    return findings
+
+
+# Règles de détection exécutables par un balayage (identifiants de /detection/rules)
+DETECTION_RULES = {
+    "absence_unjustified": detect_unjustified_absences,
+    "schedule_conflict": detect_schedule_conflicts,
+    "overtime_exceeded": compliance_rule("overtime_exceeded"),
+    "min_work_days": compliance_rule("min_work_days"),
+    "weekly_rest": compliance_rule("weekly_rest"),
+    "understaffing": detect_understaffing,
+}
+
+
+async def run_detection_sweep(rules=None, start_date: str = None, end_date: str = None, create_anomalies: bool = False, progress=None):
+    """
+    Exécute les règles demandées (toutes par défaut) sur la période.
+    Les anomalies ne sont créées que sur demande : le balayage sert de rapport ou de reprise de l'existant.
+    """
+    rules = rules or list(DETECTION_RULES)
+    unknown = [rule for rule in rules if rule not in DETECTION_RULES]
+    if unknown:
+        raise ValueError(f"Règles inconnues: {', '.join(unknown)}. Règles disponibles: {', '.join(DETECTION_RULES)}")
+
+    findings = []
+    for index, rule in enumerate(rules, start=1):
+        findings.extend(await DETECTION_RULES[rule](start_date, end_date))
+        if progress:
+            await progress(index, len(rules))
+
+    created = await save_anomalies(findings) if create_anomalies else 0
+    by_rule = {rule: sum(1 for finding in findings if finding["rule_id"] == rule) for rule in rules}
+    return {"findings": findings, "by_rule": by_rule, "anomalies_created": created}
+
+
+# =============================================================================
+# DÉTECTION INCRÉMENTALE
+# Périmètres touchés par des modifications (flux de modifications, jobs/detection_stream) :
+# seules les règles et périodes concernées sont réévaluées, les anomalies créées ou levées en conséquence.
+# =============================================================================
+
+class DetectionScopes:
+    """Périmètres à réévaluer, accumulés au fil des modifications puis évalués en une fois (dédoublonnés)"""
+
+    def __init__(self):
+        self.agent_days = {}  # user_id -> jours : conflits, conformité hebdomadaire, effectif du service
+        self.conflict_days = {}  # user_id -> jours : conflits seulement (disponibilités, suppressions sans image)
+        self.absence_ids = set()
+        self.absence_keys = set()  # (staff_id, start_date) d'absences supprimées
+        self.busy_days = {}  # user_id -> jours : bitmaps d'occupation (crud/free_busy)
+        self.changes = 0
+
+    def __bool__(self):
+        return bool(self.agent_days or self.conflict_days or self.absence_ids or self.absence_keys or self.busy_days)
+
+    def add_busy_days(self, user_id, first_day, last_day=None, extra_days: int = 0):
+        """Jours de first_day à last_day (inclus), plus extra_days jours (nuit sur le lendemain)"""
+        try:
+            first = date.fromisoformat(str(first_day)[:10])
+            last = date.fromisoformat(str(last_day or first_day)[:10]) + timedelta(days=extra_days)
+        except ValueError:
+            return
+        self.busy_days.setdefault(user_id, set()).update(period_days(first, last))
+
+    def add_planning(self, planning):
+        if planning and planning.get("user_id") and planning.get("date"):
+            self.agent_days.setdefault(planning["user_id"], set()).add(str(planning["date"])[:10])
+            self.add_busy_days(planning["user_id"], planning["date"], extra_days=1)
+
+    def add_availability(self, availability):
+        if availability and availability.get("user_id") and availability.get("date"):
+            self.conflict_days.setdefault(availability["user_id"], set()).add(str(availability["date"])[:10])
+            self.add_busy_days(availability["user_id"], availability["date"], extra_days=1)
+
+    def add_absence(self, absence):
+        if absence and absence.get("_id") is not None:
+            self.absence_ids.add(absence["_id"])
+        if absence and absence.get("staff_id") and absence.get("start_date"):
+            self.absence_keys.add((absence["staff_id"], str(absence["start_date"])[:10]))
+            self.add_busy_days(absence["staff_id"], absence["start_date"], absence.get("end_date"), extra_days=1)
+
+    def add(self, collection_name: str, doc):
+        {"plannings": self.add_planning, "availabilities": self.add_availability, "absences": self.add_absence}[collection_name](doc)
+
+    async def add_deleted(self, collection_name: str, doc_id):
+        """
+        Document supprimé sans image antérieure (serveur sans pre-images) : les périmètres sont retrouvés
+        par les anomalies qui le citent.
+        """
+        id_field = {"plannings": "planning_ids", "availabilities": "availability_ids", "absences": "absence_id"}[collection_name]
+        cursor = db.anomalies.find({f"metadata.{id_field}": str(doc_id)}, {"user_id": 1, "metadata": 1})
+        async for anomaly in cursor:
+            day = anomaly.get("metadata", {}).get("date")
+            if collection_name == "absences":
+                self.absence_keys.add((anomaly.get("user_id"), day))
+            elif anomaly.get("user_id") and day:
+                self.conflict_days.setdefault(anomaly["user_id"], set()).add(day)
+            if anomaly.get("user_id") and day:
+                self.add_busy_days(anomaly["user_id"], day, extra_days=1)
+
+
+async def evaluate_agent_conflicts(days_by_user):
+    report = {"findings": 0, "created": 0, "cleared": 0}
+    for user_id, days in days_by_user.items():
+        findings, scope_days = await agent_conflicts(user_id, days)
+        report["findings"] += len(findings)
+        report["created"] += await save_anomalies(findings)
+        report["cleared"] += await clear_resolved_anomalies(
+            ("schedule_conflict",), [(user_id, day) for day in scope_days], findings
+        )
+    return report
+
+
+async def evaluate_staffing(days_by_user):
+    """understaffing des services des agents touchés, pour les jours touchés"""
+    report = {"findings": 0, "created": 0, "cleared": 0}
+    service_by_user = {
+        str(user["_id"]): user.get("service_id")
+        async for user in users.find(
+            {"_id": {"$in": [ObjectId(user_id) for user_id in days_by_user if ObjectId.is_valid(user_id)]}},
+            {"service_id": 1}
+        )
+    }
+    days_by_service = {}
+    for user_id, days in days_by_user.items():
+        if service_by_user.get(user_id):
+            days_by_service.setdefault(service_by_user[user_id], set()).update(days)
+    if not days_by_service:
+        return report
+
+    cursor = services.find(
+        {"_id": {"$in": [ObjectId(service_id) for service_id in days_by_service if ObjectId.is_valid(service_id)]},
+         "min_staff": {"$exists": True, "$ne": None}},
+        {"min_staff": 1}
+    )
+    async for service in cursor:
+        service_id = str(service["_id"])
+        findings = await service_understaffing(service, days_by_service[service_id])
+        report["findings"] += len(findings)
+        report["created"] += await save_anomalies(findings)
+        report["cleared"] += await clear_resolved_anomalies(
+            ("understaffing",), [(service_id, day) for day in days_by_service[service_id]], findings, owner="service_id"
+        )
+    return report
+
+
+async def evaluate_absences(absence_ids, absence_keys, now: datetime = None):
+    now = now or datetime.now()
+    findings, scopes = [], set(absence_keys)
+    if absence_ids:
+        async for absence in absences.find({"_id": {"$in": list(absence_ids)}}, ABSENCE_PROJECTION):
+            scopes.add((absence.get("staff_id"), str(absence.get("start_date"))[:10]))
+            finding = unjustified_finding(absence, now)
+            if finding and finding["user_id"]:
+                findings.append(finding)
+    created = await save_anomalies(findings)
+    cleared = await clear_resolved_anomalies(
+        ("absence_unjustified",), [scope for scope in scopes if scope[0] and scope[1]], findings
+    )
+    return {"findings": len(findings), "created": created, "cleared": cleared}
+
+
+async def evaluate_scopes(scopes: DetectionScopes):
+    """
+    Réévalue les règles sur les périmètres accumulés :
+    - plannings : schedule_conflict, conformité hebdomadaire (overtime_exceeded, min_work_days, weekly_rest), understaffing
+    - disponibilités : schedule_conflict
+    - absences : absence_unjustified, et la conformité des semaines couvertes (jours justifiés)
+    - toutes : bitmaps d'occupation des agents et jours touchés (recherche de remplaçants)
+    """
+    conflict_days = {}
+    for source in (scopes.agent_days, scopes.conflict_days):
+        for user_id, days in source.items():
+            conflict_days.setdefault(user_id, set()).update(days)
+
+    report = {"changes": scopes.changes}
+    report["schedule_conflict"] = await evaluate_agent_conflicts(conflict_days)
+
+    compliance_days = {user_id: set(days) for user_id, days in scopes.agent_days.items()}
+    absence_range = await absences.find(
+        {"_id": {"$in": list(scopes.absence_ids)}}, {"staff_id": 1, "start_date": 1, "end_date": 1}
+    ).to_list(length=None) if scopes.absence_ids else []
+    for absence in absence_range:
+        if absence.get("staff_id") and absence.get("start_date"):
+            compliance_days.setdefault(absence["staff_id"], set()).update(
+                {str(absence["start_date"])[:10], str(absence.get("end_date") or absence["start_date"])[:10]}
+            )
+    # Agents regroupés par étendue de jours touchés : une écriture groupée (simulation) donne un seul recalcul
+    by_span = {}
+    for user_id, days in compliance_days.items():
+        by_span.setdefault((min(days), max(days)), []).append(user_id)
+    report["compliance"] = [
+        await refresh_weeks(sorted(user_ids), first, (date.fromisoformat(last) + timedelta(days=1)).isoformat())
+        for (first, last), user_ids in sorted(by_span.items())
+    ]
+
+    report["understaffing"] = await evaluate_staffing(scopes.agent_days)
+    report["absence_unjustified"] = await evaluate_absences(scopes.absence_ids, scopes.absence_keys)
+    report["free_busy"] = await refresh_agent_days(scopes.busy_days)
+    return report
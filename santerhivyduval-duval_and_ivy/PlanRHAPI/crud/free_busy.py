@@ -0,0 +1,166 @@
+# Bitmaps d'occupation par agent et par jour (scheduling/free_busy) enregistrés dans free_busy :
+# recalculés à chaque écriture de planning, disponibilité ou absence pour les agents et jours touchés
+# (et par la détection continue), reconstruits par le job free_busy, calculés à la demande pour les jours absents
+from datetime import date, datetime, timedelta
+
+import numpy as np
+from bson import Binary
+from pymongo import ReplaceOne
+
+from crud.absence import REJECTED_ABSENCE_STATUS
+from crud.overlap import OVERLAP_SOURCES
+from database.database import free_busy, users
+from scheduling.contracts import period_days
+from scheduling.free_busy import DAY_BYTES, intervals_mask
+from utils.time_fields import time_fields_of
+
+# Créneaux qui occupent un agent : ceux de OVERLAP_SOURCES (plannings travaillés, hors repos, congés et journées entières),
+# hors absences et disponibilités refusées
+BUSY_CONDITIONS = {
+    "absences": {"status": {"$ne": REJECTED_ABSENCE_STATUS}},
+    "availabilities": {"status": {"$ne": "refusé"}},
+}
+# Agents traités par lot (créneaux d'un lot chargés en une requête par collection)
+FREE_BUSY_BATCH_USERS = 200
+# Reconstruction sans période : jours à venir couverts à partir d'aujourd'hui
+FREE_BUSY_HORIZON_DAYS = 62
+
+
+async def busy_slots(user_ids, start: datetime, end: datetime):
+    """{user_id: [(start, end)]} des créneaux des agents qui chevauchent [start, end[, toutes collections confondues"""
+    slots = {}
+    for source, spec in OVERLAP_SOURCES.items():
+        query_filter = {
+            **spec.get("occupied", {}), **BUSY_CONDITIONS.get(source, {}),
+            spec["owner"]: {"$in": list(user_ids)}, "start": {"$lt": end}, "end": {"$gt": start}
+        }
+        if spec["max_span"] is not None:
+            query_filter["start"]["$gt"] = start - spec["max_span"]
+        async for slot in spec["collection"].find(query_filter, {"_id": 0, spec["owner"]: 1, "start": 1, "end": 1}):
+            slots.setdefault(slot[spec["owner"]], []).append((slot["start"], slot["end"]))
+    return slots
+
+
+async def compute_free_busy(user_ids, days):
+    """{user_id: masque (jours, DAY_BYTES)} calculé depuis les créneaux des agents sur les jours consécutifs demandés"""
+    first_day = date.fromisoformat(days[0])
+    start = datetime(first_day.year, first_day.month, first_day.day)
+    slots = await busy_slots(user_ids, start, start + timedelta(days=len(days)))
+    return {user_id: intervals_mask(first_day, len(days), slots.get(user_id, ())) for user_id in user_ids}
+
+
+async def refresh_free_busy(user_ids, days):
+    """Recalcule et enregistre les bitmaps des agents sur les jours consécutifs demandés ; retourne les masques calculés"""
+    if not user_ids or not days:
+        return {}
+    masks = await compute_free_busy(user_ids, days)
+    now = datetime.now()
+    operations = [
+        ReplaceOne(
+            {"user_id": user_id, "day": day},
+            {"user_id": user_id, "day": day, "busy": Binary(row.tobytes()), "computed_at": now},
+            upsert=True
+        )
+        for user_id, mask in masks.items()
+        for day, row in zip(days, mask)
+    ]
+    await free_busy.bulk_write(operations, ordered=False)
+    return masks
+
+
+async def refresh_agent_days(days_by_user):
+    """
+    Rafraîchissement après des modifications (écritures, détection continue) : {user_id: jours touchés}.
+    Agents regroupés par étendue de jours, comme le recalcul de conformité ; une erreur est journalisée, sans propagation.
+    """
+    try:
+        by_span = {}
+        for user_id, days in days_by_user.items():
+            if user_id and days:
+                by_span.setdefault((min(days), max(days)), []).append(user_id)
+        refreshed = 0
+        for (first, last), user_ids in sorted(by_span.items()):
+            days, user_ids = period_days(date.fromisoformat(first), date.fromisoformat(last)), sorted(user_ids)
+            for position in range(0, len(user_ids), FREE_BUSY_BATCH_USERS):
+                masks = await refresh_free_busy(user_ids[position:position + FREE_BUSY_BATCH_USERS], days)
+                refreshed += len(masks) * len(days)
+        return refreshed
+    except Exception as e:
+        print(f"Erreur lors du rafraîchissement des bitmaps d'occupation : {str(e)}")
+        return None
+
+
+def slot_projection(source: str) -> dict:
+    """Champs d'un document nécessaires pour retrouver les jours qu'il occupe (champs chaîne si les champs natifs manquent)"""
+    spec = OVERLAP_SOURCES[source]
+    return {spec["owner"]: 1, "start": 1, "end": 1, **{field: 1 for field in spec["fields"]}}
+
+
+def slot_days(source: str, doc: dict):
+    """(agent, jours couverts) d'un document plannings / availabilities / absences ; (None, []) sans créneau lisible"""
+    owner = doc.get(OVERLAP_SOURCES[source]["owner"])
+    times = doc if doc.get("start") is not None else time_fields_of(source, doc)
+    if not owner or times.get("start") is None or times.get("end") is None:
+        return None, []
+    return owner, period_days(times["start"].date(), (times["end"] - timedelta(minutes=1)).date())
+
+
+async def update_free_busy(source: str, *docs):
+    """
+    Répercute une écriture sur les bitmaps : les jours couverts par les documents écrits (ancienne et nouvelle version
+    d'un document modifié, document supprimé) sont recalculés pour leur agent.
+    Comme pour les totaux d'heures, une erreur n'annule pas l'écriture : elle est journalisée, le job free_busy la rattrapera.
+    """
+    try:
+        days_by_user = {}
+        for doc in docs:
+            owner, days = slot_days(source, doc) if doc else (None, [])
+            if owner:
+                days_by_user.setdefault(owner, set()).update(days)
+        return await refresh_agent_days(days_by_user) if days_by_user else 0
+    except Exception as e:
+        print(f"Erreur lors de la mise à jour des bitmaps d'occupation : {str(e)}")
+        return None
+
+
+async def load_free_busy(user_ids, days):
+    """
+    Bitmaps (agents, jours, DAY_BYTES) des agents sur les jours consécutifs demandés, lus dans free_busy.
+    Les agents dont un jour manque sont calculés et enregistrés. Retourne (bitmaps, nombre d'agents calculés).
+    """
+    index = {user_id: position for position, user_id in enumerate(user_ids)}
+    day_index = {day: position for position, day in enumerate(days)}
+    bitmaps = np.zeros((len(user_ids), len(days), DAY_BYTES), dtype=np.uint8)
+    found = np.zeros((len(user_ids), len(days)), dtype=bool)
+
+    cursor = free_busy.find(
+        {"user_id": {"$in": list(user_ids)}, "day": {"$gte": days[0], "$lte": days[-1]}},
+        {"_id": 0, "user_id": 1, "day": 1, "busy": 1}
+    )
+    async for doc in cursor:
+        row, column = index[doc["user_id"]], day_index[doc["day"]]
+        bitmaps[row, column] = np.frombuffer(doc["busy"], dtype=np.uint8)
+        found[row, column] = True
+
+    missing = [user_id for user_id, complete in zip(user_ids, found.all(axis=1)) if not complete]
+    for position in range(0, len(missing), FREE_BUSY_BATCH_USERS):
+        masks = await refresh_free_busy(missing[position:position + FREE_BUSY_BATCH_USERS], days)
+        for user_id, mask in masks.items():
+            bitmaps[index[user_id]] = mask
+    return bitmaps, len(missing)
+
+
+async def sweep_free_busy(start_date: str = None, end_date: str = None, service_id: str = None, progress=None):
+    """Reconstruction des bitmaps de tous les agents (ou d'un service), par lots ; sans période, les FREE_BUSY_HORIZON_DAYS jours à venir"""
+    first_day = date.fromisoformat(start_date) if start_date else date.today()
+    last_day = date.fromisoformat(end_date) if end_date else first_day + timedelta(days=FREE_BUSY_HORIZON_DAYS - 1)
+    days = period_days(first_day, last_day)
+    user_ids = [str(user["_id"]) async for user in users.find({"service_id": service_id} if service_id else {}, {"_id": 1})]
+
+    report = {"agents": len(user_ids), "days": len(days), "bitmaps": 0}
+    for position in range(0, len(user_ids), FREE_BUSY_BATCH_USERS):
+        masks = await refresh_free_busy(user_ids[position:position + FREE_BUSY_BATCH_USERS], days)
+        report["bitmaps"] += len(masks) * len(days)
+        if progress:
+            await progress(min(position + FREE_BUSY_BATCH_USERS, len(user_ids)), len(user_ids))
+    return report
@@ -0,0 +1,197 @@
+# Heures travaillées par agent, par semaine et par mois : totaux matérialisés dans hour_totals,
+# tenus à jour à chaque écriture de planning, reconstruits par le job hour_totals
+from datetime import date, datetime, timedelta
+
+from pymongo import DeleteMany, ReplaceOne, UpdateOne
+
+from crud.compliance import COMPLIANCE_PLANNING_PROJECTION, planning_date_span, with_time_fields
+from database.database import plannings, users, hour_totals
+from scheduling.compliance import is_worked, week_label
+from utils.date_range import calendar_period
+
+TOTAL_PERIODS = ("week", "month")
+# Reconstruction : agents traités par lot (plannings d'un lot chargés en une requête)
+HOUR_TOTALS_BATCH_USERS = 100
+# Champs d'un planning nécessaires au calcul de sa contribution
+HOUR_TOTALS_PROJECTION = COMPLIANCE_PLANNING_PROJECTION
+
+
+def period_key(period: str, day) -> dict:
+    """Clé d'un total : période ('week' ou 'month') et premier jour de la semaine ISO / du mois contenant day"""
+    if not isinstance(day, date):
+        day = date.fromisoformat(str(day)[:10])
+    return {"period": period, "period_start": calendar_period(period, day)[0].isoformat()}
+
+
+def period_label(period: str, period_start: str) -> str:
+    start = date.fromisoformat(period_start)
+    return week_label(start) if period == "week" else period_start[:7]
+
+
+def planning_contributions(planning):
+    """
+    [(clé de période, minutes, code d'activité)] d'un planning : une contribution à sa semaine et une à son mois,
+    aucune pour un créneau non travaillé (repos, congé, journée entière)
+    """
+    if not planning.get("user_id") or not planning.get("date"):
+        return []
+    planning = with_time_fields(planning)
+    if not is_worked(planning):
+        return []
+    minutes = planning.get("duration_minutes") or 0
+    return [
+        ({"user_id": planning["user_id"], **period_key(period, planning["date"])}, minutes, planning.get("activity_code"))
+        for period in TOTAL_PERIODS
+    ]
+
+
+def total_update(key: dict, minutes: int, activity_code, sign: int, now: datetime) -> UpdateOne:
+    increments = {"worked_minutes": sign * minutes, "worked_slots": sign}
+    if activity_code:
+        increments[f"by_activity.{activity_code}"] = sign * minutes
+    return UpdateOne(
+        key,
+        {"$inc": increments, "$set": {"updated_at": now}, "$setOnInsert": {"label": period_label(key["period"], key["period_start"])}},
+        upsert=True
+    )
+
+
+async def update_hour_totals(removed=(), added=()):
+    """
+    Répercute une écriture de plannings sur les totaux : les contributions des plannings retirés (ancienne version
+    d'un planning modifié, planning supprimé) sont soustraites, celles des plannings ajoutés sont ajoutées.
+    Chaque total est mis à jour par un $inc atomique ; une erreur n'annule pas l'écriture du planning,
+    elle est journalisée et la reconstruction la rattrapera.
+    """
+    try:
+        now = datetime.now()
+        operations = [
+            total_update(key, minutes, activity_code, sign, now)
+            for sign, docs in ((-1, removed), (1, added))
+            for planning in docs
+            if planning
+            for key, minutes, activity_code in planning_contributions(planning)
+        ]
+        if not operations:
+            return 0
+        result = await hour_totals.bulk_write(operations, ordered=False)
+        return result.modified_count + result.upserted_count
+    except Exception as e:
+        print(f"Erreur lors de la mise à jour des totaux d'heures : {str(e)}")
+        return None
+
+
+def fold_hour_totals(planning_docs, periods):
+    """Totaux calculés depuis des plannings, limités aux périodes demandées {(période, premier jour)}"""
+    totals = {}
+    for planning in planning_docs:
+        for key, minutes, activity_code in planning_contributions(planning):
+            if (key["period"], key["period_start"]) not in periods:
+                continue
+            total = totals.setdefault(
+                (key["user_id"], key["period"], key["period_start"]),
+                {**key, "label": period_label(key["period"], key["period_start"]), "worked_minutes": 0, "worked_slots": 0, "by_activity": {}}
+            )
+            total["worked_minutes"] += minutes
+            total["worked_slots"] += 1
+            if activity_code:
+                total["by_activity"][activity_code] = total["by_activity"].get(activity_code, 0) + minutes
+    return list(totals.values())
+
+
+def covered_periods(first_day, last_day):
+    """Semaines et mois qui chevauchent [first_day, last_day], et jours à lire pour les calculer en entier"""
+    first, last = date.fromisoformat(str(first_day)[:10]), date.fromisoformat(str(last_day)[:10])
+    periods = set()
+    for period in TOTAL_PERIODS:
+        start = calendar_period(period, first)[0]
+        while start <= last:
+            periods.add((period, start.isoformat()))
+            start = calendar_period(period, start)[1] + timedelta(days=1)
+    read_start = min(calendar_period(period, first)[0] for period in TOTAL_PERIODS)
+    read_end = max(calendar_period(period, last)[1] for period in TOTAL_PERIODS)
+    return periods, read_start.isoformat(), read_end.isoformat()
+
+
+async def rebuild_hour_totals(user_ids, first_day, last_day):
+    """
+    Recalcule depuis les plannings les totaux des agents sur les semaines et mois qui chevauchent la période.
+    Les totaux recalculés sont remplacés ; ceux qui n'ont plus de planning travaillé sont supprimés.
+    Retourne le nombre de totaux écrits.
+    """
+    if not user_ids:
+        return 0
+    periods, read_start, read_end = covered_periods(first_day, last_day)
+    planning_docs = await plannings.find(
+        {"user_id": {"$in": user_ids}, "date": {"$gte": read_start, "$lte": read_end}}, HOUR_TOTALS_PROJECTION
+    ).to_list(length=None)
+    totals = fold_hour_totals(planning_docs, periods)
+
+    now = datetime.now()
+    operations = [
+        ReplaceOne(
+            {"user_id": total["user_id"], "period": total["period"], "period_start": total["period_start"]},
+            {**total, "updated_at": now},
+            upsert=True
+        )
+        for total in totals
+    ]
+    # Totaux antérieurs à la reconstruction sur ces périodes : plus aucun planning travaillé
+    operations.append(DeleteMany({
+        "user_id": {"$in": user_ids},
+        "$or": [
+            {"period": period, "period_start": {"$in": sorted(start for kind, start in periods if kind == period)}}
+            for period in TOTAL_PERIODS
+        ],
+        "updated_at": {"$lt": now}
+    }))
+    await hour_totals.bulk_write(operations, ordered=True)
+    return len(totals)
+
+
+async def refresh_hour_totals(user_ids, first_day, last_day):
+    """Reconstruction après une écriture groupée (génération, simulation) ; une erreur est journalisée, sans propagation"""
+    try:
+        return await rebuild_hour_totals(user_ids, first_day, last_day)
+    except Exception as e:
+        print(f"Erreur lors de la reconstruction des totaux d'heures : {str(e)}")
+        return None
+
+
+async def sweep_hour_totals(start_date: str = None, end_date: str = None, service_id: str = None, progress=None):
+    """
+    Reconstruction des totaux de tous les agents ayant des plannings sur la période (ou des agents d'un service), par lots.
+    Sans période ni service, la collection est reconstruite entièrement : les totaux non recalculés sont supprimés.
+    """
+    full_rebuild = not (start_date or end_date or service_id)
+    started_at = datetime.now()
+    start_date, end_date = await planning_date_span(start_date, end_date)
+    report = {"agents": 0, "totals": 0, "removed": 0}
+    if start_date and end_date:
+        if service_id:
+            user_ids = [str(user["_id"]) async for user in users.find({"service_id": service_id}, {"_id": 1})]
+        else:
+            user_ids = sorted(await plannings.distinct("user_id", {"date": {"$gte": start_date, "$lte": end_date}}))
+        user_ids = [user_id for user_id in user_ids if user_id]
+        report["agents"] = len(user_ids)
+
+        for index in range(0, len(user_ids), HOUR_TOTALS_BATCH_USERS):
+            report["totals"] += await rebuild_hour_totals(user_ids[index:index + HOUR_TOTALS_BATCH_USERS], start_date, end_date)
+            if progress:
+                await progress(min(index + HOUR_TOTALS_BATCH_USERS, len(user_ids)), len(user_ids))
+
+    if full_rebuild:
+        # Agents sans planning, périodes hors des plannings : totaux orphelins
+        result = await hour_totals.delete_many({"updated_at": {"$lt": started_at}})
+        report["removed"] = result.deleted_count
+    return report
+
+
+async def get_hour_total(user_id: str, period: str, day) -> dict:
+    """Total d'un agent pour la semaine ou le mois contenant day : lecture d'un document par la clé unique"""
+    key = {"user_id": user_id, **period_key(period, day)}
+    total = await hour_totals.find_one(key, {"_id": 0})
+    if total is None:
+        total = {**key, "label": period_label(period, key["period_start"]), "worked_minutes": 0, "worked_slots": 0, "by_activity": {}}
+    total["worked_hours"] = round(total["worked_minutes"] / 60, 2)
+    return total
@@ -0,0 +1,125 @@
+from datetime import datetime, timedelta
+
+from bson import ObjectId
+from pymongo import ReturnDocument
+
+from database.database import jobs
+
+JOB_PENDING = "en_attente"
+JOB_RUNNING = "en_cours"
+JOB_DONE = "terminé"
+JOB_FAILED = "échoué"
+JOB_CANCELLED = "annulé"
+FINISHED_STATUSES = (JOB_DONE, JOB_FAILED, JOB_CANCELLED)
+
+# Le fichier importé (payload) reste en base le temps du traitement, il n'est jamais renvoyé
+JOB_PUBLIC_PROJECTION = {"payload": 0}
+# Le résultat peut être volumineux : il n'est renvoyé que par /jobs/{job_id}/result
+JOB_STATUS_PROJECTION = {"payload": 0, "result": 0}
+# Limite d'un document MongoDB (16 Mo), marge comprise
+MAX_PAYLOAD_BYTES = 15 * 1024 * 1024
+
+
+async def create_job(job_type: str, params: dict = None, payload: bytes = None):
+    now = datetime.now()
+    job = {
+        "type": job_type,
+        "params": params or {},
+        "status": JOB_PENDING,
+        "progress": {"done": 0, "total": None, "message": None},
+        "result": None,
+        "error": None,
+        "cancel_requested": False,
+        "attempts": 0,
+        "worker": None,
+        "created_at": now,
+        "started_at": None,
+        "heartbeat_at": None,
+        "finished_at": None,
+    }
+    if payload is not None:
+        job["payload"] = payload
+    result = await jobs.insert_one(job)
+    job["_id"] = result.inserted_id
+    job.pop("payload", None)
+    return job
+
+
+async def get_job(job_id: str, projection=JOB_STATUS_PROJECTION):
+    return await jobs.find_one({"_id": ObjectId(job_id)}, projection)
+
+
+async def request_cancel(job_id: str):
+    """
+    Annule un job : immédiatement s'il est en attente, sinon demande l'arrêt au worker qui l'exécute.
+    Retourne le job à jour (None s'il n'existe pas).
+    """
+    now = datetime.now()
+    job = await jobs.find_one_and_update(
+        {"_id": ObjectId(job_id), "status": JOB_PENDING},
+        {"$set": {"status": JOB_CANCELLED, "cancel_requested": True, "finished_at": now}, "$unset": {"payload": ""}},
+        projection=JOB_STATUS_PROJECTION,
+        return_document=ReturnDocument.AFTER
+    )
+    if job:
+        return job
+    job = await jobs.find_one_and_update(
+        {"_id": ObjectId(job_id), "status": JOB_RUNNING},
+        {"$set": {"cancel_requested": True}},
+        projection=JOB_STATUS_PROJECTION,
+        return_document=ReturnDocument.AFTER
+    )
+    return job or await get_job(job_id)
+
+
+async def claim_next_job(worker_id: str, job_types):
+    """Prend atomiquement le plus ancien job en attente d'un type géré par le worker"""
+    now = datetime.now()
+    return await jobs.find_one_and_update(
+        {"status": JOB_PENDING, "type": {"$in": list(job_types)}},
+        {
+            "$set": {"status": JOB_RUNNING, "worker": worker_id, "started_at": now, "heartbeat_at": now},
+            "$inc": {"attempts": 1}
+        },
+        sort=[("created_at", 1)],
+        return_document=ReturnDocument.AFTER
+    )
+
+
+async def heartbeat(job_id, progress: dict = None) -> bool:
+    """Signale que le job est toujours en cours (et sa progression) ; retourne True si son annulation est demandée"""
+    update = {"heartbeat_at": datetime.now()}
+    if progress:
+        update.update({f"progress.{key}": value for key, value in progress.items()})
+    job = await jobs.find_one_and_update(
+        {"_id": job_id, "status": JOB_RUNNING}, {"$set": update}, projection={"cancel_requested": 1}
+    )
+    return bool(job and job.get("cancel_requested"))
+
+
+async def finish_job(job_id, status: str, result=None, error: str = None):
+    await jobs.update_one(
+        {"_id": job_id, "status": JOB_RUNNING},
+        {
+            "$set": {"status": status, "result": result, "error": error, "finished_at": datetime.now()},
+            "$unset": {"payload": ""}
+        }
+    )
+
+
+async def release_job(job_id):
+    """Remet en attente un job interrompu par l'arrêt de son worker"""
+    await jobs.update_one(
+        {"_id": job_id, "status": JOB_RUNNING},
+        {"$set": {"status": JOB_PENDING, "worker": None, "heartbeat_at": None}}
+    )
+
+
+async def requeue_stale_jobs(stale_after_seconds: int) -> int:
+    """Remet en attente les jobs dont le worker ne donne plus signe de vie (processus arrêté brutalement)"""
+    limit = datetime.now() - timedelta(seconds=stale_after_seconds)
+    result = await jobs.update_many(
+        {"status": JOB_RUNNING, "heartbeat_at": {"$lt": limit}},
+        {"$set": {"status": JOB_PENDING, "worker": None, "heartbeat_at": None}}
+    )
+    return result.modified_count
@@ -0,0 +1,94 @@
+# Chevauchement des créneaux d'un agent : plannings, disponibilités, absences et missions
+# partagent la même représentation (agent, start, end) en datetime, servie par un index par collection
+import asyncio
+from datetime import timedelta
+
+from bson import ObjectId
+
+from database.database import plannings, availabilities, absences, missions
+from scheduling.compliance import NON_WORKED_CODES
+
+# Plannings qui occupent l'agent : créneaux horaires travaillés. Les lignes journée entière (REPOS, CONGÉ, plage vide
+# ou 'Journée') couvrent [D 00:00, D+1 00:00[ et chevaucheraient une nuit de la veille ou tout créneau du jour.
+WORKED_PLANNING_FILTER = {"all_day": {"$ne": True}, "activity_code": {"$nin": list(NON_WORKED_CODES)}}
+
+# Par collection : champ de l'agent, durée maximale d'un créneau (None : non bornée), champs renvoyés
+# et critères des créneaux pris en compte (occupied).
+# Un créneau qui chevauche [start, end[ commence avant end ; si sa durée est bornée, il commence aussi
+# après start - durée maximale, ce qui réduit la recherche à un intervalle de l'index (agent, start, end).
+# Les absences, sur plusieurs jours, sont cherchées par leur fin sur l'index (agent, end, start).
+OVERLAP_SOURCES = {
+    "plannings": {
+        "collection": plannings, "owner": "user_id", "max_span": timedelta(days=1),
+        "fields": ("date", "plage_horaire", "activity_code"), "occupied": WORKED_PLANNING_FILTER
+    },
+    "availabilities": {
+        "collection": availabilities, "owner": "user_id", "max_span": timedelta(days=1),
+        "fields": ("date", "start_time", "end_time", "status")
+    },
+    "absences": {
+        "collection": absences, "owner": "staff_id", "max_span": None,
+        "fields": ("start_date", "start_hour", "end_date", "end_hour", "status", "matricule")
+    },
+    # Missions : pas de route d'écriture, les documents portent directement user_id / start / end
+    "missions": {
+        "collection": missions, "owner": "user_id", "max_span": None,
+        "fields": ("title", "service_id")
+    },
+}
+
+
+def overlap_filter(source: str, user_id: str, start, end, exclude_id=None, conditions: dict = None) -> dict:
+    """
+    Filtre des créneaux occupés de l'agent (occupied) qui chevauchent [start, end[ (fins exclues : des créneaux bout à bout ne se chevauchent pas).
+    conditions : critères supplémentaires (statut...)
+    """
+    spec = OVERLAP_SOURCES[source]
+    query_filter = {
+        **spec.get("occupied", {}), **(conditions or {}), spec["owner"]: user_id, "start": {"$lt": end}, "end": {"$gt": start}
+    }
+    if spec["max_span"] is not None:
+        query_filter["start"]["$gt"] = start - spec["max_span"]
+    if exclude_id is not None:
+        query_filter["_id"] = {"$ne": ObjectId(exclude_id) if isinstance(exclude_id, str) else exclude_id}
+    return query_filter
+
+
+def overlap_projection(source: str) -> dict:
+    spec = OVERLAP_SOURCES[source]
+    return {field: 1 for field in (spec["owner"], "start", "end", "all_day", *spec["fields"])}
+
+
+async def find_overlap(source: str, user_id: str, start, end, exclude_id=None, conditions: dict = None):
+    """Premier créneau de la collection qui chevauche [start, end[, None sinon (contrôle avant écriture)"""
+    spec = OVERLAP_SOURCES[source]
+    return await spec["collection"].find_one(
+        overlap_filter(source, user_id, start, end, exclude_id, conditions), overlap_projection(source)
+    )
+
+
+async def find_overlaps(source: str, user_id: str, start, end, exclude_id=None):
+    spec = OVERLAP_SOURCES[source]
+    cursor = spec["collection"].find(overlap_filter(source, user_id, start, end, exclude_id), overlap_projection(source))
+    return await cursor.sort("start", 1).to_list(length=None)
+
+
+async def agent_overlaps(user_id: str, start, end, sources=None):
+    """{collection: créneaux qui chevauchent [start, end[} pour les collections demandées (toutes par défaut), en parallèle"""
+    sources = list(sources or OVERLAP_SOURCES)
+    results = await asyncio.gather(*(find_overlaps(source, user_id, start, end) for source in sources))
+    return dict(zip(sources, results))
+
+
+def sweep_overlaps(slots):
+    """
+    Paires de créneaux qui se chevauchent, parmi des créneaux d'un même agent triés par start.
+    Balayage : seuls les créneaux encore en cours (fin après le début du créneau lu) sont comparés.
+    """
+    active = []
+    pairs = []
+    for slot in slots:
+        active = [other for other in active if other["end"] > slot["start"]]
+        pairs.extend((other, slot) for other in active)
+        active.append(slot)
+    return pairs
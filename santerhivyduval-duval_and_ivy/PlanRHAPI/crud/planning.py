@@ -0,0 +1,412 @@
+import asyncio
+import functools
+from datetime import date, timedelta
+
+from fastapi import HTTPException
+
+from crud.compliance import refresh_weeks
+from crud.free_busy import refresh_agent_days
+from crud.hour_totals import refresh_hour_totals
+from database.database import plannings, codes, users, user_contrat, availabilities, absences, services
+from scheduling import build_agent_profile, generate_planning, simulate_service
+from scheduling.contracts import month_days, shift_duration, to_minutes
+from scheduling.generator import WORK_CODE
+from scheduling.optimizer import check_options, optimize_planning
+from utils.projection import EXISTS_PROJECTION
+from utils.time_fields import interval_stages, worked_minutes_expr
+from utils.workers import run_in_process
+
+# Codes historiques, utilisés si la collection des codes est vide
+DEFAULT_ACTIVITY_CODES = ["SOIN", "CONGÉ", "REPOS", "FORMATION", "ADMINISTRATIF"]
+# Fenêtre par défaut de la répartition par date (aujourd'hui + 6 jours)
+DEFAULT_DATE_WINDOW_DAYS = 7
+# Simulation multi-services : chargements MongoDB simultanés et taille des insertions groupées
+SIMULATION_LOAD_CONCURRENCY = 4
+SIMULATION_BULK_SIZE = 5000
+
+
+def date_window(start_date=None, end_date=None):
+    """
+    Fenêtre de la répartition par date : la plage demandée, complétée si une borne manque,
+    sinon aujourd'hui + 6 jours
+    """
+    span = timedelta(days=DEFAULT_DATE_WINDOW_DAYS - 1)
+    if start_date and end_date:
+        return start_date, end_date
+    if start_date:
+        start = date.fromisoformat(start_date)
+        end = start + span
+    elif end_date:
+        end = date.fromisoformat(end_date)
+        start = end - span
+    else:
+        start = date.today()
+        end = start + span
+    return start.strftime("%Y-%m-%d"), end.strftime("%Y-%m-%d")
+
+
+def date_range_filter(start_date=None, end_date=None) -> dict:
+    date_filter = {}
+    if start_date:
+        date_filter["$gte"] = start_date
+    if end_date:
+        date_filter["$lte"] = end_date
+    return {"date": date_filter} if date_filter else {}
+
+
+def planning_stats_pipeline(query_filter: dict, window_filter: dict, by_service: bool = False):
+    """
+    Pipeline unique ($facet) des statistiques de plannings.
+    query_filter : filtre appliqué avant le $facet (plage de dates, utilisateurs du service), servi par les index
+    window_filter : fenêtre de la répartition par date
+    by_service : ajoute la répartition par service (jointure sur les utilisateurs, une fois par agent)
+    Les minutes travaillées sont sommées côté serveur sur les champs horaires natifs (recalculés s'ils manquent).
+    """
+    facets = {
+        "total": [{"$count": "count"}],
+        "by_activity": [{"$group": {"_id": "$activity_code", "count": {"$sum": 1}}}],
+        "worked_minutes": [
+            *interval_stages("plannings"),
+            {"$group": {"_id": "$activity_code", "minutes": {"$sum": worked_minutes_expr()}}}
+        ],
+        "by_date": [
+            {"$match": window_filter},
+            {"$group": {"_id": "$date", "count": {"$sum": 1}}},
+            {"$sort": {"_id": 1}}
+        ]
+    }
+
+    if by_service:
+        facets["by_service"] = [
+            # Regroupement par agent d'abord : la jointure porte sur les agents, pas sur les plannings
+            {"$group": {"_id": {"user_id": "$user_id", "activity_code": "$activity_code"}, "count": {"$sum": 1}}},
+            {
+                "$lookup": {
+                    "from": "users",
+                    "let": {"user_id": "$_id.user_id"},
+                    "pipeline": [
+                        {
+                            "$match": {
+                                "$expr": {
+                                    "$eq": [
+                                        "$_id",
+                                        {"$convert": {"input": "$$user_id", "to": "objectId", "onError": None, "onNull": None}}
+                                    ]
+                                }
+                            }
+                        },
+                        {"$project": {"_id": 0, "service_id": 1}}
+                    ],
+                    "as": "user"
+                }
+            },
+            {
+                "$group": {
+                    "_id": {
+                        "service_id": {"$ifNull": [{"$arrayElemAt": ["$user.service_id", 0]}, None]},
+                        "activity_code": "$_id.activity_code"
+                    },
+                    "count": {"$sum": "$count"}
+                }
+            }
+        ]
+
+    pipeline = [{"$facet": facets}]
+    if query_filter:
+        pipeline.insert(0, {"$match": query_filter})
+    return pipeline
+
+
+def format_planning_stats(result: dict, activity_codes, window):
+    """Met en forme le résultat du $facet : tous les codes connus apparaissent, même à 0"""
+    by_activity = {code: 0 for code in activity_codes}
+    for row in result.get("by_activity", []):
+        by_activity[row["_id"]] = row["count"]
+
+    # Toutes les dates de la fenêtre apparaissent, même sans planning
+    by_date = {}
+    current, end = date.fromisoformat(window[0]), date.fromisoformat(window[1])
+    while current <= end:
+        by_date[current.strftime("%Y-%m-%d")] = 0
+        current += timedelta(days=1)
+    for row in result.get("by_date", []):
+        by_date[row["_id"]] = row["count"]
+
+    worked_minutes = {row["_id"]: row["minutes"] for row in result.get("worked_minutes", []) if row["minutes"]}
+
+    total = result.get("total", [])
+    stats = {
+        "total_plannings": total[0]["count"] if total else 0,
+        "by_activity": by_activity,
+        "by_date": by_date,
+        "worked_minutes_by_activity": worked_minutes,
+        "worked_hours": round(sum(worked_minutes.values()) / 60, 2)
+    }
+
+    if "by_service" in result:
+        by_service = {}
+        for row in result["by_service"]:
+            service_id = row["_id"].get("service_id") or "sans_service"
+            service_stats = by_service.setdefault(service_id, {"total": 0, "by_activity": {}})
+            service_stats["total"] += row["count"]
+            activity_code = row["_id"].get("activity_code")
+            service_stats["by_activity"][activity_code] = service_stats["by_activity"].get(activity_code, 0) + row["count"]
+        stats["by_service"] = by_service
+
+    return stats
+
+
+async def get_activity_codes():
+    """Codes d'activité déclarés dans la collection des codes (abréviation, à défaut le nom)"""
+    activity_codes = []
+    async for code in codes.find({}, {"name": 1, "name_abrege": 1}):
+        value = code.get("name_abrege") or code.get("name")
+        if value and value not in activity_codes:
+            activity_codes.append(value)
+    return activity_codes or list(DEFAULT_ACTIVITY_CODES)
+
+
+async def get_planning_stats(start_date=None, end_date=None, service_id=None, by_service=False):
+    """
+    Statistiques des plannings en une agrégation.
+    Sans plage de dates, le total et la répartition par activité portent sur tous les plannings
+    et la répartition par date sur les 7 prochains jours.
+    """
+    query_filter = date_range_filter(start_date, end_date)
+    if service_id:
+        service_users = users.find({"service_id": service_id}, EXISTS_PROJECTION)
+        query_filter["user_id"] = {"$in": [str(user["_id"]) async for user in service_users]}
+
+    window = date_window(start_date, end_date)
+    pipeline = planning_stats_pipeline(query_filter, date_range_filter(*window), by_service)
+
+    results, activity_codes = await asyncio.gather(
+        plannings.aggregate(pipeline).to_list(length=1),
+        get_activity_codes()
+    )
+
+    stats = format_planning_stats(results[0], activity_codes, window)
+    stats["period"] = {"start_date": start_date, "end_date": end_date}
+    return stats
+
+
+# =============================================================================
+# GÉNÉRATION AUTOMATIQUE À PARTIR DES CONTRATS
+# =============================================================================
+
+def plage_minutes(plage_horaire: str) -> int:
+    """Durée d'une plage 'HH:MM-HH:MM' en minutes (0 si la plage n'est pas horaire)"""
+    try:
+        start, end = (to_minutes(part) for part in str(plage_horaire).split("-"))
+    except ValueError:
+        return 0
+    return shift_duration(start, end)
+
+
+def check_generation_options(month: int, backend: str = None, min_staff: dict = None, time_budget: float = 5.0):
+    """Contrôle des paramètres de génération / simulation, avant tout chargement ou écriture (400 sinon)"""
+    if not 1 <= month <= 12:
+        raise HTTPException(status_code=400, detail="Mois invalide. Valeurs autorisées: 1 à 12")
+    if backend:
+        try:
+            check_options(backend, min_staff, time_budget)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+
+def group_generation_inputs(user_ids, validated, absence_docs, existing):
+    """
+    Disponibilités validées, absences et plannings existants rangés par agent.
+    locked : {date: minutes travaillées} ; plusieurs plannings un même jour s'additionnent.
+    """
+    grouped = {user_id: {"availabilities": [], "absences": [], "locked": {}} for user_id in user_ids}
+    for availability in validated:
+        grouped[availability["user_id"]]["availabilities"].append(availability)
+    for absence in absence_docs:
+        grouped[absence["staff_id"]]["absences"].append(absence)
+    for planning in existing:
+        minutes = plage_minutes(planning.get("plage_horaire", "")) if planning.get("activity_code") == WORK_CODE else 0
+        locked = grouped[planning["user_id"]]["locked"]
+        locked[planning["date"]] = locked.get(planning["date"], 0) + minutes
+    return grouped
+
+
+async def load_generation_inputs(service_id: str, days, overwrite: bool = False, contrat_override: dict = None):
+    """
+    Charge en parallèle tout ce dont le générateur a besoin pour un service, en une requête par collection.
+    contrat_override : champs de contrat appliqués à tous les agents (simulation avec contrat personnalisé).
+    Retourne la liste des profils d'agents.
+    """
+    service_users = await users.find(
+        {"service_id": service_id}, {"first_name": 1, "last_name": 1}
+    ).to_list(length=None)
+    user_ids = [str(user["_id"]) for user in service_users]
+    if not user_ids:
+        return []
+
+    start, end = days[0], days[-1]
+    if overwrite:
+        # Les plannings générés précédemment sont remplacés, les plannings saisis sont conservés
+        await plannings.delete_many({"user_id": {"$in": user_ids}, "date": {"$gte": start, "$lte": end}, "generated": True})
+
+    contrats, validated, absence_docs, existing = await asyncio.gather(
+        user_contrat.find({"user_id": {"$in": user_ids}}).to_list(length=None),
+        availabilities.find(
+            {"user_id": {"$in": user_ids}, "date": {"$gte": start, "$lte": end}, "status": "validé"},
+            {"user_id": 1, "date": 1, "start_time": 1, "end_time": 1}
+        ).to_list(length=None),
+        absences.find(
+            {"staff_id": {"$in": user_ids}, "start_date": {"$lte": end}, "end_date": {"$gte": start}},
+            {"staff_id": 1, "start_date": 1, "end_date": 1, "status": 1}
+        ).to_list(length=None),
+        plannings.find(
+            {"user_id": {"$in": user_ids}, "date": {"$gte": start, "$lte": end}},
+            {"user_id": 1, "date": 1, "plage_horaire": 1, "activity_code": 1}
+        ).to_list(length=None)
+    )
+
+    contrat_by_user = {contrat["user_id"]: {**contrat, **(contrat_override or {})} for contrat in contrats}
+    grouped = group_generation_inputs(user_ids, validated, absence_docs, existing)
+
+    return [
+        build_agent_profile(
+            user,
+            contrat_by_user.get(str(user["_id"]), contrat_override),
+            availabilities=grouped[str(user["_id"])]["availabilities"],
+            absences=grouped[str(user["_id"])]["absences"],
+            locked=grouped[str(user["_id"])]["locked"],
+            days=days
+        )
+        for user in service_users
+    ]
+
+
+async def generate_service_planning(
+    service_id: str, year: int, month: int, overwrite: bool = False, dry_run: bool = False,
+    backend: str = None, time_budget: float = 5.0, min_staff: dict = None
+):
+    """
+    Génère le planning d'un mois pour tout un service et l'écrit en une insertion groupée.
+    En dry_run, rien n'est écrit et les plannings générés sont renvoyés (prévisualisation).
+    Avec un backend, le planning glouton est optimisé (effectif minimal, heures du contrat, repos)
+    dans un thread, pour ne pas bloquer la boucle d'événements pendant le budget de temps.
+    """
+    days = month_days(year, month)
+
+    profiles = await load_generation_inputs(service_id, days, overwrite=overwrite and not dry_run)
+    optimization = None
+    if backend and profiles:
+        docs, summary, optimization = await asyncio.get_running_loop().run_in_executor(
+            None, functools.partial(
+                optimize_planning, profiles, days, min_staff, backend=backend, time_budget=time_budget
+            )
+        )
+    else:
+        docs, summary = generate_planning(profiles, days)
+
+    inserted = 0
+    compliance = None
+    if docs and not dry_run:
+        result = await plannings.insert_many(docs, ordered=False)
+        inserted = len(result.inserted_ids)
+        user_ids = [profile["user_id"] for profile in profiles]
+        compliance = await refresh_weeks(user_ids, days[0], days[-1])
+        # Plannings générés remplacés (overwrite) puis insérés : totaux et bitmaps d'occupation du mois recalculés
+        await refresh_hour_totals(user_ids, days[0], days[-1])
+        await refresh_agent_days({user_id: days for user_id in user_ids})
+
+    return {
+        "service_id": service_id,
+        "period": {"start_date": days[0], "end_date": days[-1]},
+        "agents": len(profiles),
+        "generated": len(docs),
+        "inserted": inserted,
+        "summary": summary,
+        "optimization": optimization,
+        "compliance": compliance,
+        "plannings": docs if dry_run else None
+    }
+
+
+# =============================================================================
+# SIMULATION MULTI-SERVICES
+# =============================================================================
+
+async def simulate_services(
+    year: int, month: int, service_ids=None, contrat_override: dict = None, overwrite: bool = False,
+    dry_run: bool = True, backend: str = None, time_budget: float = 5.0, min_staff: dict = None
+):
+    """
+    Simule le planning d'un mois pour plusieurs services (tous par défaut).
+    Les entrées de chaque service sont chargées sur la boucle d'événements, la génération s'exécute
+    dans le pool de processus ; les services sont indépendants et traités en parallèle.
+    Produit des événements de progression au fil des services terminés :
+    start, service (un par service), written (à chaque insertion groupée), done.
+    En dry_run, rien n'est écrit et chaque événement service contient les plannings simulés.
+    """
+    days = month_days(year, month)
+    if service_ids is None:
+        service_ids = [str(service["_id"]) async for service in services.find({}, EXISTS_PROJECTION)]
+
+    yield {"event": "start", "services": len(service_ids), "period": {"start_date": days[0], "end_date": days[-1]}}
+
+    semaphore = asyncio.Semaphore(SIMULATION_LOAD_CONCURRENCY)
+
+    async def run(service_id):
+        try:
+            async with semaphore:
+                profiles = await load_generation_inputs(
+                    service_id, days, overwrite=overwrite and not dry_run, contrat_override=contrat_override
+                )
+            if not profiles:
+                return {"service_id": service_id, "agents": 0, "generated": 0, "plannings": []}
+            return await run_in_process(
+                simulate_service, service_id, profiles, days,
+                backend=backend, time_budget=time_budget, min_staff=min_staff
+            )
+        except Exception as e:
+            return {"service_id": service_id, "error": str(e)}
+
+    tasks = [asyncio.ensure_future(run(service_id)) for service_id in service_ids]
+    pending_docs = []
+    written_users = set()
+    totals = {"agents": 0, "generated": 0, "inserted": 0, "errors": 0}
+    try:
+        for completed, next_result in enumerate(asyncio.as_completed(tasks), start=1):
+            result = await next_result
+            if "error" in result:
+                totals["errors"] += 1
+                yield {"event": "error", "completed": completed, **result}
+                continue
+
+            docs = result.pop("plannings")
+            totals["agents"] += result["agents"]
+            totals["generated"] += result["generated"]
+            if dry_run:
+                result["plannings"] = docs
+            else:
+                pending_docs.extend(docs)
+                written_users.update(doc["user_id"] for doc in docs)
+            yield {"event": "service", "completed": completed, **result}
+
+            if len(pending_docs) >= SIMULATION_BULK_SIZE:
+                inserted = await plannings.insert_many(pending_docs, ordered=False)
+                totals["inserted"] += len(inserted.inserted_ids)
+                pending_docs = []
+                yield {"event": "written", "inserted": totals["inserted"]}
+
+        if pending_docs:
+            inserted = await plannings.insert_many(pending_docs, ordered=False)
+            totals["inserted"] += len(inserted.inserted_ids)
+            yield {"event": "written", "inserted": totals["inserted"]}
+
+        if written_users:
+            # Comme generate_service_planning : conformité hebdomadaire (et ses anomalies) et totaux du mois recalculés
+            await refresh_weeks(sorted(written_users), days[0], days[-1])
+            await refresh_hour_totals(sorted(written_users), days[0], days[-1])
+            await refresh_agent_days({user_id: days for user_id in written_users})
+        yield {"event": "done", "services": len(service_ids), **totals}
+    finally:
+        # Client déconnecté ou erreur : les services restants ne sont pas simulés
+        for task in tasks:
+            task.cancel()
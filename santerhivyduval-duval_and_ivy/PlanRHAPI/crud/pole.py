@@ -6,6 +6,8 @@ from datetime import datetime
 
 from crud.jwt_config import create_token
 from database.database import db, polls
+from utils.bulk_import import bulk_import, cell
+from utils.projection import EXISTS_PROJECTION
 
 def generate_poll_matricule() -> str:
     prefix = "PO"
@@ -16,12 +18,12 @@ def generate_poll_matricule() -> str:
 async def create_poll(poll_info):
     try:
         # Vérifier si le nom du poll existe déjà
-        if polls.find_one({"name": poll_info["name"]}):
+        if await polls.find_one({"name": poll_info["name"]}, EXISTS_PROJECTION):
             raise HTTPException(status_code=400, detail="Un pôle avec ce nom existe déjà")
         
         # Générer le matricule
         matricule = generate_poll_matricule()
-        while polls.find_one({"matricule": matricule}):
+        while await polls.find_one({"matricule": matricule}, EXISTS_PROJECTION):
             matricule = generate_poll_matricule()
         
         # Ajouter les timestamps et le matricule
@@ -35,7 +37,7 @@ async def create_poll(poll_info):
         })
         
         # Insérer le poll
-        db_response = polls.insert_one(poll_info)
+        db_response = await polls.insert_one(poll_info)
         poll_id = db_response.inserted_id
         
         return {
@@ -53,7 +55,7 @@ async def create_poll(poll_info):
 async def delete_poll(poll_id):
     try:
         # Utilisez 'insert_one' sans 'await'
-        db_response = polls.delete_one({"_id": ObjectId(poll_id)})
+        db_response = await polls.delete_one({"_id": ObjectId(poll_id)})
 
         print("pôle supprimé avec succès")
 
@@ -68,14 +70,14 @@ async def update_poll(poll_id: str, poll_data: dict):
         # Ajouter la date de mise à jour
         poll_data["updated_at"] = datetime.now()
         
-        result = polls.update_one(
+        result = await polls.update_one(
             {"_id": ObjectId(poll_id)},
             {"$set": poll_data}
         )
         if result.modified_count == 0:
             raise HTTPException(status_code=404, detail="poll non trouvé")
         
-        updated_poll = polls.find_one({"_id": ObjectId(poll_id)})
+        updated_poll = await polls.find_one({"_id": ObjectId(poll_id)})
         return {
             "message": "pôle mis à jour avec succès",
             "data": {
@@ -85,4 +87,20 @@ async def update_poll(poll_id: str, poll_data: dict):
             }
         }
     except Exception as e:
-        raise HTTPException(status_code=400, detail=f"Erreur lors de la mise à jour: {str(e)}")
\ No newline at end of file
+        raise HTTPException(status_code=400, detail=f"Erreur lors de la mise à jour: {str(e)}")
+
+
+def poll_import_fields(row):
+    return {
+        "name": cell(row.get("name")),
+        "head": cell(row.get("head")) or ""
+    }
+
+
+async def import_polls(rows, mode="insert", progress=None):
+    """
+    Import groupé des lignes d'un fichier (utils.bulk_import) : insert crée les nouveaux noms,
+    upsert crée ou met à jour selon le nom. Retourne le rapport d'import (créés, mis à jour, erreurs par ligne).
+    progress : coroutine optionnelle (lignes traitées, total) appelée après chaque lot (jobs d'import).
+    """
+    return await bulk_import(polls, rows, poll_import_fields, generate_poll_matricule, mode=mode, progress=progress)
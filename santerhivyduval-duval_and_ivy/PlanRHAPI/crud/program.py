@@ -1,21 +1,96 @@
+from datetime import datetime
+
 from fastapi import HTTPException
 
-from database.database import programs
-from utils.program import extract_annual_programs
+from database.database import programs, program_days, users
+from utils.bulk_import import bulk_import, cell
+from utils.program import extract_annual_programs, plain, program_day_rows
+from utils.projection import USER_NAME_PROJECTION
+
+# Programmes relus et éclatés par lot lors de la synchronisation des lignes journalières
+SYNC_BATCH_SIZE = 50
 
 
 async def create_annual_program(program_info):
     try:
         annual_programs = extract_annual_programs(program_info['path'])
         # Insérer les programmes annuels
-        for program in annual_programs:
-            # Insert the entire program dictionary
-            programs.insert_one(program)
+        report = await import_annual_programs(annual_programs)
 
         print("Programme inséré avec succès")
 
-        return {"message": "Programme inséré avec succès", "program": str(annual_programs)}
+        return {"message": "Programme inséré avec succès", "program": report}
 
     except Exception as e:
         print(f"Erreur lors de la création de l'utilisateur : {str(e)}")
-        raise HTTPException(status_code=500, detail=f"Internal Server Error: {str(e)}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Internal Server Error: {str(e)}")
+
+
+def program_import_fields(program):
+    return {"name": cell(program.get("name")), "data": program.get("data", {})}
+
+
+async def import_annual_programs(annual_programs, mode="insert", year=None, progress=None):
+    """
+    Import groupé des programmes annuels extraits d'un fichier (un par feuille agent), identifiés par le nom de l'agent :
+    insert crée les nouveaux agents, upsert remplace aussi la grille des agents déjà importés.
+    Les lignes journalières (program_days) des agents du fichier sont ensuite reconstruites.
+    Retourne le rapport d'import ; le numéro de ligne d'une erreur est le rang de la feuille dans le classeur.
+    """
+    report = await bulk_import(programs, annual_programs, program_import_fields, mode=mode, first_row=1, progress=progress)
+    names = list({cell(program.get("name")) for program in annual_programs} - {None})
+    report["days"] = await sync_program_days({"name": {"$in": names}}, year=year) if names else None
+    return report
+
+
+async def user_ids_by_name():
+    """{nom normalisé: user_id}, dans les deux ordres 'NOM Prénom' et 'Prénom NOM' ; les homonymes ne sont pas liés"""
+    candidates = {}
+    async for user in users.find({}, USER_NAME_PROJECTION):
+        first_name, last_name = user.get("first_name") or "", user.get("last_name") or ""
+        for key in {plain(f"{last_name} {first_name}"), plain(f"{first_name} {last_name}")}:
+            candidates.setdefault(key, set()).add(str(user["_id"]))
+    return {key: user_ids.pop() for key, user_ids in candidates.items() if len(user_ids) == 1}
+
+
+async def write_program_days(batch, linked, year, summary):
+    """Remplace les lignes journalières d'un lot de programmes par celles de leur grille actuelle"""
+    now = datetime.now()
+    rows = []
+    for program in batch:
+        user_id = linked.get(plain(program.get("name") or ""))
+        if user_id is None:
+            summary["unlinked"].append(program.get("name"))
+        rows.extend(
+            {**row, "program_id": str(program["_id"]), "user_id": user_id, "name": program.get("name"), "updated_at": now}
+            for row in program_day_rows(program, year)
+        )
+    await program_days.delete_many({"program_id": {"$in": [str(program["_id"]) for program in batch]}})
+    if rows:
+        await program_days.insert_many(rows, ordered=False)
+    summary["programs"] += len(batch)
+    summary["days"] += len(rows)
+
+
+async def sync_program_days(query_filter=None, year=None, progress=None):
+    """
+    Éclate les grilles des programmes sélectionnés (tous par défaut) en lignes program_days
+    {program_id, user_id, name, date, plan, day_label}, liées à l'utilisateur de même nom.
+    year : année des grilles ; par défaut déduite des jours de la semaine de chaque grille.
+    Retourne {"programs", "days", "unlinked": noms sans utilisateur correspondant}.
+    """
+    query_filter = query_filter or {}
+    linked = await user_ids_by_name()
+    total = await programs.count_documents(query_filter) if progress else None
+    summary = {"programs": 0, "days": 0, "unlinked": []}
+    batch = []
+    async for program in programs.find(query_filter, {"name": 1, "data": 1}):
+        batch.append(program)
+        if len(batch) == SYNC_BATCH_SIZE:
+            await write_program_days(batch, linked, year, summary)
+            batch = []
+            if progress:
+                await progress(summary["programs"], total)
+    if batch:
+        await write_program_days(batch, linked, year, summary)
+    return summary
@@ -0,0 +1,198 @@
+# Recherche de remplaçants pour une absence : collègues du service, de la spécialité ou du pôle,
+# libres sur les créneaux de l'agent absent (bitmaps free_busy) et sous leurs heures de contrat, classés par score
+from datetime import date, timedelta
+
+import numpy as np
+from bson import ObjectId
+
+from crud.compliance import COMPLIANCE_PLANNING_PROJECTION, with_time_fields
+from crud.free_busy import busy_slots, load_free_busy, refresh_free_busy
+from crud.overlap import overlap_filter
+from database.database import absences, asks, hour_totals, plannings, polls, user_contrat, users
+from scheduling.compliance import contract_terms, is_worked, week_label, week_monday
+from scheduling.contracts import period_days
+from scheduling.free_busy import intervals_mask, rank_candidates, rest_mask, weekly_headroom
+from utils.time_fields import time_fields_of
+
+REPLACEMENT_SCOPES = ("service", "speciality", "pole")
+CANDIDATE_USER_PROJECTION = {"first_name": 1, "last_name": 1, "matricule": 1, "service_id": 1, "speciality_id": 1}
+
+
+async def pool_filter(scope: str, service_id, speciality_id) -> dict:
+    """Filtre des collègues : même service, même spécialité, ou spécialités des pôles qui comprennent celle de l'agent"""
+    if scope == "service":
+        if not service_id:
+            raise ValueError("Absence sans service : recherche par service impossible")
+        return {"service_id": service_id}
+    if not speciality_id:
+        raise ValueError("Agent absent sans spécialité : recherche par spécialité ou par pôle impossible")
+    if scope == "speciality":
+        return {"speciality_id": speciality_id}
+    specialities = {speciality_id}
+    async for pole in polls.find({"specialities": speciality_id}, {"specialities": 1}):
+        specialities.update(pole.get("specialities") or [])
+    return {"speciality_id": {"$in": sorted(specialities)}}
+
+
+async def slots_to_replace(absence: dict):
+    """
+    Créneaux travaillés de l'agent absent pendant l'absence, ramenés à l'absence : [(start, end, date du planning)].
+    Sans planning travaillé sur la période, l'absence entière est à remplacer.
+    """
+    planning_docs = await plannings.find(
+        overlap_filter("plannings", absence["staff_id"], absence["start"], absence["end"]), COMPLIANCE_PLANNING_PROJECTION
+    ).to_list(length=None)
+    slots = sorted(
+        (max(planning["start"], absence["start"]), min(planning["end"], absence["end"]), planning["date"])
+        for planning in map(with_time_fields, planning_docs)
+        if is_worked(planning)
+    )
+    return slots
+
+
+def load_by_week(slots, worked: bool) -> dict:
+    """{lundi (YYYY-MM-DD): minutes à remplacer}, dans la semaine du planning ; 0 sur les semaines d'une absence sans planning"""
+    load = {}
+    for start, end, day in slots:
+        if worked:
+            monday = week_monday(day).isoformat()
+            load[monday] = load.get(monday, 0) + int((end - start).total_seconds() // 60)
+        else:
+            for covered in period_days(start.date(), (end - timedelta(minutes=1)).date()):
+                load.setdefault(week_monday(covered).isoformat(), 0)
+    return dict(sorted(load.items()))
+
+
+async def weekly_terms(user_ids, week_starts):
+    """(minutes de contrat (n,), minutes travaillées (n, semaines)) depuis user_contrat et les totaux hebdomadaires"""
+    index = {user_id: position for position, user_id in enumerate(user_ids)}
+    default_minutes = contract_terms(None)[0]
+    contract = np.full(len(user_ids), default_minutes, dtype=np.int64)
+    async for contrat in user_contrat.find({"user_id": {"$in": user_ids}}):
+        if contrat.get("user_id") in index:
+            contract[index[contrat["user_id"]]] = contract_terms(contrat)[0]
+
+    week_index = {week_start: position for position, week_start in enumerate(week_starts)}
+    worked = np.zeros((len(user_ids), len(week_starts)), dtype=np.int64)
+    cursor = hour_totals.find(
+        {"user_id": {"$in": user_ids}, "period": "week", "period_start": {"$in": list(week_starts)}},
+        {"_id": 0, "user_id": 1, "period_start": 1, "worked_minutes": 1}
+    )
+    async for total in cursor:
+        worked[index[total["user_id"]], week_index[total["period_start"]]] = total.get("worked_minutes") or 0
+    return contract, worked
+
+
+async def confirm_free(user_ids, intervals):
+    """Agents sans aucun créneau sur les intervalles, vérifiés sur les collections (bitmaps possiblement en retard)"""
+    slots = await busy_slots(user_ids, min(start for start, end in intervals), max(end for start, end in intervals))
+    return {
+        user_id for user_id in user_ids
+        if not any(start < need_end and end > need_start for start, end in slots.get(user_id, ()) for need_start, need_end in intervals)
+    }
+
+
+async def replacement_candidates(absence_id: str, scope: str = "service", limit: int = 20):
+    """
+    Remplaçants d'une absence classés par score (scheduling/free_busy.rank_candidates).
+    Candidats retenus : collègues du périmètre, libres sur les créneaux à remplacer (plannings, absences, disponibilités,
+    missions) et dont les heures de la semaine, remplacement compris, restent sous le contrat.
+    Les candidats renvoyés sont revérifiés sur les collections ; un bitmap en retard est recalculé.
+    Retourne None si l'absence n'existe pas ; ValueError si le périmètre ne peut pas être déterminé.
+    """
+    if scope not in REPLACEMENT_SCOPES:
+        raise ValueError(f"Périmètre invalide: {scope}. Valeurs possibles: {', '.join(REPLACEMENT_SCOPES)}")
+    absence = await absences.find_one(
+        {"_id": ObjectId(absence_id)} if ObjectId.is_valid(absence_id) else {"_id": None},
+        {"staff_id": 1, "service_id": 1, "start_date": 1, "start_hour": 1, "end_date": 1, "end_hour": 1, "start": 1, "end": 1}
+    )
+    if absence is None:
+        return None
+    if "start" not in absence:
+        absence.update(time_fields_of("absences", absence))
+    if absence.get("start") is None:
+        raise ValueError("Absence sans date de début lisible")
+
+    staff_id = absence.get("staff_id")
+    absent_user = await users.find_one(
+        {"_id": ObjectId(staff_id)} if ObjectId.is_valid(str(staff_id)) else {"_id": None}, {"service_id": 1, "speciality_id": 1}
+    ) or {}
+    service_id = absence.get("service_id") or absent_user.get("service_id")
+    speciality_id = absent_user.get("speciality_id")
+    query_filter = await pool_filter(scope, service_id, speciality_id)
+
+    pool = [user async for user in users.find(query_filter, CANDIDATE_USER_PROJECTION) if str(user["_id"]) != staff_id]
+    user_ids = [str(user["_id"]) for user in pool]
+
+    slots = await slots_to_replace(absence)
+    worked = bool(slots)
+    if not worked:
+        slots = [(absence["start"], absence["end"], str(absence.get("start_date"))[:10])]
+    intervals = [(start, end) for start, end, day in slots]
+    load = load_by_week(slots, worked)
+    result = {
+        "absence": {"id": absence_id, "staff_id": staff_id, "service_id": service_id, "start": absence["start"], "end": absence["end"]},
+        "scope": scope,
+        "slots": [{"date": day, "start": start, "end": end} for start, end, day in slots],
+        "load_minutes": {week_label(date.fromisoformat(monday)): minutes for monday, minutes in load.items()},
+        "pool": len(user_ids),
+        "eligible": 0,
+        "computed_bitmaps": 0,
+        "candidates": []
+    }
+    if not user_ids:
+        return result
+
+    # Jours des créneaux, veille et lendemain compris (repos quotidien autour des créneaux)
+    first_day = min(start for start, end in intervals).date() - timedelta(days=1)
+    last_day = (max(end for start, end in intervals) - timedelta(minutes=1)).date() + timedelta(days=1)
+    days = period_days(first_day, last_day)
+    bitmaps, computed = await load_free_busy(user_ids, days)
+    contract, worked_minutes = await weekly_terms(user_ids, list(load))
+    remaining = weekly_headroom(contract, worked_minutes, list(load.values()))
+    affinity = np.array([
+        0.5 * (user.get("service_id") == service_id) + 0.5 * bool(speciality_id and user.get("speciality_id") == speciality_id)
+        for user in pool
+    ])
+    _, rest_busy, score, order = rank_candidates(
+        bitmaps, intervals_mask(first_day, len(days), intervals), rest_mask(first_day, len(days), intervals),
+        contract, remaining, affinity
+    )
+
+    selected, stale, position = [], [], 0
+    while len(selected) < limit and position < len(order):
+        chunk = [int(row) for row in order[position:position + limit]]
+        position += limit
+        free = await confirm_free([user_ids[row] for row in chunk], intervals)
+        selected.extend(row for row in chunk if user_ids[row] in free)
+        stale.extend(user_ids[row] for row in chunk if user_ids[row] not in free)
+    selected = selected[:limit]
+    if stale:
+        await refresh_free_busy(stale, days)
+
+    ask_status = {
+        ask["colleague_id"]: ask.get("status")
+        async for ask in asks.find(
+            {"absence_id": absence_id, "colleague_id": {"$in": [user_ids[row] for row in selected]}}, {"colleague_id": 1, "status": 1}
+        )
+    } if selected else {}
+
+    result["eligible"] = len(order) - len(stale)
+    result["computed_bitmaps"] = computed
+    result["candidates"] = [
+        {
+            "user_id": user_ids[row],
+            "first_name": pool[row].get("first_name"),
+            "last_name": pool[row].get("last_name"),
+            "matricule": pool[row].get("matricule"),
+            "service_id": pool[row].get("service_id"),
+            "speciality_id": pool[row].get("speciality_id"),
+            "score": round(float(score[row]), 3),
+            "contract_minutes": int(contract[row]),
+            "remaining_minutes": int(remaining[row]),
+            "rest_busy_minutes": int(rest_busy[row]),
+            "ask_status": ask_status.get(user_ids[row])
+        }
+        for row in selected
+    ]
+    return result
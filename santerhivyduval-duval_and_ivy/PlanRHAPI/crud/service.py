@@ -6,6 +6,7 @@ from datetime import datetime
 
 from crud.jwt_config import create_token
 from database.database import db, services
+from utils.projection import EXISTS_PROJECTION
 
 def generate_service_matricule() -> str:
     prefix = "SERV"
@@ -33,12 +34,12 @@ def generate_service_matricule() -> str:
 async def create_service(service_info):
     try:
         # Vérifier si le nom du service existe déjà
-        if services.find_one({"name": service_info["name"]}):
+        if await services.find_one({"name": service_info["name"]}, EXISTS_PROJECTION):
             raise HTTPException(status_code=400, detail="Un service avec ce nom existe déjà")
         
         # Générer le matricule
         matricule = generate_service_matricule()
-        while services.find_one({"matricule": matricule}):
+        while await services.find_one({"matricule": matricule}, EXISTS_PROJECTION):
             matricule = generate_service_matricule()
         
         # Ajouter les timestamps et le matricule
@@ -50,7 +51,7 @@ async def create_service(service_info):
         })
         
         # Insérer le service
-        db_response = services.insert_one(service_info)
+        db_response = await services.insert_one(service_info)
         service_id = db_response.inserted_id
         
         return {
@@ -71,7 +72,7 @@ async def asign_user_to_service():
 async def delete_service(service_id):
     try:
         # Utilisez 'insert_one' sans 'await'
-        db_response = services.delete_one({"_id": ObjectId(service_id)})
+        db_response = await services.delete_one({"_id": ObjectId(service_id)})
 
         print("Service supprimé avec succès")
 
@@ -86,14 +87,14 @@ async def update_service(service_id: str, service_data: dict):
         # Ajouter la date de mise à jour
         service_data["updated_at"] = datetime.now()
         
-        result = services.update_one(
+        result = await services.update_one(
             {"_id": ObjectId(service_id)},
             {"$set": service_data}
         )
         if result.modified_count == 0:
             raise HTTPException(status_code=404, detail="Service non trouvé")
         
-        updated_service = services.find_one({"_id": ObjectId(service_id)})
+        updated_service = await services.find_one({"_id": ObjectId(service_id)})
         return {
             "message": "Service mis à jour avec succès",
             "data": {
@@ -6,6 +6,8 @@ from datetime import datetime
 
 from crud.jwt_config import create_token
 from database.database import db, speciality
+from utils.bulk_import import bulk_import, cell
+from utils.projection import EXISTS_PROJECTION
 
 def generate_speciality_matricule() -> str:
     prefix = "COM"
@@ -16,12 +18,12 @@ def generate_speciality_matricule() -> str:
 async def create_speciality(speciality_info):
     try:
         # Vérifier si le nom du speciality existe déjà
-        if speciality.find_one({"name": speciality_info["name"]}):
+        if await speciality.find_one({"name": speciality_info["name"]}, EXISTS_PROJECTION):
             raise HTTPException(status_code=400, detail="Un speciality avec ce nom existe déjà")
         
         # Générer le matricule
         matricule = generate_speciality_matricule()
-        while speciality.find_one({"matricule": matricule}):
+        while await speciality.find_one({"matricule": matricule}, EXISTS_PROJECTION):
             matricule = generate_speciality_matricule()
         
         # Ajouter les timestamps et le matricule
@@ -33,7 +35,7 @@ async def create_speciality(speciality_info):
         })
         
         # Insérer le speciality
-        db_response = speciality.insert_one(speciality_info)
+        db_response = await speciality.insert_one(speciality_info)
         speciality_id = db_response.inserted_id
         
         return {
@@ -54,7 +56,7 @@ async def asign_user_to_speciality():
 async def delete_speciality(speciality_id):
     try:
         # Utilisez 'insert_one' sans 'await'
-        db_response = speciality.delete_one({"_id": ObjectId(speciality_id)})
+        db_response = await speciality.delete_one({"_id": ObjectId(speciality_id)})
 
         print("speciality supprimé avec succès")
 
@@ -69,14 +71,14 @@ async def update_speciality(speciality_id: str, speciality_data: dict):
         # Ajouter la date de mise à jour
         speciality_data["updated_at"] = datetime.now()
         
-        result = speciality.update_one(
+        result = await speciality.update_one(
             {"_id": ObjectId(speciality_id)},
             {"$set": speciality_data}
         )
         if result.modified_count == 0:
             raise HTTPException(status_code=404, detail="speciality non trouvé")
         
-        updated_speciality = speciality.find_one({"_id": ObjectId(speciality_id)})
+        updated_speciality = await speciality.find_one({"_id": ObjectId(speciality_id)})
         return {
             "message": "speciality mis à jour avec succès",
             "data": {
@@ -86,4 +88,19 @@ async def update_speciality(speciality_id: str, speciality_data: dict):
             }
         }
     except Exception as e:
-        raise HTTPException(status_code=400, detail=f"Erreur lors de la mise à jour: {str(e)}")
\ No newline at end of file
+        raise HTTPException(status_code=400, detail=f"Erreur lors de la mise à jour: {str(e)}")
+
+
+def speciality_import_fields(row):
+    return {
+        "name": cell(row.get("name"))
+    }
+
+
+async def import_specialities(rows, mode="insert", progress=None):
+    """
+    Import groupé des lignes d'un fichier (utils.bulk_import) : insert crée les nouveaux noms,
+    upsert crée ou met à jour selon le nom. Retourne le rapport d'import (créés, mis à jour, erreurs par ligne).
+    progress : coroutine optionnelle (lignes traitées, total) appelée après chaque lot (jobs d'import).
+    """
+    return await bulk_import(speciality, rows, speciality_import_fields, generate_speciality_matricule, mode=mode, progress=progress)
@@ -6,15 +6,16 @@ from datetime import datetime
 
 from crud.jwt_config import create_token
 from database.database import db, users
+from utils.projection import EXISTS_PROJECTION
 
 
-def get_user_by_email(email: str):
-    user = users.find_one({"email": email})
+async def get_user_by_email(email: str, projection=None):
+    user = await users.find_one({"email": email}, projection)
     print(f"User found by email: {user}")
     return user
 
-def get_user_by_matricule(matricule: str):
-    user = users.find_one({"matricule": matricule})
+async def get_user_by_matricule(matricule: str, projection=None):
+    user = await users.find_one({"matricule": matricule}, projection)
     print(f"User found by matricule: {user}")
     return user
 
@@ -30,11 +31,11 @@ def generate_matricule(role: str) -> str:
 
 async def create_user(user_info: dict):
     try:
-        if users.find_one({"email": user_info["email"]}):
+        if await users.find_one({"email": user_info["email"]}, EXISTS_PROJECTION):
             raise HTTPException(status_code=400, detail="Email already exists")
         
         matricule = generate_matricule(user_info["role"])
-        while users.find_one({"matricule": matricule}):
+        while await users.find_one({"matricule": matricule}, EXISTS_PROJECTION):
             matricule = generate_matricule(user_info["role"])
         
         now = datetime.now()
@@ -44,7 +45,7 @@ async def create_user(user_info: dict):
             "updated_at": now
         })
         
-        db_response = users.insert_one(user_info)
+        db_response = await users.insert_one(user_info)
         user_id = db_response.inserted_id
         token = create_token(str(user_id))
         
@@ -61,7 +62,7 @@ async def create_user(user_info: dict):
 
 async def delete_user(user_id: str):
     try:
-        db_response = users.delete_one({"_id": ObjectId(user_id)})
+        db_response = await users.delete_one({"_id": ObjectId(user_id)})
         if db_response.deleted_count == 0:
             raise HTTPException(status_code=404, detail="Utilisateur introuvable")
         return {"message": "Utilisateur supprimé avec succès", "user_id": str(user_id)}
@@ -1,8 +1,110 @@
-from pymongo import MongoClient
+import os
+from motor.motor_asyncio import AsyncIOMotorClient
 
-client = MongoClient('localhost', 27017)
-db = client['planRhIA']
+from database.pool_metrics import PoolMetrics
+
+# Configuration de la base de données
+MONGO_URI = os.getenv('MONGO_URI', 'mongodb://localhost:27017/')
+DATABASE_NAME = os.getenv('DATABASE_NAME', 'planRhIA')
+
+# Dimensionnement du pool de connexions (par processus worker)
+MONGO_MAX_POOL_SIZE = int(os.getenv('MONGO_MAX_POOL_SIZE', '100'))
+MONGO_MIN_POOL_SIZE = int(os.getenv('MONGO_MIN_POOL_SIZE', '0'))
+MONGO_WAIT_QUEUE_TIMEOUT_MS = int(os.getenv('MONGO_WAIT_QUEUE_TIMEOUT_MS', '0'))  # 0 = pas de limite
+# Compression réseau, par ordre de préférence : "zstd,snappy,zlib"
+MONGO_COMPRESSORS = os.getenv('MONGO_COMPRESSORS', '')
+
+pool_metrics = PoolMetrics()
+
+_client = None
+_database = None
+
+
+def client_settings() -> dict:
+    """Options passées au client MongoDB"""
+    settings = {
+        "maxPoolSize": MONGO_MAX_POOL_SIZE,
+        "minPoolSize": MONGO_MIN_POOL_SIZE,
+    }
+    if MONGO_WAIT_QUEUE_TIMEOUT_MS > 0:
+        settings["waitQueueTimeoutMS"] = MONGO_WAIT_QUEUE_TIMEOUT_MS
+    compressors = [c.strip() for c in MONGO_COMPRESSORS.split(",") if c.strip()]
+    if compressors:
+        settings["compressors"] = compressors
+    return settings
+
+
+def connect_client() -> AsyncIOMotorClient:
+    """Crée le client partagé (appelé au démarrage de l'application)"""
+    global _client, _database
+    if _client is None:
+        _client = AsyncIOMotorClient(MONGO_URI, event_listeners=[pool_metrics], **client_settings())
+        _database = _client[DATABASE_NAME]
+    return _client
+
+
+def close_client():
+    """Ferme le client partagé (appelé à l'arrêt de l'application)"""
+    global _client, _database
+    if _client is not None:
+        _client.close()
+    _client = None
+    _database = None
+
+
+def get_client() -> AsyncIOMotorClient:
+    return connect_client()
+
+
+def get_database():
+    connect_client()
+    return _database
+
+
+class LazyCollection:
+    """
+    Référence vers une collection, résolue sur le client partagé au moment de l'appel.
+    Permet aux modules d'importer leurs collections avant la création du client.
+    """
+
+    def __init__(self, name: str):
+        self._name = name
+        self._bound = (None, None)
+
+    @property
+    def name(self):
+        return self._name
+
+    def resolve(self):
+        """Retourne la collection Motor du client courant (mise en cache tant que le client ne change pas)"""
+        database = get_database()
+        bound_database, collection = self._bound
+        if bound_database is not database:
+            collection = database[self._name]
+            self._bound = (database, collection)
+        return collection
+
+    def __getattr__(self, item):
+        return getattr(self.resolve(), item)
+
+    def __repr__(self):
+        return f"LazyCollection({self._name!r})"
+
+
+class LazyDatabase:
+    """Référence vers la base de données du client partagé"""
+
+    def __getitem__(self, name: str) -> LazyCollection:
+        return LazyCollection(name)
+
+    def __getattr__(self, item):
+        return getattr(get_database(), item)
+
+
+db = LazyDatabase()
 programs = db['annual_programs']
+# Grilles des programmes annuels éclatées en une ligne par agent et par jour (crud/program.sync_program_days)
+program_days = db["program_days"]
 users = db["users"]
 services = db["services"]
 absences = db["absences"]
@@ -14,3 +116,14 @@ polls = db["polls"]
 user_contrat = db["user_contrat"]
 missions = db["missions"]
 comments = db["comments"]
+plannings = db["plannings"]
+availabilities = db["availabilities"]
+jobs = db["jobs"]
+# Bilans de conformité par agent et par semaine ISO (crud/compliance)
+weekly_compliance = db["weekly_compliance"]
+# Heures travaillées par agent, par semaine et par mois, tenues à jour à l'écriture (crud/hour_totals)
+hour_totals = db["hour_totals"]
+# Occupation à la minute par agent et par jour, pour la recherche de remplaçants (crud/free_busy)
+free_busy = db["free_busy"]
+# Position de lecture des flux de modifications (jobs/detection_stream), pour reprendre après un arrêt
+stream_checkpoints = db["stream_checkpoints"]
@@ -0,0 +1,237 @@
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from pymongo.errors import OperationFailure
+
+# =============================================================================
+# REGISTRE DES INDEX
+# Chaque entrée couvre une requête fréquente des routers. Les index composés
+# rendent inutiles les index simples sur leur premier champ.
+# =============================================================================
+
+INDEXES = {
+    "users": [
+        [("matricule", ASCENDING)],
+        [("email", ASCENDING)],
+        [("role", ASCENDING)],
+        [("service_id", ASCENDING)],
+        # Remplaçants d'une spécialité ou d'un pôle
+        [("speciality_id", ASCENDING)],
+    ],
+    "absences": [
+        # Absences d'un agent ou d'un service qui chevauchent une période (vues calendrier)
+        [("staff_id", ASCENDING), ("start_date", ASCENDING)],
+        [("service_id", ASCENDING), ("start_date", ASCENDING)],
+        [("start_date", ASCENDING), ("end_date", ASCENDING)],
+        [("service_id", ASCENDING), ("status", ASCENDING)],
+        [("status", ASCENDING)],
+        [("matricule", ASCENDING)],
+        # absence_unjustified : absences en attente commencées sur la période
+        [("status", ASCENDING), ("start_date", ASCENDING)],
+        # Chevauchement (crud/overlap) : absences de l'agent qui finissent après le début du créneau
+        [("staff_id", ASCENDING), ("end", ASCENDING), ("start", ASCENDING)],
+    ],
+    "plannings": [
+        [("user_id", ASCENDING), ("date", ASCENDING)],
+        [("date", ASCENDING), ("activity_code", ASCENDING)],
+        [("date", ASCENDING), ("plage_horaire", ASCENDING)],
+        [("activity_code", ASCENDING), ("date", ASCENDING)],
+        [("user_id", ASCENDING), ("date", ASCENDING), ("plage_horaire", ASCENDING)],
+        # Pagination par curseur sur (date, _id)
+        [("date", ASCENDING), ("_id", ASCENDING)],
+        # Chevauchement (crud/overlap) : créneaux de l'agent sur une fenêtre de start bornée par la durée maximale
+        [("user_id", ASCENDING), ("start", ASCENDING), ("end", ASCENDING)],
+    ],
+    "availabilities": [
+        [("user_id", ASCENDING), ("date", ASCENDING)],
+        [("date", ASCENDING), ("status", ASCENDING)],
+        # Pagination par curseur de la vue équipe : filtre status, tri (date, _id)
+        [("status", ASCENDING), ("date", ASCENDING), ("_id", ASCENDING)],
+        [("date", ASCENDING), ("_id", ASCENDING)],
+        [("user_id", ASCENDING), ("start", ASCENDING), ("end", ASCENDING)],
+    ],
+    "alerts": [
+        [("user_id", ASCENDING), ("created_at", DESCENDING)],
+        # Une alerte par détection : (agent ou service, règle, période), index uniques partiels (DETECTION_KEYS)
+        [("user_id", ASCENDING), ("metadata.rule_id", ASCENDING), ("metadata.date", ASCENDING)],
+        [("service_id", ASCENDING), ("metadata.rule_id", ASCENDING), ("metadata.date", ASCENDING)],
+        [("service_id", ASCENDING), ("created_at", DESCENDING)],
+        [("created_at", DESCENDING)],
+    ],
+    "anomalies": [
+        [("user_id", ASCENDING), ("created_at", DESCENDING)],
+        # Déduplication des détections : (agent ou service, règle, période), index uniques partiels (DETECTION_KEYS)
+        [("user_id", ASCENDING), ("metadata.rule_id", ASCENDING), ("metadata.date", ASCENDING)],
+        [("service_id", ASCENDING), ("metadata.rule_id", ASCENDING), ("metadata.date", ASCENDING)],
+        # Suppression d'un planning ou d'une absence sans image antérieure : anomalies qui le citent
+        [("metadata.planning_ids", ASCENDING)],
+        [("metadata.availability_ids", ASCENDING)],
+        [("metadata.absence_id", ASCENDING)],
+        [("service_id", ASCENDING), ("created_at", DESCENDING)],
+        [("created_at", DESCENDING)],
+    ],
+    "events": [
+        [("user_id", ASCENDING), ("due_date", ASCENDING)],
+        [("service_id", ASCENDING), ("due_date", ASCENDING)],
+        [("due_date", ASCENDING)],
+        [("created_at", DESCENDING)],
+    ],
+    "notifications": [
+        [("user_id", ASCENDING), ("created_at", DESCENDING)],
+        [("user_id", ASCENDING), ("read", ASCENDING)],
+    ],
+    "code": [
+        [("name", ASCENDING)],
+        [("matricule", ASCENDING)],
+    ],
+    "polls": [
+        [("name", ASCENDING)],
+        [("matricule", ASCENDING)],
+    ],
+    "speciality": [
+        [("name", ASCENDING)],
+        [("matricule", ASCENDING)],
+    ],
+    "services": [
+        [("name", ASCENDING)],
+        [("matricule", ASCENDING)],
+    ],
+    "user_contrat": [
+        [("user_id", ASCENDING)],
+    ],
+    "asks": [
+        # Demandes d'une absence, et demandes déjà envoyées à des collègues pour cette absence
+        [("absence_id", ASCENDING), ("colleague_id", ASCENDING)],
+        [("colleague_id", ASCENDING)],
+    ],
+    "annual_programs": [
+        [("name", ASCENDING)],
+    ],
+    "program_days": [
+        # Qui est sur le code X le jour D ; jours d'un code, paginés sur (date, _id)
+        [("date", ASCENDING), ("plan", ASCENDING)],
+        [("plan", ASCENDING), ("date", ASCENDING), ("_id", ASCENDING)],
+        [("user_id", ASCENDING), ("date", ASCENDING), ("_id", ASCENDING)],
+        [("date", ASCENDING), ("_id", ASCENDING)],
+        # Remplacement des lignes d'un programme réimporté
+        [("program_id", ASCENDING)],
+    ],
+    "missions": [
+        # Chevauchement (crud/overlap), missions de durée non bornée : comme les absences
+        [("user_id", ASCENDING), ("end", ASCENDING), ("start", ASCENDING)],
+    ],
+    "weekly_compliance": [
+        # Bilan d'une semaine d'un agent (mise à jour incrémentale), semaines d'un agent ou d'une période
+        [("user_id", ASCENDING), ("week_start", ASCENDING)],
+        [("week_start", ASCENDING), ("_id", ASCENDING)],
+        [("violations", ASCENDING), ("week_start", ASCENDING)],
+    ],
+    "hour_totals": [
+        # Total d'un agent pour une semaine ou un mois : lecture et $inc sur un seul document
+        [("user_id", ASCENDING), ("period", ASCENDING), ("period_start", ASCENDING)],
+    ],
+    "free_busy": [
+        # Bitmap d'un agent pour un jour : lecture des jours d'une recherche, remplacement par upsert
+        [("user_id", ASCENDING), ("day", ASCENDING)],
+    ],
+    "jobs": [
+        # Prise en charge par les workers : plus ancien job en attente
+        [("status", ASCENDING), ("created_at", ASCENDING)],
+        # Liste paginée sur _id, filtrée par statut ou par type
+        [("status", ASCENDING), ("_id", ASCENDING)],
+        [("type", ASCENDING), ("_id", ASCENDING)],
+    ],
+}
+
+# Clés de déduplication des anomalies et alertes détectées (crud/anomaly), écrites par upsert depuis plusieurs processus
+# (flux de modifications, job de détection, recalcul de conformité) : uniques sur les seuls documents d'une règle.
+# Une détection d'agent peut porter aussi le service_id : la clé de service est réservée aux règles d'effectif.
+DETECTION_KEYS = {
+    "user_id_1_metadata.rule_id_1_metadata.date_1": {"user_id": {"$exists": True}, "metadata.rule_id": {"$exists": True}},
+    "service_id_1_metadata.rule_id_1_metadata.date_1": {"metadata.rule_id": "understaffing"},
+}
+
+# Index partiels (collection, nom) : filtre des documents indexés
+PARTIAL_INDEXES = {
+    (collection_name, name): partial_filter
+    for collection_name in ("anomalies", "alerts")
+    for name, partial_filter in DETECTION_KEYS.items()
+}
+
+# Index uniques (collection, nom) : documents mis à jour par upsert concurrents, un seul document par clé
+UNIQUE_INDEXES = {
+    ("hour_totals", "user_id_1_period_1_period_start_1"),
+    ("free_busy", "user_id_1_day_1"),
+    *PARTIAL_INDEXES,
+}
+# Index existant dont la définition diffère (index devenu unique ou partiel) : supprimé puis recréé
+INDEX_OPTIONS_CONFLICTS = (85, 86)
+
+
+def index_name(keys) -> str:
+    """Nom par défaut attribué par MongoDB (ex. user_id_1_date_1)"""
+    return "_".join(f"{field}_{direction}" for field, direction in keys)
+
+
+def index_models(collection_name: str):
+    models = []
+    for keys in INDEXES.get(collection_name, []):
+        key = (collection_name, index_name(keys))
+        options = {"unique": True} if key in UNIQUE_INDEXES else {}
+        if key in PARTIAL_INDEXES:
+            options["partialFilterExpression"] = PARTIAL_INDEXES[key]
+        models.append(IndexModel(keys, name=index_name(keys), **options))
+    return models
+
+
+async def create_collection_indexes(collection, models):
+    """
+    Crée les index d'une collection en une commande. Si un index de même nom existe avec d'autres options,
+    les index sont repris un par un et l'index en conflit est supprimé puis recréé.
+    """
+    try:
+        return await collection.create_indexes(models)
+    except OperationFailure as e:
+        if e.code not in INDEX_OPTIONS_CONFLICTS:
+            raise
+    names = []
+    for model in models:
+        try:
+            names += await collection.create_indexes([model])
+        except OperationFailure as e:
+            if e.code not in INDEX_OPTIONS_CONFLICTS:
+                raise
+            await collection.drop_index(model.document["name"])
+            names += await collection.create_indexes([model])
+    return names
+
+
+async def ensure_indexes(database):
+    """
+    Crée les index déclarés. Idempotent : un index déjà présent avec la même définition est ignoré,
+    un index présent dont la définition a changé (unique, partiel) est recréé.
+    Retourne {collection: [noms créés ou confirmés]} et les erreurs éventuelles par collection.
+    """
+    created, errors = {}, {}
+    for collection_name in INDEXES:
+        try:
+            created[collection_name] = await create_collection_indexes(database[collection_name], index_models(collection_name))
+        except OperationFailure as e:
+            errors[collection_name] = str(e)
+    return created, errors
+
+
+async def index_drift(database):
+    """
+    Compare les index déclarés aux index présents en base.
+    missing : déclarés mais absents ; extra : présents mais non déclarés (hors _id_).
+    """
+    drift = {}
+    for collection_name, declared in INDEXES.items():
+        live = await database[collection_name].index_information()
+        declared_names = {index_name(keys) for keys in declared}
+        live_names = set(live) - {"_id_"}
+
+        missing = sorted(declared_names - live_names)
+        extra = sorted(live_names - declared_names)
+        if missing or extra:
+            drift[collection_name] = {"missing": missing, "extra": extra}
+    return drift
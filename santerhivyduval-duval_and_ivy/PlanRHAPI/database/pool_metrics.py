@@ -0,0 +1,93 @@
+import threading
+import time
+from pymongo import monitoring
+
+
+class PoolMetrics(monitoring.ConnectionPoolListener):
+    """
+    Collecte les métriques du pool de connexions MongoDB (checkouts, attentes, échecs)
+    afin de dimensionner maxPoolSize / minPoolSize sous charge.
+    Les évènements sont émis depuis les threads du driver : l'accès est protégé par un verrou.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # Jauges : état courant du pool, jamais remis à zéro
+        self.open_connections = 0
+        self.checked_out = 0
+        self.reset()
+
+    def reset(self):
+        """Remet à zéro les compteurs cumulés (les jauges sont conservées)"""
+        with self._lock:
+            self.started_at = time.time()
+            self.max_checked_out = self.checked_out
+            self.checkouts_total = 0
+            self.checkouts_failed = {}
+            self.wait_time_total_ms = 0.0
+            self.wait_time_max_ms = 0.0
+            self.pools_cleared = 0
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "since": self.started_at,
+                "open_connections": self.open_connections,
+                "checked_out": self.checked_out,
+                "max_checked_out": self.max_checked_out,
+                "checkouts_total": self.checkouts_total,
+                "checkouts_failed": dict(self.checkouts_failed),
+                "checkout_wait_avg_ms": (
+                    round(self.wait_time_total_ms / self.checkouts_total, 3) if self.checkouts_total else 0.0
+                ),
+                "checkout_wait_max_ms": round(self.wait_time_max_ms, 3),
+                "pools_cleared": self.pools_cleared
+            }
+
+    # Évènements du pool
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        with self._lock:
+            self.pools_cleared += 1
+
+    def pool_closed(self, event):
+        pass
+
+    # Évènements des connexions
+    def connection_created(self, event):
+        with self._lock:
+            self.open_connections += 1
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        with self._lock:
+            self.open_connections = max(0, self.open_connections - 1)
+
+    def connection_check_out_started(self, event):
+        pass
+
+    def connection_check_out_failed(self, event):
+        with self._lock:
+            reason = str(event.reason)
+            self.checkouts_failed[reason] = self.checkouts_failed.get(reason, 0) + 1
+
+    def connection_checked_out(self, event):
+        # duration (secondes) : temps d'attente dans la file du pool, disponible depuis pymongo 4.7
+        wait_ms = (getattr(event, "duration", 0.0) or 0.0) * 1000
+        with self._lock:
+            self.checked_out += 1
+            self.checkouts_total += 1
+            self.max_checked_out = max(self.max_checked_out, self.checked_out)
+            self.wait_time_total_ms += wait_ms
+            self.wait_time_max_ms = max(self.wait_time_max_ms, wait_ms)
+
+    def connection_checked_in(self, event):
+        with self._lock:
+            self.checked_out = max(0, self.checked_out - 1)
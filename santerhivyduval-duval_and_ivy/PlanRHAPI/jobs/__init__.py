@@ -0,0 +1,4 @@
+# Jobs en arrière-plan (simulations, imports Excel, balayages de détection) suivis dans la collection jobs
+from jobs.handlers import HANDLERS, PARAMS_SCHEMAS, UPLOAD_JOB_TYPES
+from jobs.runner import JobCancelled, enqueue, enqueue_upload, start_workers, stop_workers
+from jobs.detection_stream import DETECTION_STREAM, start_detection_stream, stop_detection_stream
@@ -0,0 +1,160 @@
+# Détection continue : flux de modifications MongoDB (change streams) sur plannings, absences et disponibilités.
+# Chaque modification désigne les règles et périodes à réévaluer (crud/detection.DetectionScopes) ;
+# les anomalies et alertes sont dédoublonnées par (règle, agent ou service, période).
+# Un seul consommateur : lancé seul (python -m jobs.detection_stream), ou par l'application avec DETECTION_STREAM=1
+# sur un unique processus uvicorn ; chaque worker de l'API lancerait sinon son propre consommateur.
+# Les change streams nécessitent un replica set : un nœud unique suffit (mongod --replSet rs0, puis rs.initiate()).
+import asyncio
+import os
+from datetime import datetime, timedelta
+
+from pymongo.errors import OperationFailure, PyMongoError
+
+from crud.anomaly import save_anomalies
+from crud.detection import DetectionScopes, detect_unjustified_absences, evaluate_scopes
+from database.database import get_database, stream_checkpoints
+
+DETECTION_STREAM = os.getenv('DETECTION_STREAM', "0") == "1"
+WATCHED_COLLECTIONS = ("plannings", "absences", "availabilities")
+# Modifications regroupées avant évaluation : une écriture groupée (simulation, import) donne une réévaluation par périmètre
+DETECTION_BATCH_SECONDS = float(os.getenv('DETECTION_BATCH_SECONDS', "2"))
+DETECTION_BATCH_CHANGES = int(os.getenv('DETECTION_BATCH_CHANGES', "5000"))
+# Règles liées au temps qui passe, sans modification à observer (absence_unjustified : délai de 48h écoulé)
+DETECTION_TICK_SECONDS = float(os.getenv('DETECTION_TICK_SECONDS', "900"))
+DETECTION_TICK_LOOKBACK_DAYS = 7
+DETECTION_RETRY_SECONDS = 10
+CHECKPOINT_ID = "detection"
+
+# Codes d'erreur MongoDB : serveur sans replica set, position de reprise sortie de l'oplog
+CHANGE_STREAM_UNSUPPORTED = 40573
+CHANGE_STREAM_HISTORY_LOST = 286
+
+_tasks = []
+
+
+async def enable_pre_images(database) -> bool:
+    """
+    Active l'image antérieure des documents (MongoDB 6+) : une suppression indique alors l'agent et le jour concernés.
+    Sans elle, les périmètres d'une suppression sont retrouvés par les anomalies qui citent le document.
+    """
+    try:
+        for collection_name in WATCHED_COLLECTIONS:
+            await database.command({"collMod": collection_name, "changeStreamPreAndPostImages": {"enabled": True}})
+        return True
+    except OperationFailure:
+        return False
+
+
+async def add_change(scopes: DetectionScopes, change: dict):
+    """Ajoute les périmètres d'une modification : versions avant et après du document"""
+    collection_name = change["ns"]["coll"]
+    scopes.changes += 1
+    for image in ("fullDocumentBeforeChange", "fullDocument"):
+        if change.get(image):
+            scopes.add(collection_name, change[image])
+    if change["operationType"] == "delete" and not change.get("fullDocumentBeforeChange"):
+        await scopes.add_deleted(collection_name, change["documentKey"]["_id"])
+
+
+async def save_checkpoint(token, report=None):
+    update = {"token": token, "updated_at": datetime.now()}
+    if report is not None:
+        update["last_report"] = report
+    await stream_checkpoints.update_one({"_id": CHECKPOINT_ID}, {"$set": update}, upsert=True)
+
+
+async def consume_changes(database):
+    """
+    Lit le flux depuis la dernière position enregistrée. Les modifications sont accumulées jusqu'à un temps calme
+    (ou DETECTION_BATCH_SECONDS / DETECTION_BATCH_CHANGES), évaluées, puis la position est enregistrée :
+    après un arrêt, les modifications non évaluées sont relues (les détections sont idempotentes).
+    """
+    checkpoint = await stream_checkpoints.find_one({"_id": CHECKPOINT_ID})
+    options = {"full_document": "updateLookup"}
+    if await enable_pre_images(database):
+        options["full_document_before_change"] = "whenAvailable"
+    if checkpoint and checkpoint.get("token"):
+        options["resume_after"] = checkpoint["token"]
+    pipeline = [{"$match": {
+        "ns.coll": {"$in": list(WATCHED_COLLECTIONS)},
+        "operationType": {"$in": ["insert", "update", "replace", "delete"]}
+    }}]
+
+    loop = asyncio.get_running_loop()
+    async with database.watch(pipeline, max_await_time_ms=int(DETECTION_BATCH_SECONDS * 1000), **options) as stream:
+        print(f"🚀 Détection continue démarrée (collections: {', '.join(WATCHED_COLLECTIONS)})")
+        scopes, batch_started = DetectionScopes(), None
+        while stream.alive:
+            change = await stream.try_next()
+            if change is not None:
+                await add_change(scopes, change)
+                batch_started = batch_started or loop.time()
+            due = change is None or loop.time() - batch_started >= DETECTION_BATCH_SECONDS or scopes.changes >= DETECTION_BATCH_CHANGES
+            if scopes.changes and due:
+                report = await evaluate_scopes(scopes) if scopes else {"changes": scopes.changes}
+                await save_checkpoint(stream.resume_token, report)
+                scopes, batch_started = DetectionScopes(), None
+
+
+async def stream_loop():
+    database = get_database()
+    while True:
+        try:
+            await consume_changes(database)
+        except asyncio.CancelledError:
+            raise
+        except OperationFailure as e:
+            if e.code == CHANGE_STREAM_UNSUPPORTED:
+                print("⚠️ Détection continue indisponible : MongoDB ne tourne pas en replica set (balayages /jobs seulement)")
+                return
+            if e.code == CHANGE_STREAM_HISTORY_LOST:
+                # Arrêt trop long : les modifications manquées relèvent d'un balayage (job detection / compliance)
+                print("⚠️ Position du flux perdue : reprise sur les modifications à venir, lancer un balayage de détection")
+                await stream_checkpoints.delete_one({"_id": CHECKPOINT_ID})
+                continue
+            print(f"❌ Détection continue : {e}")
+        except PyMongoError as e:
+            print(f"❌ Détection continue : {e}")
+        await asyncio.sleep(DETECTION_RETRY_SECONDS)
+
+
+async def tick_loop():
+    """absence_unjustified sur les absences récentes : le délai de 48h s'écoule sans modification à observer"""
+    while True:
+        try:
+            start_date = (datetime.now() - timedelta(days=DETECTION_TICK_LOOKBACK_DAYS)).date().isoformat()
+            await save_anomalies(await detect_unjustified_absences(start_date=start_date))
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"❌ Vérification des absences non justifiées impossible: {e}")
+        await asyncio.sleep(DETECTION_TICK_SECONDS)
+
+
+def start_detection_stream():
+    """Démarre le flux de détection et la vérification périodique dans la boucle d'événements courante"""
+    _tasks.append(asyncio.ensure_future(stream_loop()))
+    _tasks.append(asyncio.ensure_future(tick_loop()))
+
+
+async def stop_detection_stream():
+    for task in _tasks:
+        task.cancel()
+    await asyncio.gather(*_tasks, return_exceptions=True)
+    _tasks.clear()
+
+
+async def main():
+    from database.database import connect_client, close_client
+
+    connect_client()
+    start_detection_stream()
+    try:
+        await asyncio.gather(*_tasks)
+    finally:
+        await stop_detection_stream()
+        close_client()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
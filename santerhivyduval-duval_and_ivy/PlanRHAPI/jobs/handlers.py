@@ -0,0 +1,144 @@
+# Traitements exécutables en arrière-plan, par type de job
+from crud.code import import_codes
+from crud.compliance import sweep_compliance
+from crud.detection import run_detection_sweep
+from crud.free_busy import sweep_free_busy
+from crud.hour_totals import sweep_hour_totals
+from crud.planning import simulate_services
+from crud.pole import import_polls
+from crud.program import import_annual_programs, sync_program_days
+from crud.speciality import import_specialities
+from schemas.job import ComplianceRefresh, DetectionSweep, FreeBusyRebuild, HourTotalsRebuild, ProgramDaysSync
+from schemas.planning import PlanningSimulation
+from utils.excel_utils import read_excel_rows
+from utils.program import extract_annual_programs_from_bytes
+from utils.workers import run_in_process
+
+# {type de job: coroutine(context) -> résultat enregistré dans le job}
+HANDLERS = {}
+# Schéma de validation des paramètres, pour les jobs créés par POST /jobs
+PARAMS_SCHEMAS = {}
+# Jobs qui traitent un fichier envoyé (payload) et ne peuvent être créés que par leur endpoint d'upload
+UPLOAD_JOB_TYPES = set()
+# Au-delà, les détections ne sont pas recopiées dans le résultat du job (taille d'un document MongoDB)
+MAX_STORED_FINDINGS = 1000
+
+
+def job_handler(job_type: str, params_schema=None, upload: bool = False):
+    def register(handler):
+        HANDLERS[job_type] = handler
+        if params_schema:
+            PARAMS_SCHEMAS[job_type] = params_schema
+        if upload:
+            UPLOAD_JOB_TYPES.add(job_type)
+        return handler
+    return register
+
+
+@job_handler("simulation", PlanningSimulation)
+async def run_simulation(context):
+    """Simulation multi-services ; le résultat garde le bilan de chaque service, sans les plannings"""
+    params = context.params
+    services = []
+    result = {}
+    total = None
+    async for event in simulate_services(
+        params["year"], params["month"],
+        service_ids=params.get("service_ids"),
+        contrat_override=params.get("contrat"),
+        overwrite=params.get("overwrite", False),
+        dry_run=params.get("dry_run", True),
+        backend=params.get("backend"),
+        time_budget=params.get("time_budget", 5.0),
+        min_staff=params.get("min_staff")
+    ):
+        if event["event"] == "start":
+            total = event["services"]
+            await context.progress(0, total)
+        elif event["event"] in ("service", "error"):
+            event.pop("plannings", None)
+            services.append(event)
+            await context.progress(event["completed"], total, event["service_id"])
+        elif event["event"] == "done":
+            result = event
+    result.pop("event", None)
+    return {**result, "by_service": services}
+
+
+@job_handler("detection", DetectionSweep)
+async def run_detection(context):
+    params = context.params
+    report = await run_detection_sweep(
+        rules=params.get("rules"),
+        start_date=params.get("start_date"),
+        end_date=params.get("end_date"),
+        create_anomalies=params.get("create_anomalies", False),
+        progress=context.progress
+    )
+    report["total_findings"] = len(report["findings"])
+    report["findings"] = report["findings"][:MAX_STORED_FINDINGS]
+    return report
+
+
+@job_handler("compliance", ComplianceRefresh)
+async def run_compliance_refresh(context):
+    """Reconstruit les bilans de conformité hebdomadaire et les anomalies associées sur la période"""
+    params = context.params
+    _, totals = await sweep_compliance(
+        params.get("start_date"), params.get("end_date"), service_id=params.get("service_id"),
+        write=True, progress=context.progress
+    )
+    return totals
+
+
+@job_handler("hour_totals", HourTotalsRebuild)
+async def run_hour_totals_rebuild(context):
+    """Reconstruit les totaux d'heures par semaine et par mois depuis les plannings (réconciliation)"""
+    params = context.params
+    return await sweep_hour_totals(
+        params.get("start_date"), params.get("end_date"), service_id=params.get("service_id"),
+        progress=context.progress
+    )
+
+
+@job_handler("free_busy", FreeBusyRebuild)
+async def run_free_busy_rebuild(context):
+    """Reconstruit les bitmaps d'occupation (recherche de remplaçants), sans flux de modifications ou après une reprise"""
+    params = context.params
+    return await sweep_free_busy(
+        params.get("start_date"), params.get("end_date"), service_id=params.get("service_id"),
+        progress=context.progress
+    )
+
+
+def excel_import_handler(job_type: str, import_rows):
+    """Import Excel : lecture du fichier dans le pool de processus, écritures groupées sur la boucle d'événements"""
+    @job_handler(job_type, upload=True)
+    async def run_import(context):
+        rows = await run_in_process(read_excel_rows, context.payload)
+        await context.progress(0, len(rows))
+        return await import_rows(rows, mode=context.params.get("mode", "insert"), progress=context.progress)
+    return run_import
+
+
+excel_import_handler("import_codes", import_codes)
+excel_import_handler("import_polls", import_polls)
+excel_import_handler("import_specialities", import_specialities)
+
+
+@job_handler("import_annual_program", upload=True)
+async def run_annual_program_import(context):
+    annual_programs = await run_in_process(extract_annual_programs_from_bytes, context.payload)
+    await context.progress(0, len(annual_programs))
+    return await import_annual_programs(
+        annual_programs,
+        mode=context.params.get("mode", "insert"),
+        year=context.params.get("year"),
+        progress=context.progress
+    )
+
+
+@job_handler("sync_program_days", ProgramDaysSync)
+async def run_program_days_sync(context):
+    """Reconstruit les lignes journalières de tous les programmes annuels (reprise de l'existant)"""
+    return await sync_program_days(year=context.params.get("year"), progress=context.progress)
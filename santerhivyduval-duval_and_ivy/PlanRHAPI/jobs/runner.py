@@ -0,0 +1,167 @@
+# Workers des jobs en arrière-plan : prise en charge atomique dans la collection jobs, suivi et annulation
+# Lancés par l'application (JOB_WORKERS par processus) ou seuls : python -m jobs.runner
+import asyncio
+import os
+import socket
+
+from fastapi import HTTPException, UploadFile
+
+from crud.job import (
+    JOB_CANCELLED, JOB_DONE, JOB_FAILED, MAX_PAYLOAD_BYTES,
+    claim_next_job, create_job, finish_job, heartbeat, release_job, requeue_stale_jobs
+)
+from jobs.handlers import HANDLERS
+
+JOB_WORKERS = int(os.getenv('JOB_WORKERS', "2"))
+# Attente maximale entre deux recherches de job quand la file est vide
+JOB_POLL_INTERVAL = float(os.getenv('JOB_POLL_INTERVAL', "1"))
+# Fréquence du signal de vie d'un job en cours, qui relève aussi les demandes d'annulation
+JOB_HEARTBEAT_SECONDS = float(os.getenv('JOB_HEARTBEAT_SECONDS', "5"))
+# Un job sans signal de vie depuis ce délai est remis en attente (worker arrêté brutalement)
+JOB_STALE_SECONDS = int(os.getenv('JOB_STALE_SECONDS', "120"))
+
+_workers = []
+_wakeup = None
+
+
+class JobCancelled(Exception):
+    """Levée dans un handler dont l'annulation a été demandée"""
+
+
+class JobContext:
+    """Ce qu'un handler voit de son job : paramètres, fichier envoyé et suivi de progression"""
+
+    def __init__(self, job):
+        self.job_id = job["_id"]
+        self.params = job.get("params") or {}
+        self.payload = job.get("payload")
+
+    async def progress(self, done, total=None, message=None):
+        """Enregistre la progression ; lève JobCancelled si l'annulation du job a été demandée"""
+        progress = {"done": done}
+        if total is not None:
+            progress["total"] = total
+        if message is not None:
+            progress["message"] = message
+        if await heartbeat(self.job_id, progress):
+            raise JobCancelled()
+
+
+def wakeup_event() -> asyncio.Event:
+    global _wakeup
+    if _wakeup is None:
+        _wakeup = asyncio.Event()
+    return _wakeup
+
+
+async def enqueue(job_type: str, params: dict = None, payload: bytes = None):
+    """Crée un job en attente et réveille les workers du processus ; retourne le job (sans payload)"""
+    if job_type not in HANDLERS:
+        raise ValueError(f"Type de job inconnu: {job_type}. Types disponibles: {', '.join(HANDLERS)}")
+    job = await create_job(job_type, params, payload)
+    wakeup_event().set()
+    return job
+
+
+async def enqueue_upload(job_type: str, file: UploadFile, params: dict = None):
+    """Job d'import d'un fichier envoyé : le contenu est conservé dans le job jusqu'à son traitement"""
+    contents = await file.read()
+    if len(contents) > MAX_PAYLOAD_BYTES:
+        raise HTTPException(status_code=413, detail=f"Fichier trop volumineux pour un import en arrière-plan (max {MAX_PAYLOAD_BYTES // (1024 * 1024)} Mo)")
+    return await enqueue(job_type, {"filename": file.filename, **(params or {})}, payload=contents)
+
+
+async def run_job(job):
+    """
+    Exécute un job pris en charge. Le handler tourne dans sa propre tâche ; toutes les
+    JOB_HEARTBEAT_SECONDS, le worker signale que le job est vivant et l'interrompt si son annulation est demandée.
+    """
+    task = asyncio.ensure_future(HANDLERS[job["type"]](JobContext(job)))
+    try:
+        while not task.done():
+            await asyncio.wait({task}, timeout=JOB_HEARTBEAT_SECONDS)
+            if not task.done() and await heartbeat(job["_id"]):
+                task.cancel()
+                await asyncio.wait({task})
+    except asyncio.CancelledError:
+        # Arrêt du worker : le job est remis en attente pour un autre worker
+        task.cancel()
+        await release_job(job["_id"])
+        raise
+
+    if task.cancelled() or isinstance(task.exception(), JobCancelled):
+        await finish_job(job["_id"], JOB_CANCELLED)
+    elif task.exception() is not None:
+        error = task.exception()
+        await finish_job(job["_id"], JOB_FAILED, error=f"{type(error).__name__}: {error}")
+    else:
+        await finish_job(job["_id"], JOB_DONE, result=task.result())
+
+
+async def wait_for_job(timeout: float):
+    event = wakeup_event()
+    try:
+        await asyncio.wait_for(event.wait(), timeout)
+    except asyncio.TimeoutError:
+        pass
+    event.clear()
+
+
+async def worker_loop(worker_id: str):
+    while True:
+        try:
+            job = await claim_next_job(worker_id, HANDLERS)
+            if job is None:
+                await wait_for_job(JOB_POLL_INTERVAL)
+                continue
+            await run_job(job)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"❌ Worker {worker_id}: {e}")
+            await asyncio.sleep(JOB_POLL_INTERVAL)
+
+
+async def stale_jobs_loop():
+    while True:
+        try:
+            requeued = await requeue_stale_jobs(JOB_STALE_SECONDS)
+            if requeued:
+                print(f"⚠️ {requeued} job(s) sans worker remis en attente")
+        except Exception as e:
+            print(f"❌ Reprise des jobs interrompus impossible: {e}")
+        await asyncio.sleep(JOB_STALE_SECONDS / 2)
+
+
+def start_workers(count: int = JOB_WORKERS):
+    """Démarre count workers dans la boucle d'événements courante"""
+    prefix = f"{socket.gethostname()}-{os.getpid()}"
+    _workers.append(asyncio.ensure_future(stale_jobs_loop()))
+    for index in range(count):
+        _workers.append(asyncio.ensure_future(worker_loop(f"{prefix}-{index}")))
+
+
+async def stop_workers():
+    for task in _workers:
+        task.cancel()
+    await asyncio.gather(*_workers, return_exceptions=True)
+    _workers.clear()
+
+
+async def main():
+    from database.database import connect_client, close_client
+    from utils.workers import shutdown_process_pool
+
+    connect_client()
+    start_workers(JOB_WORKERS or 1)
+    print(f"🚀 {JOB_WORKERS or 1} worker(s) de jobs démarrés (types: {', '.join(HANDLERS)})")
+    try:
+        await asyncio.gather(*_workers)
+    finally:
+        await stop_workers()
+        shutdown_process_pool()
+        close_client()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
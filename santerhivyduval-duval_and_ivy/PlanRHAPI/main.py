@@ -1,9 +1,52 @@
+import os
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from starlette.middleware.cors import CORSMiddleware
 
-from routers import user, sessions, role, service, absence, program, asks, code, contrat, speciality, pole, saphir, availability, planning
+from database.database import connect_client, close_client, get_database
+from database.indexes import ensure_indexes, index_drift
+from utils.json_response import MongoJSONResponse
+from utils.workers import shutdown_process_pool
+from jobs import DETECTION_STREAM, start_detection_stream, start_workers, stop_detection_stream, stop_workers
+from jobs.runner import JOB_WORKERS
+from routers import user, sessions, role, service, absence, program, asks, code, contrat, speciality, pole, saphir, availability, planning, monitoring, job, agenda
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Un seul client MongoDB (et donc un seul pool) par processus worker
+    connect_client()
+
+    # Création idempotente des index déclarés dans database/indexes.py
+    if os.getenv('MONGO_ENSURE_INDEXES', '1') == '1':
+        try:
+            _, errors = await ensure_indexes(get_database())
+            for collection_name, error in errors.items():
+                print(f"⚠️ Index non créés pour {collection_name}: {error}")
+            drift = await index_drift(get_database())
+            for collection_name, diff in drift.items():
+                print(f"⚠️ Écart d'index sur {collection_name}: {diff}")
+        except Exception as e:
+            print(f"❌ Initialisation des index impossible: {e}")
+
+    # Workers des jobs en arrière-plan (JOB_WORKERS=0 : jobs traités par python -m jobs.runner)
+    if JOB_WORKERS > 0:
+        start_workers(JOB_WORKERS)
+
+    # Détection continue des anomalies sur les flux de modifications : un seul consommateur, lancé par
+    # python -m jobs.detection_stream, ou ici avec DETECTION_STREAM=1 si l'API tourne sur un seul processus
+    if DETECTION_STREAM:
+        start_detection_stream()
+
+    yield
+    await stop_detection_stream()
+    await stop_workers()
+    shutdown_process_pool()
+    close_client()
+
 
-app = FastAPI()
+app = FastAPI(lifespan=lifespan, default_response_class=MongoJSONResponse)
 
 origins = ["*"]
 
@@ -29,6 +72,9 @@ app.include_router(sessions.router)
 app.include_router(saphir.router)
 app.include_router(availability.router)
 app.include_router(planning.router)
+app.include_router(monitoring.router)
+app.include_router(job.router)
+app.include_router(agenda.router)
 
 @app.get("/")
 async def root():
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Script de migration vers les champs horaires natifs
+- plannings, availabilities, absences : ajoute start / end (datetime), start_minute / end_minute,
+  duration_minutes et all_day, calculés depuis les champs chaîne (qui sont conservés)
+- alerts, anomalies, notifications : convertit les horodatages ISO en chaîne (created_at...) en datetime
+Le script est rejouable : seuls les documents pas encore migrés sont modifiés.
+Usage : python migrate_time_fields.py [--dry-run] [--recompute]
+  --dry-run   : compte les documents à migrer sans rien écrire
+  --recompute : recalcule les champs horaires de tous les documents, même déjà migrés
+"""
+
+import os
+import sys
+from datetime import datetime
+
+from pymongo import MongoClient, UpdateOne
+
+from utils.time_fields import time_fields_of
+
+# Configuration de la base de données
+MONGO_URI = os.getenv('MONGO_URI', 'mongodb://localhost:27017/')
+DATABASE_NAME = os.getenv('DATABASE_NAME', 'planRhIA')
+
+BATCH_SIZE = 1000
+
+# Champs chaîne lus pour calculer les champs horaires, par collection
+SLOT_SOURCE_FIELDS = {
+    "plannings": ("date", "plage_horaire"),
+    "availabilities": ("date", "start_time", "end_time"),
+    "absences": ("start_date", "start_hour", "end_date", "end_hour"),
+}
+
+# Horodatages enregistrés en chaîne ISO par les anciennes versions des routes SAPHIR
+TIMESTAMP_FIELDS = {
+    "alerts": ("created_at", "updated_at"),
+    "anomalies": ("created_at", "updated_at", "detected_at"),
+    "notifications": ("created_at", "read_at"),
+}
+
+
+def parse_timestamp(value):
+    """'2025-03-01T08:30:00.123456' -> datetime ; None si la chaîne n'est pas un horodatage ISO"""
+    try:
+        return datetime.fromisoformat(value.strip().replace("Z", "+00:00")).replace(tzinfo=None)
+    except (AttributeError, ValueError):
+        return None
+
+
+def flush(collection, operations, dry_run):
+    if operations and not dry_run:
+        collection.bulk_write(operations, ordered=False)
+    return len(operations)
+
+
+def migrate_slots(db, collection_name, dry_run=False, recompute=False):
+    """Ajoute les champs horaires natifs ; retourne (documents migrés, documents aux dates illisibles)"""
+    collection = db[collection_name]
+    query_filter = {} if recompute else {"start": {"$not": {"$type": "date"}}}
+    projection = {field: 1 for field in SLOT_SOURCE_FIELDS[collection_name]}
+
+    migrated, invalid = 0, 0
+    operations = []
+    for doc in collection.find(query_filter, projection).batch_size(BATCH_SIZE):
+        fields = time_fields_of(collection_name, doc)
+        if not fields:
+            invalid += 1
+            continue
+        operations.append(UpdateOne({"_id": doc["_id"]}, {"$set": fields}))
+        if len(operations) == BATCH_SIZE:
+            migrated += flush(collection, operations, dry_run)
+            operations = []
+    migrated += flush(collection, operations, dry_run)
+    return migrated, invalid
+
+
+def migrate_timestamps(db, collection_name, dry_run=False):
+    """Convertit en datetime les horodatages chaîne ; retourne (documents migrés, valeurs illisibles)"""
+    collection = db[collection_name]
+    fields = TIMESTAMP_FIELDS[collection_name]
+    query_filter = {"$or": [{field: {"$type": "string"}} for field in fields]}
+
+    migrated, invalid = 0, 0
+    operations = []
+    for doc in collection.find(query_filter, {field: 1 for field in fields}).batch_size(BATCH_SIZE):
+        converted = {}
+        for field in fields:
+            if isinstance(doc.get(field), str):
+                value = parse_timestamp(doc[field])
+                if value is None:
+                    invalid += 1
+                else:
+                    converted[field] = value
+        if converted:
+            operations.append(UpdateOne({"_id": doc["_id"]}, {"$set": converted}))
+        if len(operations) == BATCH_SIZE:
+            migrated += flush(collection, operations, dry_run)
+            operations = []
+    migrated += flush(collection, operations, dry_run)
+    return migrated, invalid
+
+
+def migrate_time_fields(dry_run=False, recompute=False):
+    client = MongoClient(MONGO_URI)
+    db = client[DATABASE_NAME]
+
+    print(f"Connexion à la base de données {DATABASE_NAME}...")
+    if dry_run:
+        print("Mode --dry-run : aucune écriture")
+
+    for collection_name in SLOT_SOURCE_FIELDS:
+        migrated, invalid = migrate_slots(db, collection_name, dry_run, recompute)
+        print(f"✓ {collection_name}: {migrated} documents avec champs horaires natifs")
+        if invalid:
+            print(f"   ⚠️ {invalid} documents ignorés (date illisible)")
+
+    for collection_name in TIMESTAMP_FIELDS:
+        migrated, invalid = migrate_timestamps(db, collection_name, dry_run)
+        print(f"✓ {collection_name}: {migrated} documents aux horodatages convertis en datetime")
+        if invalid:
+            print(f"   ⚠️ {invalid} horodatages illisibles laissés en chaîne")
+
+    client.close()
+    print("\n🎉 Migration des champs horaires terminée !")
+
+
+if __name__ == "__main__":
+    try:
+        migrate_time_fields(dry_run="--dry-run" in sys.argv, recompute="--recompute" in sys.argv)
+    except Exception as e:
+        print(f"❌ Erreur lors de la migration : {e}")
+        print("Vérifiez que MongoDB est démarré et accessible.")
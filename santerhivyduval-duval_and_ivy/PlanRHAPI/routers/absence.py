@@ -1,15 +1,28 @@
 from bson import ObjectId
-from fastapi import HTTPException, APIRouter, Body
+from fastapi import HTTPException, APIRouter, Body, Depends, Query, Request
 from starlette import status
 from crud.absence import create_absence, delete_absence, assign_replacer_to_absence, update_absence_status
+from crud.free_busy import slot_projection, update_free_busy
+from crud.replacement import REPLACEMENT_SCOPES, replacement_candidates
 from database.database import absences
 from schemas.absence import AbsenceCreate, AbsenceUpdate
+from utils.date_range import DateRange
+from utils.json_response import MongoJSONResponse
+from utils.pagination import PageParams, paginate, sort_spec
+from utils.projection import projection_of
+from utils.streaming import stream_media_type, stream_cursor
 from pydantic import BaseModel
 from typing import Optional
 from datetime import datetime
 
 router = APIRouter()
 
+ABSENCE_FIELDS = (
+    "staff_id", "start_date", "start_hour", "end_date", "end_hour", "reason", "comment",
+    "replacement_id", "service_id", "absence_code_id", "status", "matricule", "created_at", "updated_at"
+)
+ABSENCE_PROJECTION = projection_of(ABSENCE_FIELDS)
+
 """@router.post("/absences/create")
 async def register(absence_info: AbsenceCreate):
     try:
@@ -49,6 +62,8 @@ async def register(absence_info: AbsenceCreate):
         }
         
         result = await create_absence(absence_data)
+        # create_absence complète absence_data avec les champs horaires natifs
+        await update_free_busy("absences", absence_data)
         return {
             "message": "Absence enregistrée avec succès",
             "data": {
@@ -68,7 +83,9 @@ async def register(absence_info: AbsenceCreate):
 @router.delete("/absences/delete/{absence_id}")
 async def delete(absence_id: str):
     try:
+        absence = await absences.find_one({"_id": ObjectId(absence_id)}, slot_projection("absences"))
         result = await delete_absence(absence_id)
+        await update_free_busy("absences", absence)
         return {"message": "Absence deleted successfully", "data": result}
     except Exception as e:
         return HTTPException(status_code=500, detail=f"Internal Server Error: {str(e)}")
@@ -148,7 +165,7 @@ async def update_absence(
         if update_data.replacement_id is not None:
             update_fields["replacement_id"] = update_data.replacement_id
         
-        result = absences.update_one(
+        result = await absences.update_one(
             {"_id": ObjectId(absence_id)},
             {"$set": update_fields}
         )
@@ -156,7 +173,10 @@ async def update_absence(
         if result.modified_count == 0:
             raise HTTPException(status_code=404, detail="Absence non trouvée ou aucune modification")
         
-        updated_absence = absences.find_one({"_id": ObjectId(absence_id)})
+        updated_absence = await absences.find_one({"_id": ObjectId(absence_id)}, slot_projection("absences"))
+        if update_data.status:
+            # Une absence refusée par le cadre ne compte plus dans les bitmaps d'occupation
+            await update_free_busy("absences", updated_absence)
         return {
             "message": "Absence mise à jour avec succès",
             "data": {
@@ -189,36 +209,64 @@ async def get_absences():
                 "replacement_id": absence["replacement_id"],
                 "service_id": absence["service_id"],
                 "status": absence["status"]
-            } for absence in absence_l
+            } async for absence in absence_l
         ]
         return {"message": "Absences retrieved successfully", "data": absence_list}
     except Exception as e:
         return HTTPException(status_code=500, detail=f"Internal Server Error: {str(e)}")"""
     
+def absence_row(absence):
+    return {
+        "id": str(absence["_id"]),
+        "staff_id": absence["staff_id"],
+        "start_date": absence["start_date"],
+        "start_hour": absence["start_hour"],
+        "end_date": absence["end_date"],
+        "end_hour": absence["end_hour"],
+        "reason": absence["reason"],
+        "comment": absence["comment"],
+        "replacement_id": absence["replacement_id"],
+        "service_id": absence["service_id"],
+        "absence_code_id": absence["absence_code_id"],
+        "status": absence["status"],
+        "matricule": absence.get("matricule", ""),
+        "created_at": absence.get("created_at", "").isoformat() if absence.get("created_at") else "",
+        "updated_at": absence.get("updated_at", "").isoformat() if absence.get("updated_at") else ""
+    }
+
+
+async def absence_rows(batch):
+    return [absence_row(absence) for absence in batch]
+
+
 @router.get("/absences")
-async def get_absences():
+async def get_absences(
+    request: Request,
+    stream: bool = Query(False, description="Exporter toutes les absences en flux, sans pagination"),
+    staff_id: Optional[str] = Query(None, description="ID de l'agent absent"),
+    service_id: Optional[str] = Query(None, description="ID du service"),
+    period: DateRange = Depends(),
+    page: PageParams = Depends()
+):
+    """
+    Avec Accept: application/x-ndjson (ou ?stream=true), renvoie l'export complet en flux.
+    ?from=&to= : absences qui chevauchent la période.
+    """
     try:
-        absence_l = absences.find()
-        absence_list = [
-            {
-                "id": str(absence["_id"]),
-                "staff_id": absence["staff_id"],
-                "start_date": absence["start_date"],
-                "start_hour": absence["start_hour"],
-                "end_date": absence["end_date"],
-                "end_hour": absence["end_hour"],
-                "reason": absence["reason"],
-                "comment": absence["comment"],
-                "replacement_id": absence["replacement_id"],
-                "service_id": absence["service_id"],
-                "absence_code_id": absence["absence_code_id"],
-                "status": absence["status"],
-                "matricule": absence.get("matricule", ""),
-                "created_at": absence.get("created_at", "").isoformat() if absence.get("created_at") else "",
-                "updated_at": absence.get("updated_at", "").isoformat() if absence.get("updated_at") else ""
-            } for absence in absence_l
-        ]
-        return {"message": "Absences récupérées avec succès", "data": absence_list}
+        query_filter = period.overlap_filter("start_date", "end_date")
+        if staff_id:
+            query_filter["staff_id"] = staff_id
+        if service_id:
+            query_filter["service_id"] = service_id
+
+        media_type = stream_media_type(request, stream)
+        if media_type:
+            cursor = absences.find(query_filter, ABSENCE_PROJECTION).sort(sort_spec("_id"))
+            return stream_cursor(cursor, media_type, transform=absence_rows)
+
+        absence_l, pagination = await paginate(absences, query_filter, "_id", page, ABSENCE_PROJECTION)
+        absence_list = [absence_row(absence) for absence in absence_l]
+        return {"message": "Absences récupérées avec succès", "data": absence_list, "pagination": pagination}
     except Exception as e:
         raise HTTPException(
             status_code=500,
@@ -228,7 +276,7 @@ async def get_absences():
 @router.get("/absences/{absence_id}")
 async def get_absence_by_id(absence_id: str):
     try:
-        absence = absences.find_one({"_id": ObjectId(absence_id)})
+        absence = await absences.find_one({"_id": ObjectId(absence_id)}, ABSENCE_PROJECTION)
         if absence:
             absence_details = {
                 "id": str(absence["_id"]),
@@ -256,6 +304,30 @@ async def get_absence_by_id(absence_id: str):
             detail=f"Erreur interne du serveur: {str(e)}"
         )
 
+@router.get("/absences/{absence_id}/candidates")
+async def get_replacement_candidates(
+    absence_id: str,
+    scope: str = Query("service", description=f"Périmètre des collègues : {', '.join(REPLACEMENT_SCOPES)}"),
+    limit: int = Query(20, ge=1, le=100, description="Nombre de remplaçants renvoyés")
+):
+    """
+    GET /absences/{absence_id}/candidates?scope=service&limit=20
+    Remplaçants possibles d'une absence, classés par score : collègues libres sur les créneaux de l'agent absent
+    et sous leurs heures de contrat. ask_status : demande déjà envoyée pour cette absence (routers/asks).
+    """
+    try:
+        try:
+            result = await replacement_candidates(absence_id, scope, limit)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        if result is None:
+            raise HTTPException(status_code=404, detail="Absence non trouvée")
+        return MongoJSONResponse({"message": "Remplaçants possibles récupérés avec succès", "data": result})
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Erreur lors de la recherche de remplaçants: {str(e)}")
+
 """@router.get("/absences/{absence_id}")
 async def get_absence_by_id(absence_id: str):
     try:
@@ -0,0 +1,143 @@
+from datetime import date as date_type, datetime
+from typing import Optional
+
+from fastapi import APIRouter, HTTPException, Query, Depends
+
+from crud.agenda import MAX_SERVICE_AGENDA_DAYS, build_agenda
+from crud.coverage import build_coverage
+from crud.overlap import OVERLAP_SOURCES, agent_overlaps
+from scheduling.optimizer import DAY_SHIFT, NIGHT_SHIFT, check_options
+from utils.date_range import DateRange, calendar_period, parse_day
+from utils.json_response import MongoJSONResponse
+
+router = APIRouter()
+
+
+@router.get("/agenda")
+async def get_agenda(
+    user_id: Optional[str] = Query(None, description="Agenda d'un agent ('Mon agenda')"),
+    service_id: Optional[str] = Query(None, description="Agenda d'un service"),
+    view: str = Query("month", description="Vue : week, month ou year"),
+    date: Optional[str] = Query(None, description="Jour de référence de la vue (YYYY-MM-DD), aujourd'hui par défaut"),
+    period: DateRange = Depends()
+):
+    """
+    GET /agenda?user_id=X&view=month&date=2025-03-01
+    Plannings, disponibilités, absences, événements et programme d'un agent ou d'un service
+    sur une semaine, un mois ou une année (ou ?from=&to=), en une seule réponse.
+    """
+    try:
+        if bool(user_id) == bool(service_id):
+            raise HTTPException(status_code=400, detail="Préciser user_id ou service_id (un seul des deux)")
+
+        if period.start and period.end:
+            agenda_period = period
+        elif period.active:
+            raise HTTPException(status_code=400, detail="Les paramètres from et to s'utilisent ensemble")
+        else:
+            anchor = parse_day(date, "date") if date else date_type.today()
+            agenda_period = DateRange.of(*calendar_period(view, anchor))
+
+        if service_id and agenda_period.days > MAX_SERVICE_AGENDA_DAYS:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Agenda de service limité à {MAX_SERVICE_AGENDA_DAYS} jours : utiliser les vues semaine ou mois"
+            )
+
+        agenda = await build_agenda(agenda_period, user_id=user_id, service_id=service_id)
+        return MongoJSONResponse({"message": "Agenda récupéré avec succès", "data": agenda})
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Erreur lors de la récupération de l'agenda: {str(e)}")
+
+
+def parse_instant(value: str, label: str) -> datetime:
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Paramètre {label} invalide (format attendu: YYYY-MM-DDTHH:MM)")
+
+
+@router.get("/agenda/overlaps")
+async def get_agenda_overlaps(
+    user_id: str = Query(..., description="Agent concerné"),
+    start: str = Query(..., description="Début du créneau (YYYY-MM-DDTHH:MM)"),
+    end: str = Query(..., description="Fin du créneau, exclue (YYYY-MM-DDTHH:MM)"),
+    sources: Optional[str] = Query(None, description="Collections à vérifier, séparées par des virgules (toutes par défaut)")
+):
+    """
+    GET /agenda/overlaps?user_id=X&start=2025-03-01T20:00&end=2025-03-02T08:00
+    Plannings travaillés (hors repos et congés), disponibilités, absences et missions de l'agent qui chevauchent le créneau
+    """
+    try:
+        start_at, end_at = parse_instant(start, "start"), parse_instant(end, "end")
+        if end_at <= start_at:
+            raise HTTPException(status_code=400, detail="La fin du créneau doit suivre son début")
+
+        requested = [source.strip() for source in sources.split(",") if source.strip()] if sources else None
+        unknown = [source for source in requested or [] if source not in OVERLAP_SOURCES]
+        if unknown:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Collections inconnues: {', '.join(unknown)}. Collections disponibles: {', '.join(OVERLAP_SOURCES)}"
+            )
+
+        overlaps = await agent_overlaps(user_id, start_at, end_at, requested)
+        return MongoJSONResponse({
+            "message": "Chevauchements récupérés avec succès",
+            "data": {
+                "user_id": user_id,
+                "start": start_at,
+                "end": end_at,
+                "overlaps": overlaps,
+                "has_overlap": any(overlaps.values())
+            }
+        })
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Erreur lors de la recherche des chevauchements: {str(e)}")
+
+
+@router.get("/agenda/coverage")
+async def get_service_coverage(
+    service_id: str = Query(..., description="Service concerné"),
+    view: str = Query("month", description="Vue : week, month ou year"),
+    date: Optional[str] = Query(None, description="Jour de référence de la vue (YYYY-MM-DD), aujourd'hui par défaut"),
+    min_jour: Optional[int] = Query(None, description="Effectif minimal de jour (remplace celui du service)"),
+    min_nuit: Optional[int] = Query(None, description="Effectif minimal de nuit (remplace celui du service)"),
+    period: DateRange = Depends()
+):
+    """
+    GET /agenda/coverage?service_id=X&view=month&date=2025-03-01
+    Carte de couverture d'un service : pour chaque jour et chaque créneau (jour / nuit), agents planifiés,
+    effectif présent minute par minute (min / max) et agents manquants par rapport à l'effectif minimal
+    (min_staff du service, ou ?min_jour=&min_nuit=).
+    """
+    try:
+        if period.start and period.end:
+            coverage_period = period
+        elif period.active:
+            raise HTTPException(status_code=400, detail="Les paramètres from et to s'utilisent ensemble")
+        else:
+            anchor = parse_day(date, "date") if date else date_type.today()
+            coverage_period = DateRange.of(*calendar_period(view, anchor))
+
+        min_staff = {shift: count for shift, count in ((DAY_SHIFT, min_jour), (NIGHT_SHIFT, min_nuit)) if count is not None}
+        try:
+            check_options("auto", min_staff)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+        coverage = await build_coverage(service_id, coverage_period, min_staff)
+        if coverage is None:
+            raise HTTPException(status_code=404, detail="Service non trouvé")
+        return MongoJSONResponse({
+            "message": "Couverture du service récupérée avec succès",
+            "data": {"period": coverage_period.to_dict(), **coverage}
+        })
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Erreur lors du calcul de la couverture: {str(e)}")
@@ -3,11 +3,14 @@ from fastapi import HTTPException, APIRouter
 from starlette import status
 from crud.ask import create_ask, delete_ask
 from database.database import asks
+from utils.projection import projection_of
 from schemas.ask import AskCreate
 from schemas.statusChange import StatusChange
 
 router = APIRouter()
 
+ASK_PROJECTION = projection_of(("absence_id", "colleague_id", "status"))
+
 @router.post("/asks/create")
 async def register(ask_info: AskCreate):
     try:
@@ -45,9 +48,9 @@ async def delete(ask_id: str):
 @router.get("/asks")
 async def get_asks():
     try:
-        ask_l = asks.find()
+        ask_l = asks.find({}, ASK_PROJECTION)
         ask_list = [
-            {"id": str(ask["_id"]), "absence_id": ask["absence_id"], "colleague_id": ask["colleague_id"], "status": ask["status"],} for
+            {"id": str(ask["_id"]), "absence_id": ask["absence_id"], "colleague_id": ask["colleague_id"], "status": ask["status"],} async for
             ask in ask_l]
         print(ask_list)
         return {"message" : "Demandes recupérés avec succès", "data": ask_list}
@@ -61,7 +64,7 @@ async def get_asks():
 @router.get("/asks/{ask_id}")
 async def get_ask_by_id(ask_id: str):
     try:
-        ask = asks.find_one({"_id": ObjectId(ask_id)})
+        ask = await asks.find_one({"_id": ObjectId(ask_id)}, ASK_PROJECTION)
         if ask:
             ask_details = {
                 "id": str(ask["_id"]),
@@ -84,7 +87,7 @@ async def get_ask_by_id(ask_id: str):
 @router.post("/asks/changeStatus/{ask_id}")
 async def change_status(ask_id: str, new_status: StatusChange):
     try:
-        result = asks.update_one(
+        result = await asks.update_one(
             {"_id": ObjectId(ask_id)},
             {"$set": {"status": new_status.new_status}}
         )
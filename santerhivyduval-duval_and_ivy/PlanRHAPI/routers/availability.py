@@ -2,23 +2,28 @@ from fastapi import APIRouter, HTTPException, Query, Depends
 from bson import ObjectId
 from typing import List, Optional
 from datetime import datetime
-import os
 import re
-from pymongo import MongoClient
+from crud.free_busy import slot_projection, update_free_busy
+from crud.overlap import find_overlap
+from database.database import db, availabilities, users
 from schemas.availability import AvailabilityCreate, AvailabilityUpdate
-
-# Configuration de la base de données
-MONGO_URI = os.getenv('MONGO_URI', 'mongodb://localhost:27017/')
-DATABASE_NAME = os.getenv('DATABASE_NAME', 'planRhIA')
-
-client = MongoClient(MONGO_URI)
-db = client[DATABASE_NAME]
-
-# Collection des disponibilités
-availabilities = db['availabilities']
+from utils.date_range import DateRange
+from utils.json_response import MongoJSONResponse
+from utils.pagination import PageParams, page_info, paginate_stages, sort_spec, with_keyset
+from utils.projection import EXISTS_PROJECTION, USER_NAME_PROJECTION, sparse_fields
+from utils.time_fields import TIME_FIELDS, availability_time_fields
+from utils.user_lookup import service_rows_stages, user_lookup_stages
 
 router = APIRouter()
 
+AVAILABILITY_FIELDS = (
+    "user_id", "date", "start_time", "end_time", "status", "commentaire", "created_at", "updated_at"
+)
+# user_id est toujours lu : il sert à la jointure avec les utilisateurs ; les champs horaires natifs sur demande
+availability_fields = sparse_fields(
+    (*AVAILABILITY_FIELDS, *TIME_FIELDS), default_fields=AVAILABILITY_FIELDS, required_fields=("user_id",)
+)
+
 # =============================================================================
 # FONCTIONS DE VALIDATION
 # =============================================================================
@@ -51,13 +56,13 @@ def validate_time_format(time_str: str) -> bool:
     except ValueError:
         return False
 
-def validate_user_exists(user_id: str) -> bool:
+async def validate_user_exists(user_id: str) -> bool:
     """
     Vérifie que l'utilisateur existe dans la collection users
     """
     try:
         users_collection = db['users']
-        user = users_collection.find_one({"_id": ObjectId(user_id)})
+        user = await users_collection.find_one({"_id": ObjectId(user_id)}, EXISTS_PROJECTION)
         return user is not None
     except Exception:
         return False
@@ -125,23 +130,20 @@ async def propose_availability(availability_data: AvailabilityCreate):
             )
         
         # Validation de l'existence de l'utilisateur
-        if not validate_user_exists(availability_dict["user_id"]):
+        if not await validate_user_exists(availability_dict["user_id"]):
             raise HTTPException(
                 status_code=400,
                 detail="Utilisateur non trouvé"
             )
         
-        # Vérifier qu'il n'y a pas de conflit de créneaux pour le même utilisateur et la même date
-        existing = availabilities.find_one({
-            "user_id": availability_dict["user_id"],
-            "date": availability_dict["date"],
-            "$or": [
-                {
-                    "start_time": {"$lt": availability_dict["end_time"]},
-                    "end_time": {"$gt": availability_dict["start_time"]}
-                }
-            ]
-        })
+        availability_dict.update(availability_time_fields(
+            availability_dict["date"], availability_dict["start_time"], availability_dict["end_time"]
+        ))
+        
+        # Vérifier qu'aucune disponibilité de l'utilisateur ne chevauche le créneau
+        existing = await find_overlap(
+            "availabilities", availability_dict["user_id"], availability_dict["start"], availability_dict["end"]
+        )
         
         if existing:
             raise HTTPException(
@@ -150,9 +152,10 @@ async def propose_availability(availability_data: AvailabilityCreate):
             )
         
         # Insérer dans MongoDB
-        result = availabilities.insert_one(availability_dict)
+        result = await availabilities.insert_one(availability_dict)
+        await update_free_busy("availabilities", availability_dict)
         
-        return {
+        return MongoJSONResponse({
             "message": "Disponibilité proposée avec succès",
             "data": {
                 "id": str(result.inserted_id),
@@ -163,81 +166,107 @@ async def propose_availability(availability_data: AvailabilityCreate):
                 "status": availability_dict["status"],
                 "created_at": availability_dict["created_at"].isoformat()
             }
-        }
+        })
     except HTTPException:
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erreur lors de la proposition: {str(e)}")
 
 @router.get("/availabilities/me")
-async def get_my_availabilities(user_id: str = Query(..., description="ID de l'utilisateur connecté")):
+async def get_my_availabilities(
+    user_id: str = Query(..., description="ID de l'utilisateur connecté"),
+    period: DateRange = Depends(),
+    projection: dict = Depends(availability_fields)
+):
     """
-    GET /availabilities/me
-    Soignant : voit ses propositions de disponibilités
+    GET /availabilities/me?from=&to=
+    Soignant : voit ses propositions de disponibilités, éventuellement sur une période
     """
     try:
-        availability_list = []
-        for availability in availabilities.find({"user_id": user_id}).sort("date", 1):
-            availability["_id"] = str(availability["_id"])
-            availability["created_at"] = availability.get("created_at", "").isoformat() if availability.get("created_at") else ""
-            availability["updated_at"] = availability.get("updated_at", "").isoformat() if availability.get("updated_at") else ""
-            availability_list.append(availability)
-        
-        return {
+        query_filter = {"user_id": user_id}
+        if period.active:
+            query_filter["date"] = period.day_filter()
+        availability_list = await availabilities.find(query_filter, projection).sort("date", 1).to_list(length=None)
+        
+        return MongoJSONResponse({
             "message": f"Vos disponibilités récupérées avec succès",
             "data": availability_list,
             "count": len(availability_list)
-        }
+        })
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erreur lors de la récupération: {str(e)}")
 
 @router.get("/availabilities")
 async def get_team_availabilities(
     service_id: Optional[str] = Query(None, description="ID du service"),
-    status: Optional[str] = Query("proposé", description="Statut des disponibilités")
+    status: Optional[str] = Query("proposé", description="Statut des disponibilités"),
+    period: DateRange = Depends(),
+    page: PageParams = Depends(),
+    projection: dict = Depends(availability_fields)
 ):
     """
-    GET /availabilities?service_id=X&status=proposé
-    Cadre : voit les propositions de son équipe
+    GET /availabilities?service_id=X&status=proposé&from=&to=
+    Cadre : voit les propositions de son équipe, paginées sur (date, _id)
     """
     try:
-        # Construire le filtre de requête
+        # Construire le pipeline : filtre, tri, puis jointure sur les utilisateurs (un seul aller-retour)
         query_filter = {}
         
-        if service_id:
-            # Récupérer les utilisateurs du service
-            users_collection = db['users']
-            service_users = users_collection.find({"service_id": service_id})
-            user_ids = [str(user["_id"]) for user in service_users]
-            query_filter["user_id"] = {"$in": user_ids}
-        
         if status:
             query_filter["status"] = status
         
-        # Récupérer les disponibilités avec le filtre
-        availability_list = []
-        for availability in availabilities.find(query_filter).sort("date", 1):
-            availability["_id"] = str(availability["_id"])
-            availability["created_at"] = availability.get("created_at", "").isoformat() if availability.get("created_at") else ""
-            availability["updated_at"] = availability.get("updated_at", "").isoformat() if availability.get("updated_at") else ""
-            
-            # Ajouter les informations de l'utilisateur
-            user_info = db['users'].find_one({"_id": ObjectId(availability["user_id"])})
-            if user_info:
-                availability["user_name"] = f"{user_info.get('first_name', '')} {user_info.get('last_name', '')}"
-                availability["user_matricule"] = user_info.get('matricule', '')
-            
-            availability_list.append(availability)
-        
-        return {
+        if period.active:
+            query_filter["date"] = period.day_filter()
+        
+        if service_id:
+            # Un seul pipeline sur users : agents du service, puis leurs disponibilités (filtre et curseur
+            # appliqués dans la jointure, index (user_id, date)) ; tri et limite après le filtre de service
+            pipeline = [
+                *service_rows_stages("availabilities", service_id, [
+                    {"$match": with_keyset(query_filter, "date", page)},
+                    # date est conservée pour construire le curseur de la page suivante
+                    {"$project": {**projection, "date": 1}}
+                ]),
+                {"$sort": dict(sort_spec("date"))},
+                {"$limit": page.limit + 1}
+            ]
+            availability_page = await users.aggregate(pipeline).to_list(length=None)
+        else:
+            pipeline = [
+                *paginate_stages(query_filter, "date", page),
+                {"$limit": page.limit + 1},
+                # date est conservée pour construire le curseur de la page suivante
+                {"$project": {**projection, "date": 1}},
+                # Jointure limitée à la page, pour les noms des agents
+                *user_lookup_stages()
+            ]
+            availability_page = await availabilities.aggregate(pipeline).to_list(length=None)
+        
+        total = None
+        if page.with_total and service_id:
+            count_pipeline = [
+                *service_rows_stages("availabilities", service_id, [{"$match": query_filter}, {"$project": {"_id": 1}}]),
+                {"$count": "total"}
+            ]
+            counted = await users.aggregate(count_pipeline).to_list(length=None)
+            total = counted[0]["total"] if counted else 0
+        elif page.with_total:
+            total = await availabilities.count_documents(query_filter)
+        pagination = page_info(availability_page, "date", page, total)
+        
+        availability_list = availability_page
+        
+        return MongoJSONResponse({
             "message": f"Disponibilités de l'équipe récupérées avec succès",
             "data": availability_list,
             "count": len(availability_list),
+            "pagination": pagination,
             "filters": {
                 "service_id": service_id,
-                "status": status
+                "status": status,
+                **period.to_dict()
             }
-        }
+        })
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erreur lors de la récupération: {str(e)}")
 
@@ -262,7 +291,7 @@ async def validate_or_reject_availability(
         object_id = ObjectId(availability_id)
         
         # Vérifier que la disponibilité existe
-        existing_availability = availabilities.find_one({"_id": object_id})
+        existing_availability = await availabilities.find_one({"_id": object_id}, EXISTS_PROJECTION)
         if not existing_availability:
             raise HTTPException(status_code=404, detail="Disponibilité non trouvée")
         
@@ -278,7 +307,7 @@ async def validate_or_reject_availability(
             update_fields["commentaire"] = update_data.commentaire
         
         # Mettre à jour la disponibilité
-        result = availabilities.update_one(
+        result = await availabilities.update_one(
             {"_id": object_id},
             {"$set": update_fields}
         )
@@ -286,23 +315,21 @@ async def validate_or_reject_availability(
         if result.modified_count == 0:
             raise HTTPException(status_code=404, detail="Aucune modification effectuée")
         
-        # Récupérer la disponibilité mise à jour
-        updated_availability = availabilities.find_one({"_id": object_id})
-        updated_availability["_id"] = str(updated_availability["_id"])
-        updated_availability["created_at"] = updated_availability.get("created_at", "").isoformat() if updated_availability.get("created_at") else ""
-        updated_availability["updated_at"] = updated_availability.get("updated_at", "").isoformat() if updated_availability.get("updated_at") else ""
+        # Récupérer la disponibilité mise à jour ; une disponibilité refusée ne compte plus dans les bitmaps d'occupation
+        updated_availability = await availabilities.find_one({"_id": object_id})
+        await update_free_busy("availabilities", updated_availability)
         
         # Ajouter les informations de l'utilisateur
-        user_info = db['users'].find_one({"_id": ObjectId(updated_availability["user_id"])})
+        user_info = await db['users'].find_one({"_id": ObjectId(updated_availability["user_id"])}, USER_NAME_PROJECTION)
         if user_info:
             updated_availability["user_name"] = f"{user_info.get('first_name', '')} {user_info.get('last_name', '')}"
         
         action = "validée" if update_data.status == "validé" else "refusée"
         
-        return {
+        return MongoJSONResponse({
             "message": f"Disponibilité {action} avec succès",
             "data": updated_availability
-        }
+        })
     except HTTPException:
         raise
     except Exception as e:
@@ -316,44 +343,38 @@ async def validate_or_reject_availability(
 async def get_availability_by_id(availability_id: str):
     """Récupère une disponibilité par son ID"""
     try:
-        availability = availabilities.find_one({"_id": ObjectId(availability_id)})
+        availability = await availabilities.find_one({"_id": ObjectId(availability_id)})
         if availability:
-            availability["_id"] = str(availability["_id"])
-            availability["created_at"] = availability.get("created_at", "").isoformat() if availability.get("created_at") else ""
-            availability["updated_at"] = availability.get("updated_at", "").isoformat() if availability.get("updated_at") else ""
-            return {"message": "Disponibilité récupérée avec succès", "data": availability}
+            return MongoJSONResponse({"message": "Disponibilité récupérée avec succès", "data": availability})
         else:
             raise HTTPException(status_code=404, detail="Disponibilité non trouvée")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erreur lors de la récupération: {str(e)}")
 
 @router.get("/availabilities/user/{user_id}")
-async def get_availabilities_by_user(user_id: str):
-    """Récupère les disponibilités d'un utilisateur"""
+async def get_availabilities_by_user(
+    user_id: str,
+    period: DateRange = Depends(),
+    projection: dict = Depends(availability_fields)
+):
+    """Récupère les disponibilités d'un utilisateur (?from=&to= : sur une période)"""
     try:
-        availability_list = []
-        for availability in availabilities.find({"user_id": user_id}):
-            availability["_id"] = str(availability["_id"])
-            availability["created_at"] = availability.get("created_at", "").isoformat() if availability.get("created_at") else ""
-            availability["updated_at"] = availability.get("updated_at", "").isoformat() if availability.get("updated_at") else ""
-            availability_list.append(availability)
-        
-        return {"message": f"Disponibilités de l'utilisateur {user_id} récupérées avec succès", "data": availability_list}
+        query_filter = {"user_id": user_id}
+        if period.active:
+            query_filter["date"] = period.day_filter()
+        availability_list = await availabilities.find(query_filter, projection).sort("date", 1).to_list(length=None)
+        
+        return MongoJSONResponse({"message": f"Disponibilités de l'utilisateur {user_id} récupérées avec succès", "data": availability_list})
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erreur lors de la récupération: {str(e)}")
 
 @router.get("/availabilities/date/{date}")
-async def get_availabilities_by_date(date: str):
+async def get_availabilities_by_date(date: str, projection: dict = Depends(availability_fields)):
     """Récupère les disponibilités pour une date donnée"""
     try:
-        availability_list = []
-        for availability in availabilities.find({"date": date}):
-            availability["_id"] = str(availability["_id"])
-            availability["created_at"] = availability.get("created_at", "").isoformat() if availability.get("created_at") else ""
-            availability["updated_at"] = availability.get("updated_at", "").isoformat() if availability.get("updated_at") else ""
-            availability_list.append(availability)
-        
-        return {"message": f"Disponibilités du {date} récupérées avec succès", "data": availability_list}
+        availability_list = await availabilities.find({"date": date}, projection).to_list(length=None)
+        
+        return MongoJSONResponse({"message": f"Disponibilités du {date} récupérées avec succès", "data": availability_list})
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erreur lors de la récupération: {str(e)}")
 
@@ -373,8 +394,19 @@ async def update_availability(availability_id: str, update_data: dict):
         # Convertir l'ID string en ObjectId
         object_id = ObjectId(availability_id)
         
+        # Date ou heures modifiées : les champs horaires natifs sont recalculés
+        current = None
+        if {"date", "start_time", "end_time"} & update_data.keys():
+            current = await availabilities.find_one({"_id": object_id}, slot_projection("availabilities")) or {}
+            slot = {**current, **update_data}
+            update_data.update(availability_time_fields(slot.get("date"), slot.get("start_time"), slot.get("end_time")))
+            if "start" in update_data and await find_overlap(
+                "availabilities", slot.get("user_id"), update_data["start"], update_data["end"], exclude_id=object_id
+            ):
+                raise HTTPException(status_code=400, detail="Une disponibilité existe déjà pour ce créneau horaire")
+        
         # Mettre à jour la disponibilité
-        result = availabilities.update_one(
+        result = await availabilities.update_one(
             {"_id": object_id},
             {"$set": update_data}
         )
@@ -382,16 +414,15 @@ async def update_availability(availability_id: str, update_data: dict):
         if result.modified_count == 0:
             raise HTTPException(status_code=404, detail="Disponibilité non trouvée ou aucune modification")
         
-        # Récupérer la disponibilité mise à jour
-        updated_availability = availabilities.find_one({"_id": object_id})
-        updated_availability["_id"] = str(updated_availability["_id"])
-        updated_availability["created_at"] = updated_availability.get("created_at", "").isoformat() if updated_availability.get("created_at") else ""
-        updated_availability["updated_at"] = updated_availability.get("updated_at", "").isoformat() if updated_availability.get("updated_at") else ""
-        
-        return {
+        # Récupérer la disponibilité mise à jour ; bitmaps d'occupation des jours de l'ancien et du nouveau créneau
+        updated_availability = await availabilities.find_one({"_id": object_id})
+        await update_free_busy("availabilities", current, updated_availability)
+        return MongoJSONResponse({
             "message": "Disponibilité mise à jour avec succès",
             "data": updated_availability
-        }
+        })
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erreur lors de la mise à jour: {str(e)}")
 
@@ -403,30 +434,26 @@ async def delete_availability(availability_id: str):
         object_id = ObjectId(availability_id)
         
         # Supprimer la disponibilité
-        result = availabilities.delete_one({"_id": object_id})
+        deleted = await availabilities.find_one_and_delete({"_id": object_id}, projection=slot_projection("availabilities"))
         
-        if result.deleted_count == 0:
+        if deleted is None:
             raise HTTPException(status_code=404, detail="Disponibilité non trouvée")
         
+        await update_free_busy("availabilities", deleted)
         return {"message": "Disponibilité supprimée avec succès"}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erreur lors de la suppression: {str(e)}")
 
 @router.get("/availabilities/status/{status}")
-async def get_availabilities_by_status(status: str):
+async def get_availabilities_by_status(status: str, projection: dict = Depends(availability_fields)):
     """Récupère les disponibilités par statut"""
     try:
         allowed_statuses = ["proposé", "validé", "refusé"]
         if status not in allowed_statuses:
             raise HTTPException(status_code=400, detail=f"Statut invalide. Valeurs autorisées: {allowed_statuses}")
         
-        availability_list = []
-        for availability in availabilities.find({"status": status}):
-            availability["_id"] = str(availability["_id"])
-            availability["created_at"] = availability.get("created_at", "").isoformat() if availability.get("created_at") else ""
-            availability["updated_at"] = availability.get("updated_at", "").isoformat() if availability.get("updated_at") else ""
-            availability_list.append(availability)
+        availability_list = await availabilities.find({"status": status}, projection).to_list(length=None)
         
-        return {"message": f"Disponibilités avec le statut '{status}' récupérées avec succès", "data": availability_list}
+        return MongoJSONResponse({"message": f"Disponibilités avec le statut '{status}' récupérées avec succès", "data": availability_list})
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erreur lors de la récupération: {str(e)}")
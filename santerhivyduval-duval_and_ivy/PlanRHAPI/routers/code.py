@@ -1,33 +1,46 @@
 from bson import ObjectId
-from fastapi import HTTPException, APIRouter
+from fastapi import HTTPException, APIRouter, Depends, Query
 from starlette import status
-from crud.code import create_code, delete_code, update_code, generate_code_matricule
+from crud.code import create_code, delete_code, update_code, import_codes
 from database.database import codes
 from schemas.serviceCreate import CodeCreate
 from datetime import datetime
 from fastapi import File, UploadFile
+from jobs import enqueue_upload
+from utils.bulk_import import check_import_mode
 from utils.excel_utils import parse_excel
+from utils.json_response import MongoJSONResponse
+from utils.pagination import PageParams, paginate
+from utils.projection import projection_of
 
 router = APIRouter()
+
+CODE_PROJECTION = projection_of((
+    "name", "name_abrege", "regroupement", "indicator", "begin_date", "end_date",
+    "matricule", "created_at", "updated_at"
+))
        
 @router.post("/codes/upload")
-async def upload_codes(file: UploadFile = File(...)):
+async def upload_codes(
+    file: UploadFile = File(...),
+    background: bool = Query(False, description="Import en arrière-plan : renvoie un job à suivre sur /jobs/{job_id}"),
+    mode: str = Query("insert", description="insert : nouveaux noms uniquement ; upsert : crée ou met à jour selon le nom")
+):
     try:
+        check_import_mode(mode)
+        if background:
+            job = await enqueue_upload("import_codes", file, {"mode": mode})
+            return MongoJSONResponse({"message": "Import planifié", "data": job}, status_code=202)
+
         data = await parse_excel(file)
-        inserted_ids = []
-        for item in data:
-            code_data = {
-                "name": item.get("name"),
-                "localisation": item.get("localisation", ""),
-                "description": item.get("description", ""),
-                "matricule": item.get("matricule", generate_code_matricule),
-                "created_at": datetime.now(),
-                "updated_at": datetime.now()
-            }
-            result = await codes.insert_one(code_data)
-            inserted_ids.append(str(result.inserted_id))
-        
-        return {"message": f"{len(inserted_ids)} chambres créées avec succès", "data": inserted_ids}
+        report = await import_codes(data, mode=mode)
+
+        return {
+            "message": f"{report['inserted']} codes créés, {report['updated']} mis à jour, {report['failed']} ligne(s) en erreur",
+            "data": report
+        }
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=400,
@@ -75,9 +88,9 @@ async def delete(code_id: str):
         )
 
 @router.get("/codes")
-async def get_codes():
+async def get_codes(page: PageParams = Depends()):
     try:
-        code_l = codes.find()
+        code_l, pagination = await paginate(codes, {}, "_id", page, CODE_PROJECTION)
         code_list = [
             {
                 "id": str(code["_id"]),
@@ -92,7 +105,7 @@ async def get_codes():
                 "updated_at": code.get("updated_at", "").isoformat() if code.get("updated_at") else ""
             } for code in code_l
         ]
-        return {"message": "codes récupérés avec succès", "data": code_list}
+        return {"message": "codes récupérés avec succès", "data": code_list, "pagination": pagination}
     except Exception as e:
         raise HTTPException(
             status_code=500,
@@ -102,7 +115,7 @@ async def get_codes():
 @router.get("/codes/{code_id}")
 async def get_code_by_id(code_id: str):
     try:
-        code = codes.find_one({"_id": ObjectId(code_id)})
+        code = await codes.find_one({"_id": ObjectId(code_id)}, CODE_PROJECTION)
         if code:
             code_details = {
                 "id": str(code["_id"]),
@@ -138,13 +151,13 @@ async def update_code(code_id: str, code_info: CodeCreate):
             "updated_at": datetime.now()
         }
         
-        result = codes.update_one(
+        result = await codes.update_one(
             {"_id": ObjectId(code_id)},
             {"$set": code_data}
         )
         
         if result.modified_count == 1:
-            updated_code = codes.find_one({"_id": ObjectId(code_id)})
+            updated_code = await codes.find_one({"_id": ObjectId(code_id)}, CODE_PROJECTION)
             return {
                 "message": "code mis à jour avec succès",
                 "data": {
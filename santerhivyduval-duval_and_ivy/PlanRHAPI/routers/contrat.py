@@ -3,10 +3,15 @@ from fastapi import HTTPException, APIRouter
 from starlette import status
 from crud.contrat import create_contrat, delete_contrat, update_contrat
 from database.database import user_contrat
+from utils.projection import projection_of
 from schemas.contrat import ContratCreate
 
 router = APIRouter()
 
+CONTRAT_PROJECTION = projection_of((
+    "user_id", "start_time", "contrat_type", "contrat_hour_week", "contrat_hour_day", "working_period", "work_days"
+))
+
 @router.post("/contrats/create")
 async def register(contrat_info: ContratCreate):
     try:
@@ -45,7 +50,7 @@ async def delete(contrat_id: str):
 @router.get("/contrats/{contrat_id}")
 async def get_contrat_by_id(contrat_id: str):
     try:
-        contrat = user_contrat.find_one({"_id": ObjectId(contrat_id)})
+        contrat = await user_contrat.find_one({"_id": ObjectId(contrat_id)}, CONTRAT_PROJECTION)
         if contrat:
             contrat_details = {
                 "id": str(contrat["_id"]),
@@ -72,7 +77,7 @@ async def get_contrat_by_id(contrat_id: str):
 @router.get("/contrats/user/{user_id}")
 async def get_contrat_by_user_id(user_id: str):
     try:
-        contrat = user_contrat.find_one({"user_id": user_id})
+        contrat = await user_contrat.find_one({"user_id": user_id}, CONTRAT_PROJECTION)
         if contrat:
             contrat_details = {
                 "id": str(contrat["_id"]),
@@ -0,0 +1,132 @@
+from typing import Optional
+
+from bson import ObjectId
+from fastapi import APIRouter, HTTPException, Query, Depends
+from pydantic import ValidationError
+
+from crud.job import FINISHED_STATUSES, JOB_DONE, JOB_STATUS_PROJECTION, get_job, request_cancel
+from crud.planning import check_generation_options
+from database.database import jobs
+from jobs import HANDLERS, PARAMS_SCHEMAS, UPLOAD_JOB_TYPES, enqueue
+from schemas.job import JobCreate
+from utils.json_response import MongoJSONResponse
+from utils.pagination import PageParams, paginate
+
+router = APIRouter()
+
+
+def validate_job_id(job_id: str):
+    if not ObjectId.is_valid(job_id):
+        raise HTTPException(status_code=400, detail="ID de job invalide")
+
+
+@router.post("/jobs")
+async def create_job(job_data: JobCreate):
+    """
+    POST /jobs
+    Planifie un traitement en arrière-plan (simulation, balayage de détection) et répond immédiatement.
+    Les imports de fichiers passent par leur endpoint d'upload avec ?background=true.
+    """
+    try:
+        if job_data.type not in HANDLERS:
+            raise HTTPException(status_code=400, detail=f"Type de job inconnu. Types disponibles: {', '.join(HANDLERS)}")
+        if job_data.type in UPLOAD_JOB_TYPES:
+            raise HTTPException(status_code=400, detail="Ce job traite un fichier : utiliser l'endpoint d'upload avec ?background=true")
+
+        params = job_data.params
+        schema = PARAMS_SCHEMAS.get(job_data.type)
+        if schema:
+            try:
+                params = schema(**params).dict()
+            except ValidationError as e:
+                raise HTTPException(status_code=400, detail=f"Paramètres invalides: {e}")
+        if job_data.type == "simulation":
+            check_generation_options(params["month"], params["backend"], params["min_staff"], params["time_budget"])
+
+        job = await enqueue(job_data.type, params)
+        return MongoJSONResponse({"message": "Job planifié", "data": job}, status_code=202)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Erreur lors de la création du job: {str(e)}")
+
+
+@router.get("/jobs")
+async def get_jobs(
+    status: Optional[str] = Query(None, description="Statut : en_attente, en_cours, terminé, échoué, annulé"),
+    type: Optional[str] = Query(None, description="Type de job"),
+    page: PageParams = Depends()
+):
+    """
+    GET /jobs
+    Liste des jobs (sans leurs résultats), paginée sur _id
+    """
+    try:
+        query_filter = {}
+        if status:
+            query_filter["status"] = status
+        if type:
+            query_filter["type"] = type
+        job_list, pagination = await paginate(jobs, query_filter, "_id", page, JOB_STATUS_PROJECTION)
+        return MongoJSONResponse({"message": "Jobs récupérés avec succès", "data": job_list, "pagination": pagination})
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Erreur lors de la récupération: {str(e)}")
+
+
+@router.get("/jobs/{job_id}")
+async def get_job_status(job_id: str):
+    """
+    GET /jobs/{job_id}
+    Statut et progression d'un job
+    """
+    try:
+        validate_job_id(job_id)
+        job = await get_job(job_id)
+        if not job:
+            raise HTTPException(status_code=404, detail="Job non trouvé")
+        return MongoJSONResponse({"message": "Job récupéré avec succès", "data": job})
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Erreur lors de la récupération: {str(e)}")
+
+
+@router.get("/jobs/{job_id}/result")
+async def get_job_result(job_id: str):
+    """
+    GET /jobs/{job_id}/result
+    Résultat d'un job terminé (ou son erreur) ; 409 tant que le job n'est pas fini
+    """
+    try:
+        validate_job_id(job_id)
+        job = await get_job(job_id, {"status": 1, "type": 1, "result": 1, "error": 1, "finished_at": 1})
+        if not job:
+            raise HTTPException(status_code=404, detail="Job non trouvé")
+        if job["status"] not in FINISHED_STATUSES:
+            raise HTTPException(status_code=409, detail=f"Job non terminé (statut: {job['status']})")
+        message = "Résultat du job récupéré avec succès" if job["status"] == JOB_DONE else f"Job {job['status']}"
+        return MongoJSONResponse({"message": message, "data": job})
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Erreur lors de la récupération: {str(e)}")
+
+
+@router.post("/jobs/{job_id}/cancel")
+async def cancel_job(job_id: str):
+    """
+    POST /jobs/{job_id}/cancel
+    Annule un job en attente, ou demande l'arrêt d'un job en cours (pris en compte au prochain signal de vie)
+    """
+    try:
+        validate_job_id(job_id)
+        job = await request_cancel(job_id)
+        if not job:
+            raise HTTPException(status_code=404, detail="Job non trouvé")
+        if job["status"] in FINISHED_STATUSES and not job.get("cancel_requested"):
+            raise HTTPException(status_code=409, detail=f"Job déjà terminé (statut: {job['status']})")
+        return MongoJSONResponse({"message": "Annulation demandée", "data": job})
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Erreur lors de l'annulation: {str(e)}")
@@ -0,0 +1,48 @@
+from fastapi import APIRouter, HTTPException
+
+from database.database import client_settings, pool_metrics, get_database
+from database.indexes import ensure_indexes, index_drift
+
+router = APIRouter()
+
+
+@router.get("/monitoring/mongo-pool")
+async def get_mongo_pool_metrics():
+    """Métriques du pool de connexions MongoDB du worker courant"""
+    try:
+        return {
+            "message": "Métriques du pool MongoDB récupérées avec succès",
+            "data": {
+                "settings": client_settings(),
+                "metrics": pool_metrics.snapshot()
+            }
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/monitoring/mongo-pool/reset")
+async def reset_mongo_pool_metrics():
+    """Remet à zéro les compteurs (avant une campagne de charge par exemple)"""
+    pool_metrics.reset()
+    return {"message": "Métriques du pool MongoDB réinitialisées"}
+
+
+@router.get("/monitoring/indexes")
+async def get_index_drift():
+    """Écarts entre les index déclarés et les index présents en base"""
+    try:
+        drift = await index_drift(get_database())
+        return {"message": "Écarts d'index récupérés avec succès", "data": drift}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/monitoring/indexes/ensure")
+async def apply_indexes():
+    """Applique le registre d'index (idempotent)"""
+    try:
+        created, errors = await ensure_indexes(get_database())
+        return {"message": "Index appliqués", "data": {"created": created, "errors": errors}}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
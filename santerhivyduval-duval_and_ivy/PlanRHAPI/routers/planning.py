@@ -1,22 +1,52 @@
-from fastapi import APIRouter, HTTPException, Query
+from fastapi import APIRouter, HTTPException, Query, Depends, Request
 from bson import ObjectId
 from typing import List, Optional
 from datetime import datetime
-import os
-from pymongo import MongoClient
-from schemas.planning import PlanningCreate, PlanningUpdate
+from crud.planning import (
+    check_generation_options, generate_service_planning, simulate_services,
+    get_planning_stats as planning_stats_summary
+)
+from crud.compliance import refresh_agent_weeks
+from crud.free_busy import update_free_busy
+from crud.hour_totals import HOUR_TOTALS_PROJECTION, TOTAL_PERIODS, get_hour_total, update_hour_totals
+from crud.overlap import find_overlap
+from jobs import enqueue
+from database.database import db, plannings, users, weekly_compliance
+from schemas.job import ComplianceRefresh, HourTotalsRebuild
+from scheduling.compliance import COMPLIANCE_RULES, is_worked
+from schemas.planning import PlanningCreate, PlanningUpdate, PlanningGenerate, PlanningSimulation
+from utils.date_range import DateRange
+from utils.json_response import MongoJSONResponse
+from utils.pagination import PageParams, paginate, sort_spec
+from utils.projection import EXISTS_PROJECTION, sparse_fields
+from utils.streaming import stream_media_type, stream_cursor, stream_events
+from utils.time_fields import TIME_FIELDS, planning_time_fields
+from utils.user_lookup import attach_user_info
 
-# Configuration de la base de données
-MONGO_URI = os.getenv('MONGO_URI', 'mongodb://localhost:27017/')
-DATABASE_NAME = os.getenv('DATABASE_NAME', 'planRhIA')
+router = APIRouter()
 
-client = MongoClient(MONGO_URI)
-db = client[DATABASE_NAME]
+PLANNING_FIELDS = (
+    "user_id", "date", "activity_code", "plage_horaire", "commentaire",
+    "validated_by", "generated", "created_at", "updated_at"
+)
+# user_id est toujours lu : il sert à la jointure avec les utilisateurs ; les champs horaires natifs sur demande
+planning_fields = sparse_fields((*PLANNING_FIELDS, *TIME_FIELDS), default_fields=PLANNING_FIELDS, required_fields=("user_id",))
 
-# Collection des plannings
-plannings = db['plannings']
 
-router = APIRouter()
+def validate_date_format(date_str: str) -> bool:
+    """
+    Valide le format de date YYYY-MM-DD
+    """
+    try:
+        datetime.strptime(date_str, '%Y-%m-%d')
+        return True
+    except ValueError:
+        return False
+
+
+async def with_user_info(batch):
+    """Ajoute les informations utilisateur à un lot de plannings, en une requête par lot"""
+    return await attach_user_info(batch, db['users'])
 
 # =============================================================================
 # ENDPOINTS CRUD POUR LES PLANNINGS VALIDÉS - TÂCHE 1.2.3
@@ -33,13 +63,18 @@ async def create_planning(planning_data: PlanningCreate):
         planning_dict = planning_data.dict()
         planning_dict["created_at"] = datetime.now()
         planning_dict["updated_at"] = datetime.now()
+        planning_dict.update(planning_time_fields(planning_dict["date"], planning_dict["plage_horaire"]))
         
-        # Vérifier qu'il n'y a pas de conflit de créneaux pour le même utilisateur et la même date
-        existing = plannings.find_one({
-            "user_id": planning_dict["user_id"],
-            "date": planning_dict["date"],
-            "plage_horaire": planning_dict["plage_horaire"]
-        })
+        # Vérifier qu'aucun planning travaillé de l'utilisateur ne chevauche le créneau (nuit de la veille comprise) ;
+        # un repos ou un congé (journée entière) n'est refusé qu'en double
+        if is_worked(planning_dict):
+            existing = await find_overlap("plannings", planning_dict["user_id"], planning_dict["start"], planning_dict["end"])
+        else:
+            existing = await plannings.find_one({
+                "user_id": planning_dict["user_id"],
+                "date": planning_dict["date"],
+                "plage_horaire": planning_dict["plage_horaire"]
+            }, EXISTS_PROJECTION)
         
         if existing:
             raise HTTPException(
@@ -48,9 +83,13 @@ async def create_planning(planning_data: PlanningCreate):
             )
         
         # Insérer dans MongoDB
-        result = plannings.insert_one(planning_dict)
+        result = await plannings.insert_one(planning_dict)
+        # Conformité hebdomadaire : seule la semaine de l'agent est recalculée
+        await refresh_agent_weeks(planning_dict["user_id"], planning_dict["date"])
+        await update_hour_totals(added=[planning_dict])
+        await update_free_busy("plannings", planning_dict)
         
-        return {
+        return MongoJSONResponse({
             "message": "Planning créé avec succès",
             "data": {
                 "id": str(result.inserted_id),
@@ -60,22 +99,97 @@ async def create_planning(planning_data: PlanningCreate):
                 "plage_horaire": planning_dict["plage_horaire"],
                 "created_at": planning_dict["created_at"].isoformat()
             }
-        }
+        })
     except HTTPException:
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erreur lors de la création: {str(e)}")
 
+@router.post("/plannings/generate")
+async def generate_plannings(generate_data: PlanningGenerate):
+    """
+    POST /plannings/generate
+    Génère automatiquement le planning d'un mois pour tout un service à partir des contrats
+    (heures hebdomadaires, jours de repos fixes), des disponibilités validées et des absences.
+    Avec backend ("auto", "annealing", "ilp"), le planning est optimisé dans time_budget secondes
+    pour respecter l'effectif minimal par créneau (min_staff) ; le rapport détaille l'objectif
+    et sa progression dans le temps.
+    """
+    try:
+        check_generation_options(generate_data.month, generate_data.backend, generate_data.min_staff, generate_data.time_budget)
+        
+        result = await generate_service_planning(
+            generate_data.service_id,
+            generate_data.year,
+            generate_data.month,
+            overwrite=generate_data.overwrite,
+            dry_run=generate_data.dry_run,
+            backend=generate_data.backend,
+            time_budget=generate_data.time_budget,
+            min_staff=generate_data.min_staff
+        )
+        if not result["agents"]:
+            raise HTTPException(status_code=404, detail="Aucun agent trouvé pour ce service")
+        
+        message = "Planning simulé avec succès" if generate_data.dry_run else "Planning généré avec succès"
+        return MongoJSONResponse({"message": message, "data": result})
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Erreur lors de la génération: {str(e)}")
+
+@router.post("/plannings/simulate")
+async def simulate_plannings(
+    simulation_data: PlanningSimulation,
+    background: bool = Query(False, description="Simulation en arrière-plan : renvoie un job à suivre sur /jobs/{job_id}")
+):
+    """
+    POST /plannings/simulate
+    Simule le planning d'un mois pour plusieurs services (tous par défaut), avec le contrat actuel
+    ou un contrat personnalisé. Les services sont générés en parallèle dans le pool de processus,
+    sans bloquer les autres requêtes ; la progression est renvoyée en flux NDJSON
+    (événements start, service, written, done).
+    Avec ?background=true, la simulation devient un job : réponse immédiate, suivi sur /jobs/{job_id}.
+    """
+    try:
+        check_generation_options(simulation_data.month, simulation_data.backend, simulation_data.min_staff, simulation_data.time_budget)
+        if background:
+            job = await enqueue("simulation", simulation_data.dict())
+            return MongoJSONResponse({"message": "Simulation planifiée", "data": job}, status_code=202)
+
+        return stream_events(simulate_services(
+            simulation_data.year,
+            simulation_data.month,
+            service_ids=simulation_data.service_ids,
+            contrat_override=simulation_data.contrat,
+            overwrite=simulation_data.overwrite,
+            dry_run=simulation_data.dry_run,
+            backend=simulation_data.backend,
+            time_budget=simulation_data.time_budget,
+            min_staff=simulation_data.min_staff
+        ))
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Erreur lors de la simulation: {str(e)}")
+
 @router.get("/plannings")
 async def get_all_plannings(
+    request: Request,
     user_id: Optional[str] = Query(None, description="ID de l'utilisateur"),
     date: Optional[str] = Query(None, description="Date spécifique (YYYY-MM-DD)"),
     activity_code: Optional[str] = Query(None, description="Code d'activité"),
-    service_id: Optional[str] = Query(None, description="ID du service")
+    service_id: Optional[str] = Query(None, description="ID du service"),
+    stream: bool = Query(False, description="Exporter tous les plannings en flux, sans pagination"),
+    period: DateRange = Depends(),
+    page: PageParams = Depends(),
+    projection: dict = Depends(planning_fields)
 ):
     """
     GET /plannings
-    Récupère les plannings avec filtres optionnels
+    Récupère les plannings avec filtres optionnels, paginés sur (date, _id).
+    ?from=&to= restreint à une période (semaine, mois, année) ; ?date= reste prioritaire.
+    Avec Accept: application/x-ndjson (ou ?stream=true), renvoie l'export complet en flux.
     """
     try:
         # Construire le filtre de requête
@@ -86,6 +200,8 @@ async def get_all_plannings(
         
         if date:
             query_filter["date"] = date
+        elif period.active:
+            query_filter["date"] = period.day_filter()
         
         if activity_code:
             query_filter["activity_code"] = activity_code
@@ -93,36 +209,35 @@ async def get_all_plannings(
         if service_id:
             # Récupérer les utilisateurs du service
             users_collection = db['users']
-            service_users = users_collection.find({"service_id": service_id})
-            user_ids = [str(user["_id"]) for user in service_users]
+            service_users = users_collection.find({"service_id": service_id}, {"_id": 1})
+            user_ids = [str(user["_id"]) async for user in service_users]
             query_filter["user_id"] = {"$in": user_ids}
         
-        # Récupérer les plannings avec le filtre
-        planning_list = []
-        for planning in plannings.find(query_filter).sort("date", 1):
-            planning["_id"] = str(planning["_id"])
-            planning["created_at"] = planning.get("created_at", "").isoformat() if planning.get("created_at") else ""
-            planning["updated_at"] = planning.get("updated_at", "").isoformat() if planning.get("updated_at") else ""
-            
-            # Ajouter les informations de l'utilisateur
-            user_info = db['users'].find_one({"_id": ObjectId(planning["user_id"])})
-            if user_info:
-                planning["user_name"] = f"{user_info.get('first_name', '')} {user_info.get('last_name', '')}"
-                planning["user_matricule"] = user_info.get('matricule', '')
-            
-            planning_list.append(planning)
+        # Export en flux : le curseur est lu par lots, la mémoire reste bornée
+        media_type = stream_media_type(request, stream)
+        if media_type:
+            cursor = plannings.find(query_filter, projection).sort(sort_spec("date"))
+            return stream_cursor(cursor, media_type, transform=with_user_info)
+        
+        # Récupérer la page de plannings avec le filtre
+        planning_page, pagination = await paginate(plannings, query_filter, "date", page, projection)
         
-        return {
+        # Ajouter les informations des utilisateurs en une seule requête
+        planning_list = await with_user_info(planning_page)
+        
+        return MongoJSONResponse({
             "message": "Plannings récupérés avec succès",
             "data": planning_list,
             "count": len(planning_list),
+            "pagination": pagination,
             "filters": {
                 "user_id": user_id,
                 "date": date,
                 "activity_code": activity_code,
-                "service_id": service_id
+                "service_id": service_id,
+                **period.to_dict()
             }
-        }
+        })
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erreur lors de la récupération: {str(e)}")
 
@@ -133,108 +248,81 @@ async def get_planning_by_id(planning_id: str):
     Récupère un planning par son ID
     """
     try:
-        planning = plannings.find_one({"_id": ObjectId(planning_id)})
+        planning = await plannings.find_one({"_id": ObjectId(planning_id)})
         if planning:
-            planning["_id"] = str(planning["_id"])
-            planning["created_at"] = planning.get("created_at", "").isoformat() if planning.get("created_at") else ""
-            planning["updated_at"] = planning.get("updated_at", "").isoformat() if planning.get("updated_at") else ""
-            
             # Ajouter les informations de l'utilisateur
-            user_info = db['users'].find_one({"_id": ObjectId(planning["user_id"])})
-            if user_info:
-                planning["user_name"] = f"{user_info.get('first_name', '')} {user_info.get('last_name', '')}"
-                planning["user_matricule"] = user_info.get('matricule', '')
+            await attach_user_info([planning], db['users'])
             
-            return {"message": "Planning récupéré avec succès", "data": planning}
+            return MongoJSONResponse({"message": "Planning récupéré avec succès", "data": planning})
         else:
             raise HTTPException(status_code=404, detail="Planning non trouvé")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erreur lors de la récupération: {str(e)}")
 
 @router.get("/plannings/user/{user_id}")
-async def get_plannings_by_user(user_id: str):
+async def get_plannings_by_user(
+    user_id: str,
+    period: DateRange = Depends(),
+    projection: dict = Depends(planning_fields)
+):
     """
-    GET /plannings/user/{user_id}
-    Récupère les plannings d'un utilisateur
+    GET /plannings/user/{user_id}?from=&to=
+    Récupère les plannings d'un utilisateur, éventuellement sur une période (index (user_id, date))
     """
     try:
-        planning_list = []
-        for planning in plannings.find({"user_id": user_id}).sort("date", 1):
-            planning["_id"] = str(planning["_id"])
-            planning["created_at"] = planning.get("created_at", "").isoformat() if planning.get("created_at") else ""
-            planning["updated_at"] = planning.get("updated_at", "").isoformat() if planning.get("updated_at") else ""
-            
-            # Ajouter les informations de l'utilisateur
-            user_info = db['users'].find_one({"_id": ObjectId(planning["user_id"])})
-            if user_info:
-                planning["user_name"] = f"{user_info.get('first_name', '')} {user_info.get('last_name', '')}"
-                planning["user_matricule"] = user_info.get('matricule', '')
-            
-            planning_list.append(planning)
+        query_filter = {"user_id": user_id}
+        if period.active:
+            query_filter["date"] = period.day_filter()
+        planning_list = await plannings.find(query_filter, projection).sort("date", 1).to_list(length=None)
+        
+        # Ajouter les informations des utilisateurs en une seule requête
+        await attach_user_info(planning_list, db['users'])
         
-        return {
+        return MongoJSONResponse({
             "message": f"Plannings de l'utilisateur {user_id} récupérés avec succès",
             "data": planning_list,
             "count": len(planning_list)
-        }
+        })
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erreur lors de la récupération: {str(e)}")
 
 @router.get("/plannings/date/{date}")
-async def get_plannings_by_date(date: str):
+async def get_plannings_by_date(date: str, projection: dict = Depends(planning_fields)):
     """
     GET /plannings/date/{date}
     Récupère les plannings pour une date donnée
     """
     try:
-        planning_list = []
-        for planning in plannings.find({"date": date}).sort("plage_horaire", 1):
-            planning["_id"] = str(planning["_id"])
-            planning["created_at"] = planning.get("created_at", "").isoformat() if planning.get("created_at") else ""
-            planning["updated_at"] = planning.get("updated_at", "").isoformat() if planning.get("updated_at") else ""
-            
-            # Ajouter les informations de l'utilisateur
-            user_info = db['users'].find_one({"_id": ObjectId(planning["user_id"])})
-            if user_info:
-                planning["user_name"] = f"{user_info.get('first_name', '')} {user_info.get('last_name', '')}"
-                planning["user_matricule"] = user_info.get('matricule', '')
-            
-            planning_list.append(planning)
+        planning_list = await plannings.find({"date": date}, projection).sort("plage_horaire", 1).to_list(length=None)
+        
+        # Ajouter les informations des utilisateurs en une seule requête
+        await attach_user_info(planning_list, db['users'])
         
-        return {
+        return MongoJSONResponse({
             "message": f"Plannings du {date} récupérés avec succès",
             "data": planning_list,
             "count": len(planning_list)
-        }
+        })
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erreur lors de la récupération: {str(e)}")
 
 @router.get("/plannings/activity/{activity_code}")
-async def get_plannings_by_activity(activity_code: str):
+async def get_plannings_by_activity(activity_code: str, projection: dict = Depends(planning_fields)):
     """
     GET /plannings/activity/{activity_code}
     Récupère les plannings par code d'activité
     """
     try:
-        planning_list = []
-        for planning in plannings.find({"activity_code": activity_code}).sort("date", 1):
-            planning["_id"] = str(planning["_id"])
-            planning["created_at"] = planning.get("created_at", "").isoformat() if planning.get("created_at") else ""
-            planning["updated_at"] = planning.get("updated_at", "").isoformat() if planning.get("updated_at") else ""
-            
-            # Ajouter les informations de l'utilisateur
-            user_info = db['users'].find_one({"_id": ObjectId(planning["user_id"])})
-            if user_info:
-                planning["user_name"] = f"{user_info.get('first_name', '')} {user_info.get('last_name', '')}"
-                planning["user_matricule"] = user_info.get('matricule', '')
-            
-            planning_list.append(planning)
+        planning_list = await plannings.find({"activity_code": activity_code}, projection).sort("date", 1).to_list(length=None)
         
-        return {
+        # Ajouter les informations des utilisateurs en une seule requête
+        await attach_user_info(planning_list, db['users'])
+        
+        return MongoJSONResponse({
             "message": f"Plannings avec l'activité '{activity_code}' récupérés avec succès",
             "data": planning_list,
             "count": len(planning_list)
-        }
+        })
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erreur lors de la récupération: {str(e)}")
 
@@ -249,7 +337,7 @@ async def update_planning(planning_id: str, update_data: PlanningUpdate):
         object_id = ObjectId(planning_id)
         
         # Vérifier que le planning existe
-        existing_planning = plannings.find_one({"_id": object_id})
+        existing_planning = await plannings.find_one({"_id": object_id}, HOUR_TOTALS_PROJECTION)
         if not existing_planning:
             raise HTTPException(status_code=404, detail="Planning non trouvé")
         
@@ -263,12 +351,17 @@ async def update_planning(planning_id: str, update_data: PlanningUpdate):
         
         if update_data.plage_horaire:
             update_fields["plage_horaire"] = update_data.plage_horaire
+            update_fields.update(planning_time_fields(existing_planning.get("date"), update_data.plage_horaire))
+            if is_worked({**existing_planning, **update_fields}) and await find_overlap(
+                "plannings", existing_planning.get("user_id"), update_fields["start"], update_fields["end"], exclude_id=object_id
+            ):
+                raise HTTPException(status_code=400, detail="Un planning existe déjà pour ce créneau horaire")
         
         if update_data.commentaire is not None:
             update_fields["commentaire"] = update_data.commentaire
         
         # Mettre à jour le planning
-        result = plannings.update_one(
+        result = await plannings.update_one(
             {"_id": object_id},
             {"$set": update_fields}
         )
@@ -276,21 +369,22 @@ async def update_planning(planning_id: str, update_data: PlanningUpdate):
         if result.modified_count == 0:
             raise HTTPException(status_code=404, detail="Aucune modification effectuée")
         
+        await refresh_agent_weeks(existing_planning.get("user_id"), existing_planning.get("date"))
+        
         # Récupérer le planning mis à jour
-        updated_planning = plannings.find_one({"_id": object_id})
-        updated_planning["_id"] = str(updated_planning["_id"])
-        updated_planning["created_at"] = updated_planning.get("created_at", "").isoformat() if updated_planning.get("created_at") else ""
-        updated_planning["updated_at"] = updated_planning.get("updated_at", "").isoformat() if updated_planning.get("updated_at") else ""
+        updated_planning = await plannings.find_one({"_id": object_id})
+        # Totaux d'heures : l'ancienne version du planning est retirée, la nouvelle ajoutée
+        await update_hour_totals(removed=[existing_planning], added=[updated_planning])
+        # Bitmaps d'occupation : jours de l'ancienne et de la nouvelle version
+        await update_free_busy("plannings", existing_planning, updated_planning)
         
         # Ajouter les informations de l'utilisateur
-        user_info = db['users'].find_one({"_id": ObjectId(updated_planning["user_id"])})
-        if user_info:
-            updated_planning["user_name"] = f"{user_info.get('first_name', '')} {user_info.get('last_name', '')}"
+        await attach_user_info([updated_planning], db['users'], with_matricule=False)
         
-        return {
+        return MongoJSONResponse({
             "message": "Planning mis à jour avec succès",
             "data": updated_planning
-        }
+        })
     except HTTPException:
         raise
     except Exception as e:
@@ -307,59 +401,138 @@ async def delete_planning(planning_id: str):
         object_id = ObjectId(planning_id)
         
         # Supprimer le planning
-        result = plannings.delete_one({"_id": object_id})
+        deleted = await plannings.find_one_and_delete({"_id": object_id}, projection=HOUR_TOTALS_PROJECTION)
         
-        if result.deleted_count == 0:
+        if deleted is None:
             raise HTTPException(status_code=404, detail="Planning non trouvé")
         
+        await refresh_agent_weeks(deleted.get("user_id"), deleted.get("date"))
+        await update_hour_totals(removed=[deleted])
+        await update_free_busy("plannings", deleted)
+        
         return {"message": "Planning supprimé avec succès"}
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erreur lors de la suppression: {str(e)}")
 
 @router.get("/plannings/stats/summary")
-async def get_planning_stats():
+async def get_planning_stats(
+    start_date: Optional[str] = Query(None, description="Date de début (YYYY-MM-DD)"),
+    end_date: Optional[str] = Query(None, description="Date de fin (YYYY-MM-DD)"),
+    service_id: Optional[str] = Query(None, description="ID du service"),
+    by_service: bool = Query(False, description="Inclure la répartition par service")
+):
     """
     GET /plannings/stats/summary
-    Récupère des statistiques sur les plannings
+    Récupère des statistiques sur les plannings, calculées en une seule agrégation ($facet).
+    Les codes d'activité sont ceux de la collection des codes.
     """
     try:
-        # Statistiques générales
-        total_plannings = plannings.count_documents({})
-        
-        # Statistiques par code d'activité
-        activity_stats = {}
-        activities = ["SOIN", "CONGÉ", "REPOS", "FORMATION", "ADMINISTRATIF"]
-        
-        for activity in activities:
-            count = plannings.count_documents({"activity_code": activity})
-            activity_stats[activity] = count
+        for value in (start_date, end_date):
+            if value and not validate_date_format(value):
+                raise HTTPException(status_code=400, detail=f"Date invalide: {value}. Format attendu: YYYY-MM-DD")
         
-        # Statistiques par date (7 derniers jours)
-        from datetime import date, timedelta
-        today = date.today()
-        date_stats = {}
+        stats = await planning_stats_summary(start_date, end_date, service_id, by_service)
         
-        for i in range(7):
-            current_date = today + timedelta(days=i)
-            date_str = current_date.strftime("%Y-%m-%d")
-            count = plannings.count_documents({"date": date_str})
-            date_stats[date_str] = count
-        
-        return {
+        return MongoJSONResponse({
             "message": "Statistiques des plannings récupérées avec succès",
-            "data": {
-                "total_plannings": total_plannings,
-                "by_activity": activity_stats,
-                "by_date": date_stats
-            }
-        }
+            "data": stats
+        })
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erreur lors de la récupération des statistiques: {str(e)}")
 
+@router.get("/plannings/compliance/weekly")
+async def get_weekly_compliance(
+    user_id: Optional[str] = Query(None, description="ID de l'agent"),
+    service_id: Optional[str] = Query(None, description="ID du service"),
+    violations_only: bool = Query(False, description="Seulement les semaines non conformes"),
+    period: DateRange = Depends(),
+    page: PageParams = Depends()
+):
+    """
+    GET /plannings/compliance/weekly?user_id=X&from=&to=
+    Bilans de conformité par agent et par semaine ISO (heures du contrat, jours travaillés, repos),
+    tenus à jour à chaque écriture de planning
+    """
+    try:
+        query_filter = period.overlap_filter("week_start", "week_end")
+        if user_id:
+            query_filter["user_id"] = user_id
+        elif service_id:
+            service_users = users.find({"service_id": service_id}, EXISTS_PROJECTION)
+            query_filter["user_id"] = {"$in": [str(user["_id"]) async for user in service_users]}
+        if violations_only:
+            # Filtre multiclé servi par l'index (violations, week_start)
+            query_filter["violations"] = {"$in": list(COMPLIANCE_RULES)}
 
+        weeks, pagination = await paginate(weekly_compliance, query_filter, "week_start", page, None)
+        return MongoJSONResponse({
+            "message": "Bilans de conformité récupérés avec succès",
+            "data": weeks,
+            "pagination": pagination
+        })
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Erreur lors de la récupération de la conformité: {str(e)}")
 
+@router.post("/plannings/compliance/refresh")
+async def refresh_weekly_compliance(refresh_data: ComplianceRefresh):
+    """
+    POST /plannings/compliance/refresh
+    Reconstruit en arrière-plan les bilans de conformité et les anomalies associées sur la période
+    (reprise de l'existant, plannings écrits par la simulation) ; suivi sur /jobs/{job_id}
+    """
+    try:
+        for value in (refresh_data.start_date, refresh_data.end_date):
+            if value and not validate_date_format(value):
+                raise HTTPException(status_code=400, detail=f"Date invalide: {value}. Format attendu: YYYY-MM-DD")
+        job = await enqueue("compliance", refresh_data.dict())
+        return MongoJSONResponse({"message": "Recalcul de conformité planifié", "data": job}, status_code=202)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Erreur lors de la planification du recalcul: {str(e)}")
 
+@router.get("/plannings/totals/{user_id}")
+async def get_hour_totals(
+    user_id: str,
+    period: str = Query("week", description="Période : week ou month"),
+    day: Optional[str] = Query(None, description="Jour de la semaine / du mois (YYYY-MM-DD), aujourd'hui par défaut")
+):
+    """
+    GET /plannings/totals/{user_id}?period=week&day=YYYY-MM-DD
+    Heures travaillées d'un agent sur la semaine ISO ou le mois contenant day (tableaux de bord, soldes).
+    Lecture d'un seul total matérialisé, sans parcours des plannings.
+    """
+    try:
+        if period not in TOTAL_PERIODS:
+            raise HTTPException(status_code=400, detail=f"Période invalide. Périodes disponibles: {', '.join(TOTAL_PERIODS)}")
+        if day and not validate_date_format(day):
+            raise HTTPException(status_code=400, detail="Format de date invalide. Utilisez YYYY-MM-DD")
+        total = await get_hour_total(user_id, period, day or datetime.now().date())
+        return MongoJSONResponse({"message": "Total d'heures récupéré avec succès", "data": total})
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Erreur lors de la récupération des totaux: {str(e)}")
 
-
-
-
+@router.post("/plannings/totals/rebuild")
+async def rebuild_hour_totals(rebuild_data: HourTotalsRebuild):
+    """
+    POST /plannings/totals/rebuild
+    Reconstruit en arrière-plan les totaux d'heures depuis les plannings (réconciliation) ; suivi sur /jobs/{job_id}
+    """
+    try:
+        for value in (rebuild_data.start_date, rebuild_data.end_date):
+            if value and not validate_date_format(value):
+                raise HTTPException(status_code=400, detail=f"Date invalide: {value}. Format attendu: YYYY-MM-DD")
+        job = await enqueue("hour_totals", rebuild_data.dict())
+        return MongoJSONResponse({"message": "Reconstruction des totaux d'heures planifiée", "data": job}, status_code=202)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Erreur lors de la planification de la reconstruction: {str(e)}")
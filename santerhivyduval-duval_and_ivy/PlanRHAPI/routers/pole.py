@@ -1,32 +1,43 @@
 from bson import ObjectId
-from fastapi import HTTPException, APIRouter
+from fastapi import HTTPException, APIRouter, Depends, Query
 from starlette import status
-from crud.pole import create_poll, delete_poll, update_poll, generate_poll_matricule
+from crud.pole import create_poll, delete_poll, update_poll, import_polls
 from database.database import polls
 from schemas.serviceCreate import PoleCreate
 from datetime import datetime
 from fastapi import File, UploadFile
+from jobs import enqueue_upload
+from utils.bulk_import import check_import_mode
 from utils.excel_utils import parse_excel
+from utils.json_response import MongoJSONResponse
+from utils.pagination import PageParams, paginate
+from utils.projection import projection_of
 
 router = APIRouter()
+
+POLL_PROJECTION = projection_of(("name", "head", "specialities", "matricule", "created_at", "updated_at"))
      
 @router.post("/polls/upload")
-async def upload_polls(file: UploadFile = File(...)):
+async def upload_polls(
+    file: UploadFile = File(...),
+    background: bool = Query(False, description="Import en arrière-plan : renvoie un job à suivre sur /jobs/{job_id}"),
+    mode: str = Query("insert", description="insert : nouveaux noms uniquement ; upsert : crée ou met à jour selon le nom")
+):
     try:
+        check_import_mode(mode)
+        if background:
+            job = await enqueue_upload("import_polls", file, {"mode": mode})
+            return MongoJSONResponse({"message": "Import planifié", "data": job}, status_code=202)
+
         data = await parse_excel(file)
-        inserted_ids = []
-        for item in data:
-            pole_data = {
-                "name": item.get("name"),
-                "head": item.get("head", ""),
-                "matricule": item.get("matricule", generate_poll_matricule),
-                "created_at": datetime.now(),
-                "updated_at": datetime.now()
-            }
-            result = await polls.insert_one(pole_data)
-            inserted_ids.append(str(result.inserted_id))
-        
-        return {"message": f"{len(inserted_ids)} pôles créés avec succès", "data": inserted_ids}
+        report = await import_polls(data, mode=mode)
+
+        return {
+            "message": f"{report['inserted']} pôles créés, {report['updated']} mis à jour, {report['failed']} ligne(s) en erreur",
+            "data": report
+        }
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=400,
@@ -73,9 +84,9 @@ async def delete(poll_id: str):
         )
 
 @router.get("/polls")
-async def get_polls():
+async def get_polls(page: PageParams = Depends()):
     try:
-        poll_l = polls.find()
+        poll_l, pagination = await paginate(polls, {}, "_id", page, POLL_PROJECTION)
         poll_list = [
             {
                 "id": str(poll["_id"]),
@@ -87,7 +98,7 @@ async def get_polls():
                 "updated_at": poll.get("updated_at", "").isoformat() if poll.get("updated_at") else ""
             } for poll in poll_l
         ]
-        return {"message": "polls récupérés avec succès", "data": poll_list}
+        return {"message": "polls récupérés avec succès", "data": poll_list, "pagination": pagination}
     except Exception as e:
         raise HTTPException(
             status_code=500,
@@ -97,7 +108,7 @@ async def get_polls():
 @router.get("/polls/{poll_id}")
 async def get_poll_by_id(poll_id: str):
     try:
-        poll = polls.find_one({"_id": ObjectId(poll_id)})
+        poll = await polls.find_one({"_id": ObjectId(poll_id)}, POLL_PROJECTION)
         if poll:
             poll_details = {
                 "id": str(poll["_id"]),
@@ -127,13 +138,13 @@ async def update_poll(poll_id: str, poll_info: PoleCreate):
             "updated_at": datetime.now()
         }
         
-        result = polls.update_one(
+        result = await polls.update_one(
             {"_id": ObjectId(poll_id)},
             {"$set": poll_data}
         )
         
         if result.modified_count == 1:
-            updated_poll = polls.find_one({"_id": ObjectId(poll_id)})
+            updated_poll = await polls.find_one({"_id": ObjectId(poll_id)}, POLL_PROJECTION)
             return {
                 "message": "poll mis à jour avec succès",
                 "data": {
@@ -1,21 +1,30 @@
+from typing import Optional
+
 from bson import ObjectId
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Depends, File, Query, UploadFile
 from starlette import status
 
-from database.database import programs
+from database.database import programs, program_days
+from jobs import enqueue, enqueue_upload
 from schemas.AgentPlan import AgentPlan
+from utils.bulk_import import check_import_mode
+from utils.json_response import MongoJSONResponse
+from utils.pagination import PageParams, paginate
+from utils.projection import sparse_fields
 
 router = APIRouter()
 
+# La grille annuelle (data) est volumineuse : elle n'est renvoyée par la liste que sur demande (?fields=name,data)
+program_fields = sparse_fields(("name", "data"), default_fields=("name",))
+
 # Route qui récupère tous les patients de la base de donnée
 @router.get("/programs")
-async def get_programs():
+async def get_programs(projection: dict = Depends(program_fields)):
     try:
-        annual_programs = programs.find()
+        annual_programs = programs.find({}, projection)
         programs_list = [
-            {"id": str(program["_id"],), "name": program["name"], "data": program["data"]
-             } for
-            program in annual_programs]
+            {"id": str(program["_id"]), **{field: program.get(field) for field in projection if field != "_id"}}
+            async for program in annual_programs]
         return {"message" : "Plannings recupérés avec succès", "data": programs_list}
     except Exception as e:
         return HTTPException(
@@ -23,11 +32,69 @@ async def get_programs():
             detail=f"Erreur interne du serveur: {str(e)}",
         )
 
+# Import du fichier Excel des programmes annuels : traitement en arrière-plan, suivi sur /jobs/{job_id}
+@router.post("/programs/upload")
+async def upload_programs(
+    file: UploadFile = File(...),
+    mode: str = Query("insert", description="insert : nouveaux agents uniquement ; upsert : remplace aussi les programmes existants"),
+    year: Optional[int] = Query(None, ge=2000, le=2100, description="Année des grilles (par défaut déduite des jours de la semaine)")
+):
+    try:
+        check_import_mode(mode)
+        job = await enqueue_upload("import_annual_program", file, {"mode": mode, "year": year})
+        return MongoJSONResponse({"message": "Import planifié", "data": job}, status_code=202)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Erreur interne du serveur: {str(e)}",
+        )
+
+# Lignes journalières des programmes importés (une par agent et par jour) : requêtes transverses servies par index
+@router.get("/programs/days")
+async def get_program_days(
+    date: Optional[str] = Query(None, pattern=r"^\d{4}-\d{2}-\d{2}$", description="Jour (YYYY-MM-DD)"),
+    plan: Optional[str] = Query(None, description="Code de la grille (ex. J21, RH)"),
+    user_id: Optional[str] = Query(None),
+    program_id: Optional[str] = Query(None),
+    page: PageParams = Depends()
+):
+    """
+    GET /programs/days
+    Ex. ?date=2025-03-14&plan=N13 : agents sur le code N13 ce jour-là ; ?user_id=... : année d'un agent
+    """
+    try:
+        query_filter = {
+            field: value
+            for field, value in (("date", date), ("plan", plan), ("user_id", user_id), ("program_id", program_id))
+            if value is not None
+        }
+        days, pagination = await paginate(program_days, query_filter, "date", page)
+        return MongoJSONResponse({"message": "Jours de programme récupérés avec succès", "data": days, "pagination": pagination})
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Erreur interne du serveur: {str(e)}",
+        )
+
+# Reconstruction des lignes journalières de tous les programmes (reprise de l'existant), suivi sur /jobs/{job_id}
+@router.post("/programs/days/sync")
+async def sync_program_days(year: Optional[int] = Query(None, ge=2000, le=2100)):
+    try:
+        job = await enqueue("sync_program_days", {"year": year})
+        return MongoJSONResponse({"message": "Synchronisation planifiée", "data": job}, status_code=202)
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Erreur interne du serveur: {str(e)}",
+        )
+
 # Route qui récupère tous les utilisateurs en fonction de l'ID de la base de donnée
 @router.get("/programs/{program_id}")
 async def get_programs_by_id(program_id: str):
     try:
-        program = programs.find_one({"_id": ObjectId(program_id)})
+        program = await programs.find_one({"_id": ObjectId(program_id)})
         if program:
             program_details = {
                 "id": str(program["_id"]), "name": program["name"], "data": program["data"]
@@ -47,7 +114,7 @@ async def get_programs_by_id(program_id: str):
 @router.post("/programs/name")
 async def get_programs_by_username(name: AgentPlan):
     try:
-        program = programs.find_one({"name": name.agent_name})
+        program = await programs.find_one({"name": name.agent_name})
         if program:
             program_details = {
                 "id": str(program["_id"]), "name": program["name"], "data": program["data"]
@@ -3,17 +3,20 @@ from fastapi import HTTPException, APIRouter, Depends
 from starlette import status
 
 from database.database import roles
+from utils.projection import projection_of
 
 router = APIRouter()
 
+ROLE_PROJECTION = projection_of(("name",))
+
 
 # Route qui récupère tous les users de la base de donnée
 @router.get("/roles")
 async def get_roles():
     try:
-        role_l= roles.find()
+        role_l= roles.find({}, ROLE_PROJECTION)
         roles_list = [
-            {"id": str(role["_id"]), "name": role["name"],} for
+            {"id": str(role["_id"]), "name": role["name"],} async for
             role in role_l]
 
         print(role_l)
@@ -28,7 +31,7 @@ async def get_roles():
 @router.get("/roles/{role_id}")
 async def get_role_by_id(role_id: str):
     try:
-        role = roles.find_one({"_id": ObjectId(role_id)})
+        role = await roles.find_one({"_id": ObjectId(role_id)}, ROLE_PROJECTION)
         if role:
             role_details = {
                 "id": str(role["_id"]),
@@ -1,50 +1,43 @@
 from fastapi import APIRouter, HTTPException, Depends
 from typing import List, Optional
-from pymongo import MongoClient
 from bson import ObjectId
-import os
 from datetime import datetime
-
-# Configuration de la base de données
-MONGO_URI = os.getenv('MONGO_URI', 'mongodb://localhost:27017/')
-DATABASE_NAME = os.getenv('DATABASE_NAME', 'planRhIA')
-
-client = MongoClient(MONGO_URI)
-db = client[DATABASE_NAME]
+from database.database import db
+from utils.date_range import DateRange
+from utils.json_response import MongoJSONResponse
+from utils.pagination import PageParams, paginate
+from utils.projection import sparse_fields
 
 router = APIRouter()
 
+# Documents de détection au schéma libre : tout champ peut être demandé, le document entier est renvoyé par défaut
+saphir_fields = sparse_fields()
+
 # Routes pour les alertes
 @router.get("/alerts")
-async def get_all_alerts():
+async def get_all_alerts(page: PageParams = Depends(), projection: dict = Depends(saphir_fields)):
     """Récupère toutes les alertes"""
     try:
-        alerts = list(db.alerts.find())
-        for alert in alerts:
-            alert['_id'] = str(alert['_id'])
-        return {"message": "Alertes récupérées avec succès", "data": alerts}
+        alerts, pagination = await paginate(db.alerts, {}, "_id", page, projection)
+        return MongoJSONResponse({"message": "Alertes récupérées avec succès", "data": alerts, "pagination": pagination})
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/alerts/user/{user_id}")
-async def get_alerts_by_user(user_id: str):
+async def get_alerts_by_user(user_id: str, projection: dict = Depends(saphir_fields)):
     """Récupère les alertes d'un utilisateur"""
     try:
-        alerts = list(db.alerts.find({"user_id": user_id}))
-        for alert in alerts:
-            alert['_id'] = str(alert['_id'])
-        return {"message": "Alertes utilisateur récupérées avec succès", "data": alerts}
+        alerts = await db.alerts.find({"user_id": user_id}, projection).to_list(length=None)
+        return MongoJSONResponse({"message": "Alertes utilisateur récupérées avec succès", "data": alerts})
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/alerts/service/{service_id}")
-async def get_alerts_by_service(service_id: str):
+async def get_alerts_by_service(service_id: str, projection: dict = Depends(saphir_fields)):
     """Récupère les alertes d'un service"""
     try:
-        alerts = list(db.alerts.find({"service_id": service_id}))
-        for alert in alerts:
-            alert['_id'] = str(alert['_id'])
-        return {"message": "Alertes service récupérées avec succès", "data": alerts}
+        alerts = await db.alerts.find({"service_id": service_id}, projection).to_list(length=None)
+        return MongoJSONResponse({"message": "Alertes service récupérées avec succès", "data": alerts})
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -53,13 +46,13 @@ async def update_alert(alert_id: str, update_data: dict):
     """Met à jour une alerte"""
     try:
         # Ajouter la date de mise à jour
-        update_data["updated_at"] = datetime.now().isoformat()
+        update_data["updated_at"] = datetime.now()
         
         # Convertir l'ID string en ObjectId
         object_id = ObjectId(alert_id)
         
         # Mettre à jour l'alerte
-        result = db.alerts.update_one(
+        result = await db.alerts.update_one(
             {"_id": object_id},
             {"$set": update_data}
         )
@@ -68,10 +61,8 @@ async def update_alert(alert_id: str, update_data: dict):
             raise HTTPException(status_code=404, detail="Alerte non trouvée")
         
         # Récupérer l'alerte mise à jour
-        updated_alert = db.alerts.find_one({"_id": object_id})
-        updated_alert['_id'] = str(updated_alert['_id'])
-        
-        return {"message": "Alerte mise à jour avec succès", "data": updated_alert}
+        updated_alert = await db.alerts.find_one({"_id": object_id})
+        return MongoJSONResponse({"message": "Alerte mise à jour avec succès", "data": updated_alert})
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -79,12 +70,11 @@ async def update_alert(alert_id: str, update_data: dict):
 async def get_alert_by_id(alert_id: str):
     """Récupère une alerte par son ID"""
     try:
-        alert = db.alerts.find_one({"_id": ObjectId(alert_id)})
+        alert = await db.alerts.find_one({"_id": ObjectId(alert_id)})
         if not alert:
             raise HTTPException(status_code=404, detail="Alerte non trouvée")
         
-        alert['_id'] = str(alert['_id'])
-        return {"message": "Alerte récupérée avec succès", "data": alert}
+        return MongoJSONResponse({"message": "Alerte récupérée avec succès", "data": alert})
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -92,7 +82,7 @@ async def get_alert_by_id(alert_id: str):
 async def delete_alert(alert_id: str):
     """Supprimer une alerte"""
     try:
-        result = db.alerts.delete_one({"_id": ObjectId(alert_id)})
+        result = await db.alerts.delete_one({"_id": ObjectId(alert_id)})
         if result.deleted_count == 0:
             raise HTTPException(status_code=404, detail="Alerte non trouvée")
         return {"message": "Alerte supprimée"}
@@ -101,35 +91,29 @@ async def delete_alert(alert_id: str):
 
 # Routes pour les anomalies
 @router.get("/anomalies")
-async def get_all_anomalies():
+async def get_all_anomalies(page: PageParams = Depends(), projection: dict = Depends(saphir_fields)):
     """Récupère toutes les anomalies"""
     try:
-        anomalies = list(db.anomalies.find())
-        for anomaly in anomalies:
-            anomaly['_id'] = str(anomaly['_id'])
-        return {"message": "Anomalies récupérées avec succès", "data": anomalies}
+        anomalies, pagination = await paginate(db.anomalies, {}, "_id", page, projection)
+        return MongoJSONResponse({"message": "Anomalies récupérées avec succès", "data": anomalies, "pagination": pagination})
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/anomalies/user/{user_id}")
-async def get_anomalies_by_user(user_id: str):
+async def get_anomalies_by_user(user_id: str, projection: dict = Depends(saphir_fields)):
     """Récupère les anomalies d'un utilisateur"""
     try:
-        anomalies = list(db.anomalies.find({"user_id": user_id}))
-        for anomaly in anomalies:
-            anomaly['_id'] = str(anomaly['_id'])
-        return {"message": "Anomalies utilisateur récupérées avec succès", "data": anomalies}
+        anomalies = await db.anomalies.find({"user_id": user_id}, projection).to_list(length=None)
+        return MongoJSONResponse({"message": "Anomalies utilisateur récupérées avec succès", "data": anomalies})
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/anomalies/service/{service_id}")
-async def get_anomalies_by_service(service_id: str):
+async def get_anomalies_by_service(service_id: str, projection: dict = Depends(saphir_fields)):
     """Récupère les anomalies d'un service"""
     try:
-        anomalies = list(db.anomalies.find({"service_id": service_id}))
-        for anomaly in anomalies:
-            anomaly['_id'] = str(anomaly['_id'])
-        return {"message": "Anomalies service récupérées avec succès", "data": anomalies}
+        anomalies = await db.anomalies.find({"service_id": service_id}, projection).to_list(length=None)
+        return MongoJSONResponse({"message": "Anomalies service récupérées avec succès", "data": anomalies})
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -138,13 +122,13 @@ async def update_anomaly(anomaly_id: str, update_data: dict):
     """Met à jour une anomalie"""
     try:
         # Ajouter la date de mise à jour
-        update_data["updated_at"] = datetime.now().isoformat()
+        update_data["updated_at"] = datetime.now()
         
         # Convertir l'ID string en ObjectId
         object_id = ObjectId(anomaly_id)
         
         # Mettre à jour l'anomalie
-        result = db.anomalies.update_one(
+        result = await db.anomalies.update_one(
             {"_id": object_id},
             {"$set": update_data}
         )
@@ -153,10 +137,8 @@ async def update_anomaly(anomaly_id: str, update_data: dict):
             raise HTTPException(status_code=404, detail="Anomalie non trouvée")
         
         # Récupérer l'anomalie mise à jour
-        updated_anomaly = db.anomalies.find_one({"_id": object_id})
-        updated_anomaly['_id'] = str(updated_anomaly['_id'])
-        
-        return {"message": "Anomalie mise à jour avec succès", "data": updated_anomaly}
+        updated_anomaly = await db.anomalies.find_one({"_id": object_id})
+        return MongoJSONResponse({"message": "Anomalie mise à jour avec succès", "data": updated_anomaly})
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -164,12 +146,11 @@ async def update_anomaly(anomaly_id: str, update_data: dict):
 async def get_anomaly_by_id(anomaly_id: str):
     """Récupère une anomalie par son ID"""
     try:
-        anomaly = db.anomalies.find_one({"_id": ObjectId(anomaly_id)})
+        anomaly = await db.anomalies.find_one({"_id": ObjectId(anomaly_id)})
         if not anomaly:
             raise HTTPException(status_code=404, detail="Anomalie non trouvée")
         
-        anomaly['_id'] = str(anomaly['_id'])
-        return {"message": "Anomalie récupérée avec succès", "data": anomaly}
+        return MongoJSONResponse({"message": "Anomalie récupérée avec succès", "data": anomaly})
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -177,7 +158,7 @@ async def get_anomaly_by_id(anomaly_id: str):
 async def delete_anomaly(anomaly_id: str):
     """Supprimer une anomalie"""
     try:
-        result = db.anomalies.delete_one({"_id": ObjectId(anomaly_id)})
+        result = await db.anomalies.delete_one({"_id": ObjectId(anomaly_id)})
         if result.deleted_count == 0:
             raise HTTPException(status_code=404, detail="Anomalie non trouvée")
         return {"message": "Anomalie supprimée"}
@@ -189,13 +170,13 @@ async def delete_anomaly(anomaly_id: str):
 async def create_alert_from_detection(alert_data: dict):
     """Crée une alerte automatiquement depuis une détection"""
     try:
-        alert_data["created_at"] = datetime.now().isoformat()
-        alert_data["updated_at"] = datetime.now().isoformat()
+        alert_data["created_at"] = datetime.now()
+        alert_data["updated_at"] = datetime.now()
         
-        result = db.alerts.insert_one(alert_data)
+        result = await db.alerts.insert_one(alert_data)
         alert_data["_id"] = str(result.inserted_id)
         
-        return {"message": "Alerte créée avec succès", "data": alert_data}
+        return MongoJSONResponse({"message": "Alerte créée avec succès", "data": alert_data})
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -203,13 +184,13 @@ async def create_alert_from_detection(alert_data: dict):
 async def create_anomaly_from_detection(anomaly_data: dict):
     """Crée une anomalie automatiquement depuis une détection"""
     try:
-        anomaly_data["created_at"] = datetime.now().isoformat()
-        anomaly_data["updated_at"] = datetime.now().isoformat()
+        anomaly_data["created_at"] = datetime.now()
+        anomaly_data["updated_at"] = datetime.now()
         
-        result = db.anomalies.insert_one(anomaly_data)
+        result = await db.anomalies.insert_one(anomaly_data)
         anomaly_data["_id"] = str(result.inserted_id)
         
-        return {"message": "Anomalie créée avec succès", "data": anomaly_data}
+        return MongoJSONResponse({"message": "Anomalie créée avec succès", "data": anomaly_data})
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -221,95 +202,112 @@ async def get_detection_rules():
             {
                 "id": "absence_unjustified",
                 "name": "Absence non justifiée",
-                "description": "Détecte les absences sans justificatif après 48h",
+                "description": "Détecte les absences sans motif ni validation du cadre 48h après leur début",
                 "type": "absence",
                 "severity": "high",
-                "enabled": False  # DÉSACTIVÉ pour éviter la création automatique d'anomalies
+                "enabled": True  # Flux de modifications des absences et vérification périodique (jobs/detection_stream)
             },
             {
                 "id": "schedule_conflict",
                 "name": "Conflit de planning",
-                "description": "Détecte les doubles réservations de créneaux",
+                "description": "Détecte les doubles réservations de créneaux (plannings, disponibilités)",
                 "type": "scheduling",
                 "severity": "critical",
-                "enabled": False  # DÉSACTIVÉ pour éviter la création automatique d'anomalies
+                "enabled": True  # Flux de modifications des plannings et disponibilités, une anomalie par agent et par jour
             },
             {
                 "id": "overtime_exceeded",
                 "name": "Dépassement heures supplémentaires",
-                "description": "Détecte les dépassements de quotas légaux",
+                "description": "Détecte les semaines planifiées au-delà des heures hebdomadaires du contrat",
+                "type": "compliance",
+                "severity": "medium",
+                "enabled": True  # Recalcul incrémental à chaque écriture de planning, une anomalie par agent et par semaine
+            },
+            {
+                "id": "min_work_days",
+                "name": "Jours travaillés insuffisants",
+                "description": "Détecte les semaines avec moins de jours travaillés (ou justifiés) que le contrat",
                 "type": "compliance",
                 "severity": "medium",
-                "enabled": False  # DÉSACTIVÉ pour éviter la création automatique d'anomalies
+                "enabled": True  # Recalcul incrémental à chaque écriture de planning, une anomalie par agent et par semaine
+            },
+            {
+                "id": "weekly_rest",
+                "name": "Repos hebdomadaire manquant",
+                "description": "Détecte les semaines sans aucun jour de repos",
+                "type": "compliance",
+                "severity": "high",
+                "enabled": True  # Recalcul incrémental à chaque écriture de planning, une anomalie par agent et par semaine
             },
             {
                 "id": "understaffing",
                 "name": "Sous-effectif critique",
-                "description": "Détecte les services avec personnel insuffisant",
+                "description": "Détecte les jours où un créneau est sous l'effectif minimal du service (min_staff)",
                 "type": "scheduling",
                 "severity": "critical",
-                "enabled": False  # DÉSACTIVÉ pour éviter la création automatique d'anomalies
+                "enabled": True  # Flux de modifications des plannings, une anomalie par service et par jour
             }
         ]
-        return {"message": "Règles de détection récupérées", "data": rules}
+        return MongoJSONResponse({"message": "Règles de détection récupérées", "data": rules})
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 # Routes pour les événements
+def event_filter(period: DateRange, **fields) -> dict:
+    """Filtre des événements ; la période porte sur l'échéance (due_date)"""
+    query_filter = dict(fields)
+    if period.active:
+        query_filter["due_date"] = period.day_filter()
+    return query_filter
+
 @router.get("/events")
-async def get_all_events():
-    """Récupère tous les événements"""
+async def get_all_events(
+    period: DateRange = Depends(),
+    page: PageParams = Depends(),
+    projection: dict = Depends(saphir_fields)
+):
+    """Récupère tous les événements (?from=&to= : échéance dans la période)"""
     try:
-        events = list(db.events.find())
-        for event in events:
-            event['_id'] = str(event['_id'])
-        return {"message": "Événements récupérés avec succès", "data": events}
+        events, pagination = await paginate(db.events, event_filter(period), "_id", page, projection)
+        return MongoJSONResponse({"message": "Événements récupérés avec succès", "data": events, "pagination": pagination})
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/events/user/{user_id}")
-async def get_events_by_user(user_id: str):
+async def get_events_by_user(user_id: str, period: DateRange = Depends(), projection: dict = Depends(saphir_fields)):
     """Récupère les événements d'un utilisateur"""
     try:
-        events = list(db.events.find({"user_id": user_id}))
-        for event in events:
-            event['_id'] = str(event['_id'])
-        return {"message": "Événements utilisateur récupérés avec succès", "data": events}
+        events = await db.events.find(event_filter(period, user_id=user_id), projection).sort("due_date", 1).to_list(length=None)
+        return MongoJSONResponse({"message": "Événements utilisateur récupérés avec succès", "data": events})
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/events/service/{service_id}")
-async def get_events_by_service(service_id: str):
+async def get_events_by_service(service_id: str, period: DateRange = Depends(), projection: dict = Depends(saphir_fields)):
     """Récupère les événements d'un service"""
     try:
-        events = list(db.events.find({"service_id": service_id}))
-        for event in events:
-            event['_id'] = str(event['_id'])
-        return {"message": "Événements service récupérés avec succès", "data": events}
+        events = await db.events.find(event_filter(period, service_id=service_id), projection).sort("due_date", 1).to_list(length=None)
+        return MongoJSONResponse({"message": "Événements service récupérés avec succès", "data": events})
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/events/upcoming")
-async def get_upcoming_events():
+async def get_upcoming_events(projection: dict = Depends(saphir_fields)):
     """Récupère les événements à venir"""
     try:
-        today = datetime.now().isoformat()
-        events = list(db.events.find({"due_date": {"$gte": today}}))
-        for event in events:
-            event['_id'] = str(event['_id'])
-        return {"message": "Événements à venir récupérés avec succès", "data": events}
+        today = datetime.now().isoformat()  # due_date reste une chaîne ISO
+        events = await db.events.find({"due_date": {"$gte": today}}, projection).to_list(length=None)
+        return MongoJSONResponse({"message": "Événements à venir récupérés avec succès", "data": events})
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 # Endpoints pour les notifications
 @router.get("/notifications/user/{user_id}")
-async def get_user_notifications(user_id: str):
+async def get_user_notifications(user_id: str, projection: dict = Depends(saphir_fields)):
     """Récupérer les notifications d'un utilisateur"""
     try:
-        notifications = list(db.notifications.find({"user_id": user_id}).sort("created_at", -1))
-        for notification in notifications:
-            notification['_id'] = str(notification['_id'])
-        return {"data": notifications}
+        notifications = await db.notifications.find({"user_id": user_id}, projection).sort("created_at", -1).to_list(length=None)
+        return MongoJSONResponse({"data": notifications})
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -317,9 +315,9 @@ async def get_user_notifications(user_id: str):
 async def mark_notification_as_read(notification_id: str):
     """Marquer une notification comme lue"""
     try:
-        result = db.notifications.update_one(
+        result = await db.notifications.update_one(
             {"_id": ObjectId(notification_id)},
-            {"$set": {"read": True, "read_at": datetime.now().isoformat()}}
+            {"$set": {"read": True, "read_at": datetime.now()}}
         )
         if result.matched_count == 0:
             raise HTTPException(status_code=404, detail="Notification non trouvée")
@@ -331,9 +329,9 @@ async def mark_notification_as_read(notification_id: str):
 async def mark_all_notifications_as_read(user_id: str):
     """Marquer toutes les notifications d'un utilisateur comme lues"""
     try:
-        result = db.notifications.update_many(
+        result = await db.notifications.update_many(
             {"user_id": user_id, "read": False},
-            {"$set": {"read": True, "read_at": datetime.now().isoformat()}}
+            {"$set": {"read": True, "read_at": datetime.now()}}
         )
         return {"message": f"{result.modified_count} notifications marquées comme lues"}
     except Exception as e:
@@ -343,7 +341,7 @@ async def mark_all_notifications_as_read(user_id: str):
 async def delete_notification(notification_id: str):
     """Supprimer une notification"""
     try:
-        result = db.notifications.delete_one({"_id": ObjectId(notification_id)})
+        result = await db.notifications.delete_one({"_id": ObjectId(notification_id)})
         if result.deleted_count == 0:
             raise HTTPException(status_code=404, detail="Notification non trouvée")
         return {"message": "Notification supprimée"}
@@ -354,10 +352,10 @@ async def delete_notification(notification_id: str):
 async def create_notification(notification: dict):
     """Créer une nouvelle notification"""
     try:
-        notification["created_at"] = datetime.now().isoformat()
+        notification["created_at"] = datetime.now()
         notification["read"] = False
-        result = db.notifications.insert_one(notification)
+        result = await db.notifications.insert_one(notification)
         notification["_id"] = str(result.inserted_id)
-        return {"data": notification}
+        return MongoJSONResponse({"data": notification})
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
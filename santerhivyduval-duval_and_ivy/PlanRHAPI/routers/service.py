@@ -3,11 +3,23 @@ from fastapi import HTTPException, APIRouter
 from starlette import status
 from crud.service import create_service, delete_service, update_service
 from database.database import services
+from utils.projection import projection_of
 from schemas.serviceCreate import ServiceCreate
+from scheduling.optimizer import check_options
 from datetime import datetime
 
 router = APIRouter()
 
+SERVICE_PROJECTION = projection_of(("name", "head", "matricule", "min_staff", "created_at", "updated_at"))
+
+
+def check_min_staff(min_staff):
+    """Effectif minimal par créneau (règle understaffing) : créneaux connus, effectifs positifs (400 sinon)"""
+    try:
+        check_options("auto", min_staff)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
 """@router.post("/services/create")
 async def register(service_info: ServiceCreate):
     try:
@@ -36,6 +48,9 @@ async def register(service_info: ServiceCreate):
             "name": service_info.name,
             "head": service_info.head
         }
+        if service_info.min_staff is not None:
+            check_min_staff(service_info.min_staff)
+            service_data["min_staff"] = service_info.min_staff
         
         result = await create_service(service_data)
         return {
@@ -68,16 +83,17 @@ async def delete(service_id: str):
 @router.get("/services")
 async def get_services():
     try:
-        service_l = services.find()
+        service_l = services.find({}, SERVICE_PROJECTION)
         service_list = [
             {
                 "id": str(service["_id"]),
                 "name": service["name"],
                 "head": service["head"],
                 "matricule": service.get("matricule", ""),
+                "min_staff": service.get("min_staff"),
                 "created_at": service.get("created_at", "").isoformat() if service.get("created_at") else "",
                 "updated_at": service.get("updated_at", "").isoformat() if service.get("updated_at") else ""
-            } for service in service_l
+            } async for service in service_l
         ]
         return {"message": "Services récupérés avec succès", "data": service_list}
     except Exception as e:
@@ -89,13 +105,14 @@ async def get_services():
 @router.get("/services/{service_id}")
 async def get_service_by_id(service_id: str):
     try:
-        service = services.find_one({"_id": ObjectId(service_id)})
+        service = await services.find_one({"_id": ObjectId(service_id)}, SERVICE_PROJECTION)
         if service:
             service_details = {
                 "id": str(service["_id"]),
                 "name": service["name"],
                 "head": service["head"],
                 "matricule": service.get("matricule", ""),
+                "min_staff": service.get("min_staff"),
                 "created_at": service.get("created_at", "").isoformat() if service.get("created_at") else "",
                 "updated_at": service.get("updated_at", "").isoformat() if service.get("updated_at") else ""
             }
@@ -159,7 +176,7 @@ async def update_service(service_id: str, service_info: ServiceCreate):
             }}
         )
         if result.modified_count == 1:
-            updated_service = await services.find_one({"_id": ObjectId(service_id)})
+            updated_service = await services.find_one({"_id": ObjectId(service_id)}, SERVICE_PROJECTION)
             return {
                 "message": "Service mis à jour avec succès", 
                 "data": {
@@ -181,20 +198,24 @@ async def update_service(service_id: str, service_info: ServiceCreate):
 
 @router.put("/services/update/{service_id}")
 async def update_service(service_id: str, service_info: ServiceCreate):
+    if service_info.min_staff is not None:
+        check_min_staff(service_info.min_staff)
     try:
         service_data = {
             "name": service_info.name,
             "head": service_info.head,
             "updated_at": datetime.now()
         }
+        if service_info.min_staff is not None:
+            service_data["min_staff"] = service_info.min_staff
         
-        result = services.update_one(
+        result = await services.update_one(
             {"_id": ObjectId(service_id)},
             {"$set": service_data}
         )
         
         if result.modified_count == 1:
-            updated_service = services.find_one({"_id": ObjectId(service_id)})
+            updated_service = await services.find_one({"_id": ObjectId(service_id)}, SERVICE_PROJECTION)
             return {
                 "message": "Service mis à jour avec succès",
                 "data": {
@@ -202,6 +223,7 @@ async def update_service(service_id: str, service_info: ServiceCreate):
                     "name": updated_service["name"],
                     "head": updated_service["head"],
                     "matricule": updated_service.get("matricule", ""),
+                    "min_staff": updated_service.get("min_staff"),
                     "updated_at": service_data["updated_at"].isoformat()
                 }
             }
@@ -25,7 +25,7 @@ async def create_session(
         phoneNumber=phoneNumber,
     )
     # Insertion des données dans MongoDB
-    users.insert_one({
+    await users.insert_one({
         'session_id': str(session),
         **data.dict()
     })
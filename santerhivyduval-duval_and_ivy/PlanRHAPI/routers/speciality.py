@@ -1,31 +1,43 @@
 from bson import ObjectId
-from fastapi import HTTPException, APIRouter
+from fastapi import HTTPException, APIRouter, Depends, Query
 from starlette import status
-from crud.speciality import create_speciality, delete_speciality, update_speciality, generate_speciality_matricule
+from crud.speciality import create_speciality, delete_speciality, update_speciality, import_specialities
 from database.database import speciality
 from schemas.serviceCreate import SpecialitéCreate
 from datetime import datetime
 from fastapi import File, UploadFile
+from jobs import enqueue_upload
+from utils.bulk_import import check_import_mode
 from utils.excel_utils import parse_excel
+from utils.json_response import MongoJSONResponse
+from utils.pagination import PageParams, paginate
+from utils.projection import projection_of
 
 router = APIRouter()
+
+SPECIALITY_PROJECTION = projection_of(("name", "matricule", "created_at", "updated_at"))
       
 @router.post("/speciality/upload")
-async def upload_specialities(file: UploadFile = File(...)):
+async def upload_specialities(
+    file: UploadFile = File(...),
+    background: bool = Query(False, description="Import en arrière-plan : renvoie un job à suivre sur /jobs/{job_id}"),
+    mode: str = Query("insert", description="insert : nouveaux noms uniquement ; upsert : crée ou met à jour selon le nom")
+):
     try:
+        check_import_mode(mode)
+        if background:
+            job = await enqueue_upload("import_specialities", file, {"mode": mode})
+            return MongoJSONResponse({"message": "Import planifié", "data": job}, status_code=202)
+
         data = await parse_excel(file)
-        inserted_ids = []
-        for item in data:
-            speciality_data = {
-                "name": item.get("name"),
-                "matricule": item.get("matricule", generate_speciality_matricule),
-                "created_at": datetime.now(),
-                "updated_at": datetime.now()
-            }
-            result = await speciality.insert_one(speciality_data)
-            inserted_ids.append(str(result.inserted_id))
-        
-        return {"message": f"{len(inserted_ids)} spécialités créées avec succès", "data": inserted_ids}
+        report = await import_specialities(data, mode=mode)
+
+        return {
+            "message": f"{report['inserted']} spécialités créées, {report['updated']} mises à jour, {report['failed']} ligne(s) en erreur",
+            "data": report
+        }
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=400,
@@ -68,9 +80,9 @@ async def delete(speciality_id: str):
         )
 
 @router.get("/speciality")
-async def get_speciality():
+async def get_speciality(page: PageParams = Depends()):
     try:
-        speciality_l = speciality.find()
+        speciality_l, pagination = await paginate(speciality, {}, "_id", page, SPECIALITY_PROJECTION)
         speciality_list = [
             {
                 "id": str(speciality["_id"]),
@@ -80,7 +92,7 @@ async def get_speciality():
                 "updated_at": speciality.get("updated_at", "").isoformat() if speciality.get("updated_at") else ""
             } for speciality in speciality_l
         ]
-        return {"message": "speciality récupérés avec succès", "data": speciality_list}
+        return {"message": "speciality récupérés avec succès", "data": speciality_list, "pagination": pagination}
     except Exception as e:
         raise HTTPException(
             status_code=500,
@@ -90,14 +102,14 @@ async def get_speciality():
 @router.get("/speciality/{speciality_id}")
 async def get_speciality_by_id(speciality_id: str):
     try:
-        speciality = speciality.find_one({"_id": ObjectId(speciality_id)})
-        if speciality:
+        speciality_doc = await speciality.find_one({"_id": ObjectId(speciality_id)}, SPECIALITY_PROJECTION)
+        if speciality_doc:
             speciality_details = {
-                "id": str(speciality["_id"]),
-                "name": speciality["name"],
-                "matricule": speciality.get("matricule", ""),
-                "created_at": speciality.get("created_at", "").isoformat() if speciality.get("created_at") else "",
-                "updated_at": speciality.get("updated_at", "").isoformat() if speciality.get("updated_at") else ""
+                "id": str(speciality_doc["_id"]),
+                "name": speciality_doc["name"],
+                "matricule": speciality_doc.get("matricule", ""),
+                "created_at": speciality_doc.get("created_at", "").isoformat() if speciality_doc.get("created_at") else "",
+                "updated_at": speciality_doc.get("updated_at", "").isoformat() if speciality_doc.get("updated_at") else ""
             }
             return {"message": "speciality récupéré avec succès", "data": speciality_details}
         else:
@@ -116,13 +128,13 @@ async def update_speciality(speciality_id: str, speciality_info: SpecialitéCrea
             "updated_at": datetime.now()
         }
         
-        result = speciality.update_one(
+        result = await speciality.update_one(
             {"_id": ObjectId(speciality_id)},
             {"$set": speciality_data}
         )
         
         if result.modified_count == 1:
-            updated_speciality = speciality.find_one({"_id": ObjectId(speciality_id)})
+            updated_speciality = await speciality.find_one({"_id": ObjectId(speciality_id)}, SPECIALITY_PROJECTION)
             return {
                 "message": "speciality mis à jour avec succès",
                 "data": {
@@ -17,6 +17,9 @@ from schemas.passwordChange import PasswordChange
 from schemas.userCreate import UserCreate
 from schemas.userLogin import UserLogin
 from session_config import backend, cookie
+from utils.json_response import MongoJSONResponse
+from utils.pagination import PageParams, paginate
+from utils.projection import EXISTS_PROJECTION, projection_of, sparse_fields
 from utils.validate_email import is_valid_email
 from database.database import db, users
 from passlib.context import CryptContext
@@ -24,6 +27,17 @@ from argon2 import PasswordHasher
 
 router = APIRouter()
 
+# Champs exposés par les endpoints de lecture (jamais le mot de passe)
+USER_PUBLIC_FIELDS = (
+    "first_name", "last_name", "email", "phoneNumber", "role",
+    "service_id", "speciality_id", "matricule", "created_at", "updated_at"
+)
+USER_PUBLIC_PROJECTION = projection_of(USER_PUBLIC_FIELDS)
+# Champs nécessaires à la connexion (vérification du mot de passe et session)
+USER_LOGIN_PROJECTION = projection_of(("password", *USER_PUBLIC_FIELDS))
+
+user_fields = sparse_fields(USER_PUBLIC_FIELDS)
+
 """pwd_context = CryptContext(
     schemes=["pbkdf2_sha256", "bcrypt", "argon2"],
     default="pbkdf2_sha256",
@@ -51,7 +65,7 @@ async def login(user_info: UserLogin, response: Response):
     if not user_info.matricule or not user_info.matricule.strip():
         raise HTTPException(status_code=400, detail="Matricule cannot be empty")
 
-    user = get_user_by_matricule(user_info.matricule)
+    user = await get_user_by_matricule(user_info.matricule, USER_LOGIN_PROJECTION)
     if user is None:
         raise HTTPException(status_code=401, detail="Utilisateur n'existe pas")
 
@@ -60,7 +74,7 @@ async def login(user_info: UserLogin, response: Response):
         raise HTTPException(status_code=401, detail="Mot de passe incorrect")
 
     # Update logged_in status (optional if using JWT)
-    users.update_one({"matricule": user_info.matricule}, {"$set": {"logged_in": True}})
+    await users.update_one({"matricule": user_info.matricule}, {"$set": {"logged_in": True}})
 
     # Create session (optional, consider removing if JWT is sufficient)
     session = uuid4()
@@ -101,12 +115,12 @@ async def register(user_info: UserCreate):
             raise HTTPException(status_code=400, detail="Invalid email address")
 
         # Check if email or matricule already exists
-        if users.find_one({"email": user_info.email}):
+        if await users.find_one({"email": user_info.email}, EXISTS_PROJECTION):
             raise HTTPException(status_code=400, detail="Email already exists")
 
         # Generate unique matricule
         matricule = generate_matricule(user_info.role)
-        while users.find_one({"matricule": matricule}):
+        while await users.find_one({"matricule": matricule}, EXISTS_PROJECTION):
             matricule = generate_matricule(user_info.role)
 
         # Hash the password
@@ -128,7 +142,7 @@ async def register(user_info: UserCreate):
         }
 
         # Insert user
-        db_response = users.insert_one(user_data)
+        db_response = await users.insert_one(user_data)
         user_id = db_response.inserted_id
 
         # Generate token
@@ -155,7 +169,7 @@ async def update_user(user_id: str, user_data: dict):
             del user_data["password"]
         user_data["updated_at"] = datetime.now()
 
-        result = users.update_one(
+        result = await users.update_one(
             {"_id": ObjectId(user_id)},
             {"$set": user_data}
         )
@@ -174,7 +188,7 @@ async def update_user(user_id: str, user_data: dict):
 @router.delete("/users/delete/{user_id}")
 async def delete_user_route(user_id: str):
     try:
-        result = users.delete_one({"_id": ObjectId(user_id)})
+        result = await users.delete_one({"_id": ObjectId(user_id)})
         if result.deleted_count == 0:
             raise HTTPException(status_code=404, detail="Utilisateur introuvable")
         return {"message": "Utilisateur supprimé avec succès", "data": {"deleted_count": result.deleted_count}}
@@ -186,7 +200,7 @@ async def change_password(user_id: str, password: PasswordChange):
     try:
         # Hash the new password
         hashed_password = hash_password(password.new_password)
-        result = users.update_one(
+        result = await users.update_one(
             {"_id": ObjectId(user_id)},
             {"$set": {"password": hashed_password}}
         )
@@ -202,120 +216,57 @@ async def get_user_info(current_user: str = Depends(get_current_user)):
         if not ObjectId.is_valid(current_user):
             raise HTTPException(status_code=400, detail="Invalid user ID format")
         
-        user = users.find_one({"_id": ObjectId(current_user)})
-        if user is None:
+        user_data = await users.find_one({"_id": ObjectId(current_user)}, USER_PUBLIC_PROJECTION)
+        if user_data is None:
             raise HTTPException(status_code=404, detail="Utilisateur non trouvé")
         
-        user_data = {
-            "_id": str(user["_id"]),
-            "first_name": user["first_name"],
-            "last_name": user["last_name"],
-            "email": user["email"],
-            "phoneNumber": user["phoneNumber"],
-            "role": user["role"],
-            "service_id": user.get("service_id", None),
-            "speciality_id": user.get("speciality_id", None),
-            "matricule": user["matricule"]
-        }
-        return {"message": "Utilisateur récupéré avec succès", "data": user_data}
+        return MongoJSONResponse({"message": "Utilisateur récupéré avec succès", "data": user_data})
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erreur interne du serveur: {str(e)}")
 
 @router.get("/users/nurse")
-async def get_nurses():
+async def get_nurses(projection: dict = Depends(user_fields)):
     try:
-        user_l = users.find({"role": "nurse"})
-        users_list = [
-            {
-                "_id": str(user["_id"]),
-                "first_name": user["first_name"],
-                "last_name": user["last_name"],
-                "phoneNumber": user["phoneNumber"],
-                "role": user["role"],
-                "email": user["email"],
-                "service_id": user.get("service_id", None),
-                "speciality_id": user.get("speciality_id", None),
-                "matricule": user.get("matricule", "")
-            }
-            for user in user_l
-        ]
+        users_list = await users.find({"role": "nurse"}, projection).to_list(length=None)
         if not users_list:
             raise HTTPException(status_code=404, detail="Aucun infirmier trouvé")
-        return {"message": "Infirmiers récupérés avec succès", "data": users_list}
+        return MongoJSONResponse({"message": "Infirmiers récupérés avec succès", "data": users_list})
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erreur interne du serveur: {str(e)}")
 
 @router.get("/users")
-async def get_users():
+async def get_users(page: PageParams = Depends(), projection: dict = Depends(user_fields)):
     try:
-        user_l = users.find()
-        users_list = [
-            {
-                "_id": str(user["_id"]),
-                "first_name": user["first_name"],
-                "last_name": user["last_name"],
-                "email": user["email"],
-                "phoneNumber": user["phoneNumber"],
-                "role": user.get("role", ""),
-                "service_id": user.get("service_id", None),
-                "speciality_id": user.get("speciality_id", None),
-                "matricule": user.get("matricule", ""),
-                "created_at": user.get("created_at", "").isoformat() if user.get("created_at") else "",
-                "updated_at": user.get("updated_at", "").isoformat() if user.get("updated_at") else ""
-            } for user in user_l
-        ]
-        return {"message": "Utilisateurs récupérés avec succès", "data": users_list}
+        users_list, pagination = await paginate(users, {}, "_id", page, projection)
+        return MongoJSONResponse({"message": "Utilisateurs récupérés avec succès", "data": users_list, "pagination": pagination})
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erreur interne du serveur: {str(e)}")
 
 @router.get("/users/{user_id}")
 async def get_user_details(user_id: str):
     try:
-        user = users.find_one({"_id": ObjectId(user_id)})
-        if user:
-            user_details = {
-                "_id": str(user["_id"]),
-                "first_name": user["first_name"],
-                "last_name": user["last_name"],
-                "phoneNumber": user["phoneNumber"],
-                "role": user["role"],
-                "email": user["email"],
-                "service_id": user.get("service_id", None),
-                "speciality_id": user.get("speciality_id", None),
-                "matricule": user.get("matricule", "")
-            }
-            return {"message": "Utilisateur récupéré avec succès", "data": user_details}
+        user_details = await users.find_one({"_id": ObjectId(user_id)}, USER_PUBLIC_PROJECTION)
+        if user_details:
+            return MongoJSONResponse({"message": "Utilisateur récupéré avec succès", "data": user_details})
         else:
             raise HTTPException(status_code=404, detail="Utilisateur non trouvé")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erreur interne du serveur: {str(e)}")
 
 @router.get("/users/head")
-async def get_cadres():
+async def get_cadres(projection: dict = Depends(user_fields)):
     try:
-        user_l = users.find({"role": "cadre"})
-        cadre_list = [
-            {
-                "_id": str(cadre["_id"]),
-                "first_name": cadre["first_name"],
-                "last_name": cadre["last_name"],
-                "phoneNumber": cadre["phoneNumber"],
-                "role": cadre["role"],
-                "email": cadre["email"],
-                "matricule": cadre.get("matricule", "")
-            }
-            for cadre in user_l
-        ]
+        cadre_list = await users.find({"role": "cadre"}, projection).to_list(length=None)
         if not cadre_list:
             raise HTTPException(status_code=404, detail="Aucun cadre trouvé")
-        return {"message": "Cadres récupérés avec succès", "data": cadre_list}
+        return MongoJSONResponse({"message": "Cadres récupérés avec succès", "data": cadre_list})
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erreur interne du serveur: {str(e)}")
 
 @router.post("/users/assignService/{user_id}")
 async def assign相當_service(user_id: str, service: AssignService):
     try:
-        result = users.update_one(
+        result = await users.update_one(
             {"_id": ObjectId(user_id)},
             {"$set": {"service_id": service.service_id}}
         )
@@ -328,7 +279,7 @@ async def assign相當_service(user_id: str, service: AssignService):
 @router.post("/logout")
 async def logout(current_user: str = Depends(get_current_user)):
     try:
-        result = users.update_one({"_id": ObjectId(current_user)}, {"$set": {"logged_in": False}})
+        result = await users.update_one({"_id": ObjectId(current_user)}, {"$set": {"logged_in": False}})
         return {"message": "Utilisateur déconnecté avec succès", "data": {"modified_count": result.modified_count}}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erreur interne du serveur: {str(e)}")
\ No newline at end of file
@@ -0,0 +1,5 @@
+# Moteur de génération automatique des plannings (indépendant de la base de données)
+from scheduling.contracts import build_agent_profile, parse_hours, period_days
+from scheduling.generator import generate_planning
+from scheduling.optimizer import optimize_planning
+from scheduling.simulation import simulate_service
@@ -0,0 +1,111 @@
+# Conformité hebdomadaire d'un agent (semaine ISO) : heures du contrat, jours travaillés minimum, repos hebdomadaire
+from datetime import date, datetime, timedelta
+
+from scheduling.contracts import build_agent_profile
+from scheduling.generator import ABSENCE_CODE, REST_CODE
+
+# Codes d'activité qui ne sont pas du temps travaillé
+NON_WORKED_CODES = (REST_CODE, ABSENCE_CODE)
+COMPLIANCE_RULES = ("overtime_exceeded", "min_work_days", "weekly_rest")
+
+
+def week_monday(day) -> date:
+    """Lundi de la semaine ISO contenant day ('YYYY-MM-DD' ou date)"""
+    if not isinstance(day, date):
+        day = date.fromisoformat(str(day)[:10])
+    return day - timedelta(days=day.weekday())
+
+
+def week_label(monday: date) -> str:
+    year, week, _ = monday.isocalendar()
+    return f"{year}-W{week:02d}"
+
+
+def contract_terms(contrat):
+    """(minutes hebdomadaires, jours travaillés minimum) d'un contrat, avec les valeurs par défaut du générateur"""
+    profile = build_agent_profile({"_id": None}, contrat)
+    return profile["weekly_minutes"], len(profile["work_days"])
+
+
+def is_worked(slot) -> bool:
+    """Créneau horaire d'une activité travaillée (les journées entières, repos et congés ne comptent pas)"""
+    return (
+        slot.get("start") is not None
+        and not slot.get("all_day")
+        and slot.get("activity_code") not in NON_WORKED_CODES
+    )
+
+
+def evaluate_week(user_id, monday: date, slots, weekly_minutes, min_work_days, absent_days=(), today: date = None):
+    """
+    Bilan d'une semaine ISO d'un agent et détections associées.
+    slots : plannings de la semaine et de la veille du lundi (une nuit peut déborder sur le lundi),
+            avec les champs horaires natifs (start, end, duration_minutes, all_day)
+    absent_days : jours couverts par une absence, qui justifient un jour non travaillé
+    Le minimum de jours travaillés n'est vérifié que sur une semaine planifiée, passée ou planifiée jour par jour.
+    Retourne (bilan, détections).
+    """
+    today = today or date.today()
+    days = [monday + timedelta(days=offset) for offset in range(7)]
+    labels = [day.isoformat() for day in days]
+    worked = [slot for slot in slots if is_worked(slot)]
+    counted = [slot for slot in worked if slot.get("date") in labels]
+
+    worked_minutes = sum(slot.get("duration_minutes") or 0 for slot in counted)
+    worked_days = sorted({slot["date"] for slot in counted})
+    # Jour de repos : aucune minute travaillée entre 0h et 24h, nuit de la veille comprise
+    busy_days = {
+        label
+        for day, label in zip(days, labels)
+        for slot in worked
+        if slot["start"] < datetime(day.year, day.month, day.day) + timedelta(days=1)
+        and slot["end"] > datetime(day.year, day.month, day.day)
+    }
+    rest_days = [label for label in labels if label not in busy_days]
+    justified_days = sorted(set(absent_days) & set(labels) - set(worked_days))
+    planned_days = ({slot.get("date") for slot in slots} | set(absent_days)) & set(labels)
+    complete = bool(planned_days) and (days[-1] < today or len(planned_days) == len(labels))
+
+    summary = {
+        "user_id": user_id,
+        "week": week_label(monday),
+        "week_start": labels[0],
+        "week_end": labels[-1],
+        "worked_minutes": worked_minutes,
+        "contract_minutes": weekly_minutes,
+        "worked_hours": round(worked_minutes / 60, 2),
+        "contract_hours": round(weekly_minutes / 60, 2),
+        "worked_days": worked_days,
+        "rest_days": rest_days,
+        "justified_days": justified_days,
+        "min_work_days": min_work_days,
+        "complete": complete
+    }
+
+    def finding(rule_id, description):
+        return {
+            "rule_id": rule_id,
+            "user_id": user_id,
+            "date": labels[0],
+            "description": description,
+            "week": summary["week"],
+            "worked_hours": summary["worked_hours"],
+            "contract_hours": summary["contract_hours"]
+        }
+
+    findings = []
+    if worked_minutes > weekly_minutes:
+        findings.append(finding(
+            "overtime_exceeded",
+            f"{summary['worked_hours']} h planifiées pour {summary['contract_hours']} h au contrat (semaine {summary['week']})"
+        ))
+    if complete and len(worked_days) + len(justified_days) < min_work_days:
+        findings.append(finding(
+            "min_work_days",
+            f"{len(worked_days)} jours travaillés pour {min_work_days} jours au contrat (semaine {summary['week']})"
+        ))
+    if not rest_days:
+        findings.append(finding("weekly_rest", f"Aucun jour de repos sur la semaine {summary['week']}"))
+
+    summary["violations"] = [item["rule_id"] for item in findings]
+    return summary, findings
@@ -0,0 +1,124 @@
+# Lecture des contrats RH et des contraintes d'un agent (disponibilités validées, absences)
+import re
+from datetime import date, timedelta
+
+# Jours de la semaine tels que saisis dans les contrats (work_days[].day), indexés comme date.weekday()
+WEEKDAYS = {
+    "lundi": 0, "mardi": 1, "mercredi": 2, "jeudi": 3, "vendredi": 4, "samedi": 5, "dimanche": 6,
+    "monday": 0, "tuesday": 1, "wednesday": 2, "thursday": 3, "friday": 4, "saturday": 5, "sunday": 6,
+}
+
+DEFAULT_WEEKLY_HOURS = 35
+# Sans jours de travail dans le contrat : du lundi au vendredi
+DEFAULT_WORK_DAYS = (0, 1, 2, 3, 4)
+DEFAULT_DAY_START = "08:00"
+DEFAULT_NIGHT_START = "20:00"
+
+
+def to_minutes(value: str) -> int:
+    """'08:30' -> 510"""
+    hours, minutes = value.strip().split(":")[:2]
+    return int(hours) * 60 + int(minutes)
+
+
+def format_minutes(minutes: int) -> str:
+    minutes %= 24 * 60
+    return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+
+def shift_duration(start: int, end: int) -> int:
+    """Durée d'un créneau en minutes, un créneau de nuit se terminant le lendemain"""
+    return end - start if end > start else end + 24 * 60 - start
+
+
+def parse_hours(value, default=None):
+    """
+    Convertit une durée saisie librement en minutes : '35', '35h', '35h30', '7,5', '37.5 heures'.
+    Retourne default si la valeur est vide ou illisible.
+    """
+    if value is None:
+        return default
+    if isinstance(value, (int, float)):
+        return int(round(value * 60))
+    text = str(value).strip().lower().replace(",", ".")
+    match = re.match(r"^(\d+(?:\.\d+)?)\s*(?:h|heures?)?\s*(\d{1,2})?", text)
+    if not match:
+        return default
+    minutes = float(match.group(1)) * 60
+    if match.group(2):
+        minutes += int(match.group(2))
+    return int(round(minutes))
+
+
+def period_days(start: date, end: date):
+    """Liste des dates (YYYY-MM-DD) de start à end inclus"""
+    days = []
+    current = start
+    while current <= end:
+        days.append(current.strftime("%Y-%m-%d"))
+        current += timedelta(days=1)
+    return days
+
+
+def month_days(year: int, month: int):
+    """Liste des dates (YYYY-MM-DD) d'un mois"""
+    first_day = date(year, month, 1)
+    last_day = date(year + month // 12, month % 12 + 1, 1) - timedelta(days=1)
+    return period_days(first_day, last_day)
+
+
+def expand_absence(absence, days_set):
+    """Dates de la période couvertes par une absence (bornes start_date / end_date incluses)"""
+    start, end = absence.get("start_date"), absence.get("end_date") or absence.get("start_date")
+    if not start:
+        return set()
+    start, end = str(start)[:10], str(end)[:10]
+    return {day for day in days_set if start <= day <= end}
+
+
+def build_agent_profile(user, contrat, availabilities=(), absences=(), locked=None, days=()):
+    """
+    Regroupe les contraintes d'un agent pour la période :
+    - weekly_minutes : heures hebdomadaires du contrat
+    - work_days : {jour de semaine: (début, fin)} en minutes, les autres jours sont des repos fixes
+    - availabilities : {date: (début, fin)} des disponibilités validées, prioritaires sur le contrat
+    - absences : dates d'absence (hors absences refusées)
+    - locked : {date: minutes travaillées} des plannings déjà présents, conservés tels quels
+    """
+    contrat = contrat or {}
+    weekly_minutes = parse_hours(contrat.get("contrat_hour_week"), DEFAULT_WEEKLY_HOURS * 60)
+
+    work_days = {}
+    for work_day in contrat.get("work_days") or []:
+        weekday = WEEKDAYS.get(str(work_day.get("day", "")).strip().lower())
+        try:
+            work_days[weekday] = (to_minutes(work_day["start_time"]), to_minutes(work_day["end_time"]))
+        except (KeyError, ValueError, AttributeError):
+            continue
+    work_days.pop(None, None)
+
+    if not work_days:
+        night = "nuit" in str(contrat.get("working_period") or "").lower()
+        start = to_minutes(contrat.get("start_time") or (DEFAULT_NIGHT_START if night else DEFAULT_DAY_START))
+        day_minutes = parse_hours(contrat.get("contrat_hour_day"), weekly_minutes // len(DEFAULT_WORK_DAYS))
+        work_days = {weekday: (start, (start + day_minutes) % (24 * 60)) for weekday in DEFAULT_WORK_DAYS}
+
+    days_set = set(days)
+    absent = set()
+    for absence in absences:
+        if "refus" not in str(absence.get("status", "")).lower():
+            absent |= expand_absence(absence, days_set)
+
+    return {
+        "user_id": str(user["_id"]),
+        "name": f"{user.get('first_name', '')} {user.get('last_name', '')}".strip(),
+        "weekly_minutes": weekly_minutes,
+        "work_days": work_days,
+        "availabilities": {
+            availability["date"]: (to_minutes(availability["start_time"]), to_minutes(availability["end_time"]))
+            for availability in availabilities
+            if availability.get("date") in days_set
+        },
+        "absences": absent,
+        "locked": dict(locked or {}),
+    }
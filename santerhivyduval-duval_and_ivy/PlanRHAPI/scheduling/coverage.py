@@ -0,0 +1,87 @@
+# Couverture d'un service : matrice jour × créneau (jour / nuit) de l'effectif planifié, comparée à l'effectif minimal.
+# Les créneaux sont ramenés à des minutes depuis le premier jour 00:00 puis comptés par bincount, sans boucle par minute.
+from datetime import date, datetime
+
+import numpy as np
+
+from scheduling.optimizer import DAY_SHIFT_START, SHIFTS
+from utils.time_fields import DAY_MINUTES
+
+
+def slot_offsets(first_day: date, slots, user_keys: dict):
+    """
+    (agents, débuts, fins) en tableaux d'entiers : indice de l'agent dans user_keys,
+    minutes depuis first_day 00:00 (négatives pour une nuit commencée la veille).
+    slots : créneaux travaillés avec user_id, start et end (datetime)
+    """
+    origin = np.datetime64(datetime(first_day.year, first_day.month, first_day.day), "m")
+    agents = np.fromiter((user_keys[slot["user_id"]] for slot in slots), dtype=np.int64, count=len(slots))
+    starts = (np.array([slot["start"] for slot in slots], dtype="datetime64[m]") - origin).astype(np.int64)
+    ends = (np.array([slot["end"] for slot in slots], dtype="datetime64[m]") - origin).astype(np.int64)
+    return agents, starts, ends
+
+
+def coverage_matrix(nb_days: int, agents, starts, ends, min_staff: dict = None) -> dict:
+    """
+    Matrices nb_days × len(SHIFTS) :
+    - staffed : agents distincts dont un créneau commence dans le créneau (jour : 06:00-18:00, nuit sinon),
+      même décompte que la règle understaffing et l'optimiseur
+    - coverage_min / coverage_max : effectif présent minute par minute sur la fenêtre du créneau
+      (jour : 06:00-18:00, nuit : 18:00-06:00 le lendemain), bornes basse et haute
+    - required / gap : effectif minimal et agents manquants (staffed comparé à required)
+    """
+    required = np.array([int((min_staff or {}).get(shift) or 0) for shift in SHIFTS], dtype=np.int64)
+    shift_start, shift_end = DAY_SHIFT_START
+    horizon = (nb_days + 1) * DAY_MINUTES
+
+    # Effectif minute par minute : +1 au début, -1 à la fin de chaque créneau, puis somme cumulée
+    delta = (
+        np.bincount(np.clip(starts, 0, horizon), minlength=horizon + 1)
+        - np.bincount(np.clip(ends, 0, horizon), minlength=horizon + 1)
+    )
+    headcount = np.cumsum(delta)[:horizon]
+    # Ligne d = [d 06:00, d+1 06:00[ : la fenêtre de jour puis celle de nuit
+    windows = headcount[shift_start:shift_start + nb_days * DAY_MINUTES].reshape(nb_days, DAY_MINUTES)
+    day_length = shift_end - shift_start
+    coverage_min = np.stack([windows[:, :day_length].min(axis=1), windows[:, day_length:].min(axis=1)], axis=1)
+    coverage_max = np.stack([windows[:, :day_length].max(axis=1), windows[:, day_length:].max(axis=1)], axis=1)
+
+    # Agents par créneau : un agent compte une fois par (jour, créneau)
+    in_period = (starts >= 0) & (starts < nb_days * DAY_MINUTES)
+    minute = starts[in_period] % DAY_MINUTES
+    cells = (starts[in_period] // DAY_MINUTES) * len(SHIFTS) + ((minute < shift_start) | (minute >= shift_end))
+    distinct = np.unique(agents[in_period] * (nb_days * len(SHIFTS)) + cells)
+    staffed = np.bincount(distinct % (nb_days * len(SHIFTS)), minlength=nb_days * len(SHIFTS)).reshape(nb_days, len(SHIFTS))
+
+    return {
+        "staffed": staffed,
+        "coverage_min": coverage_min,
+        "coverage_max": coverage_max,
+        "required": required,
+        "gap": np.maximum(required[np.newaxis, :] - staffed, 0)
+    }
+
+
+def coverage_report(days, matrix: dict) -> dict:
+    """Matrices en listes (réponse JSON) et cellules sous l'effectif minimal"""
+    gap = matrix["gap"]
+    below = [
+        {
+            "date": days[day_index],
+            "shift": SHIFTS[shift_index],
+            "staffed": int(matrix["staffed"][day_index, shift_index]),
+            "required": int(matrix["required"][shift_index]),
+            "missing": int(gap[day_index, shift_index])
+        }
+        for day_index, shift_index in zip(*np.nonzero(gap))
+    ]
+    return {
+        "days": list(days),
+        "shifts": list(SHIFTS),
+        "required": {shift: int(count) for shift, count in zip(SHIFTS, matrix["required"])},
+        "staffed": matrix["staffed"].tolist(),
+        "coverage_min": matrix["coverage_min"].tolist(),
+        "coverage_max": matrix["coverage_max"].tolist(),
+        "gap": gap.tolist(),
+        "below": below
+    }
@@ -0,0 +1,84 @@
+# Occupation des agents jour par jour : bitmaps à la minute (1440 bits, 180 octets par agent et par jour).
+# Un bit à 1 : minute occupée par un planning travaillé, une absence, une disponibilité ou une mission (un repos ou un congé ne compte pas).
+# Les recherches (remplaçants) comparent ces bitmaps à des masques par ET bit à bit, sans relire les créneaux.
+from datetime import date, datetime, timedelta
+
+import numpy as np
+
+from utils.time_fields import DAY_MINUTES
+
+DAY_BYTES = DAY_MINUTES // 8
+# Repos quotidien : 11h consécutives entre deux journées de travail
+DAILY_REST_MINUTES = 11 * 60
+# Poids du score d'un remplaçant (total 1) : repos autour des créneaux, marge sur le contrat, proximité (service, spécialité)
+SCORE_WEIGHTS = {"rest": 0.4, "headroom": 0.4, "affinity": 0.2}
+# Nombre de bits à 1 de chaque octet
+POPCOUNT = np.array([bin(value).count("1") for value in range(256)], dtype=np.uint16)
+
+
+def minute_offset(origin: datetime, value: datetime) -> int:
+    return int((value - origin).total_seconds() // 60)
+
+
+def intervals_mask(first_day: date, nb_days: int, intervals) -> np.ndarray:
+    """
+    Masque nb_days × DAY_BYTES (bits empaquetés) des minutes couvertes par les intervalles (start, end) en datetime,
+    fins exclues, limités aux jours [first_day, first_day + nb_days[
+    """
+    horizon = nb_days * DAY_MINUTES
+    origin = datetime(first_day.year, first_day.month, first_day.day)
+    delta = np.zeros(horizon + 1, dtype=np.int32)
+    for start, end in intervals:
+        start, end = max(minute_offset(origin, start), 0), min(minute_offset(origin, end), horizon)
+        if end > start:
+            delta[start] += 1
+            delta[end] -= 1
+    return np.packbits(np.cumsum(delta[:horizon]) > 0).reshape(nb_days, DAY_BYTES)
+
+
+def count_minutes(masks: np.ndarray) -> np.ndarray:
+    """Minutes à 1 par ligne : masks (n, jours, DAY_BYTES) -> (n,)"""
+    return POPCOUNT[masks].reshape(len(masks), -1).sum(axis=1)
+
+
+def rest_mask(first_day: date, nb_days: int, intervals, rest_minutes: int = DAILY_REST_MINUTES) -> np.ndarray:
+    """Minutes de repos attendues autour des intervalles : rest_minutes avant chaque début et après chaque fin, hors intervalles"""
+    windows = [
+        window
+        for start, end in intervals
+        for window in ((start - timedelta(minutes=rest_minutes), start), (end, end + timedelta(minutes=rest_minutes)))
+    ]
+    return intervals_mask(first_day, nb_days, windows) & ~intervals_mask(first_day, nb_days, intervals)
+
+
+def weekly_headroom(contract_minutes, worked_minutes, load_minutes):
+    """
+    Marge de chaque candidat sur ses heures de contrat, semaine par semaine.
+    contract_minutes (n,), worked_minutes (n, semaines), load_minutes (semaines,) : minutes à remplacer.
+    Retourne (n,) les minutes restantes après remplacement sur la semaine la plus chargée (négatives : contrat dépassé).
+    """
+    remaining = np.asarray(contract_minutes)[:, np.newaxis] - np.asarray(worked_minutes) - np.asarray(load_minutes)[np.newaxis, :]
+    return remaining.min(axis=1) if remaining.shape[1] else np.asarray(contract_minutes, dtype=np.int64)
+
+
+def rank_candidates(busy, need, rest, contract_minutes, remaining, affinity):
+    """
+    Score des candidats et ordre de classement.
+    busy : bitmaps (n, jours, DAY_BYTES) ; need / rest : masques (jours, DAY_BYTES) des minutes à remplacer et du repos attendu
+    remaining : minutes restantes sur le contrat après remplacement ; affinity (n,) entre 0 et 1
+    Retourne (minutes en conflit, minutes travaillées pendant le repos attendu, score, indices classés des candidats retenus).
+    Un candidat est retenu s'il n'a aucune minute occupée pendant les créneaux à remplacer et reste sous son contrat.
+    """
+    conflict_minutes = count_minutes(busy & need[np.newaxis])
+    rest_busy = count_minutes(busy & rest[np.newaxis])
+    rest_total = max(int(POPCOUNT[rest].sum()), 1)
+    contract = np.maximum(np.asarray(contract_minutes, dtype=np.float64), 1)
+
+    score = (
+        SCORE_WEIGHTS["rest"] * (1 - rest_busy / rest_total)
+        + SCORE_WEIGHTS["headroom"] * np.clip(remaining / contract, 0, 1)
+        + SCORE_WEIGHTS["affinity"] * np.asarray(affinity, dtype=np.float64)
+    )
+    eligible = np.flatnonzero((conflict_minutes == 0) & (remaining >= 0))
+    order = eligible[np.argsort(-score[eligible], kind="stable")]
+    return conflict_minutes, rest_busy, score, order
@@ -0,0 +1,116 @@
+# Génération gloutonne d'un planning à partir des profils d'agents (contrat + contraintes)
+from datetime import date, datetime
+
+from scheduling.contracts import format_minutes, shift_duration
+from utils.time_fields import planning_time_fields
+
+WORK_CODE = "SOIN"
+REST_CODE = "REPOS"
+ABSENCE_CODE = "CONGÉ"
+ABSENCE_RANGE = "Journée"
+# Un créneau raccourci pour finir le quota hebdomadaire n'est proposé qu'à partir de cette durée
+MIN_SHIFT_MINUTES = 3 * 60
+GENERATED_COMMENT = "Généré automatiquement à partir du contrat"
+
+
+def iso_week(day: str):
+    return date.fromisoformat(day).isocalendar()[:2]
+
+
+def planning_doc(user_id, day, activity_code, plage_horaire, now):
+    return {
+        "user_id": user_id,
+        "date": day,
+        "activity_code": activity_code,
+        "plage_horaire": plage_horaire,
+        **planning_time_fields(day, plage_horaire),
+        "commentaire": GENERATED_COMMENT,
+        "generated": True,
+        "created_at": now,
+        "updated_at": now
+    }
+
+
+def plan_agent(profile, days, now):
+    """
+    Planifie un agent sur la période. Priorités, jour par jour :
+    plannings existants > absences > disponibilités validées > jours de travail du contrat > repos.
+    Les jours de contrat ne sont travaillés que tant que le quota hebdomadaire n'est pas atteint.
+    Retourne (documents à insérer, minutes planifiées)
+    """
+    user_id = profile["user_id"]
+    docs = []
+    week_minutes = {}
+    planned = 0
+
+    # Les plannings existants et les disponibilités validées consomment le quota avant les jours de contrat
+    for day in days:
+        week = iso_week(day)
+        if day in profile["locked"]:
+            week_minutes[week] = week_minutes.get(week, 0) + profile["locked"][day]
+        elif day not in profile["absences"] and day in profile["availabilities"]:
+            start, end = profile["availabilities"][day]
+            week_minutes[week] = week_minutes.get(week, 0) + shift_duration(start, end)
+
+    for day in days:
+        if day in profile["locked"]:
+            planned += profile["locked"][day]
+            continue
+
+        if day in profile["absences"]:
+            docs.append(planning_doc(user_id, day, ABSENCE_CODE, ABSENCE_RANGE, now))
+            continue
+
+        if day in profile["availabilities"]:
+            start, end = profile["availabilities"][day]
+            docs.append(planning_doc(user_id, day, WORK_CODE, f"{format_minutes(start)}-{format_minutes(end)}", now))
+            planned += shift_duration(start, end)
+            continue
+
+        shift = profile["work_days"].get(date.fromisoformat(day).weekday())
+        week = iso_week(day)
+        remaining = profile["weekly_minutes"] - week_minutes.get(week, 0)
+        if shift and remaining >= MIN_SHIFT_MINUTES:
+            start, end = shift
+            duration = min(shift_duration(start, end), remaining)
+            docs.append(planning_doc(
+                user_id, day, WORK_CODE, f"{format_minutes(start)}-{format_minutes(start + duration)}", now
+            ))
+            week_minutes[week] = week_minutes.get(week, 0) + duration
+            planned += duration
+        else:
+            docs.append(planning_doc(user_id, day, REST_CODE, "", now))
+
+    return docs, planned
+
+
+def agent_summary(profile, planned, nb_weeks, generated_days):
+    """Bilan d'un agent : heures planifiées face aux heures du contrat sur la période"""
+    target = round(profile["weekly_minutes"] * nb_weeks)
+    return {
+        "user_id": profile["user_id"],
+        "name": profile["name"],
+        "planned_hours": round(planned / 60, 2),
+        "contract_hours": round(target / 60, 2),
+        "delta_hours": round((planned - target) / 60, 2),
+        "absence_days": len(profile["absences"]),
+        "generated_days": generated_days
+    }
+
+
+def generate_planning(profiles, days):
+    """
+    Génère le planning de tous les agents sur la liste de dates fournie.
+    Retourne (documents à insérer, résumé par agent)
+    """
+    now = datetime.now()
+    all_docs = []
+    summary = []
+    nb_weeks = len(days) / 7
+
+    for profile in profiles:
+        docs, planned = plan_agent(profile, days, now)
+        all_docs.extend(docs)
+        summary.append(agent_summary(profile, planned, nb_weeks, len(docs)))
+
+    return all_docs, summary
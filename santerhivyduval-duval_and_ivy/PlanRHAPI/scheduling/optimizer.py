@@ -0,0 +1,505 @@
+# Optimisation des plannings : couverture minimale par créneau, heures du contrat et repos
+# Le planning glouton sert de point de départ, amélioré par recuit simulé ou par un solveur ILP (pulp, optionnel)
+import math
+import random
+import time
+from datetime import date, datetime
+
+from scheduling.contracts import format_minutes, shift_duration
+from scheduling.generator import (
+    ABSENCE_CODE, ABSENCE_RANGE, REST_CODE, WORK_CODE, agent_summary, iso_week, plan_agent, planning_doc
+)
+
+try:
+    import pulp
+except ImportError:  # Solveur ILP optionnel : sans pulp, le recuit simulé est utilisé
+    pulp = None
+
+DAY_SHIFT = "jour"
+NIGHT_SHIFT = "nuit"
+SHIFTS = (DAY_SHIFT, NIGHT_SHIFT)
+# Un créneau commençant entre 06:00 et 18:00 est un créneau de jour, sinon de nuit
+DAY_SHIFT_START = (6 * 60, 18 * 60)
+
+# Poids de l'objectif (à minimiser)
+UNDERSTAFF_WEIGHT = 100  # par agent manquant sur un créneau (règle "understaffing")
+OVERTIME_WEIGHT = 2  # par heure au-delà du contrat, semaine par semaine
+UNDERTIME_WEIGHT = 1  # par heure en deçà du contrat, semaine par semaine
+EXTRA_DAY_WEIGHT = 4  # par jour travaillé en dehors des jours du contrat
+REST_WEIGHT = 50  # par jour au-delà de MAX_CONSECUTIVE_DAYS et par repos quotidien trop court
+MAX_CONSECUTIVE_DAYS = 6
+MIN_DAILY_REST_MINUTES = 11 * 60
+
+DEFAULT_TIME_BUDGET = 5.0
+MAX_TIME_BUDGET = 60.0
+# Recuit simulé : température décroissante (géométrique) sur le budget de temps
+INITIAL_TEMPERATURE = 20.0
+FINAL_TEMPERATURE = 0.05
+CHECK_EVERY = 512
+# Au-delà, le solveur ILP ne converge plus dans un budget de quelques secondes : 'auto' choisit le recuit
+ILP_MAX_FREE_CELLS = 4000
+
+# Nature des cases agent × jour
+FREE, LOCKED, ABSENT, AVAILABLE = 0, 1, 2, 3
+
+
+def shift_class(start: int) -> int:
+    return 0 if DAY_SHIFT_START[0] <= start < DAY_SHIFT_START[1] else 1
+
+
+def hours_penalty(minutes: int, quota: float) -> float:
+    gap = (minutes - quota) / 60
+    return gap * OVERTIME_WEIGHT if gap > 0 else -gap * UNDERTIME_WEIGHT
+
+
+def run_penalty(length: int) -> int:
+    return max(0, length - MAX_CONSECUTIVE_DAYS)
+
+
+class Roster:
+    """
+    Planning d'un service sous forme de tableaux plats (case = agent × jour), évalué de façon incrémentale :
+    changer une case ne recalcule que le créneau, la semaine et la séquence de jours qu'elle touche.
+    Les plannings existants, absences et disponibilités validées sont figés ; seules les autres cases varient.
+    """
+
+    def __init__(self, profiles, days, min_staff=None):
+        self.profiles = profiles
+        self.days = days
+        self.nb_days = nb_days = len(days)
+        min_staff = min_staff or {}
+        self.required = tuple(int(min_staff.get(shift, 0)) for shift in SHIFTS)
+
+        weekdays = [date.fromisoformat(day).weekday() for day in days]
+        week_index = {}
+        self.day_week = [week_index.setdefault(iso_week(day), len(week_index)) for day in days]
+        self.nb_weeks = nb_weeks = len(week_index)
+        self.week_days = [[] for _ in range(nb_weeks)]
+        for d, week in enumerate(self.day_week):
+            self.week_days[week].append(d)
+
+        size = len(profiles) * nb_days
+        self.kind = bytearray(size)
+        self.extra = bytearray(size)
+        self.cls = bytearray(size)
+        self.start = [0] * size
+        self.dur = [0] * size
+        self.x = bytearray(size)
+        # Quota hebdomadaire proratisé au nombre de jours de la semaine compris dans la période
+        self.quota = [0.0] * (len(profiles) * nb_weeks)
+
+        for a, profile in enumerate(profiles):
+            work_days = profile["work_days"]
+            shifts = list(work_days.values())
+            reference = max(shifts, key=shifts.count) if shifts else (8 * 60, 16 * 60)
+            for week in range(nb_weeks):
+                self.quota[a * nb_weeks + week] = profile["weekly_minutes"] * len(self.week_days[week]) / 7
+            # Décisions du générateur glouton : point de départ de l'optimisation
+            greedy_docs, _ = plan_agent(profile, days, None)
+            greedy_work = {doc["date"] for doc in greedy_docs if doc["activity_code"] == WORK_CODE}
+
+            for d, day in enumerate(days):
+                i = a * nb_days + d
+                start, end = work_days.get(weekdays[d], reference)
+                duration = shift_duration(start, end)
+                if day in profile["locked"]:
+                    self.kind[i] = LOCKED
+                    duration = profile["locked"][day]
+                    self.x[i] = duration > 0
+                elif day in profile["absences"]:
+                    self.kind[i] = ABSENT
+                elif day in profile["availabilities"]:
+                    self.kind[i] = AVAILABLE
+                    start, end = profile["availabilities"][day]
+                    duration = shift_duration(start, end)
+                    self.x[i] = 1
+                else:
+                    self.extra[i] = weekdays[d] not in work_days
+                    self.x[i] = day in greedy_work
+                self.start[i] = start
+                self.dur[i] = duration
+                self.cls[i] = shift_class(start)
+
+        self.free_cells = [i for i in range(size) if self.kind[i] == FREE]
+        self.load(self.x)
+
+    # -------------------------------------------------------------------------
+    # État et évaluation complète
+    # -------------------------------------------------------------------------
+
+    def load(self, x):
+        """Repart d'une affectation complète et recalcule compteurs et objectif"""
+        self.x = bytearray(x)
+        nb_days, nb_weeks = self.nb_days, self.nb_weeks
+        self.staffed = [0] * (nb_days * 2)
+        self.week_minutes = [0] * (len(self.profiles) * nb_weeks)
+        for i, working in enumerate(self.x):
+            if working:
+                a, d = divmod(i, nb_days)
+                self.staffed[d * 2 + self.cls[i]] += 1
+                self.week_minutes[a * nb_weeks + self.day_week[d]] += self.dur[i]
+        self.objective = sum(self.evaluate().values())
+
+    def rest_gap_too_short(self, i, j):
+        """Repos entre la fin du créneau i et le début du créneau j (jour suivant) insuffisant"""
+        return 24 * 60 + self.start[j] - (self.start[i] + self.dur[i]) < MIN_DAILY_REST_MINUTES
+
+    def evaluate(self):
+        """Objectif détaillé, recalculé entièrement (contrôle de l'évaluation incrémentale)"""
+        x, nb_days = self.x, self.nb_days
+        understaffing = sum(
+            max(0, self.required[c % 2] - staffed) for c, staffed in enumerate(self.staffed)
+        ) * UNDERSTAFF_WEIGHT
+        hours = sum(hours_penalty(minutes, quota) for minutes, quota in zip(self.week_minutes, self.quota))
+        extra_days = sum(1 for i in self.free_cells if x[i] and self.extra[i]) * EXTRA_DAY_WEIGHT
+
+        rest = 0
+        for a in range(len(self.profiles)):
+            base = a * nb_days
+            run = 0
+            for d in range(nb_days):
+                i = base + d
+                if x[i]:
+                    run += 1
+                    if d and x[i - 1] and self.rest_gap_too_short(i - 1, i):
+                        rest += 1
+                else:
+                    rest += run_penalty(run)
+                    run = 0
+            rest += run_penalty(run)
+
+        return {
+            "understaffing": understaffing,
+            "hours": round(hours, 2),
+            "extra_days": extra_days,
+            "rest": rest * REST_WEIGHT
+        }
+
+    # -------------------------------------------------------------------------
+    # Évaluation incrémentale
+    # -------------------------------------------------------------------------
+
+    def delta(self, i) -> float:
+        """Variation de l'objectif si la case i (libre) change d'état"""
+        x, nb_days = self.x, self.nb_days
+        a, d = divmod(i, nb_days)
+        sign = -1 if x[i] else 1
+
+        required = self.required[self.cls[i]]
+        staffed = self.staffed[d * 2 + self.cls[i]]
+        change = UNDERSTAFF_WEIGHT * (max(0, required - staffed - sign) - max(0, required - staffed))
+
+        w = a * self.nb_weeks + self.day_week[d]
+        minutes, quota = self.week_minutes[w], self.quota[w]
+        change += hours_penalty(minutes + sign * self.dur[i], quota) - hours_penalty(minutes, quota)
+
+        if self.extra[i]:
+            change += sign * EXTRA_DAY_WEIGHT
+
+        # Séquences de jours travaillés de part et d'autre de la case
+        base = a * nb_days
+        before = 0
+        j = d - 1
+        while j >= 0 and x[base + j]:
+            before += 1
+            j -= 1
+        after = 0
+        j = d + 1
+        while j < nb_days and x[base + j]:
+            after += 1
+            j += 1
+        joined = run_penalty(before + 1 + after)
+        split = run_penalty(before) + run_penalty(after)
+        rest = joined - split if sign > 0 else split - joined
+
+        # Repos quotidien avec la veille et le lendemain
+        short_rests = 0
+        if d and x[i - 1] and self.rest_gap_too_short(i - 1, i):
+            short_rests += 1
+        if d + 1 < nb_days and x[i + 1] and self.rest_gap_too_short(i, i + 1):
+            short_rests += 1
+        rest += sign * short_rests
+
+        return change + rest * REST_WEIGHT
+
+    def flip(self, i, change):
+        """Applique le changement d'état de la case i, de variation change (calculée par delta)"""
+        a, d = divmod(i, self.nb_days)
+        sign = -1 if self.x[i] else 1
+        self.x[i] ^= 1
+        self.staffed[d * 2 + self.cls[i]] += sign
+        self.week_minutes[a * self.nb_weeks + self.day_week[d]] += sign * self.dur[i]
+        self.objective += change
+
+    # -------------------------------------------------------------------------
+    # Résultat
+    # -------------------------------------------------------------------------
+
+    def understaffed(self):
+        """Créneaux sous l'effectif minimal"""
+        return [
+            {
+                "date": self.days[c // 2],
+                "shift": SHIFTS[c % 2],
+                "required": self.required[c % 2],
+                "staffed": staffed
+            }
+            for c, staffed in enumerate(self.staffed)
+            if staffed < self.required[c % 2]
+        ]
+
+    def to_docs(self):
+        """Documents de planning à insérer et bilan par agent ; les plannings existants ne sont pas réécrits"""
+        now = datetime.now()
+        nb_days = self.nb_days
+        docs = []
+        summary = []
+        for a, profile in enumerate(self.profiles):
+            user_id = profile["user_id"]
+            agent_docs = []
+            planned = 0
+            for d, day in enumerate(self.days):
+                i = a * nb_days + d
+                if self.x[i]:
+                    planned += self.dur[i]
+                if self.kind[i] == LOCKED:
+                    continue
+                if self.kind[i] == ABSENT:
+                    agent_docs.append(planning_doc(user_id, day, ABSENCE_CODE, ABSENCE_RANGE, now))
+                elif self.x[i]:
+                    plage = f"{format_minutes(self.start[i])}-{format_minutes(self.start[i] + self.dur[i])}"
+                    agent_docs.append(planning_doc(user_id, day, WORK_CODE, plage, now))
+                else:
+                    agent_docs.append(planning_doc(user_id, day, REST_CODE, "", now))
+            docs.extend(agent_docs)
+            summary.append(agent_summary(profile, planned, nb_days / 7, len(agent_docs)))
+        return docs, summary
+
+
+# =============================================================================
+# BACKENDS D'OPTIMISATION
+# =============================================================================
+
+def keep_greedy(roster, time_budget, seed=None):
+    """Planning glouton tel quel (référence)"""
+    return [(0.0, round(roster.objective, 2))]
+
+
+def anneal(roster, time_budget, seed=None):
+    """
+    Recuit simulé sur les cases libres, dans le budget de temps.
+    Mouvements : basculer une case, déplacer un jour travaillé dans la semaine d'un agent,
+    échanger un jour travaillé entre deux agents. Le meilleur planning rencontré est conservé.
+    Retourne la trace [(secondes écoulées, meilleur objectif)]
+    """
+    rng = random.Random(seed)
+    free = roster.free_cells
+    started = time.perf_counter()
+    trace = [(0.0, round(roster.objective, 2))]
+    if not free or roster.objective <= 0:
+        return trace
+
+    nb_days, nb_agents = roster.nb_days, len(roster.profiles)
+    x, kind = roster.x, roster.kind
+    best = roster.objective
+    best_x = bytearray(x)
+    best_dirty = False
+    temperature = INITIAL_TEMPERATURE
+    iteration = 0
+
+    while True:
+        iteration += 1
+        if iteration % CHECK_EVERY == 0:
+            elapsed = time.perf_counter() - started
+            if elapsed >= time_budget or best <= 0:
+                break
+            temperature = INITIAL_TEMPERATURE * (FINAL_TEMPERATURE / INITIAL_TEMPERATURE) ** (elapsed / time_budget)
+            if best < trace[-1][1] - 0.005:
+                trace.append((round(elapsed, 3), round(best, 2)))
+
+        i = free[rng.randrange(len(free))]
+        move = rng.random()
+        j = None
+        if move < 0.5:
+            a, d = divmod(i, nb_days)
+            if move < 0.25:
+                # Même agent, autre jour de la même semaine
+                week = roster.week_days[roster.day_week[d]]
+                j = a * nb_days + week[rng.randrange(len(week))]
+            else:
+                # Autre agent, même jour
+                j = rng.randrange(nb_agents) * nb_days + d
+            if kind[j] != FREE or x[j] == x[i]:
+                j = None
+
+        change = roster.delta(i)
+        if j is None:
+            if change > 0 and rng.random() >= math.exp(-change / temperature):
+                continue
+            if change > 0 and best_dirty:
+                best_x[:] = x
+                best_dirty = False
+            roster.flip(i, change)
+        else:
+            roster.flip(i, change)
+            total = change + roster.delta(j)
+            if total > 0 and rng.random() >= math.exp(-total / temperature):
+                roster.flip(i, -change)
+                continue
+            if total > 0 and best_dirty:
+                # Le meilleur état est celui d'avant le mouvement composé
+                x[i] ^= 1
+                best_x[:] = x
+                x[i] ^= 1
+                best_dirty = False
+            roster.flip(j, total - change)
+
+        if roster.objective < best - 1e-9:
+            best = roster.objective
+            best_dirty = True
+
+    if best_dirty:
+        best_x[:] = roster.x
+    roster.load(best_x)
+    trace.append((round(time.perf_counter() - started, 3), round(roster.objective, 2)))
+    return trace
+
+
+def solve_ilp(roster, time_budget, seed=None):
+    """
+    Programme linéaire en nombres entiers (pulp + CBC), amorcé par le planning courant.
+    Même objectif que le recuit ; le repos est modélisé par fenêtres glissantes de MAX_CONSECUTIVE_DAYS + 1 jours.
+    """
+    if pulp is None:
+        raise ValueError("Le backend 'ilp' nécessite le paquet pulp")
+    started = time.perf_counter()
+    trace = [(0.0, round(roster.objective, 2))]
+    nb_days, nb_weeks = roster.nb_days, roster.nb_weeks
+
+    problem = pulp.LpProblem("planning", pulp.LpMinimize)
+    variables = {}
+    for i in roster.free_cells:
+        variables[i] = pulp.LpVariable(f"x_{i}", cat="Binary")
+        variables[i].setInitialValue(roster.x[i])
+
+    def work(i):
+        return variables[i] if i in variables else int(roster.x[i])
+
+    objective = []
+    cells_by_slot = {}
+    for i in range(len(roster.x)):
+        if i in variables or roster.x[i]:
+            cells_by_slot.setdefault((i % nb_days) * 2 + roster.cls[i], []).append(i)
+    for c in range(nb_days * 2):
+        required = roster.required[c % 2]
+        if required:
+            missing = pulp.LpVariable(f"missing_{c}", lowBound=0)
+            problem += missing >= required - pulp.lpSum(work(i) for i in cells_by_slot.get(c, []))
+            objective.append(UNDERSTAFF_WEIGHT * missing)
+
+    for a in range(len(roster.profiles)):
+        base = a * nb_days
+        for week, week_days in enumerate(roster.week_days):
+            w = a * nb_weeks + week
+            over = pulp.LpVariable(f"over_{w}", lowBound=0)
+            under = pulp.LpVariable(f"under_{w}", lowBound=0)
+            minutes = pulp.lpSum(roster.dur[base + d] * work(base + d) for d in week_days)
+            problem += over - under == minutes - roster.quota[w]
+            objective.append(OVERTIME_WEIGHT / 60 * over + UNDERTIME_WEIGHT / 60 * under)
+
+        for start in range(nb_days - MAX_CONSECUTIVE_DAYS):
+            window = range(base + start, base + start + MAX_CONSECUTIVE_DAYS + 1)
+            if any(i in variables for i in window):
+                excess = pulp.LpVariable(f"excess_{base + start}", lowBound=0)
+                problem += pulp.lpSum(work(i) for i in window) <= MAX_CONSECUTIVE_DAYS + excess
+                objective.append(REST_WEIGHT * excess)
+
+        for d in range(nb_days - 1):
+            i = base + d
+            if (i in variables or i + 1 in variables) and roster.rest_gap_too_short(i, i + 1):
+                short = pulp.LpVariable(f"short_rest_{i}", lowBound=0)
+                problem += work(i) + work(i + 1) <= 1 + short
+                objective.append(REST_WEIGHT * short)
+
+    for i in variables:
+        if roster.extra[i]:
+            objective.append(EXTRA_DAY_WEIGHT * variables[i])
+
+    problem += pulp.lpSum(objective)
+    remaining = max(1, int(time_budget - (time.perf_counter() - started)))
+    problem.solve(pulp.PULP_CBC_CMD(msg=False, timeLimit=remaining, warmStart=True))
+
+    solution = bytearray(roster.x)
+    for i, variable in variables.items():
+        if variable.varValue is not None:
+            solution[i] = variable.varValue > 0.5
+    previous = roster.objective
+    candidate = bytearray(roster.x)
+    roster.load(solution)
+    if roster.objective > previous:
+        # Solution du solveur moins bonne que le point de départ (temps écoulé) : on garde le départ
+        roster.load(candidate)
+    trace.append((round(time.perf_counter() - started, 3), round(roster.objective, 2)))
+    return trace
+
+
+OPTIMIZERS = {
+    "greedy": keep_greedy,
+    "annealing": anneal,
+    "ilp": solve_ilp,
+}
+
+
+def available_backends():
+    return [name for name in OPTIMIZERS if name != "ilp" or pulp is not None]
+
+
+def resolve_backend(name: str = "auto", nb_free_cells: int = 0) -> str:
+    """'auto' : ILP si pulp est installé et le problème de petite taille, sinon recuit simulé"""
+    if name == "auto":
+        return "ilp" if pulp is not None and nb_free_cells <= ILP_MAX_FREE_CELLS else "annealing"
+    if name not in available_backends():
+        raise ValueError(f"Backend inconnu ou indisponible: {name}. Backends disponibles: auto, {', '.join(available_backends())}")
+    return name
+
+
+def check_options(backend, min_staff=None, time_budget=DEFAULT_TIME_BUDGET):
+    """Valide les options d'optimisation avant tout chargement ou écriture (ValueError sinon)"""
+    if backend != "auto":
+        resolve_backend(backend)
+    unknown = [shift for shift in (min_staff or {}) if shift not in SHIFTS]
+    if unknown:
+        raise ValueError(f"Créneaux inconnus: {', '.join(unknown)}. Créneaux disponibles: {', '.join(SHIFTS)}")
+    if any(count < 0 for count in (min_staff or {}).values()):
+        raise ValueError("L'effectif minimal d'un créneau ne peut pas être négatif")
+    if not 0 < time_budget <= MAX_TIME_BUDGET:
+        raise ValueError(f"Budget de temps invalide. Valeurs autorisées: ]0, {MAX_TIME_BUDGET:g}] secondes")
+
+
+def optimize_planning(profiles, days, min_staff=None, backend="auto", time_budget=DEFAULT_TIME_BUDGET, seed=None):
+    """
+    Optimise le planning d'un service à partir des mêmes profils que le générateur.
+    min_staff : effectif minimal par créneau, {"jour": n, "nuit": m}, chaque jour de la période.
+    Retourne (documents à insérer, résumé par agent, rapport : objectif détaillé et trace objectif / temps)
+    """
+    check_options(backend, min_staff, time_budget)
+
+    started = time.perf_counter()
+    roster = Roster(profiles, days, min_staff)
+    name = resolve_backend(backend, len(roster.free_cells))
+    initial = roster.objective
+    trace = OPTIMIZERS[name](roster, time_budget, seed)
+    breakdown = roster.evaluate()
+    docs, summary = roster.to_docs()
+
+    report = {
+        "backend": name,
+        "time_budget": time_budget,
+        "elapsed": round(time.perf_counter() - started, 3),
+        "initial_objective": round(initial, 2),
+        "objective": round(sum(breakdown.values()), 2),
+        "breakdown": breakdown,
+        "trace": trace,
+        "understaffed": roster.understaffed()
+    }
+    return docs, summary, report
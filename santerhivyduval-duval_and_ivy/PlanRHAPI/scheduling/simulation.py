@@ -0,0 +1,30 @@
+# Simulation d'un service, exécutée dans un processus du pool : entrées et résultat sont sérialisables (pickle)
+import time
+
+from scheduling.generator import generate_planning
+from scheduling.optimizer import optimize_planning
+
+
+def simulate_service(service_id, profiles, days, backend=None, time_budget=5.0, min_staff=None):
+    """
+    Génère (et optionnellement optimise) le planning d'un service à partir des profils déjà chargés.
+    Retourne le résultat du service, plannings compris.
+    """
+    started = time.perf_counter()
+    optimization = None
+    if backend:
+        docs, summary, optimization = optimize_planning(
+            profiles, days, min_staff, backend=backend, time_budget=time_budget
+        )
+    else:
+        docs, summary = generate_planning(profiles, days)
+
+    return {
+        "service_id": service_id,
+        "agents": len(profiles),
+        "generated": len(docs),
+        "summary": summary,
+        "optimization": optimization,
+        "elapsed": round(time.perf_counter() - started, 3),
+        "plannings": docs
+    }
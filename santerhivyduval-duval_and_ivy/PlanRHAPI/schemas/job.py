@@ -0,0 +1,30 @@
+from pydantic import BaseModel
+from typing import Any, Dict, List, Optional
+
+class JobCreate(BaseModel):
+    type: str  # "simulation", "detection"
+    params: Dict[str, Any] = {}
+
+class DetectionSweep(BaseModel):
+    rules: Optional[List[str]] = None  # None : toutes les règles exécutables
+    start_date: Optional[str] = None  # Format: YYYY-MM-DD
+    end_date: Optional[str] = None  # Format: YYYY-MM-DD
+    create_anomalies: bool = False  # Par défaut, simple rapport : aucune anomalie n'est créée
+
+class ComplianceRefresh(BaseModel):
+    start_date: Optional[str] = None  # Format: YYYY-MM-DD ; None : premier planning
+    end_date: Optional[str] = None  # Format: YYYY-MM-DD ; None : dernier planning
+    service_id: Optional[str] = None  # None : tous les agents ayant des plannings sur la période
+
+class HourTotalsRebuild(BaseModel):
+    start_date: Optional[str] = None  # Format: YYYY-MM-DD ; None : premier planning
+    end_date: Optional[str] = None  # Format: YYYY-MM-DD ; None : dernier planning
+    service_id: Optional[str] = None  # Sans période ni service : reconstruction complète de la collection
+
+class FreeBusyRebuild(BaseModel):
+    start_date: Optional[str] = None  # Format: YYYY-MM-DD ; None : aujourd'hui
+    end_date: Optional[str] = None  # Format: YYYY-MM-DD ; None : FREE_BUSY_HORIZON_DAYS jours à venir
+    service_id: Optional[str] = None  # None : tous les agents
+
+class ProgramDaysSync(BaseModel):
+    year: Optional[int] = None  # None : année déduite de chaque grille
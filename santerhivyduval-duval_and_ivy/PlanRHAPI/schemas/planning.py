@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import Optional
+from typing import Any, Dict, List, Optional
 from datetime import date, time, datetime
 
 class PlanningCreate(BaseModel):
@@ -18,6 +18,27 @@ class PlanningUpdate(BaseModel):
     commentaire: Optional[str] = None
     updated_at: Optional[datetime] = None
 
+class PlanningGenerate(BaseModel):
+    service_id: str
+    year: int
+    month: int  # 1 à 12
+    overwrite: bool = False  # Remplace les plannings générés précédemment sur la période
+    dry_run: bool = False  # Prévisualisation : rien n'est écrit en base
+    backend: Optional[str] = None  # Optimisation : "auto", "annealing", "ilp" ; None : générateur glouton seul
+    time_budget: float = 5.0  # Secondes accordées à l'optimisation
+    min_staff: Optional[Dict[str, int]] = None  # Effectif minimal par créneau : {"jour": n, "nuit": m}
+
+class PlanningSimulation(BaseModel):
+    year: int
+    month: int  # 1 à 12
+    service_ids: Optional[List[str]] = None  # None : tous les services
+    contrat: Optional[Dict[str, Any]] = None  # Contrat personnalisé appliqué à tous les agents (contrat_hour_week, work_days...)
+    dry_run: bool = True  # Prévisualisation par défaut : rien n'est écrit en base
+    overwrite: bool = False  # Remplace les plannings générés précédemment sur la période
+    backend: Optional[str] = None  # Optimisation : "auto", "annealing", "ilp" ; None : générateur glouton seul
+    time_budget: float = 5.0  # Secondes accordées à l'optimisation, par service
+    min_staff: Optional[Dict[str, int]] = None  # Effectif minimal par créneau : {"jour": n, "nuit": m}
+
 class PlanningResponse(BaseModel):
     id: str
     user_id: str
@@ -1,10 +1,11 @@
 from pydantic import BaseModel
 from datetime import datetime
-from typing import List
+from typing import Dict, List, Optional
 
 class ServiceCreate(BaseModel):
     name: str
     head: str
+    min_staff: Optional[Dict[str, int]] = None  # Effectif minimal par créneau : {"jour": n, "nuit": m} (règle understaffing)
     created_at: datetime = None
     updated_at: datetime = None
     matricule: str = None
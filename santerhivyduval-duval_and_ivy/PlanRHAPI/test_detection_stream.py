@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Script de test de la détection continue (jobs/detection_stream) : des plannings écrits directement en base,
+sans passer par l'API, doivent donner une anomalie et une alerte uniques, levées quand le conflit disparaît.
+Les change streams nécessitent un replica set ; un nœud unique suffit :
+    mongod --replSet rs0 --dbpath /tmp/rs0 --port 27017
+Le script initialise ce replica set s'il ne l'est pas encore ; l'API et le consommateur doivent ensuite être (re)démarrés :
+    python -m jobs.detection_stream
+"""
+
+import os
+import time
+
+import requests
+from bson import ObjectId
+from pymongo import MongoClient
+from pymongo.errors import OperationFailure
+
+from utils.time_fields import planning_time_fields
+
+# Configuration
+API_BASE_URL = "http://localhost:8000"
+MONGO_URI = os.getenv('MONGO_URI', 'mongodb://localhost:27017/')
+DATABASE_NAME = os.getenv('DATABASE_NAME', 'planRhIA')
+POLL_TIMEOUT = 30
+TEST_DAY = "2031-03-04"
+
+
+def ensure_replica_set(client):
+    """Replica set à un nœud (mongod lancé avec --replSet) : initialisé au besoin ; False sur un serveur autonome"""
+    try:
+        client.admin.command("replSetGetStatus")
+        return True
+    except OperationFailure as e:
+        if "--replSet" in str(e) or e.code == 76:
+            return False
+        client.admin.command("replSetInitiate")
+        time.sleep(2)
+        return True
+
+
+def wait_for(predicate):
+    deadline = time.time() + POLL_TIMEOUT
+    while time.time() < deadline:
+        result = predicate()
+        if result:
+            return result
+        time.sleep(0.5)
+    return None
+
+
+def conflict_anomalies(user_id):
+    anomalies = requests.get(f"{API_BASE_URL}/anomalies/user/{user_id}").json().get("data", [])
+    return [anomaly for anomaly in anomalies if anomaly.get("type") == "schedule_conflict"]
+
+
+def test_conflict_detection(database):
+    print("🧪 Conflit écrit directement en base (hors API)")
+    user_id = str(ObjectId())
+    slots = [
+        {"user_id": user_id, "date": TEST_DAY, "plage_horaire": "08:00-16:00", "activity_code": "SOIN"},
+        {"user_id": user_id, "date": TEST_DAY, "plage_horaire": "12:00-20:00", "activity_code": "SOIN"},
+    ]
+    for slot in slots:
+        slot.update(planning_time_fields(slot["date"], slot["plage_horaire"]))
+    database.plannings.insert_many(slots)
+    try:
+        anomalies = wait_for(lambda: conflict_anomalies(user_id))
+        if not anomalies:
+            print(f"❌ Aucune anomalie schedule_conflict après {POLL_TIMEOUT}s (flux démarré ? replica set ?)")
+            return
+        print(f"✅ Anomalie détectée: {anomalies[0]['description']}")
+
+        # Nouvelle écriture sur le même agent et le même jour : pas de nouvelle anomalie ni alerte
+        database.plannings.update_one({"_id": slots[1]["_id"]}, {"$set": {"commentaire": "modifié"}})
+        time.sleep(5)
+        alerts = [
+            alert for alert in requests.get(f"{API_BASE_URL}/alerts/user/{user_id}").json().get("data", [])
+            if alert.get("type") == "schedule_conflict"
+        ]
+        count = len(conflict_anomalies(user_id))
+        print(f"{'✅' if count == 1 and len(alerts) == 1 else '❌'} Dédoublonnage - {count} anomalie(s), {len(alerts)} alerte(s)")
+
+        database.plannings.delete_one({"_id": slots[1]["_id"]})
+        cleared = wait_for(lambda: not conflict_anomalies(user_id))
+        print(f"{'✅' if cleared else '❌'} Conflit supprimé - anomalie levée")
+    finally:
+        database.plannings.delete_many({"user_id": user_id})
+        database.anomalies.delete_many({"user_id": user_id})
+        database.alerts.delete_many({"user_id": user_id})
+
+
+def main():
+    print("🚀 Tests de la détection continue")
+    print("=" * 50)
+    client = MongoClient(MONGO_URI, directConnection=True)
+    if not ensure_replica_set(client):
+        print("❌ MongoDB ne tourne pas en replica set : lancer mongod avec --replSet rs0")
+        return
+    try:
+        requests.get(f"{API_BASE_URL}/")
+    except Exception as e:
+        print(f"❌ Impossible de se connecter à l'API: {e}")
+        print("   Assurez-vous que l'API est démarrée avec: uvicorn main:app --reload")
+        return
+
+    test_conflict_detection(client[DATABASE_NAME])
+    print("=" * 50)
+    print("🎉 Tests terminés!")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+Script de test : chaque requête fréquente des routers doit être servie par un index (IXSCAN)
+Utilise une base de test dédiée, sur laquelle le registre database/indexes.py est appliqué
+"""
+
+import asyncio
+import os
+from datetime import datetime
+
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import MongoClient
+
+from database.indexes import INDEXES, UNIQUE_INDEXES, ensure_indexes, index_drift, index_name
+
+# Configuration
+MONGO_URI = os.getenv('MONGO_URI', 'mongodb://localhost:27017/')
+TEST_DATABASE_NAME = os.getenv('TEST_DATABASE_NAME', 'planRhIA_test_indexes')
+
+# (collection, filtre, tri) : requêtes émises par les routers
+HOT_QUERIES = [
+    ("users", {"matricule": "INF000001ABCD"}, None),
+    ("users", {"email": "agent@example.com"}, None),
+    ("users", {"role": "nurse"}, None),
+    ("users", {"service_id": "S1"}, None),
+    ("absences", {"staff_id": "U1"}, None),
+    ("absences", {"service_id": "S1"}, None),
+    ("absences", {"status": "En cours"}, None),
+    ("absences", {"matricule": "ABS000001AA"}, None),
+    ("absences", {"staff_id": "U1", "start_date": {"$lt": "2025-02-01"}, "end_date": {"$gte": "2025-01-01"}}, None),
+    ("absences", {"start_date": {"$lt": "2025-02-01"}, "end_date": {"$gte": "2025-01-01"}}, None),
+    ("plannings", {"user_id": {"$in": ["U1", "U2"]}, "date": {"$gte": "2025-01-01", "$lt": "2025-02-01"}}, [("date", 1), ("_id", 1)]),
+    ("availabilities", {"user_id": "U1", "date": {"$gte": "2025-01-01", "$lt": "2025-02-01"}}, [("date", 1)]),
+    ("plannings", {"user_id": "U1"}, [("date", 1)]),
+    ("plannings", {"date": "2025-01-01"}, [("plage_horaire", 1)]),
+    ("plannings", {"activity_code": "SOIN"}, [("date", 1)]),
+    ("plannings", {"user_id": "U1", "date": "2025-01-01", "plage_horaire": "08:00-16:00"}, None),
+    ("plannings", {"date": {"$gte": "2025-01-01"}}, [("date", 1), ("_id", 1)]),
+    ("plannings", {"user_id": "U1", "start": {"$lt": datetime(2025, 1, 1, 16), "$gt": datetime(2024, 12, 31, 8)}, "end": {"$gt": datetime(2025, 1, 1, 8)}}, None),
+    ("availabilities", {"user_id": "U1", "start": {"$lt": datetime(2025, 1, 1, 16), "$gt": datetime(2024, 12, 31, 8)}, "end": {"$gt": datetime(2025, 1, 1, 8)}}, None),
+    ("absences", {"staff_id": "U1", "start": {"$lt": datetime(2025, 1, 2)}, "end": {"$gt": datetime(2025, 1, 1)}}, None),
+    ("missions", {"user_id": "U1", "start": {"$lt": datetime(2025, 1, 2)}, "end": {"$gt": datetime(2025, 1, 1)}}, None),
+    ("availabilities", {"user_id": "U1"}, [("date", 1)]),
+    ("availabilities", {"date": "2025-01-01"}, None),
+    ("availabilities", {"status": "proposé"}, [("date", 1), ("_id", 1)]),
+    ("availabilities", {"user_id": "U1", "status": "proposé", "date": {"$gte": "2025-01-01"}}, None),
+    ("alerts", {"user_id": "U1"}, None),
+    ("alerts", {"service_id": "S1"}, None),
+    ("anomalies", {"user_id": "U1"}, None),
+    ("anomalies", {"service_id": "S1"}, None),
+    ("events", {"user_id": "U1"}, None),
+    ("events", {"service_id": "S1"}, None),
+    ("events", {"due_date": {"$gte": "2025-01-01"}}, None),
+    ("events", {"service_id": "S1", "due_date": {"$gte": "2025-01-01", "$lt": "2025-02-01"}}, [("due_date", 1), ("_id", 1)]),
+    ("notifications", {"user_id": "U1"}, [("created_at", -1)]),
+    ("notifications", {"user_id": "U1", "read": False}, None),
+    ("code", {"name": "SOIN"}, None),
+    ("code", {"matricule": "CODE00001A"}, None),
+    ("polls", {"name": "Pôle A"}, None),
+    ("polls", {"matricule": "PO001AAA"}, None),
+    ("speciality", {"name": "Cardiologie"}, None),
+    ("speciality", {"matricule": "COM001AAA"}, None),
+    ("user_contrat", {"user_id": "U1"}, None),
+    ("program_days", {"date": "2025-01-01", "plan": "J21"}, None),
+    ("program_days", {"plan": "J21"}, [("date", 1), ("_id", 1)]),
+    ("program_days", {"user_id": "U1"}, [("date", 1), ("_id", 1)]),
+    ("program_days", {"program_id": "P1"}, None),
+    ("weekly_compliance", {"user_id": "U1", "week_start": "2025-01-06"}, None),
+    ("weekly_compliance", {"week_start": {"$gte": "2025-01-01"}}, [("week_start", 1), ("_id", 1)]),
+    ("weekly_compliance", {"violations": {"$in": ["overtime_exceeded", "weekly_rest"]}}, [("week_start", 1), ("_id", 1)]),
+    ("anomalies", {"user_id": "U1", "metadata.rule_id": "weekly_rest", "metadata.date": "2025-01-06"}, None),
+    ("anomalies", {"service_id": "S1", "metadata.rule_id": "understaffing", "metadata.date": "2025-01-06"}, None),
+    ("anomalies", {"metadata.planning_ids": "P1"}, None),
+    ("alerts", {"user_id": "U1", "metadata.rule_id": "schedule_conflict", "metadata.date": "2025-01-06"}, None),
+    ("absences", {"status": {"$nin": ["Validé par le cadre", "Refusé par le cadre"]}, "start_date": {"$gte": "2025-01-01", "$lte": "2025-01-08"}}, None),
+    ("hour_totals", {"user_id": "U1", "period": "week", "period_start": "2025-01-06"}, None),
+    ("free_busy", {"user_id": {"$in": ["U1", "U2"]}, "day": {"$gte": "2025-01-05", "$lte": "2025-01-08"}}, None),
+    ("users", {"speciality_id": "SP1"}, None),
+    ("asks", {"absence_id": "A1", "colleague_id": {"$in": ["U1", "U2"]}}, None),
+    ("jobs", {"status": "en_attente"}, [("created_at", 1)]),
+    ("jobs", {"type": "simulation"}, [("_id", 1)]),
+]
+
+
+def plan_stages(plan):
+    """Parcourt récursivement un plan d'exécution et retourne la liste des étapes"""
+    stages = [plan.get("stage")]
+    for key in ("inputStage", "queryPlan"):
+        if key in plan:
+            stages += plan_stages(plan[key])
+    for child in plan.get("inputStages", []):
+        stages += plan_stages(child)
+    return stages
+
+
+def winning_stages(explain):
+    planner = explain.get("queryPlanner", {})
+    return plan_stages(planner.get("winningPlan", {}))
+
+
+def seed_documents(collection_name, count=20):
+    """
+    Documents de remplissage d'une collection.
+    Les champs d'un index unique reçoivent une valeur propre à chaque document (sinon E11000 dès le second).
+    """
+    unique_fields = [
+        field
+        for keys in INDEXES.get(collection_name, [])
+        if (collection_name, index_name(keys)) in UNIQUE_INDEXES
+        for field, _ in keys
+    ]
+    documents = []
+    for i in range(count):
+        document = {"seed": i, "created_at": datetime.now()}
+        for field in unique_fields:
+            *parents, leaf = field.split(".")
+            target = document
+            for parent in parents:
+                target = target.setdefault(parent, {})
+            target[leaf] = f"seed-{i}"
+        documents.append(document)
+    return documents
+
+
+def setup_database():
+    """Applique le registre d'index sur la base de test et insère quelques documents"""
+    async def apply():
+        client = AsyncIOMotorClient(MONGO_URI)
+        database = client[TEST_DATABASE_NAME]
+        _, errors = await ensure_indexes(database)
+        # Une seconde application ne doit rien changer (idempotence)
+        await ensure_indexes(database)
+        drift = await index_drift(database)
+        client.close()
+        return errors, drift
+
+    errors, drift = asyncio.run(apply())
+
+    sync_client = MongoClient(MONGO_URI)
+    database = sync_client[TEST_DATABASE_NAME]
+    for collection_name in {query[0] for query in HOT_QUERIES}:
+        database[collection_name].insert_many(seed_documents(collection_name))
+    return sync_client, database, errors, drift
+
+
+def test_index_registry_and_plans():
+    print("🧪 Test des index : chaque requête fréquente doit utiliser un IXSCAN")
+    print("=" * 60)
+
+    sync_client, database, errors, drift = setup_database()
+    try:
+        assert not errors, f"Erreurs de création d'index : {errors}"
+        assert not drift, f"Écart entre index déclarés et index présents : {drift}"
+        print("✅ Registre appliqué, aucun écart")
+
+        failures = []
+        for collection_name, query_filter, sort in HOT_QUERIES:
+            cursor = database[collection_name].find(query_filter)
+            if sort:
+                cursor = cursor.sort(sort)
+            stages = winning_stages(cursor.explain())
+
+            label = f"{collection_name} {query_filter}" + (f" tri {sort}" if sort else "")
+            # IXSCAN, ou EXPRESS_IXSCAN sur les versions récentes de MongoDB
+            if any("IXSCAN" in (stage or "") for stage in stages) and "COLLSCAN" not in stages:
+                print(f"✅ {label}")
+            else:
+                print(f"❌ {label} : {stages}")
+                failures.append(label)
+
+        print("=" * 60)
+        assert not failures, f"Requêtes sans index : {failures}"
+    finally:
+        sync_client.drop_database(TEST_DATABASE_NAME)
+        sync_client.close()
+
+
+if __name__ == "__main__":
+    try:
+        test_index_registry_and_plans()
+        print("🎉 Tous les plans utilisent un index")
+    except AssertionError as e:
+        print(f"❌ {e}")
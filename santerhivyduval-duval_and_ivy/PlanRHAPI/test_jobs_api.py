@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Script de test des jobs en arrière-plan (/jobs) : création, suivi, résultat et annulation
+"""
+
+import time
+from datetime import date
+
+import requests
+
+# Configuration
+API_BASE_URL = "http://localhost:8000"
+POLL_TIMEOUT = 60
+
+
+def wait_for_job(job_id):
+    """Interroge /jobs/{job_id} jusqu'à la fin du job ; retourne son dernier statut"""
+    deadline = time.time() + POLL_TIMEOUT
+    while time.time() < deadline:
+        job = requests.get(f"{API_BASE_URL}/jobs/{job_id}").json()["data"]
+        if job["status"] in ("terminé", "échoué", "annulé"):
+            return job
+        time.sleep(0.5)
+    return job
+
+
+def test_detection_job():
+    print("🧪 Job de détection (schedule_conflict, rapport sans création d'anomalie)")
+    start = time.time()
+    response = requests.post(f"{API_BASE_URL}/jobs", json={"type": "detection", "params": {}})
+    elapsed_ms = (time.time() - start) * 1000
+    if response.status_code != 202:
+        print(f"❌ POST /jobs - Erreur {response.status_code}: {response.text}")
+        return
+    job_id = response.json()["data"]["_id"]
+    print(f"✅ POST /jobs - job {job_id} planifié en {elapsed_ms:.0f} ms")
+
+    response = requests.get(f"{API_BASE_URL}/jobs/{job_id}/result")
+    if response.status_code in (200, 409):
+        print(f"✅ GET /jobs/{{id}}/result avant la fin - {response.status_code}")
+
+    job = wait_for_job(job_id)
+    if job["status"] != "terminé":
+        print(f"❌ Job non terminé: {job['status']} {job.get('error')}")
+        return
+    result = requests.get(f"{API_BASE_URL}/jobs/{job_id}/result").json()["data"]["result"]
+    print(f"✅ Job terminé - {result['total_findings']} conflit(s) détecté(s), {result['anomalies_created']} anomalie(s) créée(s)")
+
+
+def test_cancel_simulation_job():
+    print("🧪 Annulation d'une simulation en arrière-plan")
+    today = date.today()
+    response = requests.post(
+        f"{API_BASE_URL}/plannings/simulate?background=true",
+        json={"year": today.year, "month": today.month, "backend": "annealing", "time_budget": 30}
+    )
+    if response.status_code != 202:
+        print(f"❌ POST /plannings/simulate?background=true - Erreur {response.status_code}: {response.text}")
+        return
+    job_id = response.json()["data"]["_id"]
+    print(f"✅ Simulation planifiée - job {job_id}")
+
+    response = requests.post(f"{API_BASE_URL}/jobs/{job_id}/cancel")
+    if response.status_code == 200:
+        print("✅ POST /jobs/{id}/cancel - OK")
+    else:
+        print(f"❌ POST /jobs/{{id}}/cancel - Erreur {response.status_code}: {response.text}")
+
+    job = wait_for_job(job_id)
+    if job["status"] == "annulé":
+        print("✅ Simulation annulée")
+    else:
+        print(f"❌ Statut inattendu après annulation: {job['status']}")
+
+
+def test_invalid_jobs():
+    print("🧪 Validation des jobs")
+    checks = [
+        ("type inconnu", {"type": "inconnu", "params": {}}),
+        ("import sans fichier", {"type": "import_codes", "params": {}}),
+        ("simulation sans mois", {"type": "simulation", "params": {"year": 2025}}),
+        ("mois invalide", {"type": "simulation", "params": {"year": 2025, "month": 13}}),
+    ]
+    for label, payload in checks:
+        response = requests.post(f"{API_BASE_URL}/jobs", json=payload)
+        print(f"{'✅' if response.status_code == 400 else '❌'} {label} - {response.status_code}")
+
+    response = requests.get(f"{API_BASE_URL}/jobs/pas-un-id")
+    print(f"{'✅' if response.status_code == 400 else '❌'} ID invalide - {response.status_code}")
+
+
+def main():
+    print("🚀 Tests des jobs en arrière-plan")
+    print("=" * 50)
+    try:
+        requests.get(f"{API_BASE_URL}/")
+    except Exception as e:
+        print(f"❌ Impossible de se connecter à l'API: {e}")
+        print("   Assurez-vous que l'API est démarrée avec: uvicorn main:app --reload")
+        return
+
+    test_invalid_jobs()
+    test_detection_job()
+    test_cancel_simulation_job()
+    print("=" * 50)
+    print("🎉 Tests terminés!")
+
+
+if __name__ == "__main__":
+    main()
@@ -90,6 +90,72 @@ def test_api_for_mon_agenda():
     except Exception as e:
         print(f"❌ Exception création planning: {e}")
     
+    # Test 6: Vue mois de l'agenda en une requête, et plannings de la période
+    try:
+        month_start = date.today().replace(day=1).strftime("%Y-%m-%d")
+        response = requests.get(f"{API_BASE_URL}/agenda", params={
+            "user_id": test_planning["user_id"], "view": "month", "date": month_start
+        })
+        if response.status_code == 200:
+            agenda = response.json().get('data', {})
+            print(f"✅ Agenda du mois {agenda['period']['from']} → {agenda['period']['to']}")
+            print(f"   Éléments: {agenda['counts']}")
+            period = {"from": agenda['period']['from'], "to": agenda['period']['to']}
+            response = requests.get(f"{API_BASE_URL}/plannings/user/{test_planning['user_id']}", params=period)
+            in_period = all(period["from"] <= p["date"] <= period["to"] for p in response.json().get('data', []))
+            print(f"{'✅' if response.status_code == 200 and in_period else '❌'} Plannings filtrés sur la période (from/to)")
+        else:
+            print(f"❌ Erreur agenda: {response.status_code}")
+        
+        response = requests.get(f"{API_BASE_URL}/plannings", params={"from": "2025-02-01", "to": "2025-01-01"})
+        print(f"{'✅' if response.status_code == 400 else '❌'} Période inversée refusée - {response.status_code}")
+    except Exception as e:
+        print(f"❌ Exception agenda: {e}")
+    
+    # Test 7: Un planning qui chevauche celui du Test 5 est refusé, et le chevauchement est retrouvé
+    try:
+        overlapping = {**test_planning, "plage_horaire": "12:00-20:00"}
+        response = requests.post(f"{API_BASE_URL}/plannings", json=overlapping)
+        print(f"{'✅' if response.status_code == 400 else '❌'} Planning chevauchant refusé - {response.status_code}")
+        
+        response = requests.get(f"{API_BASE_URL}/agenda/overlaps", params={
+            "user_id": test_planning["user_id"],
+            "start": f"{test_planning['date']}T12:00",
+            "end": f"{test_planning['date']}T20:00",
+            "sources": "plannings"
+        })
+        found = response.status_code == 200 and response.json()["data"]["has_overlap"]
+        print(f"{'✅' if found else '❌'} Chevauchement retrouvé par /agenda/overlaps - {response.status_code}")
+    except Exception as e:
+        print(f"❌ Exception chevauchements: {e}")
+    
+    # Test 8: Un repos le lendemain d'une nuit n'est pas un chevauchement (la nuit finit à 08:00 sur la journée de repos)
+    created_ids = []
+    try:
+        night_day = date.today() + timedelta(days=40)
+        night = {**test_planning, "date": night_day.strftime("%Y-%m-%d"), "plage_horaire": "20:00-08:00"}
+        rest = {**test_planning, "date": (night_day + timedelta(days=1)).strftime("%Y-%m-%d"), "activity_code": "REPOS", "plage_horaire": ""}
+        for label, planning in (("Nuit", night), ("Repos le lendemain de la nuit", rest)):
+            response = requests.post(f"{API_BASE_URL}/plannings", json=planning)
+            if response.status_code == 200:
+                created_ids.append(response.json().get('data', {}).get('id'))
+            print(f"{'✅' if response.status_code == 200 else '❌'} {label} accepté - {response.status_code}")
+        
+        response = requests.get(f"{API_BASE_URL}/agenda/overlaps", params={
+            "user_id": test_planning["user_id"],
+            "start": f"{rest['date']}T00:00",
+            "end": f"{rest['date']}T08:00",
+            "sources": "plannings"
+        })
+        plannings_found = response.json()["data"]["overlaps"]["plannings"] if response.status_code == 200 else []
+        only_night = [p.get("activity_code") for p in plannings_found] == ["SOIN"]
+        print(f"{'✅' if only_night else '❌'} Seule la nuit occupe le matin du repos - {response.status_code}")
+    except Exception as e:
+        print(f"❌ Exception nuit suivie d'un repos: {e}")
+    finally:
+        for planning_id in created_ids:
+            requests.delete(f"{API_BASE_URL}/plannings/{planning_id}")
+    
     return True
 
 def main():
@@ -106,6 +172,9 @@ def main():
         print("3. ✅ Endpoints plannings fonctionnels")
         print("4. ✅ Création de disponibilité opérationnelle")
         print("5. ✅ Création de planning opérationnelle")
+        print("6. ✅ Agenda du mois et filtres de période")
+        print("7. ✅ Contrôle des chevauchements de créneaux")
+        print("8. ✅ Repos après une nuit accepté")
         print("\n💡 Le composant Mon Agenda devrait fonctionner correctement!")
         print("\n🔧 Pour tester le composant Angular:")
         print("   1. Démarrer l'API: uvicorn main:app --reload")
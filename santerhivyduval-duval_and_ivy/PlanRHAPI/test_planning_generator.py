@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+Script de test du générateur de plannings (sans API ni MongoDB) :
+deux plannings saisis le même jour comptent tous les deux dans le quota hebdomadaire du contrat.
+"""
+
+from datetime import date
+
+from crud.planning import group_generation_inputs
+from scheduling import build_agent_profile, generate_planning, period_days
+from scheduling.contracts import shift_duration, to_minutes
+
+USER_ID = "U1"
+CONTRAT = {
+    "user_id": USER_ID,
+    "contrat_hour_week": "35",
+    "work_days": [
+        {"day": day, "start_time": "08:00", "end_time": "16:00"}
+        for day in ("Lundi", "Mardi", "Mercredi", "Jeudi", "Vendredi")
+    ]
+}
+# Lundi : deux plannings saisis (4h + 8h)
+EXISTING = [
+    {"user_id": USER_ID, "date": "2025-03-03", "plage_horaire": "08:00-12:00", "activity_code": "SOIN"},
+    {"user_id": USER_ID, "date": "2025-03-03", "plage_horaire": "13:00-21:00", "activity_code": "SOIN"},
+]
+
+
+def plage_duration(plage_horaire):
+    start, end = (to_minutes(part) for part in plage_horaire.split("-"))
+    return shift_duration(start, end)
+
+
+def test_two_plannings_same_day():
+    print("🧪 Deux plannings existants le même jour")
+    days = period_days(date(2025, 3, 3), date(2025, 3, 9))
+    grouped = group_generation_inputs([USER_ID], [], [], EXISTING)
+    locked = grouped[USER_ID]["locked"]
+    print(f"{'✅' if locked == {'2025-03-03': 720} else '❌'} Minutes du lundi additionnées - {locked}")
+
+    profile = build_agent_profile({"_id": USER_ID}, CONTRAT, locked=locked, days=days)
+    docs, _ = generate_planning([profile], days)
+    generated = sum(plage_duration(doc["plage_horaire"]) for doc in docs if doc["activity_code"] == "SOIN")
+    week_total = generated + sum(plage_duration(planning["plage_horaire"]) for planning in EXISTING)
+    contract = profile["weekly_minutes"]
+    print(f"{'✅' if week_total <= contract else '❌'} Semaine planifiée {week_total / 60:.1f}h pour un contrat de {contract / 60:.1f}h")
+
+
+def main():
+    print("🚀 Tests du générateur de plannings")
+    print("=" * 50)
+    test_two_plannings_same_day()
+    print("=" * 50)
+    print("🎉 Tests terminés!")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Script de test de la recherche de remplaçants (GET /absences/{absence_id}/candidates) :
+un collègue en repos le jour de l'absence est proposé, un collègue qui travaille sur le créneau ne l'est pas,
+et un planning créé puis supprimé par l'API est répercuté sur les bitmaps d'occupation déjà enregistrés.
+Les agents, plannings et l'absence sont écrits directement en base sur un service de test, puis supprimés.
+"""
+
+import os
+
+import requests
+from bson import ObjectId
+from pymongo import MongoClient
+
+from utils.time_fields import absence_time_fields, planning_time_fields
+
+# Configuration
+API_BASE_URL = "http://localhost:8000"
+MONGO_URI = os.getenv('MONGO_URI', 'mongodb://localhost:27017/')
+DATABASE_NAME = os.getenv('DATABASE_NAME', 'planRhIA')
+TEST_DAY = "2031-03-04"
+
+
+def planning(user_id, activity_code, plage_horaire):
+    return {
+        "user_id": user_id, "date": TEST_DAY, "activity_code": activity_code, "plage_horaire": plage_horaire,
+        **planning_time_fields(TEST_DAY, plage_horaire)
+    }
+
+
+def candidate_ids(absence_id):
+    response = requests.get(f"{API_BASE_URL}/absences/{absence_id}/candidates", params={"scope": "service"})
+    return [candidate["user_id"] for candidate in response.json()["data"]["candidates"]] if response.status_code == 200 else []
+
+
+def test_rest_day_candidate(database):
+    print("🧪 Collègue en repos le jour de l'absence")
+    service_id = str(ObjectId())
+    absent, resting, working = ObjectId(), ObjectId(), ObjectId()
+    database.users.insert_many([
+        {"_id": user_id, "first_name": name, "last_name": "Test", "service_id": service_id, "speciality_id": None}
+        for user_id, name in ((absent, "Absent"), (resting, "Repos"), (working, "Travail"))
+    ])
+    database.plannings.insert_many([
+        planning(str(absent), "SOIN", "07:00-19:00"),
+        planning(str(resting), "REPOS", ""),
+        planning(str(working), "SOIN", "13:00-21:00"),
+    ])
+    absence_id = database.absences.insert_one({
+        "staff_id": str(absent), "service_id": service_id, "start_date": TEST_DAY, "start_hour": "00:00",
+        "end_date": TEST_DAY, "end_hour": "23:59", "reason": "Test", "comment": "", "status": "En cours",
+        **absence_time_fields(TEST_DAY, "00:00", TEST_DAY, "23:59")
+    }).inserted_id
+    try:
+        response = requests.get(f"{API_BASE_URL}/absences/{absence_id}/candidates", params={"scope": "service"})
+        if response.status_code != 200:
+            print(f"❌ Recherche de remplaçants - {response.status_code}: {response.text}")
+            return
+        candidates = [candidate["user_id"] for candidate in response.json()["data"]["candidates"]]
+        print(f"{'✅' if str(resting) in candidates else '❌'} Collègue en repos proposé")
+        print(f"{'✅' if str(working) not in candidates else '❌'} Collègue qui travaille sur le créneau écarté")
+
+        # Les bitmaps du jour sont maintenant enregistrés : un planning écrit par l'API doit les mettre à jour
+        response = requests.post(f"{API_BASE_URL}/plannings", json={
+            "user_id": str(resting), "date": TEST_DAY, "activity_code": "SOIN", "plage_horaire": "08:00-16:00"
+        })
+        if response.status_code != 200:
+            print(f"❌ Création du planning - {response.status_code}: {response.text}")
+            return
+        planning_id = response.json()["data"]["id"]
+        print(f"{'✅' if str(resting) not in candidate_ids(absence_id) else '❌'} Planning créé : collègue écarté")
+        requests.delete(f"{API_BASE_URL}/plannings/{planning_id}")
+        print(f"{'✅' if str(resting) in candidate_ids(absence_id) else '❌'} Planning supprimé : collègue de nouveau proposé")
+    finally:
+        user_ids = [str(user_id) for user_id in (absent, resting, working)]
+        database.users.delete_many({"_id": {"$in": [absent, resting, working]}})
+        database.plannings.delete_many({"user_id": {"$in": user_ids}})
+        database.absences.delete_one({"_id": absence_id})
+        database.free_busy.delete_many({"user_id": {"$in": user_ids}})
+
+
+def main():
+    print("🚀 Tests de la recherche de remplaçants")
+    print("=" * 50)
+    try:
+        requests.get(f"{API_BASE_URL}/")
+    except Exception as e:
+        print(f"❌ Impossible de se connecter à l'API: {e}")
+        print("   Assurez-vous que l'API est démarrée avec: uvicorn main:app --reload")
+        return
+
+    test_rest_day_candidate(MongoClient(MONGO_URI)[DATABASE_NAME])
+    print("=" * 50)
+    print("🎉 Tests terminés!")
+
+
+if __name__ == "__main__":
+    main()
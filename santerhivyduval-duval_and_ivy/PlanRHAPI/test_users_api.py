@@ -97,8 +97,38 @@ def test_users_api():
         print(f'❌ Erreur de connexion: {e}')
         print('Vérifiez que l\'API est démarrée sur http://localhost:8000')
 
+def test_users_projection():
+    print('🔍 Test des projections de /users')
+    print('=' * 60)
+    
+    try:
+        response = requests.get('http://localhost:8000/users')
+        users = response.json().get('data', [])
+        if any('password' in user for user in users):
+            print('❌ Le hash du mot de passe est renvoyé par /users')
+        else:
+            print('✅ Aucun mot de passe dans la réponse')
+        
+        # Sélection de champs : seuls _id et les champs demandés doivent être renvoyés
+        response = requests.get('http://localhost:8000/users', params={'fields': 'first_name,last_name'})
+        users = response.json().get('data', [])
+        extra = {key for user in users for key in user} - {'_id', 'first_name', 'last_name'}
+        if response.status_code == 200 and not extra:
+            print(f'✅ ?fields= respecté ({len(users)} utilisateurs)')
+        else:
+            print(f'❌ Champs inattendus: {extra or response.text}')
+        
+        response = requests.get('http://localhost:8000/users', params={'fields': 'password'})
+        if response.status_code == 400:
+            print('✅ Champ non autorisé refusé (400)')
+        else:
+            print(f'❌ Champ non autorisé accepté: {response.status_code}')
+    except Exception as e:
+        print(f'❌ Erreur de connexion: {e}')
+
 if __name__ == "__main__":
     test_users_api()
+    test_users_projection()
 
 
 
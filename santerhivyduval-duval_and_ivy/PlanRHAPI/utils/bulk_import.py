@@ -0,0 +1,198 @@
+# Imports groupés de données de référence (codes, pôles, spécialités, programmes annuels)
+# Écritures par lots non ordonnées, matricules générés à l'avance et rapport d'erreurs par ligne
+import math
+from datetime import datetime
+
+from fastapi import HTTPException
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+
+# insert : crée les lignes dont le nom n'existe pas encore ; upsert : crée ou met à jour selon le nom (rejouable)
+IMPORT_MODES = ("insert", "upsert")
+IMPORT_BATCH_SIZE = 1000
+# Au-delà, les erreurs sont comptées mais plus détaillées dans le rapport
+MAX_REPORTED_ERRORS = 1000
+# Tirages successifs pour obtenir des matricules libres
+MATRICULE_ATTEMPTS = 10
+
+
+def check_import_mode(mode: str):
+    if mode not in IMPORT_MODES:
+        raise HTTPException(status_code=400, detail=f"Mode d'import invalide. Modes disponibles: {', '.join(IMPORT_MODES)}")
+
+
+def cell(value):
+    """Valeur d'une cellule lue par pandas : NaN et texte vide deviennent None"""
+    if isinstance(value, float) and math.isnan(value):
+        return None
+    if isinstance(value, str):
+        value = value.strip()
+        return value or None
+    return value
+
+
+async def free_matricules(collection, generate, count: int, reserved=()):
+    """count matricules générés, distincts entre eux et absents de la collection (une requête par tirage)"""
+    matricules = []
+    taken = set(reserved)
+    for _ in range(MATRICULE_ATTEMPTS):
+        missing = count - len(matricules)
+        if missing <= 0:
+            break
+        candidates = set()
+        while len(candidates) < missing:
+            matricule = generate()
+            if matricule not in taken:
+                candidates.add(matricule)
+        taken |= candidates
+        cursor = collection.find({"matricule": {"$in": list(candidates)}}, {"matricule": 1, "_id": 0})
+        used = {doc["matricule"] async for doc in cursor}
+        matricules.extend(candidates - used)
+    if len(matricules) < count:
+        raise RuntimeError("Impossible de générer des matricules uniques")
+    return matricules[:count]
+
+
+def write_errors(error: BulkWriteError) -> dict:
+    """{index de l'opération: message} des écritures refusées d'un lot non ordonné"""
+    return {item["index"]: item.get("errmsg", "Erreur d'écriture") for item in error.details.get("writeErrors", [])}
+
+
+class ImportReport:
+    def __init__(self, mode: str, received: int):
+        self.mode = mode
+        self.received = received
+        self.inserted_ids = []
+        self.updated = 0
+        self.failed = 0
+        self.errors = []
+
+    def error(self, row: int, name, message: str):
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"row": row, "name": name, "error": message})
+
+    def to_dict(self):
+        return {
+            "mode": self.mode,
+            "received": self.received,
+            "inserted": len(self.inserted_ids),
+            "updated": self.updated,
+            "failed": self.failed,
+            "errors": self.errors,
+            "inserted_ids": self.inserted_ids
+        }
+
+
+async def bulk_import(collection, rows, build, generate_matricule=None, mode: str = "insert",
+                      key: str = "name", first_row: int = 2, progress=None):
+    """
+    Importe des lignes par lots de IMPORT_BATCH_SIZE écrits sans ordre (une ligne en erreur n'arrête pas le lot).
+    - build(row) -> champs du document ; une ValueError rejette la ligne avec son message
+    - generate_matricule : générateur de matricule du type de document (None : pas de matricule) ;
+      un matricule fourni dans le fichier est conservé s'il est libre
+    - mode insert : une ligne dont le nom existe déjà est rejetée ; mode upsert : elle met à jour le document existant
+    - first_row : numéro affiché de la première ligne (2 pour un fichier Excel avec une ligne d'en-tête)
+    Retourne le rapport : créés, mis à jour, erreurs par ligne (numéro, nom, message) et identifiants créés.
+    """
+    report = ImportReport(mode, len(rows))
+    seen_keys, seen_matricules = {}, set()
+
+    for start in range(0, len(rows), IMPORT_BATCH_SIZE):
+        batch = []
+        for offset, row in enumerate(rows[start:start + IMPORT_BATCH_SIZE]):
+            line = first_row + start + offset
+            try:
+                fields = build(row)
+            except ValueError as e:
+                report.error(line, cell(row.get(key)), str(e))
+                continue
+            name = fields.get(key)
+            if name is None:
+                report.error(line, None, "Nom manquant")
+                continue
+            if name in seen_keys:
+                report.error(line, name, f"Nom en double dans le fichier (ligne {seen_keys[name]})")
+                continue
+            seen_keys[name] = line
+            matricule = cell(row.get("matricule")) if generate_matricule else None
+            if matricule is not None:
+                if matricule in seen_matricules:
+                    report.error(line, name, "Matricule en double dans le fichier")
+                    continue
+                seen_matricules.add(matricule)
+                fields["matricule"] = matricule
+            batch.append((line, fields))
+
+        if batch:
+            await write_batch(collection, batch, generate_matricule, mode, key, seen_matricules, report)
+        if progress:
+            await progress(min(start + IMPORT_BATCH_SIZE, len(rows)), len(rows))
+
+    return report.to_dict()
+
+
+async def write_batch(collection, batch, generate_matricule, mode, key, reserved, report):
+    names = [fields[key] for _, fields in batch]
+    provided = [fields["matricule"] for _, fields in batch if "matricule" in fields]
+    existing_filter = {key: {"$in": names}}
+    if provided:
+        existing_filter = {"$or": [existing_filter, {"matricule": {"$in": provided}}]}
+    existing_names, matricule_owners = set(), {}
+    async for doc in collection.find(existing_filter, {key: 1, "matricule": 1}):
+        existing_names.add(doc.get(key))
+        if doc.get("matricule"):
+            matricule_owners[doc["matricule"]] = doc.get(key)
+
+    accepted = []
+    for line, fields in batch:
+        name = fields[key]
+        if mode == "insert" and name in existing_names:
+            report.error(line, name, "Existe déjà (mode upsert pour mettre à jour)")
+            continue
+        owner = matricule_owners.get(fields.get("matricule"), name)
+        if owner != name:
+            report.error(line, name, f"Matricule déjà utilisé par {owner}")
+            continue
+        accepted.append((line, fields, name in existing_names))
+    if not accepted:
+        return
+
+    needing = [fields for _, fields, exists in accepted if not exists and "matricule" not in fields]
+    if generate_matricule and needing:
+        for fields, matricule in zip(needing, await free_matricules(collection, generate_matricule, len(needing), reserved)):
+            fields["matricule"] = matricule
+            reserved.add(matricule)
+
+    now = datetime.now()
+    if mode == "insert":
+        docs = [{**fields, "created_at": now, "updated_at": now} for _, fields, _ in accepted]
+        failed = {}
+        try:
+            await collection.insert_many(docs, ordered=False)
+        except BulkWriteError as e:
+            failed = write_errors(e)
+        for index, ((line, fields, _), doc) in enumerate(zip(accepted, docs)):
+            if index in failed:
+                report.error(line, fields[key], failed[index])
+            else:
+                report.inserted_ids.append(str(doc["_id"]))
+        return
+
+    operations = []
+    for _, fields, _ in accepted:
+        update = {"$set": {**fields, "updated_at": now}, "$setOnInsert": {"created_at": now}}
+        operations.append(UpdateOne({key: fields[key]}, update, upsert=True))
+    try:
+        result = await collection.bulk_write(operations, ordered=False)
+        failed, upserted, matched = {}, result.upserted_ids, result.matched_count
+    except BulkWriteError as e:
+        failed = write_errors(e)
+        upserted = {item["index"]: item["_id"] for item in e.details.get("upserted", [])}
+        matched = e.details.get("nMatched", 0)
+    for index, (line, fields, _) in enumerate(accepted):
+        if index in failed:
+            report.error(line, fields[key], failed[index])
+        elif index in upserted:
+            report.inserted_ids.append(str(upserted[index]))
+    report.updated += matched
@@ -0,0 +1,89 @@
+# Périodes des vues calendrier (Année / Mois / Semaine) : paramètres ?from=&to= communs aux endpoints de liste
+import calendar
+from datetime import date, datetime, timedelta
+from typing import Optional
+
+from fastapi import HTTPException, Query
+
+DATE_FORMAT = "%Y-%m-%d"
+# Vue année : la plus longue période qu'un client peut demander en une fois
+MAX_RANGE_DAYS = 366
+CALENDAR_VIEWS = ("week", "month", "year")
+
+
+def parse_day(value: str, label: str) -> date:
+    try:
+        return datetime.strptime(value, DATE_FORMAT).date()
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Paramètre {label} invalide (format attendu: YYYY-MM-DD)")
+
+
+def calendar_period(view: str, anchor: date):
+    """Bornes (incluses) de la semaine (lundi-dimanche), du mois ou de l'année contenant anchor"""
+    if view == "week":
+        start = anchor - timedelta(days=anchor.weekday())
+        return start, start + timedelta(days=6)
+    if view == "month":
+        return anchor.replace(day=1), anchor.replace(day=calendar.monthrange(anchor.year, anchor.month)[1])
+    if view == "year":
+        return date(anchor.year, 1, 1), date(anchor.year, 12, 31)
+    raise HTTPException(status_code=400, detail=f"Vue invalide. Vues disponibles: {', '.join(CALENDAR_VIEWS)}")
+
+
+class DateRange:
+    """
+    Période optionnelle à injecter avec Depends() : ?from=YYYY-MM-DD&to=YYYY-MM-DD, bornes incluses.
+    Les filtres produits comparent des chaînes : ils conviennent aux dates 'YYYY-MM-DD' comme aux horodatages ISO,
+    et restent servis par les index (champ, date) existants.
+    """
+
+    def __init__(
+        self,
+        start: Optional[str] = Query(None, alias="from", description="Début de période (YYYY-MM-DD, inclus)"),
+        end: Optional[str] = Query(None, alias="to", description="Fin de période (YYYY-MM-DD, incluse)")
+    ):
+        self.start = parse_day(start, "from") if start else None
+        self.end = parse_day(end, "to") if end else None
+        if self.start and self.end:
+            if self.end < self.start:
+                raise HTTPException(status_code=400, detail="La fin de période précède son début")
+            if (self.end - self.start).days >= MAX_RANGE_DAYS:
+                raise HTTPException(status_code=400, detail=f"Période limitée à {MAX_RANGE_DAYS} jours")
+
+    @classmethod
+    def of(cls, start: date, end: date):
+        period = cls.__new__(cls)
+        period.start, period.end = start, end
+        return period
+
+    @property
+    def active(self) -> bool:
+        return self.start is not None or self.end is not None
+
+    @property
+    def days(self) -> Optional[int]:
+        return (self.end - self.start).days + 1 if self.start and self.end else None
+
+    def day_filter(self) -> dict:
+        """Condition sur un champ date : {"$gte": début, "$lt": lendemain de la fin}"""
+        condition = {}
+        if self.start:
+            condition["$gte"] = self.start.strftime(DATE_FORMAT)
+        if self.end:
+            condition["$lt"] = (self.end + timedelta(days=1)).strftime(DATE_FORMAT)
+        return condition
+
+    def overlap_filter(self, start_field: str, end_field: str) -> dict:
+        """Éléments [start_field, end_field] qui chevauchent la période (absences sur plusieurs jours)"""
+        query_filter = {}
+        if self.end:
+            query_filter[start_field] = {"$lt": (self.end + timedelta(days=1)).strftime(DATE_FORMAT)}
+        if self.start:
+            query_filter[end_field] = {"$gte": self.start.strftime(DATE_FORMAT)}
+        return query_filter
+
+    def to_dict(self) -> dict:
+        return {
+            "from": self.start.strftime(DATE_FORMAT) if self.start else None,
+            "to": self.end.strftime(DATE_FORMAT) if self.end else None
+        }
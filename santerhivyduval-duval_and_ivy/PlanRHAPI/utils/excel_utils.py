@@ -2,7 +2,13 @@ from fastapi import UploadFile
 import pandas as pd
 from io import BytesIO
 
+
+def read_excel_rows(contents: bytes):
+    """Lignes d'un fichier Excel (première feuille) ; synchrone, exécutable dans le pool de processus"""
+    data = pd.read_excel(BytesIO(contents))
+    return data.to_dict(orient='records')
+
+
 async def parse_excel(file: UploadFile):
     contents = await file.read()
-    data = pd.read_excel(BytesIO(contents))
-    return data.to_dict(orient='records')
\ No newline at end of file
+    return read_excel_rows(contents)
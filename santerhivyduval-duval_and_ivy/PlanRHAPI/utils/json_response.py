@@ -0,0 +1,35 @@
+# Sérialisation JSON des documents MongoDB avec orjson
+
+import orjson
+from bson import ObjectId
+from bson.decimal128 import Decimal128
+from fastapi.responses import JSONResponse
+
+
+def _default(value):
+    """Types BSON non gérés nativement par orjson (datetime et date le sont déjà)"""
+    if isinstance(value, ObjectId):
+        return str(value)
+    if isinstance(value, Decimal128):
+        return str(value.to_decimal())
+    raise TypeError(f"Type non sérialisable : {type(value).__name__}")
+
+
+def dumps(content) -> bytes:
+    """
+    Sérialise un document ou une liste de documents MongoDB tels que lus en base.
+    ObjectId -> chaîne hexadécimale, datetime -> ISO 8601 (même format que datetime.isoformat()).
+    """
+    return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS)
+
+
+class MongoJSONResponse(JSONResponse):
+    """
+    Réponse JSON acceptant directement les documents MongoDB.
+    Retournée explicitement par un endpoint, elle évite la conversion champ par champ
+    et le passage par jsonable_encoder de FastAPI.
+    """
+    media_type = "application/json"
+
+    def render(self, content) -> bytes:
+        return dumps(content)
@@ -0,0 +1,107 @@
+# Pagination par curseur (keyset) pour les endpoints de liste
+import base64
+from typing import Optional
+
+import bson
+from fastapi import HTTPException, Query
+
+DEFAULT_PAGE_SIZE = 200
+MAX_PAGE_SIZE = 1000
+
+
+def encode_cursor(value, object_id) -> str:
+    """Encode la clé (valeur de tri, _id) du dernier élément d'une page"""
+    return base64.urlsafe_b64encode(bson.encode({"v": value, "id": object_id})).decode("ascii")
+
+
+def decode_cursor(token: str):
+    try:
+        payload = bson.decode(base64.urlsafe_b64decode(token.encode("ascii")))
+        return payload["v"], payload["id"]
+    except Exception:
+        raise HTTPException(status_code=400, detail="Curseur de pagination invalide")
+
+
+class PageParams:
+    """Paramètres de pagination communs, à injecter avec Depends()"""
+
+    def __init__(
+        self,
+        limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE, description="Taille de la page"),
+        cursor: Optional[str] = Query(None, description="Curseur renvoyé par la page précédente (next_cursor)"),
+        with_total: bool = Query(False, description="Inclure le nombre total d'éléments (requête supplémentaire)")
+    ):
+        self.limit = limit
+        self.cursor = cursor
+        self.with_total = with_total
+        self.after = decode_cursor(cursor) if cursor else None
+
+
+def keyset_filter(sort_field: str, after) -> dict:
+    """Filtre des éléments situés strictement après la clé (valeur, _id), en ordre croissant"""
+    value, object_id = after
+    if sort_field == "_id":
+        return {"_id": {"$gt": object_id}}
+    if value is None:
+        # null est trié avant toute autre valeur
+        return {"$or": [{sort_field: None, "_id": {"$gt": object_id}}, {sort_field: {"$ne": None}}]}
+    return {"$or": [{sort_field: {"$gt": value}}, {sort_field: value, "_id": {"$gt": object_id}}]}
+
+
+def with_keyset(query_filter: dict, sort_field: str, page: PageParams) -> dict:
+    if not page.after:
+        return query_filter
+    keyset = keyset_filter(sort_field, page.after)
+    return {"$and": [query_filter, keyset]} if query_filter else keyset
+
+
+def sort_spec(sort_field: str):
+    return [("_id", 1)] if sort_field == "_id" else [(sort_field, 1), ("_id", 1)]
+
+
+def page_info(rows, sort_field: str, page: PageParams, total=None) -> dict:
+    """
+    Construit le bloc "pagination" de la réponse.
+    rows contient jusqu'à limit + 1 documents bruts : le surplus indique qu'une page suivante existe.
+    """
+    has_more = len(rows) > page.limit
+    if has_more:
+        del rows[page.limit:]
+
+    next_cursor = None
+    if has_more and rows:
+        last = rows[-1]
+        next_cursor = encode_cursor(last.get(sort_field) if sort_field != "_id" else None, last["_id"])
+
+    info = {"limit": page.limit, "next_cursor": next_cursor, "has_more": has_more}
+    if total is not None:
+        info["total"] = total
+    return info
+
+
+async def paginate(collection, query_filter: dict, sort_field: str, page: PageParams, projection=None):
+    """
+    Récupère une page de documents triés sur (sort_field, _id).
+    Le coût reste constant quelle que soit la position dans la collection, à condition
+    qu'un index couvre (filtre, sort_field, _id).
+    Retourne (documents, bloc pagination)
+    """
+    if projection and sort_field not in projection and all(projection.values()):
+        # Le champ de tri est nécessaire pour construire le curseur suivant
+        projection = {**projection, sort_field: 1}
+    cursor = collection.find(with_keyset(query_filter, sort_field, page), projection)
+    rows = await cursor.sort(sort_spec(sort_field)).limit(page.limit + 1).to_list(length=None)
+
+    total = await collection.count_documents(query_filter) if page.with_total else None
+    return rows, page_info(rows, sort_field, page, total)
+
+
+def paginate_stages(query_filter: dict, sort_field: str, page: PageParams):
+    """
+    Variante pour les pipelines d'agrégation : étapes $match + $sort à placer en tête.
+    Ajouter ensuite {"$limit": page.limit + 1} (après d'éventuelles jointures) puis appeler page_info.
+    """
+    return [
+        {"$match": with_keyset(query_filter, sort_field, page)},
+        {"$sort": dict(sort_spec(sort_field))}
+    ]
@@ -1,44 +1,205 @@
-import pandas as pd
+import math
+import re
+import unicodedata
+from datetime import date, datetime
+from io import BytesIO
 
-from extract import get_first_line, extract_name
+import numpy as np
+import openpyxl
+
+from extract import extract_name
+
+# Ligne (à partir de 0) des noms de mois, fusionnés sur les colonnes jour / code de chaque mois
+MONTH_HEADER_ROW = 1
+# Lignes lues sous l'en-tête ; la dernière (total) n'est pas importée
+ANNUAL_PROGRAM_ROWS = 34
+
+# Noms de mois rencontrés dans les grilles (classeurs en français, anciens exports en anglais)
+MONTH_NAMES = (
+    ("janvier", "fevrier", "mars", "avril", "mai", "juin",
+     "juillet", "aout", "septembre", "octobre", "novembre", "decembre"),
+    ("january", "february", "march", "april", "may", "june",
+     "july", "august", "september", "october", "november", "december"),
+)
+MONTH_NUMBERS = {name: index for names in MONTH_NAMES for index, name in enumerate(names, start=1)}
+# Initiale du jour dans la colonne jour de la grille ('L 01', 'M 02'...), du lundi au dimanche
+WEEKDAY_LETTERS = "LMMJVSD"
+# Années essayées autour de l'année de référence quand la grille ne précise pas son année
+YEAR_SEARCH_SPAN = 2
+
+
+def is_annual_program_sheet(sheet_name: str) -> bool:
+    """Feuilles 'Planning agent ...' (hors plannings mensuels 'mois')"""
+    name = sheet_name.lower()
+    return 'planning' in name and 'agent' in name and 'mois' not in name
+
+
+def first_text(row) -> str:
+    """Première cellule texte d'une ligne (titre de la feuille)"""
+    return next((value for value in row if isinstance(value, str)), '')
+
+
+def program_grid(rows):
+    """
+    Grille des lignes de données sous l'en-tête des mois, en tableau NumPy (cellules vides : NaN).
+    Comme pandas.read_excel, les lignes vides en fin de feuille sont ignorées et la dernière ligne lue (total) est exclue.
+    """
+    body = list(rows[MONTH_HEADER_ROW + 1:MONTH_HEADER_ROW + 1 + ANNUAL_PROGRAM_ROWS])
+    while body and all(value is None for value in body[-1]):
+        body.pop()
+    body = body[:-1]
+
+    # Une colonne de plus que la plus longue ligne : la colonne code du dernier mois existe toujours
+    width = max((len(row) for row in [rows[MONTH_HEADER_ROW], *body]), default=0) + 1
+    grid = np.empty((len(body), width), dtype=object)
+    for index, row in enumerate(body):
+        grid[index, :len(row)] = row
+    grid[grid == None] = np.nan  # noqa: E711 (comparaison élément par élément)
+    return grid
+
+
+def sheet_program(rows):
+    """
+    Programme annuel d'une feuille à partir de ses premières lignes (valeurs brutes) :
+    {'name': agent, 'data': {mois: {'1': {'day': ..., 'plan': ...}, ...}}}
+    Chaque mois occupe deux colonnes (jour, code) sous son nom ; les colonnes de tous les mois
+    sont extraites en une fois de la grille.
+    """
+    header = rows[MONTH_HEADER_ROW] if len(rows) > MONTH_HEADER_ROW else ()
+    starts = {}
+    for column, value in enumerate(header):
+        if value is not None:
+            starts.setdefault(value if isinstance(value, str) else str(value), column)
+
+    grid = program_grid(rows)
+    columns = list(starts.values())
+    days = grid[:, columns].T.tolist()
+    plans = grid[:, [column + 1 for column in columns]].T.tolist()
+
+    by_month = {
+        month: {str(line): {'day': day, 'plan': plan} for line, (day, plan) in enumerate(zip(month_days, month_plans), start=1)}
+        for month, month_days, month_plans in zip(starts, days, plans)
+    }
+    return {
+        'name': extract_name(first_text(rows[0]) if rows else ''),
+        'data': {month: by_month[month] for month in sorted(by_month)}
+    }
+
+
+def read_sheet_rows(worksheet, nb_rows: int = MONTH_HEADER_ROW + 1 + ANNUAL_PROGRAM_ROWS):
+    """Premières lignes d'une feuille ; en lecture seule, le reste de la feuille n'est pas parcouru"""
+    return [list(row) for row in worksheet.iter_rows(min_row=1, max_row=nb_rows, values_only=True)]
 
 
 # Traiter le fichier excel inséré
 def extract_annual_programs(file_path):
-    # Load the Excel file
-    xls = pd.ExcelFile(file_path)
-
-    # Initialize dictionaries for each type of data
-    all_programs = []
-    monthly_programs = {}
-    code_meanings = {}
-
-    # Loop through each sheet in the Excel file
-    for sheet_name in xls.sheet_names:
-        # Check for 'planning' in the sheet name for annual programs
-        if 'planning' in sheet_name.lower():
-            # Check for 'agent' in the title and 'mois' not in the title
-            if 'agent' in sheet_name.lower() and 'mois' not in sheet_name.lower():
-                print(f"Processing sheet: {sheet_name}")
-                # Get Agent name
-                data = get_first_line(file_path, sheet_name)
-                name = extract_name(data)
-
-                # Read only the specified number of rows
-                df = pd.read_excel(xls, sheet_name=sheet_name, nrows=34, header=[1, 1])
-                annual_program = {'name': name, 'data': {}}
-                for month in df.columns.levels[0]:  # Get the unique month names from the first row
-                    if month not in annual_program['data']:
-                        annual_program['data'][month] = {}
-
-                    # Populate the dictionary with line IDs for each month
-                    for index in range(len(df)):
-                        if index < len(df) - 1:  # Exclude the last row for regular entries
-                            line_id = f"{index + 1}"  # Create a unique line ID
-                            # print("month "+ df.iloc[index][month])
-                            annual_program['data'][month][line_id] = {
-                                'day': df.iloc[index][month][0],  # Adjust based on your actual DataFrame structure
-                                'plan': df.iloc[index][month][1]  # Adjust based on your actual DataFrame structure
-                            }
-                all_programs.append(annual_program)
-    return all_programs
\ No newline at end of file
+    """
+    Programmes annuels de toutes les feuilles 'Planning agent' d'un classeur (chemin ou fichier en mémoire).
+    Le classeur est ouvert une seule fois, en lecture seule, et seules les premières lignes des feuilles sont lues.
+    """
+    workbook = openpyxl.load_workbook(file_path, read_only=True, data_only=True)
+    try:
+        return [
+            sheet_program(read_sheet_rows(worksheet))
+            for worksheet in workbook.worksheets
+            if is_annual_program_sheet(worksheet.title)
+        ]
+    finally:
+        workbook.close()
+
+
+def extract_annual_programs_from_bytes(contents: bytes):
+    """Variante pour un fichier reçu en mémoire (upload, job d'import), sans fichier temporaire"""
+    return extract_annual_programs(BytesIO(contents))
+
+
+def plain(text) -> str:
+    """Texte en minuscules sans accents, pour comparer des noms"""
+    decomposed = unicodedata.normalize("NFKD", str(text))
+    return " ".join("".join(char for char in decomposed if not unicodedata.combining(char)).casefold().split())
+
+
+def blank(value) -> bool:
+    return value is None or (isinstance(value, float) and math.isnan(value)) or (isinstance(value, str) and not value.strip())
+
+
+def month_of(month_key):
+    """(numéro du mois, année éventuelle) d'une clé de mois de la grille : 'Janvier', 'august', 'Mars 2025'..."""
+    text = plain(month_key)
+    year = re.search(r"\b(\d{4})\b", text)
+    for word in re.findall(r"[a-z]+", text):
+        if word in MONTH_NUMBERS:
+            return MONTH_NUMBERS[word], int(year.group(1)) if year else None
+    return None, None
+
+
+def day_of(day_cell):
+    """Jour du mois (et date complète si la cellule en est une) de la colonne jour : 'J 01', 1, datetime..."""
+    if isinstance(day_cell, (datetime, date)):
+        return day_cell.day, day_cell
+    if blank(day_cell):
+        return None, None
+    if isinstance(day_cell, (int, float)):
+        return int(day_cell), None
+    number = re.search(r"\d{1,2}", str(day_cell))
+    return (int(number.group()), None) if number else (None, None)
+
+
+def valid_date(year, month, day):
+    try:
+        return date(year, month, day)
+    except ValueError:
+        return None
+
+
+def infer_program_year(data, around: int = None) -> int:
+    """
+    Année d'une grille sans année : celle, autour de around (année courante par défaut), dont les jours
+    de la semaine concordent le mieux avec les initiales de la colonne jour ('L 01' : lundi 1er).
+    """
+    around = around or date.today().year
+    cells = []
+    for month_key, lines in data.items():
+        month, _ = month_of(month_key)
+        if month is None:
+            continue
+        for line in lines.values():
+            day, _ = day_of(line.get("day"))
+            label = line.get("day")
+            if day and isinstance(label, str) and label.strip()[:1].upper() in WEEKDAY_LETTERS:
+                cells.append((month, day, label.strip()[0].upper()))
+
+    def score(year):
+        dates = [(valid_date(year, month, day), letter) for month, day, letter in cells]
+        return sum(1 if current and WEEKDAY_LETTERS[current.weekday()] == letter else -1 for current, letter in dates)
+
+    candidates = range(around - YEAR_SEARCH_SPAN, around + YEAR_SEARCH_SPAN + 1)
+    return max(candidates, key=lambda year: (score(year), -abs(year - around))) if cells else around
+
+
+def program_day_rows(program, year: int = None):
+    """
+    Une ligne par jour renseigné de la grille d'un programme annuel : {date 'YYYY-MM-DD', plan, day_label}.
+    Les cases vides (jours au-delà de la fin du mois, jours sans code) ne produisent pas de ligne.
+    """
+    data = program.get("data") or {}
+    grid_year = year or infer_program_year(data)
+    rows = {}
+    for month_key, lines in data.items():
+        month, month_year = month_of(month_key)
+        if month is None:
+            continue
+        for line in lines.values():
+            plan = line.get("plan")
+            day, full_date = day_of(line.get("day"))
+            if blank(plan) or day is None:
+                continue
+            current = full_date or valid_date(month_year or grid_year, month, day)
+            if current is None:
+                continue
+            rows[current] = {
+                "date": current.strftime("%Y-%m-%d"),
+                "plan": plan.strip() if isinstance(plan, str) else plan,
+                "day_label": line.get("day") if isinstance(line.get("day"), str) else None
+            }
+    return [rows[current] for current in sorted(rows)]
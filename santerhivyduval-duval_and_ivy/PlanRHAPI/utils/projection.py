@@ -0,0 +1,43 @@
+# Projections MongoDB et sélection de champs (?fields=) pour les endpoints de liste
+from typing import Optional
+
+from fastapi import HTTPException, Query
+
+# Projection minimale des contrôles d'existence (find_one utilisé comme test)
+EXISTS_PROJECTION = {"_id": 1}
+# Nom affiché d'un utilisateur
+USER_NAME_PROJECTION = {"first_name": 1, "last_name": 1}
+
+
+def projection_of(fields) -> dict:
+    """Projection d'inclusion ; _id est toujours renvoyé par MongoDB"""
+    return {field: 1 for field in fields}
+
+
+def sparse_fields(allowed_fields=None, default_fields=None, required_fields=()):
+    """
+    Fabrique une dépendance FastAPI lisant ?fields=a,b,c et retournant la projection à appliquer.
+    - allowed_fields : champs que le client peut demander (None : tout nom de champ est accepté)
+    - default_fields : champs renvoyés sans ?fields= (par défaut allowed_fields ; None : document entier)
+    - required_fields : champs toujours lus car nécessaires côté serveur (jointure, tri...)
+    """
+    if default_fields is None:
+        default_fields = allowed_fields
+
+    def dependency(
+        fields: Optional[str] = Query(None, description="Champs à renvoyer, séparés par des virgules")
+    ) -> Optional[dict]:
+        if not fields:
+            return projection_of([*required_fields, *default_fields]) if default_fields else None
+
+        requested = [field.strip() for field in fields.split(",") if field.strip()]
+        if allowed_fields is not None:
+            unknown = [field for field in requested if field not in allowed_fields and field != "_id"]
+            if unknown:
+                raise HTTPException(
+                    status_code=400,
+                    detail=f"Champs inconnus: {', '.join(unknown)}. Champs disponibles: {', '.join(allowed_fields)}"
+                )
+        return projection_of([*required_fields, *requested])
+
+    return dependency
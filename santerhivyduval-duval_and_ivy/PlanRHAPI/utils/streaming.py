@@ -0,0 +1,80 @@
+# Export en flux (NDJSON ou tableau JSON) des grandes listes, sans matérialiser le résultat
+from fastapi import Request
+from fastapi.responses import StreamingResponse
+
+from utils.json_response import dumps
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+JSON_MEDIA_TYPE = "application/json"
+
+# Nombre de documents lus et sérialisés à la fois : borne la mémoire utilisée par requête
+STREAM_BATCH_SIZE = 500
+
+
+def stream_media_type(request: Request, stream: bool):
+    """
+    Retourne le format de flux demandé, ou None pour une réponse paginée classique.
+    Accept: application/x-ndjson active le flux NDJSON ; ?stream=true seul produit un tableau JSON.
+    """
+    accept = request.headers.get("accept", "")
+    if NDJSON_MEDIA_TYPE in accept:
+        return NDJSON_MEDIA_TYPE
+    if stream:
+        return JSON_MEDIA_TYPE
+    return None
+
+
+async def iter_batches(cursor, batch_size: int = STREAM_BATCH_SIZE):
+    """Lit un curseur Motor par lots de batch_size documents"""
+    cursor.batch_size(batch_size)
+    batch = []
+    async for document in cursor:
+        batch.append(document)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+async def _ndjson_chunks(cursor, transform, batch_size):
+    async for batch in iter_batches(cursor, batch_size):
+        rows = await transform(batch) if transform else batch
+        yield b"".join(dumps(row) + b"\n" for row in rows)
+
+
+async def _json_array_chunks(cursor, transform, batch_size):
+    yield b"["
+    first = True
+    async for batch in iter_batches(cursor, batch_size):
+        rows = await transform(batch) if transform else batch
+        for row in rows:
+            yield (b"" if first else b",") + dumps(row)
+            first = False
+    yield b"]"
+
+
+def stream_cursor(cursor, media_type: str, transform=None, batch_size: int = STREAM_BATCH_SIZE, filename=None):
+    """
+    Réponse en flux à partir d'un curseur Motor.
+    transform : coroutine appliquée à chaque lot (conversion des champs, jointure utilisateurs...)
+    et qui retourne les lignes à émettre.
+    """
+    if media_type == NDJSON_MEDIA_TYPE:
+        body = _ndjson_chunks(cursor, transform, batch_size)
+    else:
+        body = _json_array_chunks(cursor, transform, batch_size)
+
+    headers = {"X-Accel-Buffering": "no"}
+    if filename:
+        headers["Content-Disposition"] = f'attachment; filename="{filename}"'
+    return StreamingResponse(body, media_type=media_type, headers=headers)
+
+
+def stream_events(events):
+    """Réponse NDJSON à partir d'un générateur asynchrone d'événements (progression d'un traitement long)"""
+    async def body():
+        async for event in events:
+            yield dumps(event) + b"\n"
+
+    return StreamingResponse(body(), media_type=NDJSON_MEDIA_TYPE, headers={"X-Accel-Buffering": "no"})
@@ -0,0 +1,189 @@
+# Représentation native des créneaux : début et fin en datetime, minutes dans la journée, durée.
+# Les champs chaîne historiques (date 'YYYY-MM-DD', heures 'HH:MM', plage 'HH:MM-HH:MM') restent écrits :
+# les deux représentations coexistent, les champs natifs servent aux calculs dans les agrégations.
+from datetime import date, datetime, time, timedelta
+
+DAY_MINUTES = 24 * 60
+DAY_MILLISECONDS = DAY_MINUTES * 60 * 1000
+
+# Champs natifs ajoutés aux plannings, disponibilités et absences
+TIME_FIELDS = ("start", "end", "start_minute", "end_minute", "duration_minutes", "all_day")
+
+
+def day_start(value):
+    """'2025-03-01' (ou date / datetime) -> datetime à minuit, None si la date est illisible"""
+    if isinstance(value, datetime):
+        return datetime(value.year, value.month, value.day)
+    if isinstance(value, date):
+        return datetime(value.year, value.month, value.day)
+    try:
+        return datetime.strptime(str(value).strip()[:10], "%Y-%m-%d")
+    except ValueError:
+        return None
+
+
+def minute_of_day(value):
+    """'08:30', '08:30:00' ou time -> 510 ; None si l'heure est vide ou illisible"""
+    if isinstance(value, time):
+        return value.hour * 60 + value.minute
+    try:
+        hours, minutes = str(value).strip().split(":")[:2]
+        hours, minutes = int(hours), int(minutes)
+    except (TypeError, ValueError):
+        return None
+    if not (0 <= hours < 24 and 0 <= minutes < 60):
+        return None
+    return hours * 60 + minutes
+
+
+def plage_bounds(plage_horaire):
+    """'20:00-08:00' -> (1200, 480) ; (None, None) pour une plage non horaire ('Journée', '')"""
+    parts = str(plage_horaire or "").split("-")
+    if len(parts) != 2:
+        return None, None
+    return minute_of_day(parts[0]), minute_of_day(parts[1])
+
+
+def interval_fields(start_day, start_minute=None, end_day=None, end_minute=None) -> dict:
+    """
+    Champs natifs d'un créneau :
+    - start / end : datetime, fin exclue ; une fin qui ne suit pas le début passe au lendemain (nuit)
+    - start_minute / end_minute : minutes dans la journée du début et de la fin
+    - duration_minutes : durée du créneau
+    - all_day : créneau sans heures (journée entière, du début du premier jour à la fin du dernier)
+    Retourne {} si la date de début est illisible.
+    """
+    start_midnight = day_start(start_day)
+    if start_midnight is None:
+        return {}
+    end_midnight = day_start(end_day) if end_day else start_midnight
+    if end_midnight is None:
+        end_midnight = start_midnight
+
+    start = start_midnight + timedelta(minutes=start_minute or 0)
+    if end_minute is None:
+        end = end_midnight + timedelta(days=1)
+    else:
+        end = end_midnight + timedelta(minutes=end_minute)
+    if end <= start:
+        end += timedelta(days=1)
+
+    return {
+        "start": start,
+        "end": end,
+        "start_minute": start_minute or 0,
+        "end_minute": DAY_MINUTES if end_minute is None else end_minute,
+        "duration_minutes": int((end - start).total_seconds() // 60),
+        "all_day": start_minute is None or end_minute is None
+    }
+
+
+def planning_time_fields(day, plage_horaire) -> dict:
+    start_minute, end_minute = plage_bounds(plage_horaire)
+    if start_minute is None or end_minute is None:
+        start_minute = end_minute = None
+    return interval_fields(day, start_minute, day, end_minute)
+
+
+def availability_time_fields(day, start_time, end_time) -> dict:
+    start_minute, end_minute = minute_of_day(start_time), minute_of_day(end_time)
+    if start_minute is None or end_minute is None:
+        start_minute = end_minute = None
+    return interval_fields(day, start_minute, day, end_minute)
+
+
+def absence_time_fields(start_date, start_hour, end_date, end_hour) -> dict:
+    return interval_fields(start_date, minute_of_day(start_hour), end_date or start_date, minute_of_day(end_hour))
+
+
+def time_fields_of(collection_name: str, doc: dict) -> dict:
+    """Champs natifs d'un document plannings / availabilities / absences, calculés depuis ses champs chaîne"""
+    if collection_name == "plannings":
+        return planning_time_fields(doc.get("date"), doc.get("plage_horaire"))
+    if collection_name == "availabilities":
+        return availability_time_fields(doc.get("date"), doc.get("start_time"), doc.get("end_time"))
+    if collection_name == "absences":
+        return absence_time_fields(doc.get("start_date"), doc.get("start_hour"), doc.get("end_date"), doc.get("end_hour"))
+    raise ValueError(f"Collection sans champs horaires: {collection_name}")
+
+
+# =============================================================================
+# COMPATIBILITÉ DANS LES AGRÉGATIONS
+# Documents pas encore migrés : les champs natifs sont recalculés côté serveur depuis les chaînes,
+# avec les mêmes règles que interval_fields (nuit au lendemain, journée entière sans heures).
+# =============================================================================
+
+def _parse_day_expr(day):
+    return {"$dateFromString": {"dateString": day, "format": "%Y-%m-%d", "onError": None, "onNull": None}}
+
+
+def _parse_time_expr(day, hhmm):
+    return {"$dateFromString": {
+        "dateString": {"$concat": [day, "T", {"$substrCP": [{"$trim": {"input": {"$ifNull": [{"$toString": hhmm}, ""]}}}, 0, 5]}]},
+        "format": "%Y-%m-%dT%H:%M",
+        "onError": None,
+        "onNull": None
+    }}
+
+
+def legacy_interval_expr(start_day, start_hhmm, end_day, end_hhmm) -> dict:
+    """Expression {start, end, all_day} calculée depuis les champs chaîne (chemins '$champ' ou expressions)"""
+    end_day = {"$ifNull": [end_day, start_day]}
+    return {"$let": {
+        "vars": {
+            "day": _parse_day_expr(start_day),
+            "last_day": _parse_day_expr(end_day),
+            "timed_start": _parse_time_expr(start_day, start_hhmm),
+            "timed_end": _parse_time_expr(end_day, end_hhmm)
+        },
+        "in": {"$let": {
+            "vars": {
+                "start": {"$ifNull": ["$$timed_start", "$$day"]},
+                "raw_end": {"$ifNull": ["$$timed_end", {"$add": ["$$last_day", DAY_MILLISECONDS]}]}
+            },
+            "in": {
+                "start": "$$start",
+                "end": {"$cond": [{"$lte": ["$$raw_end", "$$start"]}, {"$add": ["$$raw_end", DAY_MILLISECONDS]}, "$$raw_end"]},
+                "all_day": {"$or": [{"$eq": ["$$timed_start", None]}, {"$eq": ["$$timed_end", None]}]}
+            }
+        }}
+    }}
+
+
+def _plage_part(index):
+    return {"$arrayElemAt": [{"$split": [{"$ifNull": ["$plage_horaire", ""]}, "-"]}, index]}
+
+
+LEGACY_INTERVALS = {
+    "plannings": lambda: legacy_interval_expr("$date", _plage_part(0), "$date", _plage_part(1)),
+    "availabilities": lambda: legacy_interval_expr("$date", "$start_time", "$date", "$end_time"),
+    "absences": lambda: legacy_interval_expr("$start_date", "$start_hour", "$end_date", "$end_hour"),
+}
+
+
+def interval_stages(collection_name: str):
+    """
+    Étapes à placer en tête d'agrégation : garantissent start, end, all_day et duration_minutes sur chaque document,
+    natifs s'ils sont présents, recalculés depuis les chaînes sinon.
+    """
+    legacy = LEGACY_INTERVALS[collection_name]()
+    return [
+        {"$addFields": {"_legacy_interval": {"$cond": [{"$ifNull": ["$start", False]}, None, legacy]}}},
+        {"$addFields": {
+            "start": {"$ifNull": ["$_legacy_interval.start", "$start"]},
+            "end": {"$ifNull": ["$_legacy_interval.end", "$end"]},
+            "all_day": {"$ifNull": ["$_legacy_interval.all_day", "$all_day"]}
+        }},
+        {"$addFields": {
+            "duration_minutes": {"$ifNull": [
+                "$duration_minutes",
+                {"$toInt": {"$divide": [{"$subtract": ["$end", "$start"]}, 60 * 1000]}}
+            ]}
+        }},
+        {"$project": {"_legacy_interval": 0}}
+    ]
+
+
+def worked_minutes_expr():
+    """Minutes travaillées d'un créneau : sa durée, 0 pour un créneau journée entière (repos, congé)"""
+    return {"$cond": [{"$eq": ["$all_day", True]}, 0, "$duration_minutes"]}
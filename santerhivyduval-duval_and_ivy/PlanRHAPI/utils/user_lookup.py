@@ -0,0 +1,119 @@
+# Résolution groupée des utilisateurs associés à une liste de documents
+from bson import ObjectId
+
+# Seuls les champs affichés à côté d'un planning ou d'une disponibilité
+USER_INFO_PROJECTION = {"first_name": 1, "last_name": 1, "matricule": 1}
+
+
+async def fetch_users_by_ids(users_collection, user_ids):
+    """
+    Récupère en une seule requête $in les utilisateurs correspondant aux IDs fournis.
+    Retourne un dictionnaire {user_id (str): document utilisateur}
+    """
+    object_ids = list({ObjectId(uid) for uid in user_ids if isinstance(uid, str) and ObjectId.is_valid(uid)})
+    if not object_ids:
+        return {}
+
+    cursor = users_collection.find({"_id": {"$in": object_ids}}, USER_INFO_PROJECTION, batch_size=len(object_ids))
+    return {str(user["_id"]): user async for user in cursor}
+
+
+async def attach_user_info(rows, users_collection, user_field="user_id", with_matricule=True):
+    """
+    Ajoute user_name (et user_matricule) à chaque ligne.
+    Le nombre d'allers-retours vers MongoDB est constant, quel que soit le nombre de lignes.
+    """
+    user_map = await fetch_users_by_ids(users_collection, {row.get(user_field) for row in rows})
+
+    for row in rows:
+        user_info = user_map.get(row.get(user_field))
+        if user_info:
+            row["user_name"] = f"{user_info.get('first_name', '')} {user_info.get('last_name', '')}"
+            if with_matricule:
+                row["user_matricule"] = user_info.get('matricule', '')
+
+    return rows
+
+
+def user_lookup_stages(user_field="user_id", service_id=None):
+    """
+    Étapes d'agrégation équivalentes à attach_user_info, exécutées côté serveur.
+    Si service_id est fourni, seules les lignes dont l'utilisateur appartient au service sont conservées.
+    """
+    user_match = {
+        "$expr": {
+            "$eq": [
+                "$_id",
+                {"$convert": {"input": "$$user_id", "to": "objectId", "onError": None, "onNull": None}}
+            ]
+        }
+    }
+    if service_id:
+        user_match["service_id"] = service_id
+
+    return [
+        {
+            "$lookup": {
+                "from": "users",
+                "let": {"user_id": f"${user_field}"},
+                "pipeline": [
+                    {"$match": user_match},
+                    {"$project": {"first_name": 1, "last_name": 1, "matricule": 1, "service_id": 1}}
+                ],
+                "as": "user"
+            }
+        },
+        # Sans filtre de service, les lignes dont l'utilisateur est introuvable sont conservées
+        {"$unwind": {"path": "$user", "preserveNullAndEmptyArrays": not service_id}},
+        {
+            "$addFields": {
+                "user_name": {
+                    "$cond": [
+                        {"$ifNull": ["$user", False]},
+                        {"$concat": [
+                            {"$ifNull": ["$user.first_name", ""]}, " ", {"$ifNull": ["$user.last_name", ""]}
+                        ]},
+                        "$$REMOVE"
+                    ]
+                },
+                "user_matricule": {
+                    "$cond": [{"$ifNull": ["$user", False]}, {"$ifNull": ["$user.matricule", ""]}, "$$REMOVE"]
+                }
+            }
+        },
+        {"$project": {"user": 0}}
+    ]
+
+
+def service_rows_stages(collection_name, service_id, row_stages=(), user_field="user_id"):
+    """
+    Étapes d'agrégation à exécuter sur users : agents du service, puis leurs documents de collection_name
+    (row_stages appliquées dans la jointure), renvoyés en documents de premier niveau avec user_name et user_matricule.
+    Le filtre de service s'applique côté serveur, avant le tri et la pagination ajoutés à la suite.
+    """
+    return [
+        {"$match": {"service_id": service_id}},
+        {"$project": {"first_name": 1, "last_name": 1, "matricule": 1}},
+        {
+            "$lookup": {
+                "from": collection_name,
+                "let": {"user_id": {"$toString": "$_id"}},
+                "pipeline": [{"$match": {"$expr": {"$eq": [f"${user_field}", "$$user_id"]}}}, *row_stages],
+                "as": "row"
+            }
+        },
+        {"$unwind": "$row"},
+        {
+            "$replaceWith": {
+                "$mergeObjects": [
+                    "$row",
+                    {
+                        "user_name": {"$concat": [
+                            {"$ifNull": ["$first_name", ""]}, " ", {"$ifNull": ["$last_name", ""]}
+                        ]},
+                        "user_matricule": {"$ifNull": ["$matricule", ""]}
+                    }
+                ]
+            }
+        }
+    ]
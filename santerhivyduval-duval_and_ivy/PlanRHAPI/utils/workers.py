@@ -0,0 +1,37 @@
+# Pool de processus partagé pour les calculs longs (génération de plannings), hors de la boucle d'événements
+import asyncio
+import functools
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+# Nombre de processus de calcul ; par défaut un par cœur
+PROCESS_WORKERS = int(os.getenv('PROCESS_WORKERS', "0")) or os.cpu_count() or 1
+
+_process_pool = None
+
+
+def get_process_pool() -> ProcessPoolExecutor:
+    """
+    Pool créé à la première utilisation puis réutilisé par toutes les requêtes du processus.
+    Démarrage en 'spawn' : les processus ne héritent pas des threads du client MongoDB.
+    """
+    global _process_pool
+    if _process_pool is None:
+        _process_pool = ProcessPoolExecutor(
+            max_workers=PROCESS_WORKERS, mp_context=multiprocessing.get_context("spawn")
+        )
+    return _process_pool
+
+
+async def run_in_process(func, *args, **kwargs):
+    """Exécute func dans le pool de processus ; func et ses arguments doivent être sérialisables"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_process_pool(), functools.partial(func, *args, **kwargs))
+
+
+def shutdown_process_pool():
+    global _process_pool
+    if _process_pool is not None:
+        _process_pool.shutdown(wait=False, cancel_futures=True)
+        _process_pool = None